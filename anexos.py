@@ -0,0 +1,280 @@
+"""
+Anexos das consultas (PDFs de exames, radiografias, fotos)
+
+Armazenamento endereçado por conteúdo:
+- o corpo multipart do upload é lido direto do stream da requisição
+  (receber_upload), sem o spool do Starlette: o arquivo é gravado uma única
+  vez, num temporário, enquanto o SHA-256 é calculado (nunca fica inteiro
+  em memória); Content-Length acima do limite é recusado antes da leitura
+- o arquivo final vai para ANEXOS_DIR/<2 primeiros dígitos>/<sha256>: o
+  mesmo conteúdo enviado várias vezes (a mesma radiografia em duas
+  consultas) ocupa o disco uma única vez
+- a tabela anexos guarda os metadados (nome, tipo, tamanho, hash) ligados
+  à consulta
+
+Download com FileResponse: o arquivo é enviado em blocos direto do disco
+(ou pelo próprio servidor, quando ele suporta http.response.pathsend), com
+HTTP Range para os visualizadores de PDF/imagem.
+
+Arquivos que nenhuma linha referencia mais são apagados depois da purga das
+linhas excluídas (exclusao.py). Cada filial tem seu diretório
+(ANEXOS_DIR/filiais/<nome>): a coleta de uma filial só enxerga o banco dela.
+"""
+
+import hashlib
+import os
+import time
+import uuid
+
+from sqlalchemy import select
+
+import models
+from database import filial_atual
+
+ANEXOS_DIR = os.getenv("PETCARE_ANEXOS_DIR", "./anexos")
+TAMANHO_MAXIMO = int(os.getenv("PETCARE_ANEXO_TAMANHO_MAXIMO", str(50 * 1024 * 1024)))
+TAMANHO_BLOCO = 1024 * 1024
+
+TIPOS_PERMITIDOS = {
+    "application/pdf",
+    "image/jpeg",
+    "image/png",
+    "image/webp",
+    "application/dicom",
+}
+
+# Arquivos mais novos que isso nunca são coletados: o upload pode ainda não
+# ter gravado a linha de metadados
+CARENCIA_COLETA = 3600
+
+# Folga para os cabeçalhos e delimitadores do multipart no Content-Length
+FOLGA_MULTIPART = 64 * 1024
+
+
+class AnexoGrandeDemais(ValueError):
+    """Upload maior que TAMANHO_MAXIMO"""
+
+
+class TipoNaoPermitido(ValueError):
+    """Content-Type do arquivo fora de TIPOS_PERMITIDOS"""
+
+
+class UploadInvalido(ValueError):
+    """Corpo que não é multipart/form-data ou sem o campo do arquivo"""
+
+
+def _raiz() -> str:
+    """Diretório da filial atual (a matriz usa ANEXOS_DIR)"""
+    filial = filial_atual()
+    return ANEXOS_DIR if filial is None else os.path.join(ANEXOS_DIR, "filiais", filial)
+
+
+def caminho(sha256: str) -> str:
+    return os.path.join(_raiz(), sha256[:2], sha256)
+
+
+def _pasta_temporaria() -> str:
+    pasta = os.path.join(_raiz(), "tmp")
+    os.makedirs(pasta, exist_ok=True)
+    return pasta
+
+
+class Gravacao:
+    """
+    Gravação incremental de um anexo: escrever(bloco) ..., concluir() -> (sha256, tamanho)
+    - Os blocos vão para um temporário enquanto o hash é calculado
+    - Conteúdo já armazenado não é gravado de novo (deduplicação)
+    - descartar() apaga o temporário (erros e uploads interrompidos)
+    """
+
+    def __init__(self, tamanho_maximo: int = TAMANHO_MAXIMO):
+        self.tamanho_maximo = tamanho_maximo
+        self.tamanho = 0
+        self._hash = hashlib.sha256()
+        self._temporario = os.path.join(_pasta_temporaria(), uuid.uuid4().hex)
+        self._destino = open(self._temporario, "wb")
+
+    def escrever(self, bloco: bytes):
+        self.tamanho += len(bloco)
+        if self.tamanho > self.tamanho_maximo:
+            raise AnexoGrandeDemais(f"Arquivo maior que {self.tamanho_maximo // (1024 * 1024)} MB")
+        self._hash.update(bloco)
+        self._destino.write(bloco)
+
+    def concluir(self) -> tuple:
+        self._destino.close()
+        sha256 = self._hash.hexdigest()
+        final = caminho(sha256)
+        try:
+            # Deduplicado: renova o mtime para a coleta não apagar o arquivo
+            # antes de a nova linha ser gravada
+            os.utime(final)
+        except FileNotFoundError:
+            os.makedirs(os.path.dirname(final), exist_ok=True)
+            os.replace(self._temporario, final)
+        self.descartar()
+        return sha256, self.tamanho
+
+    def descartar(self):
+        self._destino.close()
+        if os.path.exists(self._temporario):
+            os.remove(self._temporario)
+
+
+def gravar(arquivo, tamanho_maximo: int = TAMANHO_MAXIMO) -> tuple:
+    """Copia o arquivo (objeto com read(n)) para o armazenamento; retorna (sha256, tamanho)"""
+    gravacao = Gravacao(tamanho_maximo)
+    try:
+        while bloco := arquivo.read(TAMANHO_BLOCO):
+            gravacao.escrever(bloco)
+        return gravacao.concluir()
+    finally:
+        gravacao.descartar()
+
+
+def _parser_multipart():
+    try:
+        import python_multipart as multipart
+    except ImportError:  # python-multipart < 0.0.13
+        import multipart
+    return multipart.MultipartParser, multipart.multipart.parse_options_header
+
+
+async def receber_upload(request, campo: str = "arquivo", tamanho_maximo: int = None) -> dict:
+    """
+    Lê o multipart/form-data direto do stream e grava o arquivo do `campo`
+    - Retorna {nome_arquivo, content_type, sha256, tamanho}
+    - AnexoGrandeDemais pelo Content-Length (antes de ler o corpo) ou
+      assim que o limite é ultrapassado; TipoNaoPermitido pelo Content-Type
+      da parte; UploadInvalido se o corpo não tiver o campo
+    - As gravações em disco rodam no threadpool, em blocos de TAMANHO_BLOCO
+    """
+    from starlette.concurrency import run_in_threadpool
+
+    if tamanho_maximo is None:
+        tamanho_maximo = TAMANHO_MAXIMO
+    comprimento = request.headers.get("content-length")
+    if comprimento and comprimento.isdigit() and int(comprimento) > tamanho_maximo + FOLGA_MULTIPART:
+        raise AnexoGrandeDemais(f"Arquivo maior que {tamanho_maximo // (1024 * 1024)} MB")
+
+    MultipartParser, parse_options_header = _parser_multipart()
+    tipo, opcoes = parse_options_header(request.headers.get("content-type", ""))
+    if tipo != b"multipart/form-data" or not opcoes.get(b"boundary"):
+        raise UploadInvalido("Envie o arquivo como multipart/form-data")
+
+    estado = {"cabecalhos": {}, "campo": b"", "valor": b"", "parte": None, "arquivo": None}
+    buffer = bytearray()
+
+    def inicio_parte():
+        estado["cabecalhos"] = {}
+        estado["parte"] = None
+
+    def campo_cabecalho(dados, inicio, fim):
+        estado["campo"] += dados[inicio:fim]
+
+    def valor_cabecalho(dados, inicio, fim):
+        estado["valor"] += dados[inicio:fim]
+
+    def fim_cabecalho():
+        estado["cabecalhos"][estado["campo"].lower()] = estado["valor"]
+        estado["campo"] = estado["valor"] = b""
+
+    def cabecalhos_lidos():
+        _, disposicao = parse_options_header(estado["cabecalhos"].get(b"content-disposition", b""))
+        if disposicao.get(b"name") != campo.encode() or estado["arquivo"] is not None:
+            return
+        content_type = parse_options_header(estado["cabecalhos"].get(b"content-type", b""))[0].decode("latin-1").lower()
+        if content_type not in TIPOS_PERMITIDOS:
+            raise TipoNaoPermitido(f"Tipo de arquivo não permitido: {content_type or 'desconhecido'}")
+        nome = disposicao.get(b"filename", b"anexo").decode("utf-8", "replace")
+        estado["parte"] = estado["arquivo"] = {"nome_arquivo": nome, "content_type": content_type}
+
+    def dados_parte(dados, inicio, fim):
+        if estado["parte"] is not None:
+            buffer.extend(dados[inicio:fim])
+
+    def fim_parte():
+        estado["parte"] = None
+
+    parser = MultipartParser(opcoes[b"boundary"], callbacks={
+        "on_part_begin": inicio_parte,
+        "on_header_field": campo_cabecalho,
+        "on_header_value": valor_cabecalho,
+        "on_header_end": fim_cabecalho,
+        "on_headers_finished": cabecalhos_lidos,
+        "on_part_data": dados_parte,
+        "on_part_end": fim_parte,
+    })
+
+    gravacao = await run_in_threadpool(Gravacao, tamanho_maximo)
+    try:
+        try:
+            async for pedaco in request.stream():
+                parser.write(pedaco)
+                if len(buffer) >= TAMANHO_BLOCO:
+                    await run_in_threadpool(gravacao.escrever, bytes(buffer))
+                    buffer.clear()
+            parser.finalize()
+        except (TipoNaoPermitido, AnexoGrandeDemais):
+            raise
+        except ValueError as e:
+            # Erros de parse do python-multipart (também ValueError)
+            raise UploadInvalido("Corpo multipart inválido") from e
+        if estado["arquivo"] is None:
+            raise UploadInvalido(f"Campo '{campo}' ausente")
+        if buffer:
+            await run_in_threadpool(gravacao.escrever, bytes(buffer))
+        sha256, tamanho = await run_in_threadpool(gravacao.concluir)
+    finally:
+        await run_in_threadpool(gravacao.descartar)
+    return {**estado["arquivo"], "sha256": sha256, "tamanho": tamanho}
+
+
+def serializar(anexo: models.Anexo) -> dict:
+    return {
+        "id": anexo.id,
+        "consulta_id": anexo.consulta_id,
+        "nome_arquivo": anexo.nome_arquivo,
+        "content_type": anexo.content_type,
+        "tamanho": anexo.tamanho,
+        "sha256": anexo.sha256,
+        "created_at": anexo.created_at.isoformat() if anexo.created_at else None,
+    }
+
+
+def coletar_orfaos(engine=None, carencia: int = CARENCIA_COLETA) -> int:
+    """
+    Apaga arquivos sem nenhuma linha de anexos (nem excluída) e temporários abandonados
+    - Só no diretório da filial atual; engine deve ser o banco dela
+    """
+    if engine is None:
+        from database import engine_atual
+        engine = engine_atual()
+
+    raiz = _raiz()
+    if not os.path.isdir(raiz):
+        return 0
+    with engine.connect() as conn:
+        referenciados = set(conn.execute(select(models.Anexo.sha256).distinct()).scalars())
+
+    limite = time.time() - carencia
+    apagados = 0
+    # Só as pastas <2 dígitos> e tmp: "filiais" (na matriz) pertence às filiais
+    for pasta in os.listdir(raiz):
+        if len(pasta) != 2 and pasta != "tmp":
+            continue
+        temporarios = pasta == "tmp"
+        diretorio = os.path.join(raiz, pasta)
+        if not os.path.isdir(diretorio):
+            continue
+        for nome in os.listdir(diretorio):
+            if not temporarios and nome in referenciados:
+                continue
+            arquivo = os.path.join(diretorio, nome)
+            try:
+                if os.stat(arquivo).st_mtime < limite:
+                    os.remove(arquivo)
+                    apagados += 1
+            except FileNotFoundError:
+                pass
+    return apagados
@@ -0,0 +1,158 @@
+"""
+Arquivamento do histórico: tabelas quentes pequenas, histórico frio à parte
+
+Consultas e serviços de banho/tosa fechados (concluídos ou cancelados) com
+data_hora anterior a PETCARE_ARQUIVO_DIAS dias saem de consultas/banho_tosa
+e vão para consultas_arquivo/banho_tosa_arquivo, com o mesmo id:
+- em lotes de LOTE_ARQUIVAMENTO linhas, cada lote numa transação
+  (INSERT ... SELECT no arquivo + DELETE na quente), com pausa entre os
+  lotes para as escritas da API não esperarem o lock
+- a seleção usa o índice parcial ix_<tabela>_data_hora_ativos
+- as tabelas quentes (e seus índices) ficam só com a agenda e o último ano,
+  o que as listagens, dashboards e a agenda do dia realmente leem
+
+As rotas de histórico (GET /consultas/historico, /banho-tosa/historico)
+juntam as duas tabelas com UNION ALL; a busca por id e os anexos também
+enxergam as linhas arquivadas. Linhas arquivadas são somente leitura.
+
+Para os clientes de /sync arquivar não é remover: o trigger de DELETE não
+grava lápide para ids que já estão no arquivo (migração 0013), e o cliente
+offline mantém a linha no último estado sincronizado. A exclusão lógica de
+uma linha arquivada grava a lápide normalmente.
+
+Roda numa tarefa assíncrona a cada PETCARE_ARQUIVO_INTERVALO segundos (0
+desativa), na matriz e em cada filial, ou sob demanda pelo job
+"arquivar_historico".
+"""
+
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import DateTime, delete, insert, literal, select, union_all
+
+import cache
+import models
+
+ARQUIVO_DIAS = int(os.getenv("PETCARE_ARQUIVO_DIAS", "365"))
+INTERVALO_ARQUIVAMENTO = int(os.getenv("PETCARE_ARQUIVO_INTERVALO", "86400"))
+LOTE_ARQUIVAMENTO = 1000
+# Pausa entre lotes, para as escritas da API não esperarem o lock
+PAUSA_ENTRE_LOTES = 0.05
+
+# (tabela quente, arquivo, status fechados)
+ARQUIVAVEIS = [
+    (models.Consulta, models.ConsultaArquivada, ["concluida", "cancelada"]),
+    (models.BanhoTosa, models.BanhoTosaArquivado, ["concluido", "cancelado"]),
+]
+
+
+def _mover_lote(conn, quente, arquivo, criterio, lote: int) -> int:
+    """Move um lote (INSERT ... SELECT + DELETE na mesma transação); retorna as linhas movidas"""
+    ids = conn.execute(
+        select(quente.id).where(criterio).order_by(quente.id).limit(lote)
+    ).scalars().all()
+    if not ids:
+        return 0
+
+    colunas = [coluna.name for coluna in quente.__table__.columns]
+    origem = select(
+        *[quente.__table__.c[nome] for nome in colunas],
+        literal(datetime.utcnow(), DateTime),
+    ).where(quente.id.in_(ids))
+    conn.execute(insert(arquivo).from_select([*colunas, "arquivado_em"], origem))
+    conn.execute(delete(quente).where(quente.id.in_(ids)))
+    return len(ids)
+
+
+def arquivar(engine=None, dias: int = ARQUIVO_DIAS, lote: int = LOTE_ARQUIVAMENTO, progresso=None) -> dict:
+    """
+    Move as linhas fechadas mais antigas que `dias` para o arquivo; retorna {tabela: linhas}
+    - progresso(tabela, linhas) é chamado após cada lote (heartbeat do job
+      "arquivar_historico", ver jobs._recuperar_orfaos)
+    """
+    if engine is None:
+        from database import engine_atual
+        engine = engine_atual()
+
+    limite = datetime.utcnow() - timedelta(days=dias)
+    movidas = {}
+    for quente, arquivo, fechados in ARQUIVAVEIS:
+        # Mesmo predicado do índice parcial ix_<tabela>_data_hora_ativos
+        criterio = (
+            quente.deleted_at.is_(None)
+            & (quente.data_hora < limite)
+            & quente.status.in_(fechados)
+        )
+        total = 0
+        while True:
+            with engine.begin() as conn:
+                n = _mover_lote(conn, quente, arquivo, criterio, lote)
+            total += n
+            if progresso is not None:
+                progresso(quente.__tablename__, total)
+            if n < lote:
+                break
+            time.sleep(PAUSA_ENTRE_LOTES)
+        movidas[quente.__tablename__] = total
+
+    alteradas = [tabela for tabela, total in movidas.items() if total]
+    if alteradas:
+        cache.invalidar_tabelas(*alteradas, *(f"{tabela}_arquivo" for tabela in alteradas))
+    return movidas
+
+
+def historico(db, projecao, projecao_arquivo, criterios, limite: int, offset: int = 0) -> list:
+    """
+    Linhas da tabela quente e do arquivo numa única lista, da mais recente para a mais antiga
+    - criterios(modelo) -> lista de filtros, aplicada aos dois lados
+    - Cada lado já vem ordenado e limitado a offset + limite (a ordenação
+      final só junta duas listas curtas)
+    - Cada registro leva "arquivada"
+    """
+    lados = []
+    for proj, arquivada in ((projecao, False), (projecao_arquivo, True)):
+        modelo = proj.modelo
+        stmt = (
+            proj.select(*criterios(modelo))
+            .order_by(None)
+            .order_by(modelo.data_hora.desc(), modelo.id.desc())
+            .limit(offset + limite)
+            .add_columns(literal(arquivada).label("arquivada"))
+        )
+        lados.append(select(stmt.subquery()))
+
+    uniao = union_all(*lados).subquery()
+    stmt = select(uniao).order_by(uniao.c.data_hora.desc(), uniao.c.id.desc()).limit(limite).offset(offset)
+
+    serializar = projecao.serializar
+    registros = []
+    for row in db.execute(stmt):
+        registro = serializar(row)
+        registro["arquivada"] = bool(row[-1])
+        registros.append(registro)
+    return registros
+
+
+def _arquivar_na_filial(filial):
+    from database import usar_filial
+    with usar_filial(filial):
+        return arquivar()
+
+
+async def ciclo_arquivamento(intervalo: int = INTERVALO_ARQUIVAMENTO):
+    """Tarefa de fundo: arquivamento periódico fora do event loop (em thread), banco por banco"""
+    from database import pool_filiais
+
+    while True:
+        await asyncio.sleep(intervalo)
+        for filial in [None, *pool_filiais.listar()]:
+            nome = filial or "matriz"
+            try:
+                movidas = await asyncio.to_thread(_arquivar_na_filial, filial)
+            except Exception as e:
+                print(f"⚠️ Arquivamento do histórico ({nome}) falhou: {e}")
+                continue
+            if any(movidas.values()):
+                print(f"🗄️ Histórico arquivado ({nome}): {movidas}")
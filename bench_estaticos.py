@@ -0,0 +1,97 @@
+"""
+Benchmark de bytes transferidos no carregamento da página
+
+Carrega uma página HTML e os JS/CSS que ela referencia, como o navegador faria:
+- original: arquivos sem compressão (como eram servidos antes)
+- frio: primeira visita, com Accept-Encoding (variantes .br/.gz)
+- quente: segunda visita; assets com hash vêm do cache do navegador
+  (Cache-Control immutable, nenhuma requisição) e o HTML é revalidado
+  por ETag (304 sem corpo)
+
+Uso:
+    python bench_estaticos.py                          # /frontend/index.html
+    python bench_estaticos.py --pagina /auth/login.html
+    python bench_estaticos.py --encoding gzip          # simula cliente sem brotli
+"""
+
+import argparse
+import os
+import re
+import sys
+
+os.environ.setdefault("PETCARE_RATE_LIMIT", "0")
+
+from fastapi.testclient import TestClient
+
+import main
+
+
+def _referencias(html: str) -> list:
+    return re.findall(r'\b(?:src|href)=["\'](?:\./)?([^"\':?#]+\.(?:js|css))["\']', html)
+
+
+def _url(pagina: str, alvo: str) -> str:
+    return pagina.rsplit("/", 1)[0] + "/" + alvo
+
+
+def carregar(client, pagina: str, encoding: str, cache_navegador: dict = None) -> dict:
+    """Carrega a página e seus assets; cache_navegador guarda ETags e Cache-Control"""
+    headers = {"Accept-Encoding": encoding}
+    total = requisicoes = 0
+    detalhes = []
+
+    def baixar(url):
+        nonlocal total, requisicoes
+        if cache_navegador is not None and url in cache_navegador:
+            anterior = cache_navegador[url]
+            if "immutable" in anterior.get("cache-control", ""):
+                detalhes.append((url, "cache", 0))
+                return None
+            h = {**headers, "If-None-Match": anterior.get("etag", "")}
+        else:
+            h = headers
+        r = client.get(url, headers=h)
+        requisicoes += 1
+        total += r.num_bytes_downloaded
+        detalhes.append((url, r.status_code, r.num_bytes_downloaded))
+        if cache_navegador is not None and r.status_code == 200:
+            cache_navegador[url] = {"etag": r.headers.get("etag", ""), "cache-control": r.headers.get("cache-control", "")}
+        return r
+
+    r = baixar(pagina)
+    if r.status_code == 200:
+        html = r.text
+        if cache_navegador is not None:
+            cache_navegador[pagina]["html"] = html
+    else:
+        html = cache_navegador[pagina]["html"]  # 304: HTML do cache do navegador
+    for alvo in _referencias(html):
+        baixar(_url(pagina, alvo))
+    return {"bytes": total, "requisicoes": requisicoes, "detalhes": detalhes}
+
+
+def main_bench():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pagina", default="/frontend/index.html")
+    parser.add_argument("--encoding", default="br, gzip")
+    args = parser.parse_args()
+
+    with TestClient(main.app) as client:
+        # Mesmos arquivos, sem compressão: o que era transferido antes do build
+        original = carregar(client, args.pagina, "identity")
+        navegador = {}
+        frio = carregar(client, args.pagina, args.encoding, navegador)
+        quente = carregar(client, args.pagina, args.encoding, navegador)
+
+    print(f"📄 {args.pagina} (Accept-Encoding: {args.encoding})")
+    for nome, resultado in (("original", original), ("frio", frio), ("quente", quente)):
+        print(f"  {nome:<9} {resultado['bytes']:>8} bytes em {resultado['requisicoes']} requisições")
+        for url, status, n in resultado["detalhes"]:
+            print(f"      {status!s:>5} {n:>8}  {url}")
+    if original["bytes"]:
+        print(f"  economia fria: {100 * (1 - frio['bytes'] / original['bytes']):.1f}%")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_bench())
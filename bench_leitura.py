@@ -0,0 +1,133 @@
+"""
+Benchmark das listagens: ORM completo x projeção de colunas
+
+Cria um banco SQLite temporário com N linhas de donos, animais e vacinas
+(100 mil por padrão) e compara, para cada listagem:
+- ORM: db.query(Modelo).all() + montagem manual do dict (caminho antigo)
+- Projeção: projecoes.<MODELO>.listar() (colunas em tuplas, yield_per)
+
+Reporta tempo de CPU e pico de memória alocada (tracemalloc) por 100 mil linhas.
+
+Uso:
+    python bench_leitura.py
+    python bench_leitura.py --linhas 200000
+"""
+
+import argparse
+import gc
+import os
+import tempfile
+import time
+import tracemalloc
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+import models
+import projecoes
+from migrations import aplicar_pendentes
+
+
+def popular(engine, linhas: int):
+    with engine.begin() as conn:
+        conn.exec_driver_sql(
+            "WITH RECURSIVE seq(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM seq WHERE n < ?) "
+            "INSERT INTO donos (id, nome, telefone) "
+            "SELECT n, 'Dono ' || n, '(11) 9' || printf('%08d', n) FROM seq",
+            (linhas,),
+        )
+        conn.exec_driver_sql(
+            "WITH RECURSIVE seq(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM seq WHERE n < ?) "
+            "INSERT INTO animais (id, nome, especie, idade, dono_id) "
+            "SELECT n, 'Animal ' || n, 'cachorro', n % 15, n FROM seq",
+            (linhas,),
+        )
+        conn.exec_driver_sql(
+            "WITH RECURSIVE seq(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM seq WHERE n < ?) "
+            "INSERT INTO vacinas (id, nome, data_aplicacao, animal_id) "
+            "SELECT n, 'V10', date('2024-01-01', '+' || (n % 365) || ' days'), n FROM seq",
+            (linhas,),
+        )
+
+
+def orm_donos(db):
+    return [{"id": d.id, "nome": d.nome, "telefone": d.telefone} for d in db.query(models.Dono).all()]
+
+
+def orm_animais(db):
+    return [
+        {"id": a.id, "nome": a.nome, "especie": a.especie, "idade": a.idade, "dono_id": a.dono_id}
+        for a in db.query(models.Animal).all()
+    ]
+
+
+def orm_vacinas(db):
+    return [
+        {
+            "id": v.id,
+            "nome": v.nome,
+            "data_aplicacao": v.data_aplicacao.isoformat() if v.data_aplicacao else None,
+            "animal_id": v.animal_id,
+        }
+        for v in db.query(models.Vacina).all()
+    ]
+
+
+CASOS = [
+    ("donos", orm_donos, projecoes.DONO.listar),
+    ("animais", orm_animais, projecoes.ANIMAL.listar),
+    ("vacinas", orm_vacinas, projecoes.VACINA.listar),
+]
+
+
+def medir(engine, funcao):
+    """
+    Executa funcao(db) em sessões novas; retorna (segundos de CPU, pico em bytes, linhas)
+    - CPU e memória em execuções separadas (tracemalloc distorce o tempo)
+    """
+    gc.collect()
+    with Session(engine) as db:
+        inicio = time.process_time()
+        linhas = len(funcao(db))
+        duracao = time.process_time() - inicio
+
+    gc.collect()
+    with Session(engine) as db:
+        tracemalloc.start()
+        funcao(db)
+        _, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return duracao, pico, linhas
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ORM x projeção de colunas")
+    parser.add_argument("--linhas", type=int, default=100_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        aplicar_pendentes(engine, verbose=False)
+        popular(engine, args.linhas)
+
+        escala = 100_000 / args.linhas
+        print(f"Listagens com {args.linhas} linhas (valores por 100 mil linhas)")
+        print(f"{'tabela':<10}{'caminho':<11}{'CPU (ms)':>10}{'pico (MB)':>11}")
+        for tabela, orm, projecao in CASOS:
+            resultados = {}
+            for nome, funcao in (("ORM", orm), ("projeção", projecao)):
+                duracao, pico, linhas = medir(engine, funcao)
+                assert linhas == args.linhas
+                resultados[nome] = (duracao, pico)
+                print(f"{tabela:<10}{nome:<11}{duracao * 1000 * escala:>10.0f}{pico / 2**20 * escala:>11.1f}")
+            (cpu_orm, mem_orm), (cpu_proj, mem_proj) = resultados["ORM"], resultados["projeção"]
+            print(
+                f"{'':<10}{'economia':<11}{(cpu_orm - cpu_proj) * 1000 * escala:>10.0f}"
+                f"{(mem_orm - mem_proj) / 2**20 * escala:>11.1f}"
+                f"   ({cpu_orm / cpu_proj:.1f}x CPU, {mem_orm / mem_proj:.1f}x memória)"
+            )
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Benchmark de tempo de inicialização da API
+
+Mede, em processos Python novos (cold start), quanto tempo leva para:
+- importar o módulo main
+- executar o startup do lifespan
+- responder a primeira requisição (GET / por padrão)
+
+Uso:
+    python bench_startup.py                    # 10 execuções
+    python bench_startup.py --runs 20
+    python bench_startup.py --rota /donos/     # primeira requisição à API
+    python bench_startup.py --imports          # módulos mais caros (-X importtime)
+
+Sai com código 1 se a mediana do tempo até a primeira requisição passar do
+alvo (ALVO_PRIMEIRA_REQUISICAO_MS ou --alvo-ms).
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+# Alvo de tempo até a primeira requisição (ms)
+ALVO_PRIMEIRA_REQUISICAO_MS = 700
+
+SCRIPT_FILHO = r"""
+import json, sys, time
+t0 = time.perf_counter()
+import main
+t1 = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(main.app) as client:
+    t2 = time.perf_counter()
+    client.get(sys.argv[1])
+    t3 = time.perf_counter()
+print(json.dumps({"import": t1 - t0, "startup": t2 - t1, "primeira_requisicao": t3 - t0}))
+"""
+
+
+def medir(runs: int, rota: str = "/"):
+    resultados = {"import": [], "startup": [], "primeira_requisicao": []}
+    for _ in range(runs):
+        saida = subprocess.run(
+            [sys.executable, "-c", SCRIPT_FILHO, rota],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip().splitlines()[-1]
+        for chave, valor in json.loads(saida).items():
+            resultados[chave].append(valor * 1000)
+    return resultados
+
+
+def perfil_imports(limite: int = 25):
+    """Importa main com -X importtime e lista os módulos de maior tempo acumulado"""
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        capture_output=True, text=True, check=True,
+    ).stderr
+    linhas = []
+    for linha in stderr.splitlines():
+        if not linha.startswith("import time:") or "cumulative" in linha:
+            continue
+        proprio, acumulado, modulo = linha[len("import time:"):].split("|")
+        linhas.append((int(acumulado), int(proprio), modulo.rstrip()))
+    linhas.sort(reverse=True)
+    print(f"{'acumulado (ms)':>15}{'próprio (ms)':>14}  módulo")
+    for acumulado, proprio, modulo in linhas[:limite]:
+        print(f"{acumulado / 1000:>15.1f}{proprio / 1000:>14.1f}  {modulo}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--rota", default="/")
+    parser.add_argument("--alvo-ms", type=float, default=ALVO_PRIMEIRA_REQUISICAO_MS)
+    parser.add_argument("--imports", action="store_true", help="mostra o perfil de importação")
+    args = parser.parse_args()
+
+    if args.imports:
+        perfil_imports()
+        return
+
+    resultados = medir(args.runs, args.rota)
+    print(f"Cold start em {args.runs} execuções, primeira requisição: GET {args.rota} (ms)")
+    print(f"{'etapa':<22}{'mediana':>10}{'mín':>10}{'máx':>10}")
+    for etapa, tempos in resultados.items():
+        print(f"{etapa:<22}{statistics.median(tempos):>10.1f}{min(tempos):>10.1f}{max(tempos):>10.1f}")
+
+    mediana = statistics.median(resultados["primeira_requisicao"])
+    print(f"\nAlvo: {args.alvo_ms:.0f} ms -> {'OK' if mediana <= args.alvo_ms else 'ACIMA DO ALVO'}")
+    if mediana > args.alvo_ms:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,586 @@
+"""
+Camada de cache da API
+
+- Cache LRU em memória para consultas de existência de Dono e Animal:
+  quase toda escrita em consultas, banho/tosa, vacinas e animais valida
+  primeiro se o dono/animal referenciado existe, e a validação de chave
+  estrangeira não deve custar uma query por escrita com dados quentes.
+  A entrada local vale sozinha por PETCARE_ENTIDADES_TTL segundos; só
+  depois a versão da entidade é conferida no backend (com SQLite ou Redis
+  compartilhados, isso evita uma ida ao backend por validação).
+- Backend plugável (memória, arquivo SQLite compartilhado ou servidor Redis)
+  para resultados de listagens e dashboards, com invalidação entre processos
+  baseada em versão de tabela: toda escrita incrementa a versão da tabela e
+  as chaves de cache embutem as versões das tabelas de que dependem.
+- Escopo por filial (ver filiais.py): versões, chaves e entradas de
+  entidades levam o nome da filial da requisição; a matriz usa os nomes
+  sem prefixo, como antes.
+- Coalescência (single-flight) dos misses: requisições idênticas e
+  simultâneas (mesma rota, parâmetros e versões de tabela) esperam uma única
+  computação em andamento no processo e compartilham o resultado.
+
+O backend é escolhido pela variável de ambiente PETCARE_CACHE_URL:
+    memory://                      (padrão, apenas o processo atual)
+    sqlite:///./cache_petcare.db   (arquivo compartilhado entre workers)
+    redis://localhost:6379/0       (requer o pacote "redis")
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+import models
+from database import filial_atual
+
+# Capacidade máxima de cada cache (número de entradas)
+DONOS_CACHE_MAXSIZE = 4096
+ANIMAIS_CACHE_MAXSIZE = 8192
+MEMORY_BACKEND_MAXSIZE = 2048
+
+# Tempo de vida padrão (segundos) dos resultados de listagens e dashboards
+LISTAS_CACHE_TTL = 300
+
+# Por quanto tempo (segundos) uma entrada de dono/animal vale sem conferir a
+# versão no backend: alterações feitas em outro worker aparecem depois disso
+ENTIDADES_TTL = float(os.getenv("PETCARE_ENTIDADES_TTL", "2"))
+
+# Espera máxima (segundos) por uma computação coalescida antes de calcular por conta própria
+COALESCENCIA_ESPERA_MAXIMA = 30
+
+CACHE_URL = os.getenv("PETCARE_CACHE_URL", "memory://")
+
+# Projeções imutáveis com os campos básicos de cada entidade
+DonoInfo = namedtuple("DonoInfo", ["id", "nome", "telefone", "version"])
+AnimalInfo = namedtuple("AnimalInfo", ["id", "nome", "especie", "idade", "dono_id", "version"])
+
+
+class LRUCache:
+    """
+    Cache LRU limitado e seguro para uso entre threads
+    - Remove a entrada menos usada quando a capacidade é atingida
+    - Contabiliza hits e misses para reportar a taxa de acerto
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._dados = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, chave, default=None, contar: bool = True):
+        """contar=False: quem chama decide se foi acerto (ver registrar)"""
+        with self._lock:
+            try:
+                valor = self._dados[chave]
+            except KeyError:
+                if contar:
+                    self.misses += 1
+                return default
+            self._dados.move_to_end(chave)
+            if contar:
+                self.hits += 1
+            return valor
+
+    def registrar(self, acerto: bool):
+        with self._lock:
+            if acerto:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def set(self, chave, valor):
+        with self._lock:
+            self._dados[chave] = valor
+            self._dados.move_to_end(chave)
+            if len(self._dados) > self.maxsize:
+                self._dados.popitem(last=False)
+
+    def invalidate(self, chave):
+        with self._lock:
+            self._dados.pop(chave, None)
+
+    def clear(self):
+        with self._lock:
+            self._dados.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "tamanho": len(self._dados),
+                "capacidade": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            }
+
+
+# ----------------------------
+# Backends
+# ----------------------------
+class MemoryBackend:
+    """
+    Backend em memória (apenas o processo atual)
+    - Valores num LRU limitado, com expiração opcional
+    - Contadores de versão fora do LRU, para nunca serem descartados
+    """
+
+    nome = "memory"
+
+    def __init__(self, maxsize: int = MEMORY_BACKEND_MAXSIZE):
+        self._valores = LRUCache(maxsize=maxsize)
+        self._versoes = {}
+        self._lock = threading.Lock()
+
+    def get(self, chave):
+        item = self._valores.get(chave)
+        if item is None:
+            return None
+        expira, valor = item
+        if expira is not None and expira < time.monotonic():
+            self._valores.invalidate(chave)
+            return None
+        return valor
+
+    def set(self, chave, valor, ttl=None):
+        expira = time.monotonic() + ttl if ttl else None
+        self._valores.set(chave, (expira, valor))
+
+    def delete(self, chave):
+        self._valores.invalidate(chave)
+
+    def get_versao(self, nome: str) -> int:
+        return self._versoes.get(nome, 0)
+
+    def incr_versao(self, nome: str) -> int:
+        with self._lock:
+            versao = self._versoes.get(nome, 0) + 1
+            self._versoes[nome] = versao
+            return versao
+
+    def incr_versoes(self, nomes):
+        with self._lock:
+            for nome in nomes:
+                self._versoes[nome] = self._versoes.get(nome, 0) + 1
+
+    def stats(self) -> dict:
+        return self._valores.stats()
+
+
+class SQLiteBackend:
+    """
+    Backend em arquivo SQLite compartilhado entre processos
+    - Uma conexão por thread (e por processo, recriada após fork)
+    - WAL para leitores não bloquearem o escritor
+    - Entradas expiradas são removidas periodicamente nas escritas
+    """
+
+    nome = "sqlite"
+    LIMPEZA_A_CADA = 256
+
+    def __init__(self, caminho: str):
+        self.caminho = caminho
+        self._local = threading.local()
+        self._escritas = 0
+        self.hits = 0
+        self.misses = 0
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache_valores ("
+            "chave TEXT PRIMARY KEY, valor TEXT NOT NULL, expira REAL)"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache_versoes ("
+            "nome TEXT PRIMARY KEY, versao INTEGER NOT NULL)"
+        )
+
+    def _conn(self):
+        pid = os.getpid()
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != pid:
+            conn = sqlite3.connect(self.caminho, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = pid
+        return conn
+
+    def get(self, chave):
+        row = self._conn().execute(
+            "SELECT valor FROM cache_valores WHERE chave = ? AND (expira IS NULL OR expira >= ?)",
+            (chave, time.time()),
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, chave, valor, ttl=None):
+        expira = time.time() + ttl if ttl else None
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache_valores (chave, valor, expira) VALUES (?, ?, ?)",
+            (chave, json.dumps(valor), expira),
+        )
+        self._escritas += 1
+        if self._escritas % self.LIMPEZA_A_CADA == 0:
+            conn.execute("DELETE FROM cache_valores WHERE expira < ?", (time.time(),))
+
+    def delete(self, chave):
+        self._conn().execute("DELETE FROM cache_valores WHERE chave = ?", (chave,))
+
+    def get_versao(self, nome: str) -> int:
+        row = self._conn().execute(
+            "SELECT versao FROM cache_versoes WHERE nome = ?", (nome,)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def incr_versao(self, nome: str) -> int:
+        row = self._conn().execute(
+            "INSERT INTO cache_versoes (nome, versao) VALUES (?, 1) "
+            "ON CONFLICT(nome) DO UPDATE SET versao = versao + 1 RETURNING versao",
+            (nome,),
+        ).fetchone()
+        return row[0]
+
+    def incr_versoes(self, nomes):
+        """Várias versões numa única transação (invalidação em lote)"""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "INSERT INTO cache_versoes (nome, versao) VALUES (?, 1) "
+                "ON CONFLICT(nome) DO UPDATE SET versao = versao + 1",
+                [(nome,) for nome in nomes],
+            )
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        tamanho = self._conn().execute("SELECT COUNT(*) FROM cache_valores").fetchone()[0]
+        return {
+            "tamanho": tamanho,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+class RedisBackend:
+    """
+    Backend em servidor compatível com o protocolo Redis
+    - Valores serializados em JSON, expiração via SET ... EX
+    - Versões via INCR (atômico entre processos)
+    """
+
+    nome = "redis"
+    PREFIXO = "petcare:"
+
+    def __init__(self, url: str):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("Backend redis requer o pacote 'redis' (pip install redis)") from e
+        self._cliente = redis.Redis.from_url(url)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, chave):
+        valor = self._cliente.get(self.PREFIXO + chave)
+        if valor is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(valor)
+
+    def set(self, chave, valor, ttl=None):
+        self._cliente.set(self.PREFIXO + chave, json.dumps(valor), ex=ttl or None)
+
+    def delete(self, chave):
+        self._cliente.delete(self.PREFIXO + chave)
+
+    def get_versao(self, nome: str) -> int:
+        valor = self._cliente.get(self.PREFIXO + "versao:" + nome)
+        return int(valor) if valor is not None else 0
+
+    def incr_versao(self, nome: str) -> int:
+        return self._cliente.incr(self.PREFIXO + "versao:" + nome)
+
+    def incr_versoes(self, nomes):
+        pipeline = self._cliente.pipeline(transaction=False)
+        for nome in nomes:
+            pipeline.incr(self.PREFIXO + "versao:" + nome)
+        pipeline.execute()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+def criar_backend(url: str):
+    """Instancia o backend correspondente à URL informada"""
+    if url.startswith("memory://"):
+        return MemoryBackend()
+    if url.startswith("sqlite:///"):
+        return SQLiteBackend(url[len("sqlite:///"):])
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisBackend(url)
+    raise ValueError(f"URL de cache não suportada: {url}")
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """Backend configurado (criado sob demanda a partir de PETCARE_CACHE_URL)"""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = criar_backend(CACHE_URL)
+    return _backend
+
+
+def configurar_backend(url: str):
+    """Troca o backend em uso (ex.: testes apontando para um arquivo temporário)"""
+    global _backend
+    with _backend_lock:
+        _backend = criar_backend(url)
+    return _backend
+
+
+# ----------------------------
+# Coalescência de requisições
+# ----------------------------
+class _Voo:
+    __slots__ = ("pronto", "valor", "erro")
+
+    def __init__(self):
+        self.pronto = threading.Event()
+        self.valor = None
+        self.erro = None
+
+
+class SingleFlight:
+    """
+    Uma computação em andamento por chave
+    - A primeira chamada calcula; as concorrentes com a mesma chave esperam
+      e recebem o mesmo resultado (ou a mesma exceção)
+    - Contabiliza execuções e chamadas coalescidas
+    """
+
+    def __init__(self, espera_maxima: float = COALESCENCIA_ESPERA_MAXIMA):
+        self.espera_maxima = espera_maxima
+        self._voos = {}
+        self._lock = threading.Lock()
+        self.execucoes = 0
+        self.coalescidas = 0
+        self.esperas_esgotadas = 0
+
+    def executar(self, chave, calcular):
+        with self._lock:
+            voo = self._voos.get(chave)
+            lider = voo is None
+            if lider:
+                voo = self._voos[chave] = _Voo()
+                self.execucoes += 1
+            else:
+                self.coalescidas += 1
+
+        if not lider:
+            if not voo.pronto.wait(self.espera_maxima):
+                # Computação travada: não prende esta requisição indefinidamente
+                with self._lock:
+                    self.esperas_esgotadas += 1
+                return calcular()
+            if voo.erro is not None:
+                raise voo.erro
+            return voo.valor
+
+        try:
+            voo.valor = calcular()
+        except BaseException as e:
+            voo.erro = e
+            raise
+        finally:
+            with self._lock:
+                del self._voos[chave]
+            voo.pronto.set()
+        return voo.valor
+
+    def stats(self) -> dict:
+        with self._lock:
+            em_andamento = len(self._voos)
+        total = self.execucoes + self.coalescidas
+        return {
+            "execucoes": self.execucoes,
+            "coalescidas": self.coalescidas,
+            "esperas_esgotadas": self.esperas_esgotadas,
+            "em_andamento": em_andamento,
+            "taxa_coalescencia": round(self.coalescidas / total, 4) if total else 0.0,
+        }
+
+
+coalescencia = SingleFlight()
+
+
+# ----------------------------
+# Versões de tabela
+# ----------------------------
+def _escopo(nome: str) -> str:
+    """Nome no escopo da filial atual (a matriz não tem prefixo)"""
+    filial = filial_atual()
+    return nome if filial is None else f"filial={filial}:{nome}"
+
+
+def versao(tabela: str) -> int:
+    return get_backend().get_versao(_escopo(tabela))
+
+
+def invalidar_tabelas(*tabelas: str):
+    """Incrementa a versão das tabelas alteradas (chamar após o commit)"""
+    backend = get_backend()
+    for tabela in tabelas:
+        backend.incr_versao(_escopo(tabela))
+
+
+def cached(namespace: str, tabelas, calcular, ttl=LISTAS_CACHE_TTL):
+    """
+    Retorna o resultado em cache para as versões atuais das tabelas
+    - A chave embute a versão de cada tabela, então qualquer escrita em
+      qualquer worker torna a entrada antiga inalcançável
+    - Em caso de miss, executa calcular() uma única vez por chave no
+      processo (requisições simultâneas esperam e compartilham) e grava
+      o resultado; ttl=0 só coalesce, sem guardar
+    """
+    backend = get_backend()
+    chave = _escopo(namespace) + ":" + ":".join(f"{t}={backend.get_versao(_escopo(t))}" for t in tabelas)
+    valor = backend.get(chave)
+    if valor is None:
+        def calcular_e_gravar():
+            resultado = calcular()
+            if ttl != 0:
+                backend.set(chave, resultado, ttl=ttl)
+            return resultado
+
+        valor = coalescencia.executar(chave, calcular_e_gravar)
+    return valor
+
+
+# ----------------------------
+# Cache de entidades (Dono / Animal)
+# ----------------------------
+# Entradas guardam (versão, info, conferida_em); cada entidade tem a sua
+# versão ("<tabela>:entidade=<id>"), que só muda em updates/deletes daquele
+# id: alterações feitas em outro worker invalidam só a entrada afetada, e o
+# resto do cache continua válido. Dentro de ENTIDADES_TTL a entrada local é
+# usada sem consultar o backend; as escritas deste processo a descartam na hora.
+donos_cache = LRUCache(maxsize=DONOS_CACHE_MAXSIZE)
+animais_cache = LRUCache(maxsize=ANIMAIS_CACHE_MAXSIZE)
+
+
+def _buscar_entidade(lru, tabela: str, id: int, carregar):
+    """Entrada local recente, senão confere a versão no backend, senão carregar()"""
+    chave = (filial_atual(), id)
+    agora = time.monotonic()
+    item = lru.get(chave, contar=False)
+    if item is not None and agora - item[2] < ENTIDADES_TTL:
+        lru.registrar(acerto=True)
+        return item[1]
+
+    versao_atual = versao(f"{tabela}:entidade={id}")
+    if item is not None and item[0] == versao_atual:
+        lru.set(chave, (versao_atual, item[1], agora))
+        lru.registrar(acerto=True)
+        return item[1]
+
+    lru.registrar(acerto=False)
+    info = carregar()
+    if info is None:
+        lru.invalidate(chave)
+        return None
+    lru.set(chave, (versao_atual, info, agora))
+    return info
+
+
+def buscar_dono(db, dono_id: int):
+    """Retorna DonoInfo do cache ou do banco (None se não existir)"""
+    def carregar():
+        row = (
+            db.query(models.Dono.id, models.Dono.nome, models.Dono.telefone, models.Dono.version)
+            .filter(models.Dono.id == dono_id, models.Dono.deleted_at.is_(None))
+            .first()
+        )
+        return DonoInfo(*row) if row else None
+
+    return _buscar_entidade(donos_cache, "donos", dono_id, carregar)
+
+
+def buscar_animal(db, animal_id: int):
+    """Retorna AnimalInfo do cache ou do banco (None se não existir)"""
+    def carregar():
+        row = (
+            db.query(
+                models.Animal.id,
+                models.Animal.nome,
+                models.Animal.especie,
+                models.Animal.idade,
+                models.Animal.dono_id,
+                models.Animal.version,
+            )
+            .filter(models.Animal.id == animal_id, models.Animal.deleted_at.is_(None))
+            .first()
+        )
+        return AnimalInfo(*row) if row else None
+
+    return _buscar_entidade(animais_cache, "animais", animal_id, carregar)
+
+
+def _invalidar_entidades(lru, tabela: str, ids):
+    """Descarta as entradas neste processo e incrementa, num lote só, a versão de cada id"""
+    filial = filial_atual()
+    for id in ids:
+        lru.invalidate((filial, id))
+    get_backend().incr_versoes([_escopo(f"{tabela}:entidade={id}") for id in ids])
+
+
+def invalidar_donos(ids):
+    _invalidar_entidades(donos_cache, "donos", ids)
+
+
+def invalidar_animais(ids):
+    _invalidar_entidades(animais_cache, "animais", ids)
+
+
+def invalidar_dono(dono_id: int):
+    invalidar_donos([dono_id])
+
+
+def invalidar_animal(animal_id: int):
+    invalidar_animais([animal_id])
+
+
+def estatisticas() -> dict:
+    """Resumo de uso dos caches"""
+    backend = get_backend()
+    return {
+        "donos": donos_cache.stats(),
+        "animais": animais_cache.stats(),
+        "backend": {"nome": backend.nome, **backend.stats()},
+        "coalescencia": coalescencia.stats(),
+    }
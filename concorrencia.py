@@ -0,0 +1,114 @@
+"""
+Controle de concorrência otimista (coluna version)
+
+Recepção e veterinários editam a mesma consulta ao mesmo tempo; sem
+controle, a última gravação apaga a anterior. Locks pessimistas seguram o
+lock de escrita do SQLite e derrubam a vazão, então cada linha tem uma
+versão:
+- GET /<recurso>/{id} devolve "version" no corpo e no ETag ("3")
+- PUT com If-Match: "3" grava com um único compare-and-swap:
+      UPDATE ... SET ..., version = version + 1
+      WHERE id = ? AND version = 3 AND deleted_at IS NULL
+      RETURNING <colunas da projeção>
+  sem ler a linha antes nem depois; nenhuma linha alterada significa registro
+  inexistente (404) ou alterado por outra pessoa (409, com a versão atual
+  no ETag)
+- PUT sem If-Match (ou If-Match: *) continua gravando sem checar a versão,
+  mas também incrementa version
+- PATCH (parcial) usa o mesmo UPDATE; PATCH /{id}/status acrescenta o
+  filtro "status IN (origens permitidas)" (ver normalizacao.TRANSICOES_*)
+"""
+
+from typing import Optional
+
+from fastapi import Header, HTTPException
+from sqlalchemy import update
+
+
+class ConflitoDeVersao(Exception):
+    """A linha foi alterada depois da versão lida pelo cliente"""
+
+    def __init__(self, atual: int):
+        super().__init__(f"Versão atual: {atual}")
+        self.atual = atual
+
+
+class CondicaoRecusada(Exception):
+    """A linha existe na versão esperada, mas não atende a condição do UPDATE"""
+
+    def __init__(self, registro: dict):
+        super().__init__(registro)
+        self.registro = registro
+
+
+def etag(versao: int) -> str:
+    return f'"{versao}"'
+
+
+def versao_do_if_match(valor: Optional[str]) -> Optional[int]:
+    """If-Match: "3" (ou W/"3", ou 3) -> 3; None sem header ou com *; ValueError se inválido"""
+    if valor is None or valor.strip() == "*":
+        return None
+    valor = valor.strip()
+    if valor.startswith("W/"):
+        valor = valor[2:]
+    valor = valor.strip('"')
+    if not valor.isdigit():
+        raise ValueError(valor)
+    return int(valor)
+
+
+def versao_esperada(
+    if_match: Optional[str] = Header(None, description='Versão lida pelo cliente (ETag, ex.: "3")'),
+) -> Optional[int]:
+    """Dependência das rotas PUT/PATCH: versão do If-Match (400 se inválido)"""
+    try:
+        return versao_do_if_match(if_match)
+    except ValueError:
+        raise HTTPException(400, 'If-Match inválido: use o ETag da leitura (ex.: "3")')
+
+
+def atualizar(db, projecao, id: int, valores: dict, versao: Optional[int] = None, condicao=None) -> Optional[dict]:
+    """
+    Compare-and-swap de uma linha ativa num único UPDATE ... RETURNING
+    - Retorna o registro já atualizado, no formato da projeção (sem nova leitura)
+    - None se a linha não existir (ou estiver excluída)
+    - ConflitoDeVersao se versao foi informada e não é a atual
+    - CondicaoRecusada se a linha não atende condicao (ex.: transição de status)
+    O commit fica com quem chama
+    """
+    modelo = projecao.modelo
+    criterios = [modelo.id == id, modelo.deleted_at.is_(None)]
+    if versao is not None:
+        criterios.append(modelo.version == versao)
+    if condicao is not None:
+        criterios.append(condicao)
+    stmt = (
+        update(modelo)
+        .where(*criterios)
+        .values(**valores, version=modelo.version + 1)
+        .returning(*projecao.retorno)
+        .execution_options(synchronize_session=False)
+    )
+    row = db.execute(stmt).first()
+    if row is not None:
+        return projecao.serializar(row)
+    if versao is None and condicao is None:
+        return None
+
+    # Só no caminho da falha: distingue 404, 409 de versão e condição recusada
+    atual = projecao.obter(db, id)
+    if atual is None:
+        return None
+    if versao is not None and atual["version"] != versao:
+        raise ConflitoDeVersao(atual["version"])
+    raise CondicaoRecusada(atual)
+
+
+def conflito(e: ConflitoDeVersao) -> HTTPException:
+    """409 para a rota, com a versão atual no ETag"""
+    return HTTPException(
+        409,
+        f"Registro alterado por outra pessoa (versão atual {e.atual}); recarregue e tente de novo",
+        headers={"ETag": etag(e.atual)},
+    )
@@ -1,10 +1,353 @@
+import asyncio
+import contextvars
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 
-# Conexão com o banco SQLite
+# Conexão com o banco SQLite (matriz; cada filial tem o seu, ver PoolFiliais)
 DATABASE_URL = "sqlite:///./clinica_vet.db"
 
 engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
+
+# Filiais: um arquivo SQLite por filial, cada um com o próprio lock de escrita
+#   PETCARE_FILIAIS              nomes das filiais (separados por vírgula)
+#   PETCARE_FILIAIS_DIR          diretório dos bancos (<nome>.db)
+#   PETCARE_FILIAIS_MAX_ENGINES  engines abertos ao mesmo tempo (LRU)
+FILIAIS = [nome.strip() for nome in os.getenv("PETCARE_FILIAIS", "").split(",") if nome.strip()]
+FILIAIS_DIR = os.getenv("PETCARE_FILIAIS_DIR", "./bancos_filiais")
+FILIAIS_MAX_ENGINES = int(os.getenv("PETCARE_FILIAIS_MAX_ENGINES", "16"))
+NOME_FILIAL = re.compile(r"^[a-z0-9][a-z0-9_-]{0,39}$")
+
+# Filial da requisição atual (None = matriz), definida por filiais.FilialMiddleware
+_filial_atual = contextvars.ContextVar("filial_atual", default=None)
+
+# Conexões de leitura para relatórios e dashboards (ver RoteadorEngines):
+#   PETCARE_READ_DATABASE_URL   réplica de leitura (tem prioridade)
+#   PETCARE_SNAPSHOT_INTERVALO  segundos entre cópias do snapshot SQLite (0 desativa)
+#   PETCARE_SNAPSHOT_DIR        diretório das cópias
+READ_DATABASE_URL = os.getenv("PETCARE_READ_DATABASE_URL")
+SNAPSHOT_INTERVALO = int(os.getenv("PETCARE_SNAPSHOT_INTERVALO", "0"))
+SNAPSHOT_DIR = os.getenv("PETCARE_SNAPSHOT_DIR", "./snapshots")
+# Snapshot mais velho que isso (cópias falhando) deixa de ser usado
+SNAPSHOT_DEFASAGEM_MAXIMA = 3 * SNAPSHOT_INTERVALO
+# TTL máximo dos resultados em cache calculados fora do primário
+LEITURA_TTL_CACHE = int(os.getenv("PETCARE_LEITURA_TTL_CACHE", str(SNAPSHOT_INTERVALO or 5)))
+
+# Intenções declaradas pelas rotas
+ESCRITA = "escrita"
+LEITURA = "leitura"
+
+
+def _connect_args(url: str) -> dict:
+    return {"check_same_thread": False} if url.startswith("sqlite") else {}
+
+
+class RoteadorEngines:
+    """
+    Escolhe o engine pela intenção declarada da rota
+    - ESCRITA (e leituras que precisam enxergar a própria escrita): primário
+    - LEITURA: réplica, snapshot ou, se nenhum estiver disponível, o primário
+
+    O snapshot é uma cópia do SQLite feita com a API de backup num arquivo
+    novo a cada ciclo, aberta somente leitura num pool próprio: os relatórios
+    nunca disputam o lock com as escritas do primário. A cópia anterior é
+    descartada depois da troca (conexões em uso terminam nela).
+    """
+
+    def __init__(self, primario, url_leitura=None, intervalo_snapshot=0, diretorio=SNAPSHOT_DIR):
+        self.primario = primario
+        self.intervalo_snapshot = intervalo_snapshot
+        self.diretorio = diretorio
+        self._lock = threading.Lock()
+        self._snapshot = None  # (engine, caminho, criado_em)
+        self._descartados = []  # Cópias antigas ainda abertas (Windows não remove)
+        self._sequencia = 0
+        self.snapshots = 0
+        self.replica = None
+        if url_leitura:
+            self.replica = create_engine(url_leitura, connect_args=_connect_args(url_leitura))
+
+    @property
+    def usa_snapshot(self) -> bool:
+        return (
+            self.replica is None
+            and self.intervalo_snapshot > 0
+            and self.primario.url.get_backend_name() == "sqlite"
+        )
+
+    def engine_para(self, intencao: str = ESCRITA):
+        if intencao != LEITURA:
+            return self.primario
+        if self.replica is not None:
+            return self.replica
+        snapshot = self._snapshot
+        if snapshot is not None and time.time() - snapshot[2] <= SNAPSHOT_DEFASAGEM_MAXIMA:
+            return snapshot[0]
+        return self.primario
+
+    def separado(self) -> bool:
+        """True se as leituras estão indo para outro banco (dados podem estar defasados)"""
+        return self.engine_para(LEITURA) is not self.primario
+
+    def atualizar_snapshot(self) -> str:
+        """Copia o primário para um arquivo novo e passa a ler dele"""
+        os.makedirs(self.diretorio, exist_ok=True)
+        with self._lock:
+            self._sequencia += 1
+            caminho = os.path.join(self.diretorio, f"snapshot_{os.getpid()}_{self._sequencia}.db")
+
+        origem = sqlite3.connect(self.primario.url.database)
+        destino = sqlite3.connect(caminho)
+        try:
+            # Cópia numa única etapa: o lock de leitura do primário dura só a
+            # cópia sequencial das páginas (em etapas, cada escrita no meio
+            # recomeçaria a cópia)
+            origem.backup(destino)
+        finally:
+            destino.close()
+            origem.close()
+
+        novo = create_engine(
+            f"sqlite:///file:{os.path.abspath(caminho)}?mode=ro&uri=true",
+            connect_args={"check_same_thread": False},
+        )
+        with self._lock:
+            anterior, self._snapshot = self._snapshot, (novo, caminho, time.time())
+            self.snapshots += 1
+            if anterior is not None:
+                anterior[0].dispose()
+                self._descartados.append(anterior[1])
+            self._descartados = [c for c in self._descartados if not _remover(c)]
+        return caminho
+
+    def limpar(self):
+        """Remove as cópias deste processo (shutdown)"""
+        with self._lock:
+            if self._snapshot is not None:
+                self._snapshot[0].dispose()
+                self._descartados.append(self._snapshot[1])
+                self._snapshot = None
+            self._descartados = [c for c in self._descartados if not _remover(c)]
+
+    def estatisticas(self) -> dict:
+        snapshot = self._snapshot
+        return {
+            "leitura": "replica" if self.replica is not None else "snapshot" if self.usa_snapshot else "primario",
+            "separado": self.separado(),
+            "snapshots_criados": self.snapshots,
+            "idade_snapshot_s": round(time.time() - snapshot[2], 1) if snapshot else None,
+        }
+
+
+def _remover(caminho: str) -> bool:
+    try:
+        os.remove(caminho)
+    except FileNotFoundError:
+        pass
+    except OSError:
+        return False
+    return True
+
+
+roteador = RoteadorEngines(engine, READ_DATABASE_URL, SNAPSHOT_INTERVALO)
+
+
+class FilialDesconhecida(LookupError):
+    """Nome de filial inválido ou não cadastrado"""
+
+
+class PoolFiliais:
+    """
+    Engines dos bancos das filiais, criados sob demanda
+    - Filiais conhecidas: as de PETCARE_FILIAIS e os bancos já existentes
+      em FILIAIS_DIR
+    - Na criação do engine as migrações pendentes são aplicadas (um banco
+      novo já sai com o schema completo)
+    - No máximo max_engines abertos; o menos usado é descartado (conexões
+      em uso terminam normalmente e o engine é recriado no próximo acesso)
+    """
+
+    def __init__(self, diretorio=FILIAIS_DIR, cadastradas=FILIAIS, max_engines=FILIAIS_MAX_ENGINES):
+        self.diretorio = diretorio
+        self.cadastradas = set(cadastradas)
+        self.max_engines = max_engines
+        self._engines = OrderedDict()
+        self._lock = threading.Lock()
+        self.criados = 0
+        self.descartados = 0
+
+    def caminho(self, nome: str) -> str:
+        return os.path.join(self.diretorio, f"{nome}.db")
+
+    def existe(self, nome: str) -> bool:
+        return bool(NOME_FILIAL.match(nome or "")) and (
+            nome in self.cadastradas or os.path.isfile(self.caminho(nome))
+        )
+
+    def ha_filiais(self) -> bool:
+        return bool(self.cadastradas) or bool(self.listar())
+
+    def listar(self) -> list:
+        existentes = set()
+        if os.path.isdir(self.diretorio):
+            existentes = {
+                arquivo[:-3] for arquivo in os.listdir(self.diretorio)
+                if arquivo.endswith(".db") and NOME_FILIAL.match(arquivo[:-3])
+            }
+        return sorted(self.cadastradas | existentes)
+
+    def engine(self, nome: str):
+        with self._lock:
+            atual = self._engines.get(nome)
+            if atual is not None:
+                self._engines.move_to_end(nome)
+                return atual
+            if not self.existe(nome):
+                raise FilialDesconhecida(nome)
+
+            os.makedirs(self.diretorio, exist_ok=True)
+            novo = create_engine(
+                f"sqlite:///{self.caminho(nome)}", connect_args={"check_same_thread": False}
+            )
+            from migrations import aplicar_pendentes
+            aplicar_pendentes(novo, verbose=False)
+
+            self._engines[nome] = novo
+            self.criados += 1
+            if len(self._engines) > self.max_engines:
+                _, antigo = self._engines.popitem(last=False)
+                antigo.dispose()
+                self.descartados += 1
+            return novo
+
+    def limpar(self, close: bool = True):
+        with self._lock:
+            for engine_filial in self._engines.values():
+                engine_filial.dispose(close=close)
+            self._engines.clear()
+
+    def estatisticas(self) -> dict:
+        with self._lock:
+            abertos = list(self._engines)
+        return {
+            "filiais": len(self.listar()),
+            "engines_abertos": abertos,
+            "max_engines": self.max_engines,
+            "criados": self.criados,
+            "descartados": self.descartados,
+        }
+
+
+pool_filiais = PoolFiliais()
+
+
+def filial_atual():
+    """Nome da filial da requisição/job atual (None = matriz)"""
+    return _filial_atual.get()
+
+
+@contextmanager
+def usar_filial(nome):
+    """Executa o bloco no banco da filial (None = matriz)"""
+    token = _filial_atual.set(nome)
+    try:
+        yield
+    finally:
+        _filial_atual.reset(token)
+
+
+def engine_atual():
+    """Engine da filial atual (ou da matriz)"""
+    nome = _filial_atual.get()
+    return engine if nome is None else pool_filiais.engine(nome)
+
+
+class SessaoFilial(Session):
+    """Sessão ligada, na criação, ao banco da filial atual (sem bind explícito)"""
+
+    def __init__(self, bind=None, **kwargs):
+        super().__init__(bind=bind if bind is not None else engine_atual(), **kwargs)
+
+
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, class_=SessaoFilial)
+
+
+def nova_sessao(intencao: str = ESCRITA) -> Session:
+    """Sessão no engine adequado à intenção (ESCRITA ou LEITURA)"""
+    # Réplica e snapshot existem só para a matriz
+    if intencao == ESCRITA or _filial_atual.get() is not None:
+        return SessionLocal()
+    return Session(bind=roteador.engine_para(intencao), autoflush=False)
+
+
+def ttl_leitura(ttl: int) -> int:
+    """
+    TTL de cache para resultados calculados com sessões de LEITURA
+    - Com réplica/snapshot o dado pode estar defasado em relação à versão
+      das tabelas: não guarda por mais tempo que um ciclo de cópia
+    """
+    if roteador.separado():
+        return min(ttl, LEITURA_TTL_CACHE)
+    return ttl
+
+
+async def ciclo_snapshot(intervalo: int = SNAPSHOT_INTERVALO):
+    """Tarefa de fundo: renova o snapshot de leitura fora do event loop (em thread)"""
+    while True:
+        try:
+            await asyncio.to_thread(roteador.atualizar_snapshot)
+        except Exception as e:
+            print(f"⚠️ Snapshot de leitura falhou: {e}")
+        await asyncio.sleep(intervalo)
+
+
+def schema_pronto() -> bool:
+    """
+    Verifica com uma única query se todas as migrações já foram aplicadas
+    (evita o DDL e a checagem tabela a tabela a cada startup)
+    """
+    from migrations import listar_revisoes
+
+    with engine.connect() as conn:
+        try:
+            aplicadas = {row[0] for row in conn.exec_driver_sql("SELECT revisao FROM schema_migrations")}
+        except Exception:
+            return False
+    return set(listar_revisoes()) <= aplicadas
+
+
+def init_db():
+    """
+    Aplica as migrações pendentes (ver pacote migrations)
+    - Chamado uma vez no startup (lifespan) em vez de na importação do módulo
+    - Não faz nada quando o banco já está na última revisão
+    """
+    if schema_pronto():
+        return
+    from migrations import aplicar_pendentes
+    aplicar_pendentes(engine)
+
+
+def _dispose_after_fork():
+    # Conexões herdadas do processo pai não podem ser usadas no filho:
+    # descarta o pool sem fechá-las (close=False) para não afetar o pai
+    engine.dispose(close=False)
+    if roteador.replica is not None:
+        roteador.replica.dispose(close=False)
+    # O snapshot do pai é dele: o filho cria o seu no próprio lifespan
+    roteador._snapshot = None
+    roteador._descartados = []
+    pool_filiais.limpar(close=False)
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_dispose_after_fork)
@@ -0,0 +1,329 @@
+"""
+Diagnóstico em produção: perfil por requisição e snapshots de memória
+
+Perfilador (PerfilMiddleware)
+- Opt-in por requisição: header "X-Perfil: 1" ou ?_perfil=1, aceito só com
+  token de administrador da matriz (claim "admin", confirmada no banco da
+  matriz; ver security.ADMINS); nos demais casos a requisição segue
+  normalmente, sem perfil
+- Amostragem: uma thread lê sys._current_frames() a cada
+  PETCARE_PERFIL_INTERVALO_MS e conta as pilhas das threads ocupadas (event
+  loop e threadpool das rotas síncronas), sem instrumentar cada chamada
+- A saída é o formato "collapsed stacks" (uma pilha por linha, frames
+  separados por ";" e a contagem no fim), aceito por flamegraph.pl,
+  speedscope e inferno; fica em PETCARE_PERFIS_DIR e o nome volta no header
+  X-Perfil (baixe em GET /debug/perfis/{nome})
+- Um perfil por vez em cada processo; requisições simultâneas no mesmo
+  worker também aparecem nas amostras (cada pilha começa pelo nome da thread)
+
+Memória (tracemalloc, GET/POST /debug/memoria)
+- O primeiro snapshot liga o tracemalloc (com custo de memória e CPU até
+  ser desligado em DELETE /debug/memoria)
+- Snapshots ficam em memória no processo (até SNAPSHOTS_MAXIMO) e podem ser
+  comparados entre si ou com o estado atual, para achar o crescimento de
+  alocações (ex.: nos laços de serialização das projeções)
+- Cada snapshot/comparação percorre todas as alocações rastreadas: com a
+  API carregada leva alguns segundos (rota de diagnóstico, não de uso comum)
+"""
+
+import asyncio
+import os
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, OrderedDict
+from datetime import datetime
+from urllib.parse import parse_qs
+
+from security import claims_da_requisicao
+
+PERFIS_DIR = os.getenv("PETCARE_PERFIS_DIR", "./perfis")
+INTERVALO_AMOSTRAGEM = int(os.getenv("PETCARE_PERFIL_INTERVALO_MS", "1")) / 1000
+# Perfis mantidos em disco (os mais antigos são apagados)
+PERFIS_MAXIMO = 50
+# Requisições longas (ex.: SSE) param de ser amostradas depois disso
+DURACAO_MAXIMA = 60
+
+SNAPSHOTS_MAXIMO = 10
+# Frames guardados por alocação (agrupar=traceback); mais frames, mais custo
+FRAMES_TRACEMALLOC = int(os.getenv("PETCARE_TRACEMALLOC_FRAMES", "10"))
+
+NOME_PERFIL = re.compile(r"^[\w.-]+\.folded$")
+
+# Frames de espera: a thread está ociosa (fila vazia, select do event loop)
+_ESPERAS = {
+    ("threading.py", "wait"),
+    ("queue.py", "get"),
+    ("selectors.py", "select"),
+}
+
+
+# --------------------------
+# Perfilador por amostragem
+# --------------------------
+def _nome_frame(codigo) -> str:
+    return f"{codigo.co_name} ({os.path.basename(codigo.co_filename)}:{codigo.co_firstlineno})"
+
+
+class Amostrador(threading.Thread):
+    """Conta as pilhas das threads ocupadas enquanto estiver rodando"""
+
+    def __init__(self, intervalo: float = INTERVALO_AMOSTRAGEM):
+        super().__init__(name="perfilador", daemon=True)
+        self.intervalo = intervalo
+        self.pilhas = Counter()
+        self.amostras = 0
+        self._parar = threading.Event()
+
+    def run(self):
+        proprio = threading.get_ident()
+        limite = time.monotonic() + DURACAO_MAXIMA
+        # Amostra antes de esperar: requisições curtas também têm ao menos uma
+        while not self._parar.is_set() and time.monotonic() < limite:
+            nomes = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == proprio:
+                    continue
+                codigo = frame.f_code
+                if (os.path.basename(codigo.co_filename), codigo.co_name) in _ESPERAS:
+                    continue
+                pilha = []
+                while frame is not None:
+                    pilha.append(_nome_frame(frame.f_code))
+                    frame = frame.f_back
+                pilha.append(nomes.get(ident, f"thread-{ident}"))
+                self.pilhas[";".join(reversed(pilha))] += 1
+            self.amostras += 1
+            self._parar.wait(self.intervalo)
+
+    def parar(self):
+        self._parar.set()
+        self.join()
+
+    def collapsed(self) -> str:
+        """Formato collapsed stacks: "thread;f1;f2 contagem" por linha"""
+        return "".join(f"{pilha} {n}\n" for pilha, n in self.pilhas.most_common())
+
+
+_perfil_em_andamento = threading.Lock()
+
+
+def _gravar(nome: str, conteudo: str):
+    os.makedirs(PERFIS_DIR, exist_ok=True)
+    caminho = os.path.join(PERFIS_DIR, nome)
+    temporario = caminho + ".tmp"
+    with open(temporario, "w", encoding="utf-8") as arquivo:
+        arquivo.write(conteudo)
+    os.replace(temporario, caminho)
+
+    antigos = sorted(listar_perfis(), key=lambda p: p["criado_em"])[:-PERFIS_MAXIMO]
+    for perfil in antigos:
+        try:
+            os.remove(os.path.join(PERFIS_DIR, perfil["nome"]))
+        except FileNotFoundError:
+            pass
+
+
+def listar_perfis() -> list:
+    if not os.path.isdir(PERFIS_DIR):
+        return []
+    perfis = []
+    for entrada in os.scandir(PERFIS_DIR):
+        if NOME_PERFIL.match(entrada.name):
+            info = entrada.stat()
+            perfis.append({
+                "nome": entrada.name,
+                "tamanho": info.st_size,
+                "criado_em": datetime.fromtimestamp(info.st_mtime).isoformat(),
+            })
+    return sorted(perfis, key=lambda p: p["criado_em"], reverse=True)
+
+
+def caminho_perfil(nome: str):
+    """Caminho do perfil, ou None se o nome for inválido ou não existir"""
+    if not NOME_PERFIL.match(nome):
+        return None
+    caminho = os.path.join(PERFIS_DIR, nome)
+    return caminho if os.path.isfile(caminho) else None
+
+
+def _pedido_de_perfil(scope):
+    """
+    X-Perfil: 1 ou ?_perfil=1 com token de administrador da matriz
+    - Retorna o user_id a confirmar no banco (ver _admin_na_matriz) ou None
+    """
+    pedido = False
+    for nome, valor in scope.get("headers", ()):
+        if nome == b"x-perfil":
+            pedido = valor.strip() not in (b"", b"0")
+            break
+    query = scope.get("query_string", b"")
+    if not pedido and b"_perfil=" in query:
+        pedido = parse_qs(query.decode("latin-1")).get("_perfil", ["0"])[0] not in ("", "0")
+    if not pedido:
+        return None
+
+    claims = claims_da_requisicao(scope) or {}
+    if claims.get("admin") is not True or claims.get("filial") is not None:
+        return None
+    return claims.get("user_id")
+
+
+def _admin_na_matriz(user_id) -> bool:
+    """A claim sozinha não basta: o usuário precisa existir na matriz com e-mail de administrador"""
+    from sqlalchemy import select
+
+    import models
+    from database import engine
+    from security import eh_admin
+
+    with engine.connect() as conn:
+        email = conn.execute(select(models.User.email).where(models.User.id == user_id)).scalar()
+    return eh_admin(email)
+
+
+class PerfilMiddleware:
+    """
+    Middleware ASGI que roda a requisição sob o perfilador por amostragem
+    - Sem o pedido (ou sem token de administrador) custa só a checagem dos headers
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        user_id = _pedido_de_perfil(scope) if scope["type"] == "http" else None
+        if user_id is None or not await asyncio.to_thread(_admin_na_matriz, user_id):
+            return await self.app(scope, receive, send)
+        if not _perfil_em_andamento.acquire(blocking=False):
+            # Já há um perfil rodando neste processo
+            return await self.app(scope, receive, send)
+
+        rota = re.sub(r"[^\w-]+", "_", scope["path"]).strip("_") or "raiz"
+        nome = f"{datetime.now():%Y%m%d-%H%M%S-%f}_{scope['method']}_{rota[:80]}.folded"
+        amostrador = Amostrador()
+
+        async def enviar(mensagem):
+            if mensagem["type"] == "http.response.start":
+                mensagem["headers"] = [*mensagem.get("headers", ()), (b"x-perfil", nome.encode())]
+            await send(mensagem)
+
+        inicio = time.perf_counter()
+        amostrador.start()
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            amostrador.parar()
+            duracao_ms = (time.perf_counter() - inicio) * 1000
+            _perfil_em_andamento.release()
+            cabecalho = (
+                f"# {scope['method']} {scope['path']} {duracao_ms:.1f} ms, "
+                f"{amostrador.amostras} amostras a cada {amostrador.intervalo * 1000:g} ms\n"
+            )
+            try:
+                _gravar(nome, cabecalho + amostrador.collapsed())
+            except OSError as e:
+                print(f"⚠️ Perfil {nome} não gravado: {e}")
+
+
+# --------------------------
+# Snapshots de memória (tracemalloc)
+# --------------------------
+_snapshots = OrderedDict()  # id -> (criado_em, Snapshot)
+_proximo_snapshot = 1
+_lock_memoria = threading.Lock()
+
+# Alocações do próprio tracemalloc e do import system não interessam. São
+# descartadas só nas linhas do resultado: Snapshot.filter_traces percorre
+# todas as alocações em Python e leva segundos em um worker com a API carregada
+_IGNORADOS = (
+    tracemalloc.__file__,
+    "<frozen importlib._bootstrap>",
+    "<frozen importlib._bootstrap_external>",
+    "<unknown>",
+)
+
+
+def _maiores(estatisticas, limite: int, diferenca: bool) -> list:
+    maiores = []
+    for stat in estatisticas:
+        if stat.traceback[0].filename in _IGNORADOS:
+            continue
+        maiores.append(_estatistica(stat, diferenca))
+        if len(maiores) == limite:
+            break
+    return maiores
+
+
+def _estatistica(stat, diferenca: bool) -> dict:
+    item = {
+        "local": [f"{frame.filename}:{frame.lineno}" for frame in stat.traceback],
+        "tamanho_kb": round(stat.size / 1024, 1),
+        "blocos": stat.count,
+    }
+    if diferenca:
+        item["diferenca_kb"] = round(stat.size_diff / 1024, 1)
+        item["diferenca_blocos"] = stat.count_diff
+    return item
+
+
+def estado_memoria() -> dict:
+    atual, pico = tracemalloc.get_traced_memory()
+    with _lock_memoria:
+        snapshots = [{"id": id, "criado_em": criado_em} for id, (criado_em, _) in _snapshots.items()]
+    return {
+        "rastreando": tracemalloc.is_tracing(),
+        "rastreada_kb": round(atual / 1024, 1),
+        "pico_kb": round(pico / 1024, 1),
+        "snapshots": snapshots,
+    }
+
+
+def tirar_snapshot(agrupar: str = "lineno", limite: int = 20) -> dict:
+    """Snapshot guardado para comparações (liga o tracemalloc na primeira vez)"""
+    global _proximo_snapshot
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(FRAMES_TRACEMALLOC)
+    snapshot = tracemalloc.take_snapshot()
+    criado_em = datetime.now().isoformat()
+    with _lock_memoria:
+        id = _proximo_snapshot
+        _proximo_snapshot += 1
+        _snapshots[id] = (criado_em, snapshot)
+        while len(_snapshots) > SNAPSHOTS_MAXIMO:
+            _snapshots.popitem(last=False)
+    return {
+        "id": id,
+        "criado_em": criado_em,
+        "maiores": _maiores(snapshot.statistics(agrupar), limite, False),
+    }
+
+
+def comparar(de: int, para: int = None, agrupar: str = "lineno", limite: int = 20) -> dict:
+    """
+    Diferença entre dois snapshots (para=None: contra o estado atual)
+    - KeyError se algum id não existir (ou já tiver sido descartado)
+    """
+    with _lock_memoria:
+        antes = _snapshots[de][1]
+        depois = _snapshots[para][1] if para is not None else None
+    if depois is None:
+        if not tracemalloc.is_tracing():
+            raise KeyError(de)
+        depois = tracemalloc.take_snapshot()
+    estatisticas = depois.compare_to(antes, agrupar)
+    return {
+        "de": de,
+        "para": para if para is not None else "atual",
+        "crescimento_kb": round(sum(s.size_diff for s in estatisticas) / 1024, 1),
+        "maiores": _maiores(estatisticas, limite, True),
+    }
+
+
+def parar_memoria():
+    """Desliga o tracemalloc e descarta os snapshots"""
+    with _lock_memoria:
+        _snapshots.clear()
+    tracemalloc.stop()
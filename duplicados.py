@@ -0,0 +1,220 @@
+"""
+Detecção e mesclagem de donos duplicados
+
+Detecção por bloqueio: em vez de comparar todos os pares (O(n²)), os donos
+são agrupados por chaves baratas e só os pares dentro de cada bloco são
+comparados. Cada bloco sai de um GROUP BY sobre um índice parcial das
+linhas ativas (ver migrations/versions/0007_chaves_duplicados.py):
+- telefone: últimos 8 dígitos do telefone normalizado
+- nome: chave fonética do primeiro e do último nome
+Blocos maiores que TAMANHO_MAXIMO_BLOCO (ex.: telefone da própria clínica
+usado como padrão) são ignorados e apenas contados: não indicam duplicata e
+fariam o custo voltar a ser quadrático.
+
+Dentro de um bloco os nomes são comparados por similaridade de trigramas
+(da grafia e da forma fonética, vale a maior).
+Telefone igual já basta para sugerir o par; nome foneticamente igual só
+entra com similaridade >= limiar.
+
+Mesclagem: numa única transação, animais, consultas e banho/tosa dos donos
+removidos passam para o dono mantido (um UPDATE com CASE por tabela) e os
+removidos recebem exclusão lógica.
+"""
+
+from datetime import datetime
+from itertools import combinations
+
+from sqlalchemy import case, func, select, update
+
+import cache
+import eventos
+import exclusao
+import models
+import normalizacao
+import projecoes
+
+LIMIAR_SIMILARIDADE = 0.5
+TAMANHO_MAXIMO_BLOCO = 50
+DIGITOS_CHAVE_TELEFONE = 8
+LOTE_IN = 500
+
+# Tabelas que apontam para donos e são repontadas na mesclagem
+DEPENDENTES = [
+    models.Animal,
+    models.Consulta,
+    models.BanhoTosa,
+    models.ConsultaArquivada,
+    models.BanhoTosaArquivado,
+]
+
+
+class MesclagemInvalida(ValueError):
+    """Grupo de mesclagem com ids inexistentes, repetidos ou conflitantes"""
+
+
+def _lotes(ids, tamanho=LOTE_IN):
+    ids = list(ids)
+    for inicio in range(0, len(ids), tamanho):
+        yield ids[inicio:inicio + tamanho]
+
+
+def preencher_chaves(db) -> int:
+    """Calcula as chaves que faltam (linhas gravadas por fora do ORM)"""
+    pendentes = db.execute(
+        select(models.Dono.id, models.Dono.nome, models.Dono.telefone).where(
+            models.Dono.deleted_at.is_(None),
+            (models.Dono.telefone_normalizado.is_(None)) | (models.Dono.nome_fonetico.is_(None)),
+        )
+    ).all()
+    if not pendentes:
+        return 0
+    db.execute(
+        update(models.Dono).execution_options(synchronize_session=False),
+        [
+            {"id": id, **models.chaves_dono({"nome": nome, "telefone": telefone})}
+            for id, nome, telefone in pendentes
+        ],
+    )
+    db.commit()
+    return len(pendentes)
+
+
+def _blocos(db, chave, *filtros):
+    """GROUP BY chave (só linhas ativas) com mais de um dono: [(chave, [ids])]"""
+    stmt = (
+        select(chave, func.group_concat(models.Dono.id))
+        .where(models.Dono.deleted_at.is_(None), *filtros)
+        .group_by(chave)
+        .having(func.count() > 1)
+    )
+    return [(valor, [int(id) for id in ids.split(",")]) for valor, ids in db.execute(stmt)]
+
+
+def candidatos(db, limiar: float = LIMIAR_SIMILARIDADE, limite: int = 500) -> dict:
+    """
+    Pares de donos provavelmente duplicados
+    - Ordenados por número de motivos e similaridade do nome
+    - Custo proporcional à soma dos quadrados dos blocos, não a n²
+    """
+    preencher_chaves(db)
+
+    # Mesma expressão do índice ix_donos_telefone_chave
+    chave_telefone = func.substr(models.Dono.telefone_normalizado, -DIGITOS_CHAVE_TELEFONE)
+    blocos = [
+        ("telefone", ids)
+        for _, ids in _blocos(
+            db, chave_telefone,
+            func.length(models.Dono.telefone_normalizado) >= DIGITOS_CHAVE_TELEFONE,
+        )
+    ]
+    blocos += [("nome", ids) for _, ids in _blocos(db, models.Dono.nome_fonetico, models.Dono.nome_fonetico != "")]
+
+    ignorados = [ids for _, ids in blocos if len(ids) > TAMANHO_MAXIMO_BLOCO]
+    blocos = [(motivo, ids) for motivo, ids in blocos if len(ids) <= TAMANHO_MAXIMO_BLOCO]
+
+    # Só os donos que caíram em algum bloco são lidos e comparados
+    envolvidos = {id for _, ids in blocos for id in ids}
+    donos = {}
+    for lote in _lotes(envolvidos):
+        for registro in projecoes.DONO.listar(db, models.Dono.id.in_(lote)):
+            donos[registro["id"]] = registro
+    trigramas = {
+        id: (normalizacao.trigramas(d["nome"]), normalizacao.trigramas_foneticos(d["nome"]))
+        for id, d in donos.items()
+    }
+
+    pares = {}
+    for motivo, ids in blocos:
+        for a, b in combinations(sorted(ids), 2):
+            # Maior entre a grafia e a pronúncia: erros de digitação e variações (Luiz/Luís)
+            sim = max(map(normalizacao.similaridade, trigramas[a], trigramas[b]))
+            if motivo == "nome" and sim < limiar:
+                continue
+            par = pares.setdefault((a, b), {"motivos": [], "similaridade_nome": round(sim, 3)})
+            par["motivos"].append(motivo)
+
+    ordenados = sorted(
+        pares.items(),
+        key=lambda item: (len(item[1]["motivos"]), item[1]["similaridade_nome"]),
+        reverse=True,
+    )
+    return {
+        "total": len(ordenados),
+        "blocos_comparados": len(blocos),
+        "blocos_ignorados": len(ignorados),
+        "pares": [
+            {"donos": [donos[a], donos[b]], **par}
+            for (a, b), par in ordenados[:limite]
+        ],
+    }
+
+
+def _validar(db, grupos) -> dict:
+    """{id removido: id mantido}, depois de conferir que todos existem e estão ativos"""
+    destino = {}
+    mantidos = set()
+    for manter_id, remover_ids in grupos:
+        remover = set(remover_ids)
+        if not remover:
+            raise MesclagemInvalida(f"Grupo do dono {manter_id} sem donos para remover")
+        if manter_id in remover:
+            raise MesclagemInvalida(f"Dono {manter_id} não pode ser mantido e removido")
+        for id in remover:
+            if id in destino or id in mantidos:
+                raise MesclagemInvalida(f"Dono {id} aparece em mais de um grupo")
+            destino[id] = manter_id
+        if manter_id in destino:
+            raise MesclagemInvalida(f"Dono {manter_id} aparece em mais de um grupo")
+        mantidos.add(manter_id)
+
+    todos = set(destino) | mantidos
+    ativos = set()
+    for lote in _lotes(todos):
+        ativos.update(db.execute(
+            select(models.Dono.id).where(models.Dono.id.in_(lote), models.Dono.deleted_at.is_(None))
+        ).scalars())
+    faltando = sorted(todos - ativos)
+    if faltando:
+        raise MesclagemInvalida(f"Donos não encontrados: {faltando}")
+    return destino
+
+
+def mesclar(db, grupos) -> dict:
+    """
+    Mescla grupos [(manter_id, [remover_ids])] numa única transação
+    - Um UPDATE ... CASE dono_id por tabela dependente, com RETURNING
+    - Donos removidos recebem exclusão lógica
+    - Retorna {"repontados": {tabela: ids}, "removidos": {"donos": ids}}
+    O commit fica com quem chama; depois dele, use notificar()
+    """
+    destino = _validar(db, grupos)
+    agora = datetime.utcnow()
+
+    repontados = {}
+    for modelo in DEPENDENTES:
+        # Inclui linhas já excluídas: nenhuma fica apontando para um dono removido
+        stmt = (
+            update(modelo)
+            .where(modelo.dono_id.in_(list(destino)))
+            .values(dono_id=case(destino, value=modelo.dono_id), updated_at=agora, version=modelo.version + 1)
+            .returning(modelo.id, modelo.deleted_at)
+            .execution_options(synchronize_session=False)
+        )
+        repontados[modelo.__tablename__] = [id for id, excluido in db.execute(stmt) if excluido is None]
+
+    removidos = exclusao._marcar(db, models.Dono, models.Dono.id.in_(list(destino)), agora)
+    return {"repontados": repontados, "removidos": {"donos": removidos}}
+
+
+def notificar(resultado: dict):
+    """Depois do commit: invalida os caches e publica as alterações no feed"""
+    exclusao.notificar(resultado["removidos"])
+    for modelo in DEPENDENTES:
+        ids = resultado["repontados"].get(modelo.__tablename__)
+        if not ids:
+            continue
+        cache.invalidar_tabelas(modelo.__tablename__)
+        if modelo is models.Animal:
+            cache.invalidar_animais(ids)
+        for id in ids:
+            eventos.publicar(modelo.__tablename__, "atualizado", id)
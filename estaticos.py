@@ -0,0 +1,263 @@
+"""
+Arquivos estáticos com nomes versionados e variantes pré-comprimidas
+
+Build (na primeira requisição de cada mount, ou antes com
+`python estaticos.py`, como o serve.py faz):
+- JS/CSS ganham o hash do conteúdo no nome (app.js -> app.3f2a9c1b0d.js)
+- os HTML são reescritos para apontar para os nomes com hash
+- cada arquivo texto ganha variantes .gz (e .br, se o pacote "brotli"
+  estiver instalado) quando a compressão compensa
+
+A saída vai para PETCARE_STATIC_DIR/<mount>/<versão>, onde a versão é o hash
+de todos os arquivos de origem: workers diferentes chegam à mesma pasta e um
+build só é refeito quando algum arquivo muda. As VERSOES_MANTIDAS versões
+mais recentes ficam em disco e continuam sendo servidas (depois da atual):
+num restart gradual, workers do build anterior e HTML já entregue aos
+navegadores ainda apontam para os nomes com hash antigos.
+
+Servindo (StaticFilesPrecomprimidos):
+- escolhe .br ou .gz conforme o Accept-Encoding, com Vary: Accept-Encoding
+- nomes com hash: Cache-Control immutable por um ano (o navegador nem
+  revalida); o resto (HTML): no-cache, revalidado por ETag (304)
+"""
+
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import shutil
+import threading
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+
+BUILD_DIR = os.getenv("PETCARE_STATIC_DIR", "./static_build")
+
+# Extensões que recebem hash no nome (referenciadas pelos HTML)
+VERSIONADAS = {".js", ".css", ".png", ".jpg", ".svg", ".ico", ".woff2"}
+# Extensões comprimidas (formatos binários já são comprimidos)
+COMPRIMIVEIS = {".js", ".css", ".html", ".svg", ".json", ".txt"}
+# Ganho mínimo para guardar uma variante comprimida
+GANHO_MINIMO = 0.9
+# Builds mantidos por mount (o atual e os anteriores mais recentes)
+VERSOES_MANTIDAS = 3
+
+CACHE_IMUTAVEL = "public, max-age=31536000, immutable"
+CACHE_REVALIDAR = "no-cache"
+
+_NOME_COM_HASH = re.compile(r"\.[0-9a-f]{10}\.[^.]+$")
+
+
+def _hash(dados: bytes) -> str:
+    return hashlib.sha256(dados).hexdigest()[:10]
+
+
+def _arquivos(origem: str) -> list:
+    """Caminhos relativos de todos os arquivos da origem, em ordem estável"""
+    encontrados = []
+    for raiz, pastas, arquivos in os.walk(origem):
+        pastas.sort()
+        for nome in sorted(arquivos):
+            encontrados.append(os.path.relpath(os.path.join(raiz, nome), origem).replace(os.sep, "/"))
+    return encontrados
+
+
+def versao_origem(origem: str) -> str:
+    """Hash de nomes e conteúdos de todos os arquivos da origem"""
+    h = hashlib.sha256()
+    for relativo in _arquivos(origem):
+        h.update(relativo.encode())
+        with open(os.path.join(origem, relativo), "rb") as f:
+            h.update(hashlib.sha256(f.read()).digest())
+    return h.hexdigest()[:12]
+
+
+def _brotli():
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli
+
+
+def _gravar(caminho: str, dados: bytes):
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    with open(caminho, "wb") as f:
+        f.write(dados)
+
+
+def _comprimir(caminho: str, dados: bytes, brotli):
+    if os.path.splitext(caminho)[1] not in COMPRIMIVEIS:
+        return
+    variantes = [(".gz", gzip.compress(dados, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variantes.append((".br", brotli.compress(dados, quality=11)))
+    for sufixo, comprimido in variantes:
+        if len(comprimido) < len(dados) * GANHO_MINIMO:
+            _gravar(caminho + sufixo, comprimido)
+
+
+def _reescrever_html(html: str, pasta: str, nomes: dict) -> str:
+    """Troca src/href relativos a arquivos versionados pelos nomes com hash"""
+    def trocar(m):
+        prefixo, alvo = m.group(2) or "", m.group(3)
+        relativo = os.path.normpath(os.path.join(pasta, alvo)).replace(os.sep, "/")
+        if relativo not in nomes:
+            return m.group(0)
+        novo = os.path.relpath(nomes[relativo], pasta or ".").replace(os.sep, "/")
+        return f'{m.group(1)}="{prefixo}{novo}"'
+
+    return re.sub(r'\b(src|href)=["\'](\./)?([^"\':?#]+)["\']', trocar, html)
+
+
+def construir(origem: str, destino: str) -> str:
+    """
+    Gera a pasta versionada da origem em destino e retorna o caminho dela
+    - Não faz nada se a versão atual já foi construída
+    - Escreve numa pasta temporária e renomeia: nenhum worker vê build pela metade
+    """
+    versao = versao_origem(origem)
+    pasta_final = os.path.join(destino, versao)
+    if os.path.isdir(pasta_final):
+        # Volta a ser a mais recente (ex.: deploy revertido)
+        os.utime(pasta_final)
+        return pasta_final
+
+    temporaria = f"{pasta_final}.tmp-{os.getpid()}-{threading.get_ident()}"
+    shutil.rmtree(temporaria, ignore_errors=True)
+    brotli = _brotli()
+    arquivos = _arquivos(origem)
+
+    # 1. assets versionados
+    nomes = {}
+    for relativo in arquivos:
+        base, ext = os.path.splitext(relativo)
+        if ext not in VERSIONADAS:
+            continue
+        with open(os.path.join(origem, relativo), "rb") as f:
+            dados = f.read()
+        nomes[relativo] = f"{base}.{_hash(dados)}{ext}"
+        _gravar(os.path.join(temporaria, nomes[relativo]), dados)
+        _comprimir(os.path.join(temporaria, nomes[relativo]), dados, brotli)
+
+    # 2. todos os arquivos com o nome original (HTML reescritos)
+    for relativo in arquivos:
+        with open(os.path.join(origem, relativo), "rb") as f:
+            dados = f.read()
+        if relativo.endswith(".html"):
+            pasta = os.path.dirname(relativo)
+            dados = _reescrever_html(dados.decode("utf-8"), pasta, nomes).encode("utf-8")
+        _gravar(os.path.join(temporaria, relativo), dados)
+        _comprimir(os.path.join(temporaria, relativo), dados, brotli)
+
+    try:
+        os.rename(temporaria, pasta_final)
+    except OSError:
+        # Outro worker terminou o mesmo build antes
+        shutil.rmtree(temporaria, ignore_errors=True)
+
+    # Versões além das VERSOES_MANTIDAS mais recentes (best effort: podem
+    # estar em uso no Windows)
+    for antiga in versoes_anteriores(destino, pasta_final)[VERSOES_MANTIDAS - 1:]:
+        shutil.rmtree(antiga, ignore_errors=True)
+    return pasta_final
+
+
+def versoes_anteriores(destino: str, atual: str) -> list:
+    """Pastas de builds anteriores ao atual, da mais recente para a mais antiga"""
+    pastas = [
+        os.path.join(destino, nome) for nome in os.listdir(destino)
+        if ".tmp-" not in nome and os.path.join(destino, nome) != atual
+    ]
+    return sorted(pastas, key=os.path.getmtime, reverse=True)
+
+
+def _aceita(accept_encoding: str, codificacao: str) -> bool:
+    for parte in accept_encoding.split(","):
+        nome, _, parametros = parte.strip().partition(";")
+        if nome.strip().lower() in (codificacao, "*"):
+            q = parametros.strip()
+            if not q.startswith("q="):
+                return True
+            try:
+                return float(q[2:] or 0) > 0
+            except ValueError:
+                # q malformado: trata como não aceito
+                return False
+    return False
+
+
+class StaticFilesPrecomprimidos(StaticFiles):
+    """
+    StaticFiles que serve o build versionado de `directory`
+    - O build roda uma vez por processo, na primeira requisição
+    - Se o build falhar, serve a pasta original como antes
+    """
+
+    def __init__(self, *, directory: str, nome: str = None, **kwargs):
+        self.origem = directory
+        self.destino = os.path.join(BUILD_DIR, nome or os.path.basename(os.path.normpath(directory)))
+        self._construido = False
+        self._lock = threading.Lock()
+        super().__init__(directory=directory, **kwargs)
+
+    def _garantir_build(self):
+        with self._lock:
+            if self._construido:
+                return
+            try:
+                atual = construir(self.origem, self.destino)
+                # Builds anteriores depois do atual: nomes com hash antigos continuam servidos
+                self.all_directories = [atual, *versoes_anteriores(self.destino, atual)[:VERSOES_MANTIDAS - 1]]
+            except OSError as e:
+                print(f"⚠️ Build dos estáticos de {self.origem} falhou, servindo os originais: {e}")
+            self._construido = True
+
+    async def get_response(self, path, scope):
+        if not self._construido:
+            await run_in_threadpool(self._garantir_build)
+        return await super().get_response(path, scope)
+
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        request_headers = Headers(scope=scope)
+        accept_encoding = request_headers.get("accept-encoding", "")
+        caminho = os.fspath(full_path)
+
+        response = None
+        for codificacao, sufixo in (("br", ".br"), ("gzip", ".gz")):
+            variante = caminho + sufixo
+            if _aceita(accept_encoding, codificacao) and os.path.isfile(variante):
+                response = FileResponse(
+                    variante,
+                    status_code=status_code,
+                    stat_result=os.stat(variante),
+                    media_type=mimetypes.guess_type(caminho)[0] or "text/plain",
+                    headers={"Content-Encoding": codificacao},
+                )
+                break
+        if response is None:
+            response = FileResponse(caminho, status_code=status_code, stat_result=stat_result)
+
+        response.headers["Vary"] = "Accept-Encoding"
+        imutavel = _NOME_COM_HASH.search(os.path.basename(caminho)) is not None
+        response.headers["Cache-Control"] = CACHE_IMUTAVEL if imutavel else CACHE_REVALIDAR
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
+
+
+# Pastas montadas pelo main.py
+PASTAS = ("frontend", "auth")
+
+
+def construir_todos():
+    """Build de todas as pastas montadas (serve.py chama antes de subir os workers)"""
+    return {pasta: construir(pasta, os.path.join(BUILD_DIR, pasta)) for pasta in PASTAS}
+
+
+if __name__ == "__main__":
+    for pasta, saida in construir_todos().items():
+        print(f"📦 {pasta} -> {saida}")
@@ -0,0 +1,175 @@
+"""
+Barramento de eventos de alteração (alimenta o feed SSE em /eventos)
+
+- Os handlers de escrita publicam um evento pequeno por registro alterado,
+  depois do commit: tabela, ação (criado/atualizado/removido) e id. O
+  registro não vai no evento: quem recebe busca pela API, com o próprio
+  token (nomes, telefones e dados clínicos não vazam pelo feed).
+- Cada conexão SSE é uma assinatura com fila limitada no event loop do
+  servidor; publicar() é chamado das threads do threadpool e entrega com
+  call_soon_threadsafe, sem bloquear o handler.
+- Um histórico curto em memória permite retomar a conexão pelo Last-Event-ID;
+  se o id não estiver mais no histórico (ou veio de outro processo), ou se a
+  fila do cliente encheu, o cliente recebe "resync" e recarrega as listas.
+
+Cada evento leva a filial em que foi publicado (ver filiais.py) e só é
+entregue às conexões da mesma filial.
+
+O barramento é por processo. Com vários workers, o feed complementa os eventos
+locais comparando as versões de tabela do backend de cache compartilhado.
+
+No SIGINT/SIGTERM as conexões abertas são encerradas, para que o shutdown
+gracioso do uvicorn não fique esperando streams que nunca terminam.
+"""
+
+import asyncio
+import itertools
+import os
+import signal
+import threading
+from collections import deque, namedtuple
+
+from database import filial_atual
+
+# Eventos mantidos para retomada por Last-Event-ID
+HISTORICO_MAXSIZE = 500
+# Eventos pendentes por conexão antes de marcá-la para resync
+FILA_MAXSIZE = 1000
+
+TABELAS = ("donos", "animais", "vacinas", "consultas", "banho_tosa")
+
+Evento = namedtuple("Evento", ["seq", "tabela", "acao", "id", "filial"])
+
+
+class Assinatura:
+    """Fila de eventos de uma conexão, consumida no event loop que a criou"""
+
+    def __init__(self, loop, filial=None):
+        self.loop = loop
+        self.filial = filial
+        self.fila = asyncio.Queue(maxsize=FILA_MAXSIZE)
+        self.perdeu_eventos = False
+        self.encerrada = False
+
+    def _entregar(self, evento: Evento):
+        try:
+            self.fila.put_nowait(evento)
+        except asyncio.QueueFull:
+            self.perdeu_eventos = True
+
+    def _encerrar(self):
+        self.encerrada = True
+        if self.fila.empty():
+            # Acorda o consumidor parado em fila.get()
+            self.fila.put_nowait(None)
+
+
+_lock = threading.Lock()
+_assinaturas = set()
+_historico = deque(maxlen=HISTORICO_MAXSIZE)
+_sequencia = itertools.count(1)
+_publicados_por_tabela = {}  # (filial, tabela) -> eventos
+_descartados = 0
+
+
+def id_evento(evento: Evento) -> str:
+    """Id do evento no feed: "<pid>-<seq>" (ids de outro processo forçam resync)"""
+    return f"{os.getpid()}-{evento.seq}"
+
+
+def publicar(tabela: str, acao: str, id: int):
+    """Publica uma alteração para todas as conexões abertas do processo"""
+    global _descartados
+    filial = filial_atual()
+    with _lock:
+        evento = Evento(next(_sequencia), tabela, acao, id, filial)
+        _historico.append(evento)
+        chave = (filial, tabela)
+        _publicados_por_tabela[chave] = _publicados_por_tabela.get(chave, 0) + 1
+        assinaturas = [a for a in _assinaturas if a.filial == filial]
+
+    for assinatura in assinaturas:
+        try:
+            assinatura.loop.call_soon_threadsafe(assinatura._entregar, evento)
+        except RuntimeError:
+            # Event loop já encerrado (servidor desligando)
+            with _lock:
+                _assinaturas.discard(assinatura)
+                _descartados += 1
+
+
+def publicados_por_tabela() -> dict:
+    """Contagem de eventos publicados por tabela neste processo (filial atual)"""
+    filial = filial_atual()
+    with _lock:
+        return {tabela: _publicados_por_tabela.get((filial, tabela), 0) for tabela in TABELAS}
+
+
+def assinar(ultimo_id: str = None):
+    """
+    Registra uma nova conexão
+    - Retorna (assinatura, eventos a reenviar); eventos é None quando
+      ultimo_id não pode ser retomado e o cliente precisa de resync
+    """
+    assinatura = Assinatura(asyncio.get_running_loop(), filial_atual())
+    with _lock:
+        _assinaturas.add(assinatura)
+        if not ultimo_id:
+            return assinatura, []
+
+        pid, _, seq = ultimo_id.partition("-")
+        if pid != str(os.getpid()) or not seq.isdigit():
+            return assinatura, None
+        seq = int(seq)
+        if _historico and seq < _historico[0].seq - 1:
+            return assinatura, None
+        return assinatura, [
+            evento for evento in _historico
+            if evento.seq > seq and evento.filial == assinatura.filial
+        ]
+
+
+def cancelar(assinatura: Assinatura):
+    with _lock:
+        _assinaturas.discard(assinatura)
+
+
+def encerrar_conexoes():
+    """Encerra todas as conexões abertas (chamado no shutdown)"""
+    with _lock:
+        assinaturas = list(_assinaturas)
+        _assinaturas.clear()
+    for assinatura in assinaturas:
+        try:
+            assinatura.loop.call_soon_threadsafe(assinatura._encerrar)
+        except RuntimeError:
+            pass
+
+
+def encerrar_no_sinal():
+    """
+    Encadeia encerrar_conexoes() aos handlers de SIGINT/SIGTERM já instalados
+    (pelo uvicorn); deve ser chamado na thread principal, no startup
+    """
+    if threading.current_thread() is not threading.main_thread():
+        return
+    for sinal in (signal.SIGINT, signal.SIGTERM):
+        anterior = signal.getsignal(sinal)
+        if not callable(anterior):
+            continue
+
+        def handler(signum, frame, anterior=anterior):
+            encerrar_conexoes()
+            anterior(signum, frame)
+
+        signal.signal(sinal, handler)
+
+
+def estatisticas() -> dict:
+    with _lock:
+        return {
+            "conexoes": len(_assinaturas),
+            "publicados": sum(_publicados_por_tabela.values()),
+            "historico": len(_historico),
+            "descartados": _descartados,
+        }
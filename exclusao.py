@@ -0,0 +1,205 @@
+"""
+Exclusão lógica com cascata em lote e purga das linhas excluídas
+
+- Excluir marca deleted_at em vez de apagar a linha. A cascata (dono ->
+  animais -> vacinas, consultas e banho/tosa, inclusive as arquivadas;
+  consultas -> anexos) é feita com um UPDATE por
+  tabela filtrado pelas chaves estrangeiras indexadas, sem carregar objetos
+  no ORM; RETURNING devolve os ids marcados para invalidar o cache e
+  publicar os eventos de remoção.
+- As leituras (projecoes.py, cache.buscar_dono/animal) ignoram linhas com
+  deleted_at preenchido.
+- A purga apaga de verdade as linhas excluídas há mais de
+  PETCARE_PURGA_RETENCAO_DIAS dias, em lotes pequenos com commit por lote
+  (o lock de escrita do SQLite fica livre entre os lotes). Roda numa tarefa
+  assíncrona a cada PETCARE_PURGA_INTERVALO segundos (0 desativa), na
+  matriz e em cada filial. Depois dela, os arquivos de anexos sem
+  referência são apagados do disco.
+"""
+
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, select, update
+
+import cache
+import eventos
+import models
+
+RETENCAO_DIAS = int(os.getenv("PETCARE_PURGA_RETENCAO_DIAS", "30"))
+INTERVALO_PURGA = int(os.getenv("PETCARE_PURGA_INTERVALO", "3600"))
+LOTE_PURGA = 1000
+# Pausa entre lotes, para as escritas da API não esperarem o lock
+PAUSA_ENTRE_LOTES = 0.05
+
+# Filhas antes das mães: nenhuma linha purgada fica referenciada
+ORDEM_PURGA = [
+    models.Vacina, models.Anexo,
+    models.Consulta, models.ConsultaArquivada,
+    models.BanhoTosa, models.BanhoTosaArquivado,
+    models.Animal, models.Dono,
+]
+
+
+def _marcar(db, modelo, criterio, agora) -> list:
+    """UPDATE ... SET deleted_at por conjunto; retorna os ids marcados"""
+    stmt = (
+        update(modelo)
+        .where(criterio, modelo.deleted_at.is_(None))
+        .values(deleted_at=agora, updated_at=agora, version=modelo.version + 1)
+        .returning(modelo.id)
+        .execution_options(synchronize_session=False)
+    )
+    return list(db.execute(stmt).scalars())
+
+
+def excluir(db, modelo, id: int) -> dict:
+    """Exclusão lógica de uma linha sem dependentes: {tabela: [ids]}"""
+    return {modelo.__tablename__: _marcar(db, modelo, modelo.id == id, datetime.utcnow())}
+
+
+def _marcar_anexos(db, consultas: list, agora) -> list:
+    """Anexos das consultas marcadas (em lotes, a lista pode ser grande)"""
+    marcados = []
+    for inicio in range(0, len(consultas), LOTE_PURGA):
+        lote = consultas[inicio:inicio + LOTE_PURGA]
+        marcados += _marcar(db, models.Anexo, models.Anexo.consulta_id.in_(lote), agora)
+    return marcados
+
+
+def excluir_consulta(db, consulta_id: int) -> dict:
+    """Exclui a consulta e seus anexos"""
+    agora = datetime.utcnow()
+    removidos = {"consultas": _marcar(db, models.Consulta, models.Consulta.id == consulta_id, agora)}
+    removidos["anexos"] = _marcar_anexos(db, removidos["consultas"], agora)
+    return removidos
+
+
+def excluir_animal(db, animal_id: int) -> dict:
+    """Exclui o animal e, em cascata, suas vacinas, consultas e serviços"""
+    agora = datetime.utcnow()
+    removidos = {"animais": _marcar(db, models.Animal, models.Animal.id == animal_id, agora)}
+    if not removidos["animais"]:
+        return removidos
+
+    removidos["vacinas"] = _marcar(db, models.Vacina, models.Vacina.animal_id == animal_id, agora)
+    removidos["consultas"] = _marcar(db, models.Consulta, models.Consulta.animal_id == animal_id, agora)
+    removidos["consultas_arquivo"] = _marcar(
+        db, models.ConsultaArquivada, models.ConsultaArquivada.animal_id == animal_id, agora
+    )
+    removidos["anexos"] = _marcar_anexos(db, removidos["consultas"] + removidos["consultas_arquivo"], agora)
+    removidos["banho_tosa"] = _marcar(db, models.BanhoTosa, models.BanhoTosa.animal_id == animal_id, agora)
+    removidos["banho_tosa_arquivo"] = _marcar(
+        db, models.BanhoTosaArquivado, models.BanhoTosaArquivado.animal_id == animal_id, agora
+    )
+    return removidos
+
+
+def excluir_dono(db, dono_id: int) -> dict:
+    """Exclui o dono e, em cascata, seus animais e tudo que depende deles"""
+    agora = datetime.utcnow()
+    removidos = {"donos": _marcar(db, models.Dono, models.Dono.id == dono_id, agora)}
+    if not removidos["donos"]:
+        return removidos
+
+    animais_do_dono = select(models.Animal.id).where(models.Animal.dono_id == dono_id)
+    removidos["animais"] = _marcar(db, models.Animal, models.Animal.dono_id == dono_id, agora)
+    removidos["vacinas"] = _marcar(db, models.Vacina, models.Vacina.animal_id.in_(animais_do_dono), agora)
+    removidos["consultas"] = _marcar(
+        db, models.Consulta,
+        (models.Consulta.dono_id == dono_id) | models.Consulta.animal_id.in_(animais_do_dono),
+        agora,
+    )
+    removidos["consultas_arquivo"] = _marcar(
+        db, models.ConsultaArquivada,
+        (models.ConsultaArquivada.dono_id == dono_id) | models.ConsultaArquivada.animal_id.in_(animais_do_dono),
+        agora,
+    )
+    removidos["anexos"] = _marcar_anexos(db, removidos["consultas"] + removidos["consultas_arquivo"], agora)
+    removidos["banho_tosa"] = _marcar(
+        db, models.BanhoTosa,
+        (models.BanhoTosa.dono_id == dono_id) | models.BanhoTosa.animal_id.in_(animais_do_dono),
+        agora,
+    )
+    removidos["banho_tosa_arquivo"] = _marcar(
+        db, models.BanhoTosaArquivado,
+        (models.BanhoTosaArquivado.dono_id == dono_id) | models.BanhoTosaArquivado.animal_id.in_(animais_do_dono),
+        agora,
+    )
+    return removidos
+
+
+def notificar(removidos: dict):
+    """Depois do commit: invalida os caches e publica as remoções no feed"""
+    for tabela, ids in removidos.items():
+        if not ids:
+            continue
+        cache.invalidar_tabelas(tabela)
+        if tabela == "donos":
+            cache.invalidar_donos(ids)
+        elif tabela == "animais":
+            cache.invalidar_animais(ids)
+        for id in ids:
+            eventos.publicar(tabela, "removido", id)
+
+
+def purgar(engine=None, retencao_dias: int = RETENCAO_DIAS, lote: int = LOTE_PURGA, progresso=None) -> dict:
+    """
+    Apaga as linhas excluídas há mais de retencao_dias, em lotes; retorna {tabela: linhas}
+    - progresso(tabela, linhas) é chamado após cada lote (heartbeat do job
+      "purgar_excluidos", ver jobs._recuperar_orfaos)
+    """
+    if engine is None:
+        from database import engine_atual
+        engine = engine_atual()
+
+    limite = datetime.utcnow() - timedelta(days=retencao_dias)
+    purgadas = {}
+    for modelo in ORDEM_PURGA:
+        # Mesmo predicado do índice parcial ix_<tabela>_deleted_at
+        alvo = (
+            select(modelo.id)
+            .where(modelo.deleted_at.is_not(None), modelo.deleted_at < limite)
+            .limit(lote)
+        )
+        total = 0
+        while True:
+            with engine.begin() as conn:
+                apagadas = conn.execute(delete(modelo).where(modelo.id.in_(alvo))).rowcount
+            total += apagadas
+            if progresso is not None:
+                progresso(modelo.__tablename__, total)
+            if apagadas < lote:
+                break
+            time.sleep(PAUSA_ENTRE_LOTES)
+        purgadas[modelo.__tablename__] = total
+
+    # Arquivos cujas linhas de anexos acabaram de ser purgadas (e uploads abandonados)
+    import anexos
+    purgadas["arquivos_anexos"] = anexos.coletar_orfaos(engine)
+    return purgadas
+
+
+def _purgar_na_filial(filial):
+    from database import usar_filial
+    with usar_filial(filial):
+        return purgar()
+
+
+async def ciclo_purga(intervalo: int = INTERVALO_PURGA):
+    """Tarefa de fundo: purga periódica fora do event loop (em thread), banco por banco"""
+    from database import pool_filiais
+
+    while True:
+        await asyncio.sleep(intervalo)
+        for filial in [None, *pool_filiais.listar()]:
+            nome = filial or "matriz"
+            try:
+                purgadas = await asyncio.to_thread(_purgar_na_filial, filial)
+            except Exception as e:
+                print(f"⚠️ Purga de registros excluídos ({nome}) falhou: {e}")
+                continue
+            if any(purgadas.values()):
+                print(f"🧹 Purga de registros excluídos ({nome}): {purgadas}")
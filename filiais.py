@@ -0,0 +1,101 @@
+"""
+Filiais: um banco SQLite por filial
+
+Cada filial grava no seu próprio arquivo (PETCARE_FILIAIS_DIR/<nome>.db),
+então as escritas de uma filial não disputam o lock de escrita das outras.
+
+Resolução da filial:
+- o login com {"filial": "<nome>"} autentica no banco da filial e o token
+  sai com a claim "filial" (security.create_token)
+- FilialMiddleware lê a claim do Bearer token (decodificado uma vez por
+  security.ClaimsMiddleware) e define a filial da
+  requisição; SessionLocal, cache, feed de eventos e anexos passam a usar o
+  escopo dela (ver database.usar_filial)
+- token sem a claim: matriz (clinica_vet.db)
+- sem token (ou com token inválido): matriz só enquanto não houver filiais;
+  com filiais cadastradas as rotas de dados (PREFIXOS_DADOS) respondem 401,
+  em vez de cair na matriz e driblar o isolamento entre filiais
+
+Os engines das filiais são criados sob demanda e limitados por LRU
+(database.PoolFiliais). Relatórios da rede inteira consultam todas as
+filiais em paralelo (routers/filiais.py).
+"""
+
+import json
+
+from database import FilialDesconhecida, pool_filiais, usar_filial
+from security import claims_da_requisicao
+
+PRINCIPAL = "matriz"
+
+# Rotas com dados de uma filial: exigem token quando há filiais cadastradas
+PREFIXOS_DADOS = (
+    "/donos", "/animais", "/vacinas", "/consultas", "/banho-tosa",
+    "/eventos", "/sync", "/jobs", "/dashboard",
+)
+
+
+async def _responder(send, status: int, detail: str, headers=()):
+    corpo = json.dumps({"detail": detail}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(corpo)).encode()),
+            *headers,
+        ],
+    })
+    await send({"type": "http.response.body", "body": corpo})
+
+
+def _rota_de_dados(path: str) -> bool:
+    return any(path == prefixo or path.startswith(prefixo + "/") for prefixo in PREFIXOS_DADOS)
+
+
+class FilialMiddleware:
+    """
+    Middleware ASGI que define a filial da requisição pela claim do token
+    - Claim de filial desconhecida: 403 antes de qualquer acesso ao banco
+    - Rota de dados sem token válido, com filiais cadastradas: 401 (não
+      dá para saber de qual filial é a requisição)
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket"):
+            return await self.app(scope, receive, send)
+
+        claims = claims_da_requisicao(scope)
+        filial = (claims or {}).get("filial")
+
+        if filial is not None and not pool_filiais.existe(filial):
+            return await _responder(send, 403, "Filial desconhecida")
+        if (
+            claims is None
+            and scope["type"] == "http"
+            and scope["method"] != "OPTIONS"
+            and _rota_de_dados(scope["path"])
+            and pool_filiais.ha_filiais()
+        ):
+            return await _responder(
+                send, 401, "Token obrigatório: a filial da requisição vem do token",
+                [(b"www-authenticate", b"Bearer")],
+            )
+
+        with usar_filial(filial):
+            await self.app(scope, receive, send)
+
+
+def listar() -> list:
+    """Matriz e todas as filiais conhecidas"""
+    return [PRINCIPAL, *pool_filiais.listar()]
+
+
+def escopo(nome: str):
+    """usar_filial() pelo nome público (PRINCIPAL = matriz)"""
+    if nome != PRINCIPAL and not pool_filiais.existe(nome):
+        raise FilialDesconhecida(nome)
+    return usar_filial(None if nome == PRINCIPAL else nome)
@@ -39,8 +39,8 @@ async function verifyAuth() {
     }
 }
 
-// Verificar autenticação ao carregar a página
-window.addEventListener('load', verifyAuth);
+// A autenticação é verificada pelo /dashboard/bootstrap em initApp
+// (verifyAuth só é usado se o bootstrap falhar por outro motivo)
 /*
  * SISTEMA DE CLÍNICA VETERINÁRIA - JAVASCRIPT PRINCIPAL
  * Autor: SuperNinja AI Assistant
@@ -56,6 +56,11 @@ let donosCache = []; // Cache para otimizar consultas
 let animaisCache = []; // Cache para otimizar consultas
 let consultasCache = []; // Cache para consultas
 let servicosCache = []; // Cache para serviços de banho e tosa
+let vacinasCache = []; // Cache para vacinas
+let consultasCarregadas = false; // Aba de consultas já buscou a lista completa
+let servicosCarregados = false; // Aba de banho e tosa já buscou a lista completa
+let agendaHoje = []; // Consultas e serviços do dia (do bootstrap)
+let versoesEmEdicao = {}; // "tabela:id" -> version carregada no formulário (If-Match do PUT)
 
 // ===== UTILITÁRIOS =====
 
@@ -83,6 +88,18 @@ function clearInputs(ids) {
   });
 }
 
+/**
+ * Header If-Match com a versão carregada no formulário de edição
+ * (o servidor responde 409 se outra pessoa salvou o registro antes)
+ * @param {string} tabela - Tabela do registro (donos, animais, vacinas)
+ * @param {string|number} id - ID do registro
+ * @returns {object} Headers para o PUT
+ */
+function ifMatch(tabela, id) {
+  const versao = versoesEmEdicao[`${tabela}:${id}`];
+  return versao ? { "If-Match": `"${versao}"` } : {};
+}
+
 /**
  * Função para fazer requisições JSON com tratamento de erro e autenticação
  * @param {string} url - URL da requisição
@@ -110,9 +127,9 @@ async function jsonFetch(url, opts = {}) {
     const timeoutId = setTimeout(() => controller.abort(), 10000); // 10 segundos timeout
     
     const response = await fetch(url, {
+      ...opts,
       headers,
-      signal: controller.signal,
-      ...opts
+      signal: controller.signal
     });
     
     clearTimeout(timeoutId);
@@ -307,11 +324,11 @@ function switchTab(tabName) {
   document.querySelector(`[data-tab="${tabName}"]`).classList.add('active');
   byId(tabName).classList.add('active');
   
-  // Carrega dados específicos da tab
-  if (tabName === 'consultas') {
+  // Carrega dados específicos da tab (depois disso o feed de eventos mantém em dia)
+  if (tabName === 'consultas' && !consultasCarregadas) {
     carregarConsultas();
     carregarEstatisticasConsultas();
-  } else if (tabName === 'banho-tosa') {
+  } else if (tabName === 'banho-tosa' && !servicosCarregados) {
     carregarServicos();
     carregarEstatisticasServicos();
   }
@@ -378,175 +395,191 @@ function getNomeAnimalById(animalId) {
  */
 async function carregarDonos() {
   try {
-    const dados = await jsonFetch(`${API}/donos`);
-    donosCache = dados; // Atualiza cache
-    
-    const tbody = byId("tabela-donos").querySelector("tbody");
-    tbody.innerHTML = "";
-    
-    // Contador de animais por dono
-    const contagemAnimais = {};
-    animaisCache.forEach(animal => {
-      contagemAnimais[animal.dono_id] = (contagemAnimais[animal.dono_id] || 0) + 1;
-    });
-    
-    dados.forEach(dono => {
-      const tr = document.createElement("tr");
-      const numAnimais = contagemAnimais[dono.id] || 0;
-      
-      tr.innerHTML = `
-        <td><strong>${dono.id}</strong></td>
-        <td>${dono.nome}</td>
-        <td>${formatarTelefone(dono.telefone)}</td>
-        <td>
-          <span class="badge ${numAnimais > 0 ? 'badge-success' : 'badge-secondary'}">
-            <i class="fas fa-dog"></i> ${numAnimais}
-          </span>
-        </td>
-        <td>
-          <button class="btn btn-edit" data-action="edit" data-id="${dono.id}" title="Editar">
-            <i class="fas fa-edit"></i>
-          </button>
-          <button class="btn btn-delete" data-action="del" data-id="${dono.id}" title="Excluir">
-            <i class="fas fa-trash"></i>
-          </button>
-        </td>
-      `;
-      
-      tbody.appendChild(tr);
-    });
-    
-    // Atualiza contador
-    updateRecordCount('tabela-donos', dados.length);
-    
-    // Atualiza selects de donos em outros formulários
-    atualizarSelectDonos();
-    
+    donosCache = await jsonFetch(`${API}/donos`); // Atualiza cache
+    renderizarDonos();
   } catch (error) {
     console.error('Erro ao carregar donos:', error);
     showToast('Erro ao carregar donos: ' + error.message, 'error');
   }
 }
 
+/**
+ * Renderiza a tabela de donos a partir do cache
+ */
+function renderizarDonos() {
+  const dados = donosCache;
+  const tbody = byId("tabela-donos").querySelector("tbody");
+  tbody.innerHTML = "";
+  
+  // Contador de animais por dono
+  const contagemAnimais = {};
+  animaisCache.forEach(animal => {
+    contagemAnimais[animal.dono_id] = (contagemAnimais[animal.dono_id] || 0) + 1;
+  });
+  
+  dados.forEach(dono => {
+    const tr = document.createElement("tr");
+    const numAnimais = contagemAnimais[dono.id] || 0;
+    
+    tr.innerHTML = `
+      <td><strong>${dono.id}</strong></td>
+      <td>${dono.nome}</td>
+      <td>${formatarTelefone(dono.telefone)}</td>
+      <td>
+        <span class="badge ${numAnimais > 0 ? 'badge-success' : 'badge-secondary'}">
+          <i class="fas fa-dog"></i> ${numAnimais}
+        </span>
+      </td>
+      <td>
+        <button class="btn btn-edit" data-action="edit" data-id="${dono.id}" title="Editar">
+          <i class="fas fa-edit"></i>
+        </button>
+        <button class="btn btn-delete" data-action="del" data-id="${dono.id}" title="Excluir">
+          <i class="fas fa-trash"></i>
+        </button>
+      </td>
+    `;
+    
+    tbody.appendChild(tr);
+  });
+  
+  // Atualiza contador
+  updateRecordCount('tabela-donos', dados.length);
+  
+  // Atualiza selects de donos em outros formulários
+  atualizarSelectDonos();
+}
+
 /**
  * Carrega todos os animais da API
  */
 async function carregarAnimais() {
   try {
-    const dados = await jsonFetch(`${API}/animais`);
-    animaisCache = dados; // Atualiza cache
-    
-    const tbody = byId("tabela-animais").querySelector("tbody");
-    tbody.innerHTML = "";
-    
-    dados.forEach(animal => {
-      const tr = document.createElement("tr");
-      const nomeDono = getNomeDonoById(animal.dono_id);
-      
-      tr.innerHTML = `
-        <td><strong>${animal.id}</strong></td>
-        <td>
-          <div class="animal-info">
-            <i class="fas fa-paw animal-icon"></i>
-            ${animal.nome}
-          </div>
-        </td>
-        <td>
-          <span class="especie-badge especie-${animal.especie.toLowerCase()}">
-            ${getEspecieIcon(animal.especie)} ${animal.especie}
-          </span>
-        </td>
-        <td>${animal.idade} anos</td>
-        <td>
-          <div class="dono-info">
-            <i class="fas fa-user"></i>
-            ${nomeDono}
-          </div>
-        </td>
-        <td>
-          <span class="id-badge" title="ID do Dono">
-            <i class="fas fa-hashtag"></i>
-            ${animal.dono_id}
-          </span>
-        </td>
-        <td>
-          <button class="btn btn-edit" data-action="edit" data-id="${animal.id}" title="Editar">
-            <i class="fas fa-edit"></i>
-          </button>
-          <button class="btn btn-delete" data-action="del" data-id="${animal.id}" title="Excluir">
-            <i class="fas fa-trash"></i>
-          </button>
-        </td>
-      `;
-      
-      tbody.appendChild(tr);
-    });
-    
-    updateRecordCount('tabela-animais', dados.length);
-    atualizarSelectAnimais();
-    
+    animaisCache = await jsonFetch(`${API}/animais`); // Atualiza cache
+    renderizarAnimais();
   } catch (error) {
     console.error('Erro ao carregar animais:', error);
     showToast('Erro ao carregar animais: ' + error.message, 'error');
   }
 }
 
+/**
+ * Renderiza a tabela de animais a partir do cache
+ */
+function renderizarAnimais() {
+  const dados = animaisCache;
+  const tbody = byId("tabela-animais").querySelector("tbody");
+  tbody.innerHTML = "";
+  
+  dados.forEach(animal => {
+    const tr = document.createElement("tr");
+    const nomeDono = getNomeDonoById(animal.dono_id);
+    
+    tr.innerHTML = `
+      <td><strong>${animal.id}</strong></td>
+      <td>
+        <div class="animal-info">
+          <i class="fas fa-paw animal-icon"></i>
+          ${animal.nome}
+        </div>
+      </td>
+      <td>
+        <span class="especie-badge especie-${animal.especie.toLowerCase()}">
+          ${getEspecieIcon(animal.especie)} ${animal.especie}
+        </span>
+      </td>
+      <td>${animal.idade} anos</td>
+      <td>
+        <div class="dono-info">
+          <i class="fas fa-user"></i>
+          ${nomeDono}
+        </div>
+      </td>
+      <td>
+        <span class="id-badge" title="ID do Dono">
+          <i class="fas fa-hashtag"></i>
+          ${animal.dono_id}
+        </span>
+      </td>
+      <td>
+        <button class="btn btn-edit" data-action="edit" data-id="${animal.id}" title="Editar">
+          <i class="fas fa-edit"></i>
+        </button>
+        <button class="btn btn-delete" data-action="del" data-id="${animal.id}" title="Excluir">
+          <i class="fas fa-trash"></i>
+        </button>
+      </td>
+    `;
+    
+    tbody.appendChild(tr);
+  });
+  
+  updateRecordCount('tabela-animais', dados.length);
+  atualizarSelectAnimais();
+}
+
 /**
  * Carrega todas as vacinas da API
  */
 async function carregarVacinas() {
   try {
-    const dados = await jsonFetch(`${API}/vacinas`);
-    
-    const tbody = byId("tabela-vacinas").querySelector("tbody");
-    tbody.innerHTML = "";
-    
-    dados.forEach(vacina => {
-      const tr = document.createElement("tr");
-      const nomeAnimal = getNomeAnimalById(vacina.animal_id);
-      
-      tr.innerHTML = `
-        <td><strong>${vacina.id}</strong></td>
-        <td>
-          <div class="vacina-info">
-            <i class="fas fa-syringe"></i>
-            ${vacina.nome}
-          </div>
-        </td>
-        <td>${formatarData(vacina.data_aplicacao)}</td>
-        <td>
-          <div class="animal-info">
-            <i class="fas fa-paw"></i>
-            ${nomeAnimal}
-          </div>
-        </td>
-        <td>
-          <span class="id-badge" title="ID do Animal">
-            <i class="fas fa-hashtag"></i>
-            ${vacina.animal_id}
-          </span>
-        </td>
-        <td>
-          <button class="btn btn-edit" data-action="edit" data-id="${vacina.id}" title="Editar">
-            <i class="fas fa-edit"></i>
-          </button>
-          <button class="btn btn-delete" data-action="del" data-id="${vacina.id}" title="Excluir">
-            <i class="fas fa-trash"></i>
-          </button>
-        </td>
-      `;
-      
-      tbody.appendChild(tr);
-    });
-    
-    updateRecordCount('tabela-vacinas', dados.length);
-    
+    vacinasCache = await jsonFetch(`${API}/vacinas`); // Atualiza cache
+    renderizarVacinas();
   } catch (error) {
     console.error('Erro ao carregar vacinas:', error);
     showToast('Erro ao carregar vacinas: ' + error.message, 'error');
   }
 }
 
+/**
+ * Renderiza a tabela de vacinas a partir do cache
+ */
+function renderizarVacinas() {
+  const dados = vacinasCache;
+  const tbody = byId("tabela-vacinas").querySelector("tbody");
+  tbody.innerHTML = "";
+  
+  dados.forEach(vacina => {
+    const tr = document.createElement("tr");
+    const nomeAnimal = getNomeAnimalById(vacina.animal_id);
+    
+    tr.innerHTML = `
+      <td><strong>${vacina.id}</strong></td>
+      <td>
+        <div class="vacina-info">
+          <i class="fas fa-syringe"></i>
+          ${vacina.nome}
+        </div>
+      </td>
+      <td>${formatarData(vacina.data_aplicacao)}</td>
+      <td>
+        <div class="animal-info">
+          <i class="fas fa-paw"></i>
+          ${nomeAnimal}
+        </div>
+      </td>
+      <td>
+        <span class="id-badge" title="ID do Animal">
+          <i class="fas fa-hashtag"></i>
+          ${vacina.animal_id}
+        </span>
+      </td>
+      <td>
+        <button class="btn btn-edit" data-action="edit" data-id="${vacina.id}" title="Editar">
+          <i class="fas fa-edit"></i>
+        </button>
+        <button class="btn btn-delete" data-action="del" data-id="${vacina.id}" title="Excluir">
+          <i class="fas fa-trash"></i>
+        </button>
+      </td>
+    `;
+    
+    tbody.appendChild(tr);
+  });
+  
+  updateRecordCount('tabela-vacinas', dados.length);
+}
+
 /**
  * Obtém ícone conforme espécie do animal
  * @param {string} especie - Espécie do animal
@@ -614,25 +647,27 @@ function atualizarSelectAnimais() {
 // Carregar estatísticas do dashboard de consultas
 async function carregarEstatisticasConsultas() {
   try {
-    const response = await jsonFetch(`${API}/consultas/stats/dashboard`);
-    
-    if (response) {
-      document.getElementById('stat-total').textContent = response.total_consultas;
-      document.getElementById('stat-agendadas').textContent = response.agendadas;
-      document.getElementById('stat-concluidas').textContent = response.concluidas;
-      document.getElementById('stat-canceladas').textContent = response.canceladas;
-    }
-    
+    exibirEstatisticasConsultas(await jsonFetch(`${API}/consultas/stats/dashboard`));
   } catch (error) {
     console.error('Erro ao carregar estatísticas:', error);
   }
 }
 
+// Exibir estatísticas de consultas nos cards
+function exibirEstatisticasConsultas(stats) {
+  if (!stats) return;
+  document.getElementById('stat-total').textContent = stats.total_consultas;
+  document.getElementById('stat-agendadas').textContent = stats.agendadas;
+  document.getElementById('stat-concluidas').textContent = stats.concluidas;
+  document.getElementById('stat-canceladas').textContent = stats.canceladas;
+}
+
 // Carregar consultas
 async function carregarConsultas() {
   try {
     const response = await jsonFetch(`${API}/consultas`);
     consultasCache = response || [];
+    consultasCarregadas = true;
     
     renderizarConsultas(consultasCache);
     
@@ -720,15 +755,14 @@ async function salvarConsulta(event) {
   };
   
   try {
-    await jsonFetch(`${API}/consultas`, {
+    const consulta = await jsonFetch(`${API}/consultas`, {
       method: 'POST',
       body: JSON.stringify(consultaData)
     });
     
     showToast('Consulta agendada com sucesso!', 'success');
     limparFormularioConsulta();
-    await carregarConsultas();
-    await carregarEstatisticasConsultas();
+    aplicarMudanca({ tabela: 'consultas', acao: 'criado', id: consulta.id, dados: consulta });
     
   } catch (error) {
     console.error('Erro ao salvar consulta:', error);
@@ -800,8 +834,7 @@ function excluirConsulta(id) {
       try {
         await jsonFetch(`${API}/consultas/${id}`, { method: 'DELETE' });
         showToast('Consulta excluída com sucesso!', 'success');
-        await carregarConsultas();
-        await carregarEstatisticasConsultas();
+        aplicarMudanca({ tabela: 'consultas', acao: 'removido', id });
       } catch (error) {
         console.error('Erro ao excluir consulta:', error);
         showToast('Erro ao excluir consulta', 'error');
@@ -815,25 +848,27 @@ function excluirConsulta(id) {
 // Carregar estatísticas do dashboard de serviços
 async function carregarEstatisticasServicos() {
   try {
-    const response = await jsonFetch(`${API}/banho-tosa/stats/dashboard`);
-    
-    if (response) {
-      document.getElementById('servico-stat-total').textContent = response.total_servicos;
-      document.getElementById('servico-stat-agendados').textContent = response.agendados;
-      document.getElementById('servico-stat-concluidos').textContent = response.concluidos;
-      document.getElementById('servico-stat-cancelados').textContent = response.cancelados;
-    }
-    
+    exibirEstatisticasServicos(await jsonFetch(`${API}/banho-tosa/stats/dashboard`));
   } catch (error) {
     console.error('Erro ao carregar estatísticas de serviços:', error);
   }
 }
 
+// Exibir estatísticas de serviços nos cards
+function exibirEstatisticasServicos(stats) {
+  if (!stats) return;
+  document.getElementById('servico-stat-total').textContent = stats.total_servicos;
+  document.getElementById('servico-stat-agendados').textContent = stats.agendados;
+  document.getElementById('servico-stat-concluidos').textContent = stats.concluidos;
+  document.getElementById('servico-stat-cancelados').textContent = stats.cancelados;
+}
+
 // Carregar serviços de banho e tosa
 async function carregarServicos() {
   try {
     const response = await jsonFetch(`${API}/banho-tosa`);
     servicosCache = response || [];
+    servicosCarregados = true;
     
     renderizarServicos(servicosCache);
     
@@ -938,15 +973,14 @@ async function salvarServico(event) {
   };
   
   try {
-    await jsonFetch(`${API}/banho-tosa`, {
+    const servico = await jsonFetch(`${API}/banho-tosa`, {
       method: 'POST',
       body: JSON.stringify(servicoData)
     });
     
     showToast('Serviço agendado com sucesso!', 'success');
     limparFormularioServico();
-    await carregarServicos();
-    await carregarEstatisticasServicos();
+    aplicarMudanca({ tabela: 'banho_tosa', acao: 'criado', id: servico.id, dados: servico });
     
   } catch (error) {
     console.error('Erro ao salvar serviço:', error);
@@ -1021,8 +1055,7 @@ function excluirServico(id) {
       try {
         await jsonFetch(`${API}/banho-tosa/${id}`, { method: 'DELETE' });
         showToast('Serviço excluído com sucesso!', 'success');
-        await carregarServicos();
-        await carregarEstatisticasServicos();
+        aplicarMudanca({ tabela: 'banho_tosa', acao: 'removido', id });
       } catch (error) {
         console.error('Erro ao excluir serviço:', error);
         showToast('Erro ao excluir serviço', 'error');
@@ -1090,26 +1123,27 @@ byId("form-dono").addEventListener("submit", async (e) => {
   };
   
   try {
+    let dono;
     if (id) {
       // Atualização
-      await jsonFetch(`${API}/donos/${id}`, {
+      dono = await jsonFetch(`${API}/donos/${id}`, {
         method: "PUT",
+        headers: ifMatch("donos", id),
         body: JSON.stringify(payload)
       });
       showToast('Dono atualizado com sucesso!');
     } else {
       // Criação
-      await jsonFetch(`${API}/donos`, {
+      dono = await jsonFetch(`${API}/donos`, {
         method: "POST",
         body: JSON.stringify(payload)
       });
       showToast('Dono cadastrado com sucesso!');
     }
     
-    // Limpa formulário e recarrega dados
+    // Limpa formulário e atualiza a tabela com o registro retornado
     clearInputs(["dono-id", "dono-nome", "dono-telefone"]);
-    await carregarDonos();
-    await carregarAnimais(); // Atualiza contagem de animais por dono
+    aplicarMudanca({ tabela: 'donos', acao: id ? 'atualizado' : 'criado', id: dono.id, dados: dono });
     
   } catch (error) {
     console.error('Erro ao salvar dono:', error);
@@ -1134,6 +1168,7 @@ byId("tabela-donos").addEventListener("click", async (e) => {
     try {
       const dono = await jsonFetch(`${API}/donos/${id}`);
       byId("dono-id").value = dono.id;
+      versoesEmEdicao[`donos:${dono.id}`] = dono.version;
       byId("dono-nome").value = dono.nome;
       byId("dono-telefone").value = dono.telefone;
       
@@ -1154,9 +1189,7 @@ byId("tabela-donos").addEventListener("click", async (e) => {
         try {
           await jsonFetch(`${API}/donos/${id}`, { method: "DELETE" });
           showToast('Dono excluído com sucesso!');
-          await carregarDonos();
-          await carregarAnimais();
-          await carregarVacinas();
+          aplicarMudanca({ tabela: 'donos', acao: 'removido', id: Number(id) });
         } catch (error) {
           console.error('Erro ao excluir dono:', error);
           showToast('Erro ao excluir dono: ' + error.message, 'error');
@@ -1181,14 +1214,16 @@ byId("form-animal").addEventListener("submit", async (e) => {
   };
   
   try {
+    let animal;
     if (id) {
-      await jsonFetch(`${API}/animais/${id}`, {
+      animal = await jsonFetch(`${API}/animais/${id}`, {
         method: "PUT",
+        headers: ifMatch("animais", id),
         body: JSON.stringify(payload)
       });
       showToast('Animal atualizado com sucesso!');
     } else {
-      await jsonFetch(`${API}/animais`, {
+      animal = await jsonFetch(`${API}/animais`, {
         method: "POST",
         body: JSON.stringify(payload)
       });
@@ -1196,7 +1231,7 @@ byId("form-animal").addEventListener("submit", async (e) => {
     }
     
     clearInputs(["animal-id", "animal-nome", "animal-especie", "animal-idade", "animal-dono-id"]);
-    await carregarAnimais();
+    aplicarMudanca({ tabela: 'animais', acao: id ? 'atualizado' : 'criado', id: animal.id, dados: animal });
     
   } catch (error) {
     console.error('Erro ao salvar animal:', error);
@@ -1234,6 +1269,7 @@ byId("tabela-animais").addEventListener("click", async (e) => {
     try {
       const animal = await jsonFetch(`${API}/animais/${id}`);
       byId("animal-id").value = animal.id;
+      versoesEmEdicao[`animais:${animal.id}`] = animal.version;
       byId("animal-nome").value = animal.nome;
       byId("animal-especie").value = animal.especie;
       byId("animal-idade").value = animal.idade;
@@ -1256,8 +1292,7 @@ byId("tabela-animais").addEventListener("click", async (e) => {
         try {
           await jsonFetch(`${API}/animais/${id}`, { method: "DELETE" });
           showToast('Animal excluído com sucesso!');
-          await carregarAnimais();
-          await carregarVacinas();
+          aplicarMudanca({ tabela: 'animais', acao: 'removido', id: Number(id) });
         } catch (error) {
           console.error('Erro ao excluir animal:', error);
           showToast('Erro ao excluir animal: ' + error.message, 'error');
@@ -1281,14 +1316,16 @@ byId("form-vacina").addEventListener("submit", async (e) => {
   };
   
   try {
+    let vacina;
     if (id) {
-      await jsonFetch(`${API}/vacinas/${id}`, {
+      vacina = await jsonFetch(`${API}/vacinas/${id}`, {
         method: "PUT",
+        headers: ifMatch("vacinas", id),
         body: JSON.stringify(payload)
       });
       showToast('Vacina atualizada com sucesso!');
     } else {
-      await jsonFetch(`${API}/vacinas?animal_id=${animalId}`, {
+      vacina = await jsonFetch(`${API}/vacinas?animal_id=${animalId}`, {
         method: "POST",
         body: JSON.stringify(payload)
       });
@@ -1296,7 +1333,7 @@ byId("form-vacina").addEventListener("submit", async (e) => {
     }
     
     clearInputs(["vacina-id", "vacina-nome", "vacina-data", "vacina-animal-id"]);
-    await carregarVacinas();
+    aplicarMudanca({ tabela: 'vacinas', acao: id ? 'atualizado' : 'criado', id: vacina.id, dados: vacina });
     
   } catch (error) {
     console.error('Erro ao salvar vacina:', error);
@@ -1334,6 +1371,7 @@ byId("tabela-vacinas").addEventListener("click", async (e) => {
     try {
       const vacina = await jsonFetch(`${API}/vacinas/${id}`);
       byId("vacina-id").value = vacina.id;
+      versoesEmEdicao[`vacinas:${vacina.id}`] = vacina.version;
       byId("vacina-nome").value = vacina.nome;
       byId("vacina-data").value = vacina.data_aplicacao;
       byId("vacina-animal-id").value = vacina.animal.id || vacina.animal_id || "";
@@ -1355,7 +1393,7 @@ byId("tabela-vacinas").addEventListener("click", async (e) => {
         try {
           await jsonFetch(`${API}/vacinas/${id}`, { method: "DELETE" });
           showToast('Vacina excluída com sucesso!');
-          await carregarVacinas();
+          aplicarMudanca({ tabela: 'vacinas', acao: 'removido', id: Number(id) });
         } catch (error) {
           console.error('Erro ao excluir vacina:', error);
           showToast('Erro ao excluir vacina: ' + error.message, 'error');
@@ -1398,8 +1436,224 @@ document.addEventListener('keydown', (e) => {
   }
 });
 
+// ===== ATUALIZAÇÕES EM TEMPO REAL (SSE) =====
+
+let feedEventos = null; // Conexão EventSource com /eventos
+
+/**
+ * Insere, substitui ou remove um registro numa lista ordenada por ID
+ * (idempotente: o mesmo evento aplicado duas vezes não duplica a linha)
+ */
+function mesclarRegistro(lista, acao, id, dados) {
+  const indice = lista.findIndex(item => item.id === id);
+  if (acao === 'removido') {
+    if (indice >= 0) lista.splice(indice, 1);
+  } else if (dados) {
+    if (indice >= 0) {
+      lista[indice] = dados;
+    } else {
+      const posicao = lista.findIndex(item => item.id > id);
+      lista.splice(posicao >= 0 ? posicao : lista.length, 0, dados);
+    }
+  }
+}
+
+/**
+ * Atualiza o nome desnormalizado (dono_nome/animal_nome) nas consultas e serviços
+ */
+function renomearEmAgendas(campoId, campoNome, id, nome) {
+  [consultasCache, servicosCache].forEach(lista => {
+    lista.forEach(item => {
+      if (item[campoId] === id) item[campoNome] = nome;
+    });
+  });
+}
+
+/**
+ * Recalcula os cards de estatísticas a partir das listas em memória
+ */
+function atualizarEstatisticasLocais() {
+  const contar = (lista, status) => lista.filter(item => item.status === status).length;
+  
+  if (consultasCarregadas) {
+    byId('stat-total').textContent = consultasCache.length;
+    byId('stat-agendadas').textContent = contar(consultasCache, 'agendada');
+    byId('stat-concluidas').textContent = contar(consultasCache, 'concluida');
+    byId('stat-canceladas').textContent = contar(consultasCache, 'cancelada');
+  }
+  
+  if (servicosCarregados) {
+    byId('servico-stat-total').textContent = servicosCache.length;
+    byId('servico-stat-agendados').textContent = contar(servicosCache, 'agendado');
+    byId('servico-stat-concluidos').textContent = contar(servicosCache, 'concluido');
+    byId('servico-stat-cancelados').textContent = contar(servicosCache, 'cancelado');
+  }
+}
+
+/**
+ * Aplica uma alteração (do feed ou da resposta de uma ação local) às
+ * listas em memória e re-renderiza só as visões afetadas
+ * @param {Object} mudanca - { tabela, acao, id, dados }
+ */
+function aplicarMudanca({ tabela, acao, id, dados }) {
+  switch (tabela) {
+    case 'donos':
+      mesclarRegistro(donosCache, acao, id, dados);
+      if (dados) renomearEmAgendas('dono_id', 'dono_nome', id, dados.nome);
+      renderizarDonos();
+      renderizarAnimais();
+      break;
+    case 'animais':
+      mesclarRegistro(animaisCache, acao, id, dados);
+      if (dados) renomearEmAgendas('animal_id', 'animal_nome', id, dados.nome);
+      renderizarAnimais();
+      renderizarDonos(); // Contagem de animais por dono
+      renderizarVacinas();
+      break;
+    case 'vacinas':
+      mesclarRegistro(vacinasCache, acao, id, dados);
+      renderizarVacinas();
+      return;
+    case 'consultas':
+      if (consultasCarregadas) mesclarRegistro(consultasCache, acao, id, dados);
+      break;
+    case 'banho_tosa':
+      if (servicosCarregados) mesclarRegistro(servicosCache, acao, id, dados);
+      break;
+    default:
+      return;
+  }
+  
+  if (consultasCarregadas) renderizarConsultas(consultasCache);
+  if (servicosCarregados) renderizarServicos(servicosCache);
+  atualizarEstatisticasLocais();
+}
+
+// Rota da API de cada tabela do feed
+const ROTAS_TABELAS = {
+  donos: 'donos',
+  animais: 'animais',
+  vacinas: 'vacinas',
+  consultas: 'consultas',
+  banho_tosa: 'banho-tosa',
+};
+
+/**
+ * Aplica um evento do feed: o evento traz só { tabela, acao, id } e o
+ * registro é buscado na API com o token do usuário
+ * @param {Object} mudanca - { tabela, acao, id }
+ */
+async function receberMudanca({ tabela, acao, id }) {
+  const rota = ROTAS_TABELAS[tabela];
+  if (!rota) return;
+  if (acao === 'removido') {
+    aplicarMudanca({ tabela, acao, id });
+    return;
+  }
+  try {
+    const dados = await jsonFetch(`${API}/${rota}/${id}`);
+    aplicarMudanca({ tabela, acao, id, dados });
+  } catch (error) {
+    // Removido (ou arquivado) entre o evento e a busca
+    if (/^404\b/.test(error.message)) aplicarMudanca({ tabela, acao: 'removido', id });
+  }
+}
+
+/**
+ * Recarrega da API as listas das tabelas indicadas (eventos de outro
+ * worker ou eventos perdidos)
+ * @param {string[]} tabelas - Tabelas alteradas
+ */
+async function recarregarTabelas(tabelas) {
+  const recargas = [];
+  if (tabelas.includes('donos')) recargas.push(carregarDonos());
+  if (tabelas.includes('animais')) recargas.push(carregarAnimais());
+  if (tabelas.includes('vacinas')) recargas.push(carregarVacinas());
+  if (consultasCarregadas && ['consultas', 'donos', 'animais'].some(t => tabelas.includes(t))) {
+    recargas.push(carregarConsultas());
+  }
+  if (servicosCarregados && ['banho_tosa', 'donos', 'animais'].some(t => tabelas.includes(t))) {
+    recargas.push(carregarServicos());
+  }
+  await Promise.all(recargas);
+  atualizarEstatisticasLocais();
+}
+
+/**
+ * Conecta ao feed de eventos da API; o navegador reconecta sozinho
+ * e reenvia o Last-Event-ID para receber o que foi perdido
+ */
+function iniciarFeedEventos() {
+  if (!window.EventSource || feedEventos) return;
+  
+  // EventSource não envia headers: o token vai na query
+  const token = localStorage.getItem("token");
+  feedEventos = new EventSource(`${API}/eventos/?token=${encodeURIComponent(token || '')}`);
+  
+  feedEventos.addEventListener('mudanca', (e) => {
+    receberMudanca(JSON.parse(e.data));
+  });
+  
+  feedEventos.addEventListener('invalidado', (e) => {
+    recarregarTabelas(JSON.parse(e.data).tabelas);
+  });
+  
+  feedEventos.addEventListener('resync', () => {
+    recarregarTabelas(['donos', 'animais', 'vacinas', 'consultas', 'banho_tosa']);
+  });
+}
+
 // ===== INICIALIZAÇÃO =====
 
+/**
+ * Carrega a primeira tela numa única requisição (/dashboard/bootstrap):
+ * usuário, estatísticas, agenda do dia e a primeira página de cada lista.
+ * Listas maiores que a página são completadas em segundo plano.
+ */
+async function carregarBootstrap() {
+  let dados;
+  try {
+    dados = await jsonFetch(`${API}/dashboard/bootstrap`);
+  } catch (error) {
+    if (/^40[13]\b/.test(error.message)) {
+      localStorage.removeItem("token");
+      window.location.href = "../index.html";
+      return;
+    }
+    // Sem bootstrap: carrega como antes, uma requisição por lista
+    console.error('Erro no bootstrap:', error);
+    verifyAuth();
+    await Promise.all([carregarDonos(), carregarAnimais(), carregarVacinas()]);
+    return;
+  }
+  
+  const userNameElement = byId('user-name');
+  if (userNameElement) userNameElement.textContent = dados.usuario.nome;
+  
+  donosCache = dados.donos.itens;
+  animaisCache = dados.animais.itens;
+  vacinasCache = dados.vacinas.itens;
+  consultasCache = dados.consultas.itens;
+  servicosCache = dados.banho_tosa.itens;
+  consultasCarregadas = dados.consultas.completo;
+  servicosCarregados = dados.banho_tosa.completo;
+  agendaHoje = dados.agenda_hoje;
+  
+  renderizarDonos();
+  renderizarAnimais();
+  renderizarVacinas();
+  renderizarConsultas(consultasCache);
+  renderizarServicos(servicosCache);
+  exibirEstatisticasConsultas(dados.stats_consultas);
+  exibirEstatisticasServicos(dados.stats_banho_tosa);
+  
+  const restantes = [];
+  if (!dados.donos.completo) restantes.push(carregarDonos());
+  if (!dados.animais.completo) restantes.push(carregarAnimais());
+  if (!dados.vacinas.completo) restantes.push(carregarVacinas());
+  Promise.all(restantes);
+}
+
 /**
  * Função de inicialização da aplicação
  */
@@ -1408,12 +1662,11 @@ async function initApp() {
     // Mostra indicador de carregamento
     console.log('\ud83d\udc3e Iniciando PetCare - Sistema Veterinário...');
     
-    // Carrega dados iniciais
-    await Promise.all([
-      carregarDonos(),
-      carregarAnimais(),
-      carregarVacinas()
-    ]);
+    // Carrega dados iniciais (uma única requisição)
+    await carregarBootstrap();
+    
+    // Recebe alterações feitas por outros usuários sem recarregar as tabelas
+    iniciarFeedEventos();
     
     // Configura data atual como padrão para novas vacinas
     const today = new Date().toISOString().split('T')[0];
@@ -1478,11 +1731,13 @@ if (document.readyState === 'loading') {
 
 // Exporta funções para debug (opcional)
 window.PetCare = {
+  carregarBootstrap,
   carregarDonos,
   carregarAnimais,
   carregarVacinas,
   carregarConsultas,
   carregarServicos,
+  aplicarMudanca,
   showToast,
   switchTab
 };
\ No newline at end of file
@@ -0,0 +1,414 @@
+"""
+Execução de tarefas pesadas em segundo plano (jobs)
+
+- Cada job é uma linha da tabela jobs, no próprio banco SQLite: tipo,
+  parâmetros, status, progresso, resultado/erro e tentativas. Não há broker
+  externo: a tabela é a fila e sobrevive a reinícios.
+- Um despachante (thread) por processo busca os jobs pendentes e os
+  reivindica com UPDATE ... WHERE status = 'pendente' RETURNING: vários
+  workers do uvicorn dividem a mesma fila sem executar um job duas vezes.
+- Os jobs rodam num pool de threads ou de processos (PETCARE_JOBS_MODO).
+- Falhas são repetidas até max_tentativas, com espera exponencial.
+- A tarefa informa o andamento com ctx.progresso(pct, mensagem), que grava
+  o progresso (servindo de heartbeat) e levanta JobCancelado quando o
+  cancelamento foi pedido. Jobs em execução sem heartbeat há mais de
+  PETCARE_JOBS_ORFAO_SEGUNDOS (processo morreu no meio) voltam para a fila.
+
+As tarefas são registradas com o decorator @tarefa (ver tarefas.py).
+
+Configuração por variáveis de ambiente:
+    PETCARE_JOBS_WORKERS=2            tamanho do pool (0 não executa jobs)
+    PETCARE_JOBS_MODO=threads         threads ou processos
+    PETCARE_JOBS_ORFAO_SEGUNDOS=300
+"""
+
+import json
+import multiprocessing
+import os
+import socket
+import threading
+import time
+import traceback
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, update
+
+import models
+
+WORKERS = int(os.getenv("PETCARE_JOBS_WORKERS", "2"))
+MODO = os.getenv("PETCARE_JOBS_MODO", "threads")
+ORFAO_SEGUNDOS = int(os.getenv("PETCARE_JOBS_ORFAO_SEGUNDOS", "300"))
+
+MAX_TENTATIVAS = 3
+# Espera antes da nova tentativa: BASE_ESPERA * 2 ** (tentativas - 1) segundos
+BASE_ESPERA_SEGUNDOS = 5
+# Intervalo de consulta à fila quando não há aviso de job novo
+INTERVALO_FILA = 1.0
+# Intervalo mínimo entre gravações de progresso de um mesmo job
+INTERVALO_PROGRESSO = 0.5
+
+STATUS_FINAIS = ("concluido", "falhou", "cancelado")
+
+Tarefa = namedtuple("Tarefa", ["nome", "funcao", "max_tentativas"])
+
+_TAREFAS = {}
+
+
+class JobCancelado(Exception):
+    """Levantada por ctx.progresso() quando o cancelamento foi pedido"""
+
+
+class JobInterrompido(Exception):
+    """Levantada por ctx.progresso() quando o servidor está desligando"""
+
+
+def tarefa(nome: str, max_tentativas: int = MAX_TENTATIVAS):
+    """Registra uma função como tarefa: funcao(ctx, **parametros) -> resultado JSON"""
+    def registrar(funcao):
+        _TAREFAS[nome] = Tarefa(nome, funcao, max_tentativas)
+        return funcao
+    return registrar
+
+
+def tarefas_registradas() -> dict:
+    import tarefas  # noqa: F401 - registra as tarefas padrão
+    return _TAREFAS
+
+
+def _engine():
+    """Engine da fila: sempre o banco da matriz, mesmo para jobs de filiais"""
+    from database import engine
+    return engine
+
+
+def _identificacao() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def serializar(job) -> dict:
+    """Job (objeto ORM) -> dict de resposta"""
+    def iso(valor):
+        return valor.isoformat() if valor else None
+
+    return {
+        "id": job.id,
+        "tipo": job.tipo,
+        "parametros": json.loads(job.parametros) if job.parametros else {},
+        "status": job.status,
+        "progresso": job.progresso,
+        "mensagem": job.mensagem,
+        "resultado": json.loads(job.resultado) if job.resultado else None,
+        "erro": job.erro,
+        "tentativas": job.tentativas,
+        "max_tentativas": job.max_tentativas,
+        "cancelamento_solicitado": job.cancelar,
+        "criado_em": iso(job.criado_em),
+        "iniciado_em": iso(job.iniciado_em),
+        "concluido_em": iso(job.concluido_em),
+        "version": job.version,
+    }
+
+
+# --------------------------
+# Fila
+# --------------------------
+def enfileirar(db, tipo: str, parametros: dict = None):
+    """
+    Cria um job pendente e avisa o despachante deste processo
+    - ValueError se o tipo não estiver registrado
+    - O número de tentativas é o da tarefa (@tarefa), nunca do cliente
+    """
+    registro = tarefas_registradas().get(tipo)
+    if registro is None:
+        raise ValueError(f"Tipo de job desconhecido: {tipo}")
+
+    from database import filial_atual
+
+    agora = datetime.utcnow()
+    job = models.Job(
+        tipo=tipo,
+        filial=filial_atual(),
+        parametros=json.dumps(parametros or {}),
+        max_tentativas=registro.max_tentativas,
+        criado_em=agora,
+        executar_apos=agora,
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    if _executor is not None:
+        _executor.acordar()
+    return job
+
+
+def cancelar(db, job_id: int):
+    """
+    Pede o cancelamento de um job
+    - Pendente: cancelado na hora
+    - Em execução: marcado; a tarefa para na próxima chamada de ctx.progresso()
+    - Retorna o job, ou None se não existir
+    """
+    job = db.get(models.Job, job_id)
+    if job is None or job.status in STATUS_FINAIS:
+        return job
+
+    if job.status == "pendente":
+        job.status = "cancelado"
+        job.concluido_em = datetime.utcnow()
+    else:
+        job.cancelar = True
+    job.version = models.Job.version + 1
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def _reivindicar(engine, worker: str):
+    """Marca o próximo job pendente como em execução; retorna o id ou None"""
+    agora = datetime.utcnow()
+    with engine.connect() as conn:
+        candidato = conn.execute(
+            select(models.Job.id)
+            .where(models.Job.status == "pendente", models.Job.executar_apos <= agora)
+            .order_by(models.Job.executar_apos, models.Job.id)
+            .limit(1)
+        ).scalar()
+    if candidato is None:
+        return None
+
+    # O WHERE status = 'pendente' garante que só um processo vence a disputa
+    with engine.begin() as conn:
+        return conn.execute(
+            update(models.Job)
+            .where(models.Job.id == candidato, models.Job.status == "pendente")
+            .values(
+                status="executando",
+                worker=worker,
+                tentativas=models.Job.tentativas + 1,
+                version=models.Job.version + 1,
+                iniciado_em=agora,
+                atualizado_em=agora,
+            )
+            .returning(models.Job.id)
+        ).scalar()
+
+
+def _recuperar_orfaos(engine) -> int:
+    """
+    Devolve à fila (ou falha) jobs em execução sem heartbeat recente
+    - Órfãos com cancelamento pedido ficam cancelados, sem nova execução
+    """
+    agora = datetime.utcnow()
+    limite = agora - timedelta(seconds=ORFAO_SEGUNDOS)
+    orfao = (models.Job.status == "executando", models.Job.atualizado_em < limite)
+    with engine.begin() as conn:
+        cancelados = conn.execute(
+            update(models.Job)
+            .where(*orfao, models.Job.cancelar.is_(True))
+            .values(status="cancelado", concluido_em=agora, version=models.Job.version + 1)
+        ).rowcount
+        falhos = conn.execute(
+            update(models.Job)
+            .where(*orfao, models.Job.tentativas >= models.Job.max_tentativas)
+            .values(
+                status="falhou", erro="Processo interrompido durante a execução",
+                concluido_em=agora, version=models.Job.version + 1,
+            )
+        ).rowcount
+        devolvidos = conn.execute(
+            update(models.Job)
+            .where(*orfao)
+            .values(status="pendente", worker=None, executar_apos=agora, version=models.Job.version + 1)
+        ).rowcount
+    return cancelados + falhos + devolvidos
+
+
+# --------------------------
+# Execução
+# --------------------------
+class ContextoJob:
+    """
+    Passado às tarefas: identificação do job e registro de progresso
+    - engine: banco da filial do job (dados); o progresso vai para a fila
+    """
+
+    def __init__(self, job_id: int, engine, fila=None):
+        self.job_id = job_id
+        self.engine = engine
+        self.fila = fila if fila is not None else engine
+        self._ultima_gravacao = 0.0
+
+    def progresso(self, pct: float, mensagem: str = None):
+        """
+        Registra o andamento (0 a 100) e verifica cancelamento
+        - Gravações são espaçadas em INTERVALO_PROGRESSO (exceto 100%)
+        """
+        if _parando.is_set():
+            raise JobInterrompido()
+
+        agora = time.monotonic()
+        if pct < 100 and agora - self._ultima_gravacao < INTERVALO_PROGRESSO:
+            return
+        self._ultima_gravacao = agora
+
+        valores = {"progresso": int(pct), "atualizado_em": datetime.utcnow(), "version": models.Job.version + 1}
+        if mensagem is not None:
+            valores["mensagem"] = mensagem
+        with self.fila.begin() as conn:
+            cancelar = conn.execute(
+                update(models.Job)
+                .where(models.Job.id == self.job_id)
+                .values(**valores)
+                .returning(models.Job.cancelar)
+            ).scalar()
+        if cancelar:
+            raise JobCancelado()
+
+
+def _finalizar(engine, job_id: int, **valores):
+    with engine.begin() as conn:
+        conn.execute(
+            update(models.Job).where(models.Job.id == job_id).values(**valores, version=models.Job.version + 1)
+        )
+
+
+def executar_job(job_id: int):
+    """Executa um job já reivindicado (em thread ou em processo do pool)"""
+    engine = _engine()
+    with engine.connect() as conn:
+        job = conn.execute(select(models.Job).where(models.Job.id == job_id)).first()
+    if job is None:
+        return
+
+    agora = datetime.utcnow
+    registro = tarefas_registradas().get(job.tipo)
+    if registro is None:
+        _finalizar(engine, job_id, status="falhou", erro=f"Tipo de job desconhecido: {job.tipo}", concluido_em=agora())
+        return
+
+    from database import engine_atual, usar_filial
+
+    try:
+        # Cache, eventos e anexos da tarefa no escopo da filial do job
+        with usar_filial(job.filial):
+            ctx = ContextoJob(job_id, engine_atual(), fila=engine)
+            resultado = registro.funcao(ctx, **json.loads(job.parametros or "{}"))
+    except JobCancelado:
+        _finalizar(engine, job_id, status="cancelado", concluido_em=agora())
+    except JobInterrompido:
+        # Desligamento: volta para a fila sem gastar a tentativa
+        _finalizar(engine, job_id, status="pendente", worker=None, tentativas=job.tentativas - 1)
+    except Exception:
+        erro = traceback.format_exc(limit=5)
+        if job.tentativas >= job.max_tentativas:
+            _finalizar(engine, job_id, status="falhou", erro=erro, concluido_em=agora())
+        else:
+            espera = BASE_ESPERA_SEGUNDOS * 2 ** (job.tentativas - 1)
+            _finalizar(
+                engine, job_id,
+                status="pendente", worker=None, erro=erro,
+                executar_apos=agora() + timedelta(seconds=espera),
+            )
+    else:
+        _finalizar(
+            engine, job_id,
+            status="concluido", progresso=100, erro=None,
+            resultado=json.dumps(resultado, default=str), concluido_em=agora(),
+        )
+
+
+_parando = threading.Event()
+
+
+class Executor:
+    """Despachante da fila + pool de execução de um processo"""
+
+    def __init__(self, workers: int = WORKERS, modo: str = MODO):
+        self.workers = workers
+        self.modo = modo
+        self._acordar = threading.Event()
+        self._parar = threading.Event()
+        self._em_execucao = set()
+        self._lock = threading.Lock()
+        self._thread = None
+        if modo == "processos":
+            self._pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"))
+        else:
+            self._pool = ThreadPoolExecutor(workers, thread_name_prefix="petcare-job")
+
+    def iniciar(self):
+        self._thread = threading.Thread(target=self._despachar, name="petcare-jobs", daemon=True)
+        self._thread.start()
+
+    def acordar(self):
+        self._acordar.set()
+
+    def parar(self):
+        """Para de reivindicar jobs; jobs em thread voltam para a fila no próximo progresso()"""
+        self._parar.set()
+        _parando.set()
+        self._acordar.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def _concluido(self, futuro):
+        with self._lock:
+            self._em_execucao.discard(futuro)
+        self._acordar.set()
+
+    def _despachar(self):
+        engine = _engine()
+        worker = _identificacao()
+        proxima_verificacao = 0.0
+        while not self._parar.is_set():
+            try:
+                if time.monotonic() >= proxima_verificacao:
+                    _recuperar_orfaos(engine)
+                    proxima_verificacao = time.monotonic() + min(ORFAO_SEGUNDOS, 60)
+
+                while len(self._em_execucao) < self.workers and not self._parar.is_set():
+                    job_id = _reivindicar(engine, worker)
+                    if job_id is None:
+                        break
+                    futuro = self._pool.submit(executar_job, job_id)
+                    with self._lock:
+                        self._em_execucao.add(futuro)
+                    futuro.add_done_callback(self._concluido)
+            except Exception as e:
+                print(f"⚠️ Despachante de jobs: {e}")
+
+            self._acordar.wait(INTERVALO_FILA)
+            self._acordar.clear()
+
+    def stats(self) -> dict:
+        return {"workers": self.workers, "modo": self.modo, "em_execucao": len(self._em_execucao)}
+
+
+_executor = None
+
+
+def iniciar(workers: int = WORKERS, modo: str = MODO):
+    """Inicia o despachante deste processo (no startup da API)"""
+    global _executor
+    if workers <= 0 or _executor is not None:
+        return None
+    _parando.clear()
+    _executor = Executor(workers, modo)
+    _executor.iniciar()
+    return _executor
+
+
+def parar():
+    global _executor
+    if _executor is not None:
+        _executor.parar()
+        _executor = None
+
+
+def estatisticas() -> dict:
+    if _executor is None:
+        return {"workers": 0, "modo": None, "em_execucao": 0}
+    return _executor.stats()
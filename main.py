@@ -1,23 +1,132 @@
+import asyncio
+import importlib
+import os
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-
-from database import Base, engine
-from routers import (
-    donos,
-    animais,
-    vacinas,
-    auth,
-    consultas,
-    banho_tosa
-)
+from starlette.routing import Mount
+
+from diagnostico import PerfilMiddleware
+from estaticos import StaticFilesPrecomprimidos
+from filiais import FilialMiddleware
+from rate_limit import ConcurrencyLimitMiddleware, RateLimitMiddleware
+from security import ClaimsMiddleware
+
+# Routers (API), importados sob demanda no primeiro acesso ao prefixo
+ROUTERS = {
+    "/auth": "routers.auth",              # /auth (API)
+    "/donos": "routers.donos",            # /donos
+    "/animais": "routers.animais",        # /animais
+    "/vacinas": "routers.vacinas",        # /vacinas
+    "/consultas": "routers.consultas",    # /consultas
+    "/banho-tosa": "routers.banho_tosa",  # /banho-tosa
+    "/eventos": "routers.eventos",        # /eventos (SSE)
+    "/sync": "routers.sync",              # /sync
+    "/jobs": "routers.jobs",              # /jobs
+    "/dashboard": "routers.dashboard",    # /dashboard/bootstrap
+    "/filiais": "routers.filiais",        # /filiais/relatorio
+    "/debug": "routers.debug",            # /debug/perfis, /debug/memoria (admin)
+    "/cache": "routers.estatisticas",     # /cache/stats (admin)
+    "/database": "routers.estatisticas",  # /database/stats (admin)
+}
+
+# Rotas que precisam de todos os routers carregados
+ROTAS_DOCUMENTACAO = ("/docs", "/redoc", "/openapi.json")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Ciclo de vida da aplicação
+    - Startup: cria as tabelas (a menos que o launcher já tenha feito isso
+      uma vez antes de iniciar os workers) e faz o feed de eventos encerrar
+      suas conexões no SIGINT/SIGTERM; agenda a purga periódica dos
+      registros excluídos (exclusao.py), o arquivamento do histórico
+      (arquivamento.py), a renovação do snapshot de leitura (database.py) e
+      inicia o executor de jobs (jobs.py)
+    - Shutdown: para o executor de jobs e fecha as conexões do pool após o
+      término das requisições
+    """
+    from database import ciclo_snapshot, engine, init_db, pool_filiais, roteador
+    from eventos import encerrar_no_sinal
+    import arquivamento
+    import exclusao
+    import jobs
+
+    if os.getenv("PETCARE_SCHEMA_PRONTO") != "1":
+        init_db()
+    encerrar_no_sinal()
+    purga = asyncio.create_task(exclusao.ciclo_purga()) if exclusao.INTERVALO_PURGA > 0 else None
+    arquivo = (
+        asyncio.create_task(arquivamento.ciclo_arquivamento())
+        if arquivamento.INTERVALO_ARQUIVAMENTO > 0 else None
+    )
+    snapshot = asyncio.create_task(ciclo_snapshot()) if roteador.usa_snapshot else None
+    jobs.iniciar()
+    yield
+    jobs.parar()
+    for tarefa in (purga, arquivo, snapshot):
+        if tarefa is not None:
+            tarefa.cancel()
+    roteador.limpar()
+    pool_filiais.limpar()
+    engine.dispose()
+
+app = FastAPI(title="API Clínica Veterinária", lifespan=lifespan)
+
+_routers_carregados = set()
+_modulos_incluidos = set()
+
+def carregar_router(prefixo: str):
+    """Importa o módulo do router e registra suas rotas (uma única vez, mesmo com vários prefixos)"""
+    if prefixo in _routers_carregados:
+        return
+    nome = ROUTERS[prefixo]
+    if nome not in _modulos_incluidos:
+        modulo = importlib.import_module(nome)
+        app.include_router(modulo.router)
+        # Mounts estáticos sempre depois das rotas da API (/auth é usado pelos dois)
+        app.router.routes.sort(key=lambda rota: isinstance(rota, Mount))
+        _modulos_incluidos.add(nome)
+    _routers_carregados.add(prefixo)
+
+def carregar_todos_routers():
+    for prefixo in ROUTERS:
+        carregar_router(prefixo)
+
+class RoutersSobDemandaMiddleware:
+    """
+    Middleware ASGI que carrega o router do prefixo antes do roteamento
+    - O cold start não paga a importação de routers, schemas e criptografia
+    - A documentação (/docs, /openapi.json) carrega todos os routers
+    """
+
+    def __init__(self, app):
+        self.app = app
 
-# Criar tabelas
-Base.metadata.create_all(bind=engine)
+    async def __call__(self, scope, receive, send):
+        if scope["type"] in ("http", "websocket") and len(_routers_carregados) < len(ROUTERS):
+            path = scope["path"]
+            if path in ROTAS_DOCUMENTACAO:
+                carregar_todos_routers()
+            else:
+                for prefixo in ROUTERS:
+                    if path == prefixo or path.startswith(prefixo + "/"):
+                        carregar_router(prefixo)
+                        break
+        await self.app(scope, receive, send)
 
-app = FastAPI(title="API Clínica Veterinária")
+# Middlewares: o último adicionado é o mais externo
+# (CORS -> token -> rate limit -> limite de concorrência -> routers sob demanda -> filial -> perfil)
+# O token é decodificado uma vez só (ClaimsMiddleware); os demais leem scope["state"]
+app.add_middleware(PerfilMiddleware)
+app.add_middleware(FilialMiddleware)
+app.add_middleware(RoutersSobDemandaMiddleware)
+app.add_middleware(ConcurrencyLimitMiddleware)
+app.add_middleware(RateLimitMiddleware)
+app.add_middleware(ClaimsMiddleware)
 
-# CORS liberado
+# CORS liberado (mais externo, para que respostas 429/503 também tenham os headers)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -26,17 +135,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Routers (API)
-app.include_router(auth.router)        # /auth (API)
-app.include_router(donos.router)       # /donos
-app.include_router(animais.router)     # /animais
-app.include_router(vacinas.router)     # /vacinas
-app.include_router(consultas.router)   # /consultas
-app.include_router(banho_tosa.router)  # /banho-tosa
-
-# Frontend estático (servir páginas após incluir routers)
-app.mount("/frontend", StaticFiles(directory="frontend"), name="frontend")
-app.mount("/auth", StaticFiles(directory="auth"), name="auth")
+# Frontend estático (mantido após as rotas da API)
+app.mount("/frontend", StaticFilesPrecomprimidos(directory="frontend"), name="frontend")
+app.mount("/auth", StaticFilesPrecomprimidos(directory="auth"), name="auth")
 
 @app.get("/")
 def root():
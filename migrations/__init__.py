@@ -0,0 +1,140 @@
+"""
+Migrações versionadas do banco de dados
+
+Cada revisão é um módulo em migrations/versions (ordenado pelo nome, ex.:
+"0002_normalizar_enums.py") com:
+    DESCRICAO = "texto curto"
+    def upgrade(ctx): ...
+
+As revisões aplicadas ficam registradas na tabela schema_migrations.
+Migrações de dados devem usar ctx.atualizar_em_lotes(), que percorre a
+tabela por faixas de id e faz commit a cada lote: o lock de escrita do
+SQLite é mantido por pouco tempo de cada vez e uma execução interrompida
+pode simplesmente ser repetida.
+
+Uso (linha de comando):
+    python -m migrations              # aplica as revisões pendentes
+    python -m migrations status       # lista aplicadas / pendentes
+    python -m migrations --lote 5000  # tamanho do lote das migrações de dados
+"""
+
+import importlib
+import pkgutil
+import time
+from datetime import datetime
+
+from sqlalchemy import text
+
+LOTE_PADRAO = 10000
+
+_PACOTE_VERSOES = __name__ + ".versions"
+
+
+def listar_revisoes():
+    """Nomes de todas as revisões conhecidas, em ordem de aplicação"""
+    from migrations import versions
+    return sorted(
+        nome for _, nome, is_pkg in pkgutil.iter_modules(versions.__path__)
+        if not is_pkg and nome[:4].isdigit()
+    )
+
+
+def _garantir_tabela_controle(engine):
+    with engine.begin() as conn:
+        conn.exec_driver_sql(
+            "CREATE TABLE IF NOT EXISTS schema_migrations ("
+            "revisao VARCHAR PRIMARY KEY, "
+            "aplicada_em DATETIME NOT NULL, "
+            "duracao_ms INTEGER)"
+        )
+
+
+def revisoes_aplicadas(engine) -> set:
+    _garantir_tabela_controle(engine)
+    with engine.connect() as conn:
+        return {row[0] for row in conn.exec_driver_sql("SELECT revisao FROM schema_migrations")}
+
+
+def revisoes_pendentes(engine) -> list:
+    aplicadas = revisoes_aplicadas(engine)
+    return [r for r in listar_revisoes() if r not in aplicadas]
+
+
+def _imprimir_progresso(tabela, processados, total, atualizadas):
+    pct = 100 * processados // total if total else 100
+    print(f"    {tabela}: {processados}/{total} ids ({pct}%), {atualizadas} linhas atualizadas")
+
+
+class Contexto:
+    """Operações disponíveis para as revisões"""
+
+    def __init__(self, engine, lote=LOTE_PADRAO, progresso=_imprimir_progresso):
+        self.engine = engine
+        self.lote = lote
+        self.progresso = progresso
+
+    def executar(self, sql: str, params=None):
+        """Executa um comando em transação própria"""
+        with self.engine.begin() as conn:
+            return conn.execute(text(sql), params or {})
+
+    def tabela_existe(self, tabela: str) -> bool:
+        with self.engine.connect() as conn:
+            row = conn.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :nome"),
+                {"nome": tabela},
+            ).first()
+        return row is not None
+
+    def colunas(self, tabela: str) -> set:
+        with self.engine.connect() as conn:
+            return {row[1] for row in conn.exec_driver_sql(f"PRAGMA table_info({tabela})")}
+
+    def adicionar_coluna(self, tabela: str, coluna: str, definicao: str):
+        """ALTER TABLE ADD COLUMN idempotente"""
+        if coluna not in self.colunas(tabela):
+            self.executar(f"ALTER TABLE {tabela} ADD COLUMN {coluna} {definicao}")
+
+    def atualizar_em_lotes(self, tabela: str, set_sql: str, where_sql: str = "1 = 1", params=None) -> int:
+        """
+        UPDATE em lotes por faixa de id, com commit por lote
+        - set_sql/where_sql são fragmentos SQL (podem usar :parametros)
+        - Reporta o progresso a cada lote e retorna o total de linhas alteradas
+        """
+        with self.engine.connect() as conn:
+            min_id, max_id = conn.exec_driver_sql(f"SELECT MIN(id), MAX(id) FROM {tabela}").one()
+        if min_id is None:
+            return 0
+
+        total = max_id - min_id + 1
+        atualizadas = 0
+        sql = text(f"UPDATE {tabela} SET {set_sql} WHERE id BETWEEN :_inicio AND :_fim AND ({where_sql})")
+        for inicio in range(min_id, max_id + 1, self.lote):
+            fim = min(inicio + self.lote - 1, max_id)
+            with self.engine.begin() as conn:
+                atualizadas += conn.execute(sql, {**(params or {}), "_inicio": inicio, "_fim": fim}).rowcount
+            self.progresso(tabela, fim - min_id + 1, total, atualizadas)
+        return atualizadas
+
+
+def aplicar_pendentes(engine=None, lote=LOTE_PADRAO, progresso=_imprimir_progresso, verbose=True) -> list:
+    """Aplica as revisões pendentes em ordem e retorna os nomes aplicados"""
+    if engine is None:
+        from database import engine
+
+    ctx = Contexto(engine, lote=lote, progresso=progresso if verbose else (lambda *a: None))
+    aplicadas = []
+    for revisao in revisoes_pendentes(engine):
+        modulo = importlib.import_module(f"{_PACOTE_VERSOES}.{revisao}")
+        if verbose:
+            print(f"🔧 Aplicando {revisao}: {modulo.DESCRICAO}")
+        inicio = time.perf_counter()
+        modulo.upgrade(ctx)
+        duracao_ms = int((time.perf_counter() - inicio) * 1000)
+        with engine.begin() as conn:
+            conn.execute(
+                text("INSERT INTO schema_migrations (revisao, aplicada_em, duracao_ms) VALUES (:r, :a, :d)"),
+                {"r": revisao, "a": datetime.utcnow(), "d": duracao_ms},
+            )
+        aplicadas.append(revisao)
+    return aplicadas
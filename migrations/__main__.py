@@ -0,0 +1,28 @@
+import argparse
+
+from migrations import LOTE_PADRAO, aplicar_pendentes, listar_revisoes, revisoes_aplicadas
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m migrations", description="Migrações do banco de dados")
+    parser.add_argument("comando", nargs="?", default="upgrade", choices=["upgrade", "status"])
+    parser.add_argument("--lote", type=int, default=LOTE_PADRAO, help="linhas por lote nas migrações de dados")
+    args = parser.parse_args()
+
+    from database import engine
+
+    if args.comando == "status":
+        aplicadas = revisoes_aplicadas(engine)
+        for revisao in listar_revisoes():
+            print(f"{'✅' if revisao in aplicadas else '⏳'} {revisao}")
+        return
+
+    aplicadas = aplicar_pendentes(engine, lote=args.lote)
+    if aplicadas:
+        print(f"🎉 {len(aplicadas)} revisão(ões) aplicada(s)")
+    else:
+        print("✅ Banco de dados já está atualizado")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Schema inicial (equivalente ao antigo create_all / update_database.py)
+
+DDL explícito, e não Base.metadata.create_all: revisões posteriores alteram
+estas tabelas e precisam partir sempre do mesmo ponto.
+"""
+
+DESCRICAO = "schema inicial (donos, animais, vacinas, consultas, banho_tosa, users)"
+
+DDL = [
+    """CREATE TABLE IF NOT EXISTS donos (
+        id INTEGER NOT NULL,
+        nome VARCHAR,
+        telefone VARCHAR,
+        PRIMARY KEY (id)
+    )""",
+    "CREATE INDEX IF NOT EXISTS ix_donos_id ON donos (id)",
+    """CREATE TABLE IF NOT EXISTS users (
+        id INTEGER NOT NULL,
+        nome VARCHAR NOT NULL,
+        email VARCHAR NOT NULL,
+        hashed_password VARCHAR NOT NULL,
+        PRIMARY KEY (id)
+    )""",
+    "CREATE UNIQUE INDEX IF NOT EXISTS ix_users_email ON users (email)",
+    "CREATE INDEX IF NOT EXISTS ix_users_id ON users (id)",
+    """CREATE TABLE IF NOT EXISTS animais (
+        id INTEGER NOT NULL,
+        nome VARCHAR,
+        especie VARCHAR,
+        idade INTEGER,
+        dono_id INTEGER,
+        PRIMARY KEY (id),
+        FOREIGN KEY(dono_id) REFERENCES donos (id)
+    )""",
+    "CREATE INDEX IF NOT EXISTS ix_animais_id ON animais (id)",
+    """CREATE TABLE IF NOT EXISTS vacinas (
+        id INTEGER NOT NULL,
+        nome VARCHAR,
+        data_aplicacao DATE,
+        animal_id INTEGER,
+        PRIMARY KEY (id),
+        FOREIGN KEY(animal_id) REFERENCES animais (id)
+    )""",
+    "CREATE INDEX IF NOT EXISTS ix_vacinas_id ON vacinas (id)",
+    """CREATE TABLE IF NOT EXISTS consultas (
+        id INTEGER NOT NULL,
+        data_hora DATETIME NOT NULL,
+        motivo VARCHAR NOT NULL,
+        observacoes TEXT,
+        status VARCHAR(12),
+        valor INTEGER,
+        dono_id INTEGER,
+        animal_id INTEGER,
+        PRIMARY KEY (id),
+        FOREIGN KEY(dono_id) REFERENCES donos (id),
+        FOREIGN KEY(animal_id) REFERENCES animais (id)
+    )""",
+    "CREATE INDEX IF NOT EXISTS ix_consultas_id ON consultas (id)",
+    """CREATE TABLE IF NOT EXISTS banho_tosa (
+        id INTEGER NOT NULL,
+        data_hora DATETIME NOT NULL,
+        tipo_servico VARCHAR(12) NOT NULL,
+        status VARCHAR(12),
+        valor INTEGER,
+        observacoes TEXT,
+        duracao_estimada INTEGER,
+        dono_id INTEGER,
+        animal_id INTEGER,
+        PRIMARY KEY (id),
+        FOREIGN KEY(dono_id) REFERENCES donos (id),
+        FOREIGN KEY(animal_id) REFERENCES animais (id)
+    )""",
+    "CREATE INDEX IF NOT EXISTS ix_banho_tosa_id ON banho_tosa (id)",
+]
+
+
+def upgrade(ctx):
+    for comando in DDL:
+        ctx.executar(comando)
@@ -0,0 +1,60 @@
+"""
+Normaliza status/tipo_servico para minúsculo (substitui fix_enum_data.py)
+
+Cada tabela recebe um único UPDATE com CASE por lote de ids, em vez de um
+UPDATE por variação sobre a tabela inteira.
+"""
+
+DESCRICAO = "normaliza status e tipo_servico para os valores canônicos em minúsculo"
+
+STATUS_CONSULTA = {
+    "agendada": "agendada",
+    "concluida": "concluida",
+    "concluída": "concluida",
+    "cancelada": "cancelada",
+    "em_andamento": "em_andamento",
+    "em andamento": "em_andamento",
+}
+
+STATUS_SERVICO = {
+    "agendado": "agendado",
+    "concluido": "concluido",
+    "concluído": "concluido",
+    "cancelado": "cancelado",
+    "em_andamento": "em_andamento",
+    "em andamento": "em_andamento",
+}
+
+TIPO_SERVICO = {
+    "banho": "banho",
+    "tosa": "tosa",
+    "banho_e_tosa": "banho_e_tosa",
+    "banho e tosa": "banho_e_tosa",
+}
+
+
+def _case(coluna: str, mapa: dict) -> str:
+    # lower() do SQLite só trata ASCII: "CONCLUÍDA" vira "concluÍda"
+    chave = f"replace(replace(lower(trim({coluna})), 'Í', 'í'), 'Ú', 'ú')"
+    ramos = " ".join(f"WHEN '{origem}' THEN '{destino}'" for origem, destino in mapa.items())
+    return f"CASE {chave} {ramos} ELSE {coluna} END"
+
+
+def _fora_do_padrao(coluna: str, mapa: dict) -> str:
+    canonicos = ", ".join(f"'{v}'" for v in sorted(set(mapa.values())))
+    return f"{coluna} NOT IN ({canonicos})"
+
+
+def upgrade(ctx):
+    ctx.atualizar_em_lotes(
+        "consultas",
+        f"status = {_case('status', STATUS_CONSULTA)}",
+        _fora_do_padrao("status", STATUS_CONSULTA),
+    )
+    if ctx.tabela_existe("banho_tosa"):
+        ctx.atualizar_em_lotes(
+            "banho_tosa",
+            f"status = {_case('status', STATUS_SERVICO)}, "
+            f"tipo_servico = {_case('tipo_servico', TIPO_SERVICO)}",
+            f"{_fora_do_padrao('status', STATUS_SERVICO)} OR {_fora_do_padrao('tipo_servico', TIPO_SERVICO)}",
+        )
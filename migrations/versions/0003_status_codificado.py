@@ -0,0 +1,61 @@
+"""
+Grava status e tipo_servico como códigos inteiros (ver normalizacao.py)
+
+Para cada coluna:
+1. adiciona <coluna>_codigo INTEGER com CHECK restrito aos códigos válidos
+2. preenche em lotes, com um CASE montado a partir dos valores distintos
+   existentes (normalizados em Python, inclusive acentos)
+3. remove a coluna de texto e renomeia a nova para o nome original
+4. cria índice na coluna de status
+
+Colunas que já são INTEGER são ignoradas, então a revisão pode ser repetida
+se for interrompida no meio.
+"""
+
+import normalizacao
+
+DESCRICAO = "status/tipo_servico como códigos inteiros com CHECK e índice"
+
+COLUNAS = [
+    ("consultas", "status", normalizacao.STATUS_CONSULTA, normalizacao.normalizar_status_consulta),
+    ("banho_tosa", "status", normalizacao.STATUS_SERVICO, normalizacao.normalizar_status_servico),
+    ("banho_tosa", "tipo_servico", normalizacao.TIPO_SERVICO, normalizacao.normalizar_tipo_servico),
+]
+
+
+def _tipo_coluna(ctx, tabela, coluna):
+    with ctx.engine.connect() as conn:
+        for row in conn.exec_driver_sql(f"PRAGMA table_info({tabela})"):
+            if row[1] == coluna:
+                return row[2].upper()
+    return None
+
+
+def _codificar(ctx, tabela, coluna, codigos, normalizar):
+    if _tipo_coluna(ctx, tabela, coluna) in ("INTEGER", "SMALLINT"):
+        return
+
+    nova = f"{coluna}_codigo"
+    validos = ", ".join(str(c) for c in sorted(codigos.values()))
+    padrao = codigos[normalizar(None)]
+    ctx.adicionar_coluna(tabela, nova, f"SMALLINT CHECK ({nova} IS NULL OR {nova} IN ({validos}))")
+
+    with ctx.engine.connect() as conn:
+        distintos = [row[0] for row in conn.exec_driver_sql(f"SELECT DISTINCT {coluna} FROM {tabela}")]
+    params = {}
+    ramos = []
+    for i, valor in enumerate(v for v in distintos if v is not None):
+        params[f"v{i}"] = valor
+        ramos.append(f"WHEN :v{i} THEN {codigos[normalizar(valor)]}")
+    case = f"CASE {coluna} {' '.join(ramos)} ELSE {padrao} END" if ramos else str(padrao)
+    ctx.atualizar_em_lotes(tabela, f"{nova} = {case}", f"{nova} IS NULL", params)
+
+    ctx.executar(f"ALTER TABLE {tabela} DROP COLUMN {coluna}")
+    ctx.executar(f"ALTER TABLE {tabela} RENAME COLUMN {nova} TO {coluna}")
+
+
+def upgrade(ctx):
+    for tabela, coluna, codigos, normalizar in COLUNAS:
+        _codificar(ctx, tabela, coluna, codigos, normalizar)
+    ctx.executar("CREATE INDEX IF NOT EXISTS ix_consultas_status ON consultas (status)")
+    ctx.executar("CREATE INDEX IF NOT EXISTS ix_banho_tosa_status ON banho_tosa (status)")
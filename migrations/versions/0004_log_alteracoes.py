@@ -0,0 +1,57 @@
+"""
+updated_at e log de alterações para sincronização incremental (/sync)
+
+1. adiciona updated_at às tabelas sincronizadas e preenche em lotes
+2. cria a tabela alteracoes: uma linha por registro com a última alteração
+   - seq INTEGER PRIMARY KEY AUTOINCREMENT: é o rowid (a própria B-tree da
+     tabela), monotônico e nunca reutilizado; "WHERE seq > :token ORDER BY
+     seq" é uma busca por faixa nesse índice
+   - UNIQUE (tabela, registro_id) + INSERT OR REPLACE: cada nova alteração
+     substitui a anterior do mesmo registro com um seq novo, então o log
+     cresce com o número de registros (e lápides), não com o de escritas
+3. triggers AFTER INSERT/UPDATE/DELETE mantêm o log: capturam também as
+   escritas em lote (UPDATE/DELETE por conjunto) feitas fora do ORM
+4. registra as linhas já existentes, para que um cliente sem token receba tudo
+"""
+
+DESCRICAO = "updated_at e log de alterações com lápides (alteracoes) para /sync"
+
+TABELAS = ("donos", "animais", "vacinas", "consultas", "banho_tosa")
+
+DDL_ALTERACOES = """CREATE TABLE IF NOT EXISTS alteracoes (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    tabela VARCHAR NOT NULL,
+    registro_id INTEGER NOT NULL,
+    acao VARCHAR NOT NULL CHECK (acao IN ('alterado', 'removido')),
+    alterado_em DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE (tabela, registro_id)
+)"""
+
+TRIGGER = """CREATE TRIGGER IF NOT EXISTS trg_{tabela}_{sufixo} AFTER {evento} ON {tabela}
+BEGIN
+    INSERT OR REPLACE INTO alteracoes (tabela, registro_id, acao)
+    VALUES ('{tabela}', {linha}.id, '{acao}');
+END"""
+
+EVENTOS = [
+    ("ins", "INSERT", "NEW", "alterado"),
+    ("upd", "UPDATE", "NEW", "alterado"),
+    ("del", "DELETE", "OLD", "removido"),
+]
+
+
+def upgrade(ctx):
+    for tabela in TABELAS:
+        ctx.adicionar_coluna(tabela, "updated_at", "DATETIME")
+        ctx.atualizar_em_lotes(tabela, "updated_at = CURRENT_TIMESTAMP", "updated_at IS NULL")
+
+    ctx.executar(DDL_ALTERACOES)
+
+    for tabela in TABELAS:
+        # Linhas existentes entram no log antes dos triggers (ordem de id)
+        ctx.executar(
+            f"INSERT OR IGNORE INTO alteracoes (tabela, registro_id, acao) "
+            f"SELECT '{tabela}', id, 'alterado' FROM {tabela} ORDER BY id"
+        )
+        for sufixo, evento, linha, acao in EVENTOS:
+            ctx.executar(TRIGGER.format(tabela=tabela, sufixo=sufixo, evento=evento, linha=linha, acao=acao))
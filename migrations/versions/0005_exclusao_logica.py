@@ -0,0 +1,54 @@
+"""
+Exclusão lógica (deleted_at) com cascata por conjunto e purga em lotes
+
+1. adiciona deleted_at às tabelas de domínio, com índice parcial
+   (WHERE deleted_at IS NOT NULL) usado pela purga: só contém as excluídas
+2. indexa as chaves estrangeiras, usadas pelos UPDATEs de cascata
+   (animais.dono_id, vacinas.animal_id, consultas/banho_tosa.dono_id e animal_id)
+3. troca os índices de status por índices parciais das linhas ativas, que
+   atendem o GROUP BY dos dashboards e o filtro ?status= das listagens
+4. o trigger de UPDATE do log de alterações passa a registrar "removido"
+   quando a linha é marcada como excluída (para /sync)
+"""
+
+DESCRICAO = "exclusão lógica (deleted_at), índices de chaves estrangeiras e de purga"
+
+TABELAS = ("donos", "animais", "vacinas", "consultas", "banho_tosa")
+
+CHAVES_ESTRANGEIRAS = [
+    ("animais", "dono_id"),
+    ("vacinas", "animal_id"),
+    ("consultas", "dono_id"),
+    ("consultas", "animal_id"),
+    ("banho_tosa", "dono_id"),
+    ("banho_tosa", "animal_id"),
+]
+
+TRIGGER_UPDATE = """CREATE TRIGGER trg_{tabela}_upd AFTER UPDATE ON {tabela}
+BEGIN
+    INSERT OR REPLACE INTO alteracoes (tabela, registro_id, acao)
+    VALUES ('{tabela}', NEW.id, CASE WHEN NEW.deleted_at IS NULL THEN 'alterado' ELSE 'removido' END);
+END"""
+
+
+def upgrade(ctx):
+    for tabela in TABELAS:
+        ctx.adicionar_coluna(tabela, "deleted_at", "DATETIME")
+        ctx.executar(
+            f"CREATE INDEX IF NOT EXISTS ix_{tabela}_deleted_at ON {tabela} (deleted_at) "
+            f"WHERE deleted_at IS NOT NULL"
+        )
+
+    for tabela, coluna in CHAVES_ESTRANGEIRAS:
+        ctx.executar(f"CREATE INDEX IF NOT EXISTS ix_{tabela}_{coluna} ON {tabela} ({coluna})")
+
+    for tabela in ("consultas", "banho_tosa"):
+        ctx.executar(f"DROP INDEX IF EXISTS ix_{tabela}_status")
+        ctx.executar(
+            f"CREATE INDEX IF NOT EXISTS ix_{tabela}_status_ativos ON {tabela} (status) "
+            f"WHERE deleted_at IS NULL"
+        )
+
+    for tabela in TABELAS:
+        ctx.executar(f"DROP TRIGGER IF EXISTS trg_{tabela}_upd")
+        ctx.executar(TRIGGER_UPDATE.format(tabela=tabela))
@@ -0,0 +1,40 @@
+"""
+Tabela jobs: fila persistente das tarefas de segundo plano (ver jobs.py)
+
+- ix_jobs_fila (status, executar_apos): busca do próximo job pendente
+- ix_jobs_status_atualizado (status, atualizado_em): jobs em execução sem
+  heartbeat (processo que morreu no meio) e listagem por status
+"""
+
+DESCRICAO = "fila persistente de jobs de segundo plano"
+
+DDL = [
+    """CREATE TABLE IF NOT EXISTS jobs (
+        id INTEGER NOT NULL,
+        tipo VARCHAR NOT NULL,
+        parametros TEXT,
+        status VARCHAR NOT NULL DEFAULT 'pendente'
+            CHECK (status IN ('pendente', 'executando', 'concluido', 'falhou', 'cancelado')),
+        progresso INTEGER NOT NULL DEFAULT 0,
+        mensagem VARCHAR,
+        resultado TEXT,
+        erro TEXT,
+        tentativas INTEGER NOT NULL DEFAULT 0,
+        max_tentativas INTEGER NOT NULL DEFAULT 3,
+        cancelar BOOLEAN NOT NULL DEFAULT 0,
+        worker VARCHAR,
+        criado_em DATETIME NOT NULL,
+        executar_apos DATETIME NOT NULL,
+        iniciado_em DATETIME,
+        atualizado_em DATETIME,
+        concluido_em DATETIME,
+        PRIMARY KEY (id)
+    )""",
+    "CREATE INDEX IF NOT EXISTS ix_jobs_fila ON jobs (status, executar_apos)",
+    "CREATE INDEX IF NOT EXISTS ix_jobs_status_atualizado ON jobs (status, atualizado_em)",
+]
+
+
+def upgrade(ctx):
+    for sql in DDL:
+        ctx.executar(sql)
@@ -0,0 +1,66 @@
+"""
+Chaves de comparação de donos para a detecção de duplicados (ver duplicados.py)
+
+1. adiciona telefone_normalizado (só dígitos, sem DDI) e nome_fonetico
+   (chave fonética do primeiro e do último nome)
+2. preenche as chaves em lotes, calculadas em Python com as mesmas funções
+   de normalizacao.py usadas pela API
+3. índices parciais das linhas ativas usados no bloqueio por GROUP BY:
+   - ix_donos_telefone_chave: últimos 8 dígitos (tolera DDD ausente e o 9 extra)
+   - ix_donos_nome_fonetico
+"""
+
+from sqlalchemy import text
+
+import normalizacao
+
+DESCRICAO = "chaves normalizadas de telefone e nome dos donos (detecção de duplicados)"
+
+INDICES = [
+    "CREATE INDEX IF NOT EXISTS ix_donos_telefone_chave ON donos (substr(telefone_normalizado, -8)) "
+    "WHERE deleted_at IS NULL",
+    "CREATE INDEX IF NOT EXISTS ix_donos_nome_fonetico ON donos (nome_fonetico) "
+    "WHERE deleted_at IS NULL",
+]
+
+
+def _preencher(ctx) -> int:
+    """Calcula as chaves das linhas sem chave, por faixa de id e com commit por lote"""
+    selecionar = text(
+        "SELECT id, nome, telefone FROM donos "
+        "WHERE id > :ultimo AND (telefone_normalizado IS NULL OR nome_fonetico IS NULL) "
+        "ORDER BY id LIMIT :lote"
+    )
+    atualizar = text("UPDATE donos SET telefone_normalizado = :telefone, nome_fonetico = :nome WHERE id = :id")
+    with ctx.engine.connect() as conn:
+        total = conn.exec_driver_sql(
+            "SELECT COUNT(*) FROM donos WHERE telefone_normalizado IS NULL OR nome_fonetico IS NULL"
+        ).scalar()
+
+    ultimo = 0
+    processados = 0
+    while True:
+        with ctx.engine.begin() as conn:
+            linhas = conn.execute(selecionar, {"ultimo": ultimo, "lote": ctx.lote}).all()
+            if not linhas:
+                break
+            conn.execute(atualizar, [
+                {
+                    "id": id,
+                    "telefone": normalizacao.normalizar_telefone(telefone),
+                    "nome": normalizacao.chave_fonetica_nome(nome),
+                }
+                for id, nome, telefone in linhas
+            ])
+        ultimo = linhas[-1][0]
+        processados += len(linhas)
+        ctx.progresso("donos", processados, total, processados)
+    return processados
+
+
+def upgrade(ctx):
+    ctx.adicionar_coluna("donos", "telefone_normalizado", "VARCHAR")
+    ctx.adicionar_coluna("donos", "nome_fonetico", "VARCHAR")
+    _preencher(ctx)
+    for sql in INDICES:
+        ctx.executar(sql)
@@ -0,0 +1,16 @@
+"""
+Índices parciais por data_hora das consultas e serviços ativos
+
+Usados pela agenda do dia em /dashboard/bootstrap (faixa de data_hora só
+entre as linhas sem exclusão lógica).
+"""
+
+DESCRICAO = "índices de data_hora das consultas e serviços ativos (agenda do dia)"
+
+
+def upgrade(ctx):
+    for tabela in ("consultas", "banho_tosa"):
+        ctx.executar(
+            f"CREATE INDEX IF NOT EXISTS ix_{tabela}_data_hora_ativos ON {tabela} (data_hora) "
+            f"WHERE deleted_at IS NULL"
+        )
@@ -0,0 +1,33 @@
+"""
+Tabela anexos: metadados dos arquivos anexados às consultas (ver anexos.py)
+
+- ix_anexos_consulta_id: listagem dos anexos de uma consulta
+- ix_anexos_sha256: deduplicação e coleta dos arquivos sem referência
+- ix_anexos_deleted_at: índice parcial das linhas excluídas (purga)
+"""
+
+DESCRICAO = "anexos das consultas (arquivos endereçados por conteúdo)"
+
+DDL = [
+    """CREATE TABLE IF NOT EXISTS anexos (
+        id INTEGER NOT NULL,
+        consulta_id INTEGER NOT NULL,
+        nome_arquivo VARCHAR NOT NULL,
+        content_type VARCHAR NOT NULL,
+        tamanho INTEGER NOT NULL,
+        sha256 VARCHAR(64) NOT NULL,
+        created_at DATETIME NOT NULL,
+        updated_at DATETIME,
+        deleted_at DATETIME,
+        PRIMARY KEY (id),
+        FOREIGN KEY(consulta_id) REFERENCES consultas (id)
+    )""",
+    "CREATE INDEX IF NOT EXISTS ix_anexos_consulta_id ON anexos (consulta_id)",
+    "CREATE INDEX IF NOT EXISTS ix_anexos_sha256 ON anexos (sha256)",
+    "CREATE INDEX IF NOT EXISTS ix_anexos_deleted_at ON anexos (deleted_at) WHERE deleted_at IS NOT NULL",
+]
+
+
+def upgrade(ctx):
+    for sql in DDL:
+        ctx.executar(sql)
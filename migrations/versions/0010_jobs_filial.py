@@ -0,0 +1,11 @@
+"""
+Coluna jobs.filial: a fila de jobs fica no banco da matriz e cada job
+registra a filial em que foi criado (NULL = matriz), para executar no banco
+dela e ser visível só para ela (ver filiais.py)
+"""
+
+DESCRICAO = "filial dos jobs da fila"
+
+
+def upgrade(ctx):
+    ctx.adicionar_coluna("jobs", "filial", "VARCHAR")
@@ -0,0 +1,64 @@
+"""
+Tabelas de arquivo: consultas e serviços de banho/tosa fechados e antigos
+saem das tabelas quentes para consultas_arquivo / banho_tosa_arquivo (ver
+arquivamento.py), mantendo o id original
+
+- ix_<arquivo>_animal_data / _dono_data: histórico por animal e por dono
+- ix_<arquivo>_data_hora: histórico por período
+- ix_<arquivo>_status: contagens dos dashboards só pelo índice
+- ix_<arquivo>_deleted_at: índice parcial das linhas excluídas (purga)
+"""
+
+DESCRICAO = "tabelas de arquivo do histórico de consultas e banho/tosa"
+
+DDL = [
+    """CREATE TABLE IF NOT EXISTS consultas_arquivo (
+        id INTEGER NOT NULL,
+        data_hora DATETIME NOT NULL,
+        motivo VARCHAR NOT NULL,
+        observacoes TEXT,
+        status SMALLINT,
+        valor INTEGER,
+        dono_id INTEGER,
+        animal_id INTEGER,
+        updated_at DATETIME,
+        deleted_at DATETIME,
+        arquivado_em DATETIME NOT NULL,
+        PRIMARY KEY (id),
+        FOREIGN KEY(dono_id) REFERENCES donos (id),
+        FOREIGN KEY(animal_id) REFERENCES animais (id)
+    )""",
+    """CREATE TABLE IF NOT EXISTS banho_tosa_arquivo (
+        id INTEGER NOT NULL,
+        data_hora DATETIME NOT NULL,
+        tipo_servico SMALLINT NOT NULL,
+        status SMALLINT,
+        valor INTEGER,
+        observacoes TEXT,
+        duracao_estimada INTEGER,
+        dono_id INTEGER,
+        animal_id INTEGER,
+        updated_at DATETIME,
+        deleted_at DATETIME,
+        arquivado_em DATETIME NOT NULL,
+        PRIMARY KEY (id),
+        FOREIGN KEY(dono_id) REFERENCES donos (id),
+        FOREIGN KEY(animal_id) REFERENCES animais (id)
+    )""",
+]
+
+INDICES = [
+    ("animal_data", "animal_id, data_hora", ""),
+    ("dono_data", "dono_id, data_hora", ""),
+    ("data_hora", "data_hora", ""),
+    ("status", "status", ""),
+    ("deleted_at", "deleted_at", " WHERE deleted_at IS NOT NULL"),
+]
+
+
+def upgrade(ctx):
+    for sql in DDL:
+        ctx.executar(sql)
+    for tabela in ("consultas_arquivo", "banho_tosa_arquivo"):
+        for sufixo, colunas, where in INDICES:
+            ctx.executar(f"CREATE INDEX IF NOT EXISTS ix_{tabela}_{sufixo} ON {tabela} ({colunas}){where}")
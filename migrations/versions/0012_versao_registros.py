@@ -0,0 +1,21 @@
+"""
+Coluna version para o controle de concorrência otimista (ver concorrencia.py)
+
+Cada UPDATE pela API incrementa version; o PUT com If-Match só grava se a
+versão ainda for a que o cliente leu (UPDATE ... WHERE id = ? AND
+version = ?). As linhas existentes começam na versão 1 (DEFAULT do ALTER
+TABLE, sem reescrever a tabela). O arquivo leva a coluna também, para o
+INSERT ... SELECT do arquivamento copiar todas as colunas.
+"""
+
+DESCRICAO = "coluna version (concorrência otimista) nas tabelas de domínio e no arquivo"
+
+TABELAS = (
+    "donos", "animais", "vacinas", "consultas", "banho_tosa",
+    "consultas_arquivo", "banho_tosa_arquivo",
+)
+
+
+def upgrade(ctx):
+    for tabela in TABELAS:
+        ctx.adicionar_coluna(tabela, "version", "INTEGER NOT NULL DEFAULT 1")
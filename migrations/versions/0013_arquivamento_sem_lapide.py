@@ -0,0 +1,41 @@
+"""
+Arquivar não é remover: o log de /sync ignora os DELETEs do arquivamento
+
+O arquivamento (arquivamento.py) faz INSERT ... SELECT no arquivo e depois
+DELETE na tabela quente, na mesma transação. O trigger de DELETE gravava a
+lápide e os clientes offline apagavam consultas que as rotas de histórico
+continuam devolvendo.
+
+1. o trigger de DELETE de consultas/banho_tosa só grava a lápide se o id
+   não estiver no arquivo (busca pela chave primária do arquivo); a purga
+   de linhas excluídas continua gerando a lápide
+2. a exclusão lógica de uma linha já arquivada (cascata da exclusão do
+   dono/animal) grava a lápide com o nome da tabela quente, para os
+   clientes que ainda têm a linha de antes do arquivamento
+"""
+
+DESCRICAO = "log de /sync sem lápides para linhas arquivadas; lápide na exclusão do arquivo"
+
+TABELAS = ("consultas", "banho_tosa")
+
+TRIGGER_DELETE = """CREATE TRIGGER trg_{tabela}_del AFTER DELETE ON {tabela}
+WHEN NOT EXISTS (SELECT 1 FROM {tabela}_arquivo WHERE id = OLD.id)
+BEGIN
+    INSERT OR REPLACE INTO alteracoes (tabela, registro_id, acao)
+    VALUES ('{tabela}', OLD.id, 'removido');
+END"""
+
+TRIGGER_EXCLUSAO_ARQUIVO = """CREATE TRIGGER IF NOT EXISTS trg_{tabela}_arquivo_upd
+AFTER UPDATE OF deleted_at ON {tabela}_arquivo
+WHEN OLD.deleted_at IS NULL AND NEW.deleted_at IS NOT NULL
+BEGIN
+    INSERT OR REPLACE INTO alteracoes (tabela, registro_id, acao)
+    VALUES ('{tabela}', NEW.id, 'removido');
+END"""
+
+
+def upgrade(ctx):
+    for tabela in TABELAS:
+        ctx.executar(f"DROP TRIGGER IF EXISTS trg_{tabela}_del")
+        ctx.executar(TRIGGER_DELETE.format(tabela=tabela))
+        ctx.executar(TRIGGER_EXCLUSAO_ARQUIVO.format(tabela=tabela))
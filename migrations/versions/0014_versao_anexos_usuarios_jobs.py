@@ -0,0 +1,17 @@
+"""
+Coluna version também em anexos, users e jobs
+
+A 0012 deixou de fora as tabelas sem edição pela API. Com a coluna em todas
+as tabelas, qualquer UPDATE pode usar o mesmo controle (WHERE version = ?)
+e os clientes têm um ETag barato para o polling de GET /jobs/{id}. As
+linhas existentes começam na versão 1 (DEFAULT do ALTER TABLE).
+"""
+
+DESCRICAO = "coluna version em anexos, users e jobs"
+
+TABELAS = ("anexos", "users", "jobs")
+
+
+def upgrade(ctx):
+    for tabela in TABELAS:
+        ctx.adicionar_coluna(tabela, "version", "INTEGER NOT NULL DEFAULT 1")
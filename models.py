@@ -1,24 +1,106 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Date, DateTime, Text, Enum as SQLEnum
+from sqlalchemy import Boolean, Column, Integer, SmallInteger, String, ForeignKey, Date, DateTime, Text, Index, UniqueConstraint, func, text, Enum as SQLEnum
+from sqlalchemy import event
 from sqlalchemy.orm import relationship
+from sqlalchemy.types import TypeDecorator
 from database import Base
+from datetime import datetime
 import enum
+import normalizacao
+
+
+class CodigoEnum(TypeDecorator):
+    """
+    Coluna que grava um código inteiro e expõe o nome em texto
+    - O mapeamento vem de normalizacao.CODIGOS[nome]
+    - Filtros e GROUP BY comparam inteiros pequenos no banco
+    """
+
+    impl = SmallInteger
+    cache_ok = True
+
+    def __init__(self, nome: str):
+        super().__init__()
+        self.nome = nome
+        self._codigos = normalizacao.CODIGOS[nome]
+        self._nomes = {codigo: valor for valor, codigo in self._codigos.items()}
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        try:
+            return self._codigos[value]
+        except KeyError:
+            raise ValueError(f"Valor inválido para {self.nome}: {value!r}")
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return self._nomes[value]
+
+
+def _indice_excluidos(tabela: str):
+    """Índice parcial só com as linhas excluídas (usado pela purga)"""
+    return Index(f"ix_{tabela}_deleted_at", "deleted_at", sqlite_where=text("deleted_at IS NOT NULL"))
+
+
+def _indice_status_ativos(tabela: str):
+    """Índice parcial de status só com as linhas ativas (dashboards e filtros)"""
+    return Index(f"ix_{tabela}_status_ativos", "status", sqlite_where=text("deleted_at IS NULL"))
+
+
+def _indice_data_ativos(tabela: str):
+    """Índice parcial de data_hora só com as linhas ativas (agenda do dia)"""
+    return Index(f"ix_{tabela}_data_hora_ativos", "data_hora", sqlite_where=text("deleted_at IS NULL"))
+
 
 class Dono(Base):
     __tablename__ = "donos"
+    __table_args__ = (
+        _indice_excluidos("donos"),
+        # Bloqueio da detecção de duplicados (ver duplicados.py)
+        Index("ix_donos_telefone_chave", func.substr(text("telefone_normalizado"), -8),
+              sqlite_where=text("deleted_at IS NULL")),
+        Index("ix_donos_nome_fonetico", "nome_fonetico", sqlite_where=text("deleted_at IS NULL")),
+    )
     id = Column(Integer, primary_key=True, index=True)
     nome = Column(String)
     telefone = Column(String)
+    telefone_normalizado = Column(String)  # Só dígitos, sem DDI (normalizacao.normalizar_telefone)
+    nome_fonetico = Column(String)  # Chave fonética do nome (normalizacao.chave_fonetica_nome)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    deleted_at = Column(DateTime)  # Exclusão lógica (ver exclusao.py)
+    version = Column(Integer, nullable=False, default=1, server_default="1")  # Concorrência otimista (ver concorrencia.py)
     animais = relationship("Animal", back_populates="dono")
     consultas = relationship("Consulta", back_populates="dono")
     servicos_banho_tosa = relationship("BanhoTosa", back_populates="dono")
 
+@event.listens_for(Dono, "before_insert")
+@event.listens_for(Dono, "before_update")
+def _atualizar_chaves_dono(mapper, connection, dono):
+    """Mantém as chaves de comparação em dia a cada INSERT/UPDATE pelo ORM"""
+    for campo, valor in chaves_dono({"nome": dono.nome, "telefone": dono.telefone}).items():
+        setattr(dono, campo, valor)
+
+def chaves_dono(valores: dict) -> dict:
+    """Chaves de comparação dos campos presentes em valores (também para UPDATEs fora do ORM)"""
+    chaves = {}
+    if "telefone" in valores:
+        chaves["telefone_normalizado"] = normalizacao.normalizar_telefone(valores["telefone"])
+    if "nome" in valores:
+        chaves["nome_fonetico"] = normalizacao.chave_fonetica_nome(valores["nome"])
+    return chaves
+
 class Animal(Base):
     __tablename__ = "animais"
+    __table_args__ = (_indice_excluidos("animais"),)
     id = Column(Integer, primary_key=True, index=True)
     nome = Column(String)
     especie = Column(String)
     idade = Column(Integer)
-    dono_id = Column(Integer, ForeignKey("donos.id"))
+    dono_id = Column(Integer, ForeignKey("donos.id"), index=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    deleted_at = Column(DateTime)  # Exclusão lógica (ver exclusao.py)
+    version = Column(Integer, nullable=False, default=1, server_default="1")  # Concorrência otimista (ver concorrencia.py)
     dono = relationship("Dono", back_populates="animais")
     vacinas = relationship("Vacina", back_populates="animal")
     consultas = relationship("Consulta", back_populates="animal")
@@ -26,10 +108,14 @@ class Animal(Base):
 
 class Vacina(Base):
     __tablename__ = "vacinas"
+    __table_args__ = (_indice_excluidos("vacinas"),)
     id = Column(Integer, primary_key=True, index=True)
     nome = Column(String)
     data_aplicacao = Column(Date)
-    animal_id = Column(Integer, ForeignKey("animais.id"))
+    animal_id = Column(Integer, ForeignKey("animais.id"), index=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    deleted_at = Column(DateTime)  # Exclusão lógica (ver exclusao.py)
+    version = Column(Integer, nullable=False, default=1, server_default="1")  # Concorrência otimista (ver concorrencia.py)
     animal = relationship("Animal", back_populates="vacinas")
 
 # ===== ENUMS PARA CONSULTAS =====
@@ -41,19 +127,43 @@ class StatusConsulta(str, enum.Enum):
 
 class Consulta(Base):
     __tablename__ = "consultas"
+    __table_args__ = (_indice_excluidos("consultas"), _indice_status_ativos("consultas"), _indice_data_ativos("consultas"))
     id = Column(Integer, primary_key=True, index=True)
     data_hora = Column(DateTime, nullable=False)
     motivo = Column(String, nullable=False)
     observacoes = Column(Text)
-    status = Column(String, default="agendada")  # Mudado para String simples
+    status = Column(CodigoEnum("status_consulta"), default="agendada")  # Código inteiro no banco
     valor = Column(Integer)  # Valor em centavos
-    dono_id = Column(Integer, ForeignKey("donos.id"))
-    animal_id = Column(Integer, ForeignKey("animais.id"))
+    dono_id = Column(Integer, ForeignKey("donos.id"), index=True)
+    animal_id = Column(Integer, ForeignKey("animais.id"), index=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    deleted_at = Column(DateTime)  # Exclusão lógica (ver exclusao.py)
+    version = Column(Integer, nullable=False, default=1, server_default="1")  # Concorrência otimista (ver concorrencia.py)
     
     # Relacionamentos
     dono = relationship("Dono", back_populates="consultas")
     animal = relationship("Animal", back_populates="consultas")
 
+class Anexo(Base):
+    """
+    Metadados de um arquivo anexado à consulta (ver anexos.py)
+    - O conteúdo fica em disco, endereçado pelo sha256: linhas com o mesmo
+      hash compartilham o arquivo
+    """
+    __tablename__ = "anexos"
+    __table_args__ = (_indice_excluidos("anexos"),)
+
+    id = Column(Integer, primary_key=True)
+    consulta_id = Column(Integer, ForeignKey("consultas.id"), nullable=False, index=True)
+    nome_arquivo = Column(String, nullable=False)
+    content_type = Column(String, nullable=False)
+    tamanho = Column(Integer, nullable=False)  # Bytes
+    sha256 = Column(String(64), nullable=False, index=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    deleted_at = Column(DateTime)  # Exclusão lógica (ver exclusao.py)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+
 # ===== ENUMS PARA BANHO E TOSA =====
 class StatusServico(str, enum.Enum):
     AGENDADO = "agendado"
@@ -68,26 +178,133 @@ class TipoServico(str, enum.Enum):
 
 class BanhoTosa(Base):
     __tablename__ = "banho_tosa"
+    __table_args__ = (_indice_excluidos("banho_tosa"), _indice_status_ativos("banho_tosa"), _indice_data_ativos("banho_tosa"))
     
     id = Column(Integer, primary_key=True, index=True)
     data_hora = Column(DateTime, nullable=False)
-    tipo_servico = Column(String, nullable=False)  # Mudado para String simples
-    status = Column(String, default="agendado")  # Mudado para String simples
+    tipo_servico = Column(CodigoEnum("tipo_servico"), nullable=False)  # Código inteiro no banco
+    status = Column(CodigoEnum("status_servico"), default="agendado")  # Código inteiro no banco
     valor = Column(Integer)  # Valor em centavos
     observacoes = Column(Text)
     duracao_estimada = Column(Integer)  # Duração em minutos
     
     # Relacionamentos
-    dono_id = Column(Integer, ForeignKey("donos.id"))
-    animal_id = Column(Integer, ForeignKey("animais.id"))
+    dono_id = Column(Integer, ForeignKey("donos.id"), index=True)
+    animal_id = Column(Integer, ForeignKey("animais.id"), index=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    deleted_at = Column(DateTime)  # Exclusão lógica (ver exclusao.py)
+    version = Column(Integer, nullable=False, default=1, server_default="1")  # Concorrência otimista (ver concorrencia.py)
     
     dono = relationship("Dono", back_populates="servicos_banho_tosa")
     animal = relationship("Animal", back_populates="servicos_banho_tosa")
 
+# ===== ARQUIVO (HISTÓRICO FRIO) =====
+def _indices_arquivo(tabela: str):
+    """Índices do arquivo: histórico por animal/dono e por período, contagem por status"""
+    return (
+        _indice_excluidos(tabela),
+        Index(f"ix_{tabela}_animal_data", "animal_id", "data_hora"),
+        Index(f"ix_{tabela}_dono_data", "dono_id", "data_hora"),
+        Index(f"ix_{tabela}_data_hora", "data_hora"),
+        Index(f"ix_{tabela}_status", "status"),
+    )
+
+class ConsultaArquivada(Base):
+    """
+    Consulta fechada antiga, movida de consultas (ver arquivamento.py)
+    - Mesmas colunas e mesmo id da linha original, mais arquivado_em
+    """
+    __tablename__ = "consultas_arquivo"
+    __table_args__ = _indices_arquivo("consultas_arquivo")
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    data_hora = Column(DateTime, nullable=False)
+    motivo = Column(String, nullable=False)
+    observacoes = Column(Text)
+    status = Column(CodigoEnum("status_consulta"))
+    valor = Column(Integer)
+    dono_id = Column(Integer, ForeignKey("donos.id"))
+    animal_id = Column(Integer, ForeignKey("animais.id"))
+    updated_at = Column(DateTime)
+    deleted_at = Column(DateTime)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    arquivado_em = Column(DateTime, nullable=False)
+
+class BanhoTosaArquivado(Base):
+    """
+    Serviço de banho/tosa fechado antigo, movido de banho_tosa (ver arquivamento.py)
+    - Mesmas colunas e mesmo id da linha original, mais arquivado_em
+    """
+    __tablename__ = "banho_tosa_arquivo"
+    __table_args__ = _indices_arquivo("banho_tosa_arquivo")
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    data_hora = Column(DateTime, nullable=False)
+    tipo_servico = Column(CodigoEnum("tipo_servico"), nullable=False)
+    status = Column(CodigoEnum("status_servico"))
+    valor = Column(Integer)
+    observacoes = Column(Text)
+    duracao_estimada = Column(Integer)
+    dono_id = Column(Integer, ForeignKey("donos.id"))
+    animal_id = Column(Integer, ForeignKey("animais.id"))
+    updated_at = Column(DateTime)
+    deleted_at = Column(DateTime)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    arquivado_em = Column(DateTime, nullable=False)
+
+class Alteracao(Base):
+    """
+    Log de alterações para sincronização incremental (mantido por triggers,
+    ver migrations/versions/0004_log_alteracoes.py)
+    - Uma linha por registro: a última alteração, ou a lápide se foi removido
+    - seq é o rowid: monotônico, serve de token em /sync
+    """
+    __tablename__ = "alteracoes"
+    __table_args__ = (UniqueConstraint("tabela", "registro_id"),)
+
+    seq = Column(Integer, primary_key=True, autoincrement=True)
+    tabela = Column(String, nullable=False)
+    registro_id = Column(Integer, nullable=False)
+    acao = Column(String, nullable=False)  # "alterado" ou "removido"
+    alterado_em = Column(DateTime, nullable=False, server_default=func.current_timestamp())
+
+class Job(Base):
+    """
+    Job de segundo plano (fila persistente, ver jobs.py)
+    - status: pendente, executando, concluido, falhou ou cancelado
+    - parametros/resultado: JSON em texto
+    """
+    __tablename__ = "jobs"
+    __table_args__ = (
+        Index("ix_jobs_fila", "status", "executar_apos"),
+        Index("ix_jobs_status_atualizado", "status", "atualizado_em"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    tipo = Column(String, nullable=False)
+    parametros = Column(Text)
+    status = Column(String, nullable=False, default="pendente")
+    progresso = Column(Integer, nullable=False, default=0)  # 0 a 100
+    mensagem = Column(String)
+    resultado = Column(Text)
+    erro = Column(Text)
+    tentativas = Column(Integer, nullable=False, default=0)
+    max_tentativas = Column(Integer, nullable=False, default=3)
+    cancelar = Column(Boolean, nullable=False, default=False)  # Cancelamento pedido
+    worker = Column(String)  # host:pid do processo que executa
+    filial = Column(String)  # Banco em que a tarefa roda (None = matriz)
+    criado_em = Column(DateTime, nullable=False, default=datetime.utcnow)
+    executar_apos = Column(DateTime, nullable=False, default=datetime.utcnow)
+    iniciado_em = Column(DateTime)
+    atualizado_em = Column(DateTime)  # Heartbeat
+    concluido_em = Column(DateTime)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+
 class User(Base):
     __tablename__ = "users"
 
     id = Column(Integer, primary_key=True, index=True)
     nome = Column(String, nullable=False)
     email = Column(String, nullable=False, unique=True, index=True)
-    hashed_password = Column(String, nullable=False)
\ No newline at end of file
+    hashed_password = Column(String, nullable=False)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
\ No newline at end of file
@@ -0,0 +1,211 @@
+"""
+Normalização de status e tipo de serviço
+
+Tabelas de normalização montadas uma única vez na importação, indexadas pela
+forma canônica da entrada (casefold, sem acentos, espaços/hífens como "_").
+Assim "CONCLUÍDA", "Concluida" e "concluída" caem todos na mesma chave.
+
+Os códigos inteiros abaixo são os valores gravados no banco (colunas status
+e tipo_servico); a API continua expondo os nomes em texto.
+
+Também ficam aqui as chaves de comparação de donos usadas na detecção de
+duplicados (telefone normalizado, chave fonética do nome e trigramas).
+"""
+
+import re
+import unicodedata
+from functools import lru_cache
+
+# Códigos persistidos no banco: não reordenar nem reaproveitar números
+STATUS_CONSULTA = {
+    "agendada": 1,
+    "em_andamento": 2,
+    "concluida": 3,
+    "cancelada": 4,
+}
+
+STATUS_SERVICO = {
+    "agendado": 1,
+    "em_andamento": 2,
+    "concluido": 3,
+    "cancelado": 4,
+}
+
+TIPO_SERVICO = {
+    "banho": 1,
+    "tosa": 2,
+    "banho_e_tosa": 3,
+}
+
+# Mapeamentos usados pela coluna codificada (ver models.CodigoEnum)
+CODIGOS = {
+    "status_consulta": STATUS_CONSULTA,
+    "status_servico": STATUS_SERVICO,
+    "tipo_servico": TIPO_SERVICO,
+}
+
+# Transições de status permitidas (origem -> destinos), validadas em memória
+# pelas rotas PATCH /{id}/status: viram o filtro "status IN (origens)" do UPDATE
+TRANSICOES_CONSULTA = {
+    "agendada": {"em_andamento", "concluida", "cancelada"},
+    "em_andamento": {"concluida", "cancelada"},
+    "cancelada": {"agendada"},
+    "concluida": set(),
+}
+
+TRANSICOES_SERVICO = {
+    "agendado": {"em_andamento", "concluido", "cancelado"},
+    "em_andamento": {"concluido", "cancelado"},
+    "cancelado": {"agendado"},
+    "concluido": set(),
+}
+
+STATUS_CONSULTA_PADRAO = "agendada"
+STATUS_SERVICO_PADRAO = "agendado"
+TIPO_SERVICO_PADRAO = "banho"
+
+_SEPARADORES = re.compile(r"[\s\-]+")
+
+
+@lru_cache(maxsize=1024)
+def chave(value) -> str:
+    """Forma canônica da entrada: sem acentos, casefold, separadores como '_'"""
+    texto = unicodedata.normalize("NFKD", str(value).strip())
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    return _SEPARADORES.sub("_", texto.casefold())
+
+
+def _tabela(canonicos, aliases=None) -> dict:
+    tabela = {c: c for c in canonicos}
+    tabela.update(aliases or {})
+    return tabela
+
+
+_MAPA_STATUS_CONSULTA = _tabela(STATUS_CONSULTA)
+_MAPA_STATUS_SERVICO = _tabela(STATUS_SERVICO)
+_MAPA_TIPO_SERVICO = _tabela(TIPO_SERVICO, {"banho_tosa": "banho_e_tosa"})
+
+
+def normalizar_status_consulta(value) -> str:
+    """Normaliza status de consulta (valores desconhecidos viram 'agendada')"""
+    if not value:
+        return STATUS_CONSULTA_PADRAO
+    return _MAPA_STATUS_CONSULTA.get(chave(value), STATUS_CONSULTA_PADRAO)
+
+
+def normalizar_status_servico(value) -> str:
+    """Normaliza status de banho/tosa (valores desconhecidos viram 'agendado')"""
+    if not value:
+        return STATUS_SERVICO_PADRAO
+    return _MAPA_STATUS_SERVICO.get(chave(value), STATUS_SERVICO_PADRAO)
+
+
+def reconhecer_status_consulta(value):
+    """Status de consulta canônico, ou None se o valor não for reconhecido"""
+    return _MAPA_STATUS_CONSULTA.get(chave(value)) if value else None
+
+
+def reconhecer_status_servico(value):
+    """Status de banho/tosa canônico, ou None se o valor não for reconhecido"""
+    return _MAPA_STATUS_SERVICO.get(chave(value)) if value else None
+
+
+def origens_permitidas(transicoes: dict, destino: str) -> list:
+    """Status a partir dos quais a transição para destino é permitida"""
+    return [origem for origem, destinos in transicoes.items() if destino in destinos]
+
+
+def normalizar_tipo_servico(value) -> str:
+    """Normaliza tipo de serviço (valores desconhecidos viram 'banho')"""
+    if not value:
+        return TIPO_SERVICO_PADRAO
+    return _MAPA_TIPO_SERVICO.get(chave(value), TIPO_SERVICO_PADRAO)
+
+
+# ===== CHAVES DE COMPARAÇÃO DE DONOS =====
+
+# Partículas ignoradas nos nomes ("João da Silva" == "João Silva")
+_PARTICULAS = {"da", "das", "de", "di", "do", "dos", "du", "e"}
+
+_NAO_DIGITOS = re.compile(r"\D+")
+_NAO_LETRAS = re.compile(r"[^a-z ]+")
+
+# Regras fonéticas simplificadas para português, aplicadas em ordem
+_REGRAS_FONETICAS = [
+    (re.compile(r"ph"), "f"),
+    (re.compile(r"[cs]h"), "x"),
+    (re.compile(r"lh"), "l"),
+    (re.compile(r"nh"), "n"),
+    (re.compile(r"qu|q"), "k"),
+    (re.compile(r"gu(?=[ei])"), "g"),
+    (re.compile(r"sc(?=[ei])"), "s"),
+    (re.compile(r"c(?=[ei])"), "s"),
+    (re.compile(r"c"), "k"),
+    (re.compile(r"g(?=[ei])"), "j"),
+    (re.compile(r"y"), "i"),
+    (re.compile(r"w"), "v"),
+    (re.compile(r"z"), "s"),
+    (re.compile(r"h"), ""),
+    (re.compile(r"m$"), "n"),
+]
+_VOGAIS = re.compile(r"[aeiou]")
+_REPETIDAS = re.compile(r"(.)\1+")
+
+
+def normalizar_telefone(telefone) -> str:
+    """
+    Só os dígitos, sem o código do país (55) e sem o 0 de discagem
+    "(11) 99999-0000", "+55 11 99999 0000" e "011999990000" -> "11999990000"
+    """
+    digitos = _NAO_DIGITOS.sub("", telefone or "")
+    if len(digitos) > 11 and digitos.startswith("55"):
+        digitos = digitos[2:]
+    return digitos.lstrip("0")
+
+
+def _palavras(nome) -> list:
+    texto = _NAO_LETRAS.sub(" ", chave(nome or "").replace("_", " "))
+    return [p for p in texto.split() if p not in _PARTICULAS]
+
+
+@lru_cache(maxsize=4096)
+def fonetica(palavra: str) -> str:
+    """Chave fonética de uma palavra: primeira letra + consoantes com som normalizado"""
+    if not palavra:
+        return ""
+    for padrao, troca in _REGRAS_FONETICAS:
+        palavra = padrao.sub(troca, palavra)
+    if not palavra:
+        return ""
+    return _REPETIDAS.sub(r"\1", palavra[0] + _VOGAIS.sub("", palavra[1:]))
+
+
+def chave_fonetica_nome(nome) -> str:
+    """Chave de bloqueio do nome: fonética do primeiro e do último nome"""
+    palavras = _palavras(nome)
+    if not palavras:
+        return ""
+    extremos = palavras[:1] + palavras[-1:] if len(palavras) > 1 else palavras
+    return " ".join(fonetica(p) for p in extremos)
+
+
+def _trigramas_texto(texto) -> frozenset:
+    texto = f"  {texto} "
+    return frozenset(texto[i:i + 3] for i in range(len(texto) - 2))
+
+
+def trigramas(nome) -> frozenset:
+    """Trigramas do nome normalizado (com bordas), para similaridade"""
+    return _trigramas_texto(" ".join(_palavras(nome)))
+
+
+def trigramas_foneticos(nome) -> frozenset:
+    """Trigramas da forma fonética de todas as palavras ("Luiz Souza" ~ "Luís Sousa")"""
+    return _trigramas_texto(" ".join(fonetica(p) for p in _palavras(nome)))
+
+
+def similaridade(a: frozenset, b: frozenset) -> float:
+    """Índice de Jaccard entre dois conjuntos de trigramas"""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
@@ -0,0 +1,357 @@
+"""
+Projeções de leitura: colunas selecionadas -> dicts de resposta
+
+Cada projeção seleciona apenas as colunas que a resposta usa (com JOIN para
+nomes de dono/animal, em vez de carregar os relacionamentos um a um) e tem
+um serializador gerado uma única vez, na importação, a partir da lista de
+campos. As linhas vêm como tuplas do Core: nenhum objeto ORM é criado e nada
+entra no identity map da sessão.
+
+Datas e horas são lidas como texto do SQLite e convertidas para ISO 8601 por
+manipulação de string, sem criar objetos datetime por linha.
+
+?fields= e ?include= (ver Projecao.expandir):
+- fields gera uma subprojeção que só seleciona (e só faz JOIN para) os
+  campos pedidos; subprojeções ficam em cache por conjunto de campos
+- include resolve relações em lote: os ids referenciados pela página são
+  reunidos e cada relação custa uma única query com IN, seja qual for o
+  número de linhas
+"""
+
+from collections import defaultdict
+from datetime import date, datetime
+
+from sqlalchemy import String, select, type_coerce
+
+import models
+
+# Linhas buscadas do cursor por vez nas listagens (yield_per)
+LOTE_LEITURA = 2000
+# Ids por query IN ao carregar relações (abaixo do limite de variáveis do SQLite)
+LOTE_IN = 30000
+
+
+def datetime_iso(valor):
+    """Equivalente a datetime.isoformat() para valores gravados pelo SQLAlchemy"""
+    if valor is None:
+        return None
+    if not isinstance(valor, str):
+        return valor.isoformat()
+    # Formato do SQLAlchemy no SQLite: "YYYY-MM-DD HH:MM:SS.ffffff"
+    if len(valor) == 26 and valor[10] == " ":
+        if valor.endswith(".000000"):
+            return valor[:10] + "T" + valor[11:19]
+        return valor[:10] + "T" + valor[11:]
+    return datetime.fromisoformat(valor).isoformat()
+
+
+def date_iso(valor):
+    """Equivalente a date.isoformat() para valores gravados pelo SQLAlchemy"""
+    if valor is None:
+        return None
+    if not isinstance(valor, str):
+        return valor.isoformat()
+    if len(valor) == 10:
+        return valor
+    return date.fromisoformat(valor[:10]).isoformat()
+
+
+def _gerar_funcao(nome, nomes, conversores, acesso):
+    """
+    Gera (uma vez) uma função que monta o dict com um literal, sem laços:
+        def serializar_consulta(r): return {"id": r[0], "data_hora": c1(r[1]), ...}
+    """
+    ambiente = {}
+    partes = []
+    for i, (campo, conversor) in enumerate(zip(nomes, conversores)):
+        valor = acesso(i, campo)
+        if conversor is not None:
+            ambiente[f"c{i}"] = conversor
+            valor = f"c{i}({valor})"
+        partes.append(f"{campo!r}: {valor}")
+    codigo = f"def {nome}(r):\n    return {{{', '.join(partes)}}}\n"
+    exec(codigo, ambiente)
+    return ambiente[nome]
+
+
+class Projecao:
+    """
+    Projeção de um modelo para o formato de resposta da API
+
+    campos: lista de (nome, expressão SQL, conversor ou None)
+    joins:  lista de (modelo, condição) para LEFT OUTER JOIN
+    """
+
+    def __init__(self, modelo, campos, joins=()):
+        self.modelo = modelo
+        self._campos = campos
+        self._joins = joins
+        self._subprojecoes = {}
+        self._retorno = None
+        self.nomes = tuple(nome for nome, _, _ in campos)
+        conversores = [conversor for _, _, conversor in campos]
+
+        stmt = select(*[expr.label(nome) for nome, expr, _ in campos]).select_from(modelo)
+        for alvo, condicao in joins:
+            stmt = stmt.outerjoin(alvo, condicao)
+        # Linhas com exclusão lógica nunca aparecem nas respostas
+        self._stmt = stmt.where(modelo.deleted_at.is_(None))
+
+        sufixo = modelo.__tablename__
+        self.serializar = _gerar_funcao(
+            f"serializar_{sufixo}", self.nomes, conversores, lambda i, campo: f"r[{i}]"
+        )
+        # Serializador de objetos ORM (apenas quando todos os campos são atributos do modelo)
+        if not joins:
+            self.serializar_objeto = _gerar_funcao(
+                f"serializar_objeto_{sufixo}", self.nomes, conversores, lambda i, campo: f"r.{campo}"
+            )
+
+    @property
+    def retorno(self) -> list:
+        """
+        Colunas da projeção para UPDATE ... RETURNING (ver concorrencia.atualizar)
+        - Campos das tabelas do JOIN viram subconsultas correlacionadas: o
+          registro atualizado sai completo do próprio UPDATE
+        """
+        if self._retorno is None:
+            colunas = []
+            for nome, expr, _ in self._campos:
+                for alvo, condicao in self._joins:
+                    if alvo.__table__ in expr._from_objects:
+                        expr = select(expr).where(condicao).scalar_subquery()
+                        break
+                colunas.append(expr.label(nome))
+            self._retorno = colunas
+        return self._retorno
+
+    def select(self, *criterios):
+        stmt = self._stmt.where(*criterios) if criterios else self._stmt
+        return stmt.order_by(self.modelo.id)
+
+    def iterar(self, db, *criterios, lote: int = LOTE_LEITURA):
+        """
+        Percorre o resultado em lotes (yield_per): o driver não materializa
+        todas as linhas de uma vez e cada lote vira dicts imediatamente
+        """
+        serializar = self.serializar
+        resultado = db.execute(self.select(*criterios).execution_options(yield_per=lote))
+        for linhas in resultado.partitions():
+            for row in linhas:
+                yield serializar(row)
+
+    def listar(self, db, *criterios) -> list:
+        return list(self.iterar(db, *criterios))
+
+    def obter(self, db, id):
+        row = db.execute(self.select(self.modelo.id == id)).first()
+        return self.serializar(row) if row is not None else None
+
+    def subprojecao(self, nomes) -> "Projecao":
+        """Projeção só com os campos indicados (na ordem original), com os JOINs que eles usam"""
+        chave = frozenset(nomes)
+        projecao = self._subprojecoes.get(chave)
+        if projecao is None:
+            campos = [campo for campo in self._campos if campo[0] in chave]
+            joins = [
+                (alvo, condicao) for alvo, condicao in self._joins
+                if any(alvo.__table__ in expr._from_objects for _, expr, _ in campos)
+            ]
+            projecao = self._subprojecoes[chave] = Projecao(self.modelo, campos, joins)
+        return projecao
+
+    def expandir(self, fields: str = None, include: str = None) -> "Expansao":
+        """
+        Valida ?fields= e ?include= (listas separadas por vírgula)
+        - ValueError com a mensagem para o cliente se algum nome for inválido
+        """
+        tabela = self.modelo.__tablename__
+        relacoes = RELACOES.get(tabela, {})
+        campos = _separar(fields)
+        inclusoes = _separar(include)
+        for nome in campos:
+            if nome not in self.nomes:
+                raise ValueError(f"Campo inválido em fields: {nome} (disponíveis: {', '.join(self.nomes)})")
+        for nome in inclusoes:
+            if nome not in relacoes:
+                disponiveis = ", ".join(relacoes) or "nenhuma"
+                raise ValueError(f"Relação inválida em include: {nome} (disponíveis: {disponiveis})")
+        return Expansao(self, campos, inclusoes, relacoes)
+
+
+def _separar(valor) -> list:
+    if not valor:
+        return []
+    return list(dict.fromkeys(parte.strip() for parte in valor.split(",") if parte.strip()))
+
+
+class Expansao:
+    """
+    Resultado validado de ?fields= e ?include= para uma projeção
+    - chave: sufixo para a chave de cache ("" sem parâmetros)
+    - tabelas: tabelas das relações incluídas (para as versões do cache)
+    """
+
+    def __init__(self, projecao, campos, inclusoes, relacoes):
+        self.inclusoes = [(nome, relacoes[nome]) for nome in inclusoes]
+        self.tabelas = sorted({relacao.projecao.modelo.__tablename__ for _, relacao in self.inclusoes})
+        self.chave = f":fields={','.join(campos)}:include={','.join(inclusoes)}" if campos or inclusoes else ""
+        self.descartar = ()
+        if campos:
+            # Chaves usadas pelas relações entram na consulta, mas só saem se pedidas
+            necessarios = {relacao.campo_local for _, relacao in self.inclusoes}
+            self.descartar = tuple(necessarios - set(campos))
+            projecao = projecao.subprojecao([*campos, *self.descartar])
+        self.projecao = projecao
+
+    def _completar(self, db, registros: list) -> list:
+        for nome, relacao in self.inclusoes:
+            relacao.carregar(db, registros, nome)
+        if self.descartar:
+            for registro in registros:
+                for campo in self.descartar:
+                    del registro[campo]
+        return registros
+
+    def listar(self, db, *criterios) -> list:
+        return self._completar(db, self.projecao.listar(db, *criterios))
+
+    def obter(self, db, id):
+        registro = self.projecao.obter(db, id)
+        return self._completar(db, [registro])[0] if registro is not None else None
+
+
+class Relacao:
+    """
+    Relação disponível em ?include= (carregador em lote)
+    - campo_local: campo do registro com o id procurado
+    - campo_remoto: coluna da projeção relacionada comparada com IN
+    - muitos: lista de registros relacionados (1:N) ou um único (N:1)
+    """
+
+    def __init__(self, projecao, campo_local, campo_remoto, muitos=False):
+        self.projecao = projecao
+        self.campo_local = campo_local
+        self.campo_remoto = campo_remoto
+        self.muitos = muitos
+
+    def carregar(self, db, registros: list, nome: str):
+        """Uma query IN para todos os registros da página"""
+        ids = list({r[self.campo_local] for r in registros if r[self.campo_local] is not None})
+        coluna = getattr(self.projecao.modelo, self.campo_remoto)
+        encontrados = defaultdict(list)
+        for inicio in range(0, len(ids), LOTE_IN):
+            for relacionado in self.projecao.listar(db, coluna.in_(ids[inicio:inicio + LOTE_IN])):
+                encontrados[relacionado[self.campo_remoto]].append(relacionado)
+
+        for registro in registros:
+            relacionados = encontrados.get(registro[self.campo_local], [])
+            if self.muitos:
+                registro[nome] = relacionados
+            else:
+                registro[nome] = relacionados[0] if relacionados else None
+
+
+DONO = Projecao(models.Dono, [
+    ("id", models.Dono.id, None),
+    ("nome", models.Dono.nome, None),
+    ("telefone", models.Dono.telefone, None),
+    ("version", models.Dono.version, None),
+])
+
+ANIMAL = Projecao(models.Animal, [
+    ("id", models.Animal.id, None),
+    ("nome", models.Animal.nome, None),
+    ("especie", models.Animal.especie, None),
+    ("idade", models.Animal.idade, None),
+    ("dono_id", models.Animal.dono_id, None),
+    ("version", models.Animal.version, None),
+])
+
+VACINA = Projecao(models.Vacina, [
+    ("id", models.Vacina.id, None),
+    ("nome", models.Vacina.nome, None),
+    ("data_aplicacao", type_coerce(models.Vacina.data_aplicacao, String), date_iso),
+    ("animal_id", models.Vacina.animal_id, None),
+    ("version", models.Vacina.version, None),
+])
+
+def _consulta(modelo) -> Projecao:
+    """Projeção de consultas (tabela quente ou arquivo, mesmas colunas)"""
+    return Projecao(
+        modelo,
+        [
+            ("id", modelo.id, None),
+            ("data_hora", type_coerce(modelo.data_hora, String), datetime_iso),
+            ("motivo", modelo.motivo, None),
+            ("observacoes", modelo.observacoes, None),
+            ("status", modelo.status, None),
+            ("valor", modelo.valor, None),
+            ("dono_id", modelo.dono_id, None),
+            ("animal_id", modelo.animal_id, None),
+            ("version", modelo.version, None),
+            ("dono_nome", models.Dono.nome, None),
+            ("animal_nome", models.Animal.nome, None),
+        ],
+        joins=[
+            (models.Dono, models.Dono.id == modelo.dono_id),
+            (models.Animal, models.Animal.id == modelo.animal_id),
+        ],
+    )
+
+
+def _banho_tosa(modelo) -> Projecao:
+    """Projeção de banho/tosa (tabela quente ou arquivo, mesmas colunas)"""
+    return Projecao(
+        modelo,
+        [
+            ("id", modelo.id, None),
+            ("data_hora", type_coerce(modelo.data_hora, String), datetime_iso),
+            ("tipo_servico", modelo.tipo_servico, None),
+            ("status", modelo.status, None),
+            ("valor", modelo.valor, None),
+            ("observacoes", modelo.observacoes, None),
+            ("duracao_estimada", modelo.duracao_estimada, None),
+            ("dono_id", modelo.dono_id, None),
+            ("animal_id", modelo.animal_id, None),
+            ("version", modelo.version, None),
+            ("dono_nome", models.Dono.nome, None),
+            ("animal_nome", models.Animal.nome, None),
+        ],
+        joins=[
+            (models.Dono, models.Dono.id == modelo.dono_id),
+            (models.Animal, models.Animal.id == modelo.animal_id),
+        ],
+    )
+
+
+CONSULTA = _consulta(models.Consulta)
+BANHO_TOSA = _banho_tosa(models.BanhoTosa)
+
+# Histórico frio (ver arquivamento.py)
+CONSULTA_ARQUIVO = _consulta(models.ConsultaArquivada)
+BANHO_TOSA_ARQUIVO = _banho_tosa(models.BanhoTosaArquivado)
+
+# Relações de ?include= por tabela
+RELACOES = {
+    "donos": {
+        "animais": Relacao(ANIMAL, "id", "dono_id", muitos=True),
+    },
+    "animais": {
+        "dono": Relacao(DONO, "dono_id", "id"),
+        "vacinas": Relacao(VACINA, "id", "animal_id", muitos=True),
+    },
+    "vacinas": {
+        "animal": Relacao(ANIMAL, "animal_id", "id"),
+    },
+    "consultas": {
+        "dono": Relacao(DONO, "dono_id", "id"),
+        "animal": Relacao(ANIMAL, "animal_id", "id"),
+    },
+    "banho_tosa": {
+        "dono": Relacao(DONO, "dono_id", "id"),
+        "animal": Relacao(ANIMAL, "animal_id", "id"),
+    },
+}
+RELACOES["consultas_arquivo"] = RELACOES["consultas"]
+RELACOES["banho_tosa_arquivo"] = RELACOES["banho_tosa"]
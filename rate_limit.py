@@ -0,0 +1,171 @@
+"""
+Rate limiting por usuário e controle de admissão da API
+
+- Token bucket por cliente e por regra de rota: o cliente é a filial e o
+  user_id do JWT (ids de usuário se repetem entre os bancos das filiais;
+  claims já decodificadas por security.ClaimsMiddleware) ou o IP quando não
+  há token válido; em /auth/login é sempre o IP.
+- Buckets num LRU limitado: clientes inativos são descartados primeiro.
+- Limite global de requisições simultâneas: acima dele a API responde 503
+  na hora, em vez de enfileirar sem limite no threadpool.
+
+Configuração por variáveis de ambiente:
+    PETCARE_RATE_LIMIT=0             desativa o rate limiting
+    PETCARE_MAX_CONCORRENTES=64      requisições simultâneas por worker
+"""
+
+import json
+import math
+import os
+import time
+from collections import OrderedDict, namedtuple
+
+from security import claims_da_requisicao
+
+HABILITADO = os.getenv("PETCARE_RATE_LIMIT", "1") != "0"
+MAX_CONCORRENTES = int(os.getenv("PETCARE_MAX_CONCORRENTES", "64"))
+MAX_BUCKETS = 10000
+
+# taxa: tokens repostos por segundo; capacidade: rajada máxima
+Limite = namedtuple("Limite", ["nome", "taxa", "capacidade"])
+
+# (método ou None, prefixo, limite) - vale a primeira regra que casar
+REGRAS = [
+    ("POST", "/auth/login", Limite("login", taxa=5 / 60, capacidade=5)),
+    ("POST", "/auth/register", Limite("registro", taxa=3 / 60, capacidade=3)),
+    ("GET", "/", Limite("leitura", taxa=20, capacidade=60)),
+    (None, "/", Limite("escrita", taxa=5, capacidade=20)),
+]
+
+# Arquivos estáticos (mounts /frontend e /auth) não contam para o limite.
+# Isenção só pelo prefixo do mount, nunca pela extensão (/donos/x.js é API)
+PREFIXOS_ISENTOS = ("/frontend/", "/auth/")
+# Rotas da API sob o prefixo do mount /auth: continuam limitadas
+ROTAS_NAO_ISENTAS = ("/auth/login", "/auth/register", "/auth/me")
+
+# Conexões de longa duração (SSE) não ocupam vaga no limite de concorrência
+PREFIXOS_STREAMING = ("/eventos",)
+
+# Rotas em que o cliente é sempre o IP (não há usuário antes do login)
+ROTAS_POR_IP = ("/auth/login", "/auth/register")
+
+
+def _regra(metodo: str, path: str):
+    for metodo_regra, prefixo, limite in REGRAS:
+        if (metodo_regra is None or metodo_regra == metodo) and path.startswith(prefixo):
+            return limite
+    return None
+
+
+def _resposta_json(status: int, detail: str, headers=()):
+    corpo = json.dumps({"detail": detail}).encode()
+    cabecalhos = [
+        (b"content-type", b"application/json"),
+        (b"content-length", str(len(corpo)).encode()),
+        *headers,
+    ]
+
+    async def responder(send):
+        await send({"type": "http.response.start", "status": status, "headers": cabecalhos})
+        await send({"type": "http.response.body", "body": corpo})
+
+    return responder
+
+
+class TokenBuckets:
+    """Buckets por chave num LRU limitado: {chave: [tokens, último_instante]}"""
+
+    def __init__(self, maxsize: int = MAX_BUCKETS):
+        self.maxsize = maxsize
+        self._buckets = OrderedDict()
+
+    def consumir(self, chave, limite: Limite, agora: float) -> float:
+        """Consome um token; retorna 0 se permitido ou os segundos até o próximo token"""
+        bucket = self._buckets.get(chave)
+        if bucket is None:
+            bucket = [float(limite.capacidade), agora]
+            self._buckets[chave] = bucket
+            if len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(chave)
+            bucket[0] = min(limite.capacidade, bucket[0] + (agora - bucket[1]) * limite.taxa)
+            bucket[1] = agora
+
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            return 0.0
+        return (1 - bucket[0]) / limite.taxa
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+def identificar_cliente(scope) -> str:
+    """user:<filial>:<id> a partir do Bearer token, ou ip:<endereço>"""
+    if scope["path"] not in ROTAS_POR_IP:
+        claims = claims_da_requisicao(scope) or {}
+        user_id = claims.get("user_id")
+        if user_id is not None:
+            return f"user:{claims.get('filial') or 'matriz'}:{user_id}"
+    cliente = scope.get("client")
+    return f"ip:{cliente[0] if cliente else 'desconhecido'}"
+
+
+class RateLimitMiddleware:
+    """Middleware ASGI de token bucket por cliente e regra de rota (429)"""
+
+    def __init__(self, app, habilitado: bool = HABILITADO):
+        self.app = app
+        self.habilitado = habilitado
+        self.buckets = TokenBuckets()
+        self.rejeitadas = 0
+
+    async def __call__(self, scope, receive, send):
+        if not self.habilitado or scope["type"] != "http" or scope["method"] == "OPTIONS":
+            return await self.app(scope, receive, send)
+
+        path = scope["path"]
+        if path.startswith(PREFIXOS_ISENTOS) and path not in ROTAS_NAO_ISENTAS:
+            return await self.app(scope, receive, send)
+
+        limite = _regra(scope["method"], path)
+        if limite is None:
+            return await self.app(scope, receive, send)
+
+        espera = self.buckets.consumir((limite.nome, identificar_cliente(scope)), limite, time.monotonic())
+        if espera:
+            self.rejeitadas += 1
+            responder = _resposta_json(
+                429,
+                "Muitas requisições, tente novamente em instantes",
+                [(b"retry-after", str(math.ceil(espera)).encode())],
+            )
+            return await responder(send)
+
+        await self.app(scope, receive, send)
+
+
+class ConcurrencyLimitMiddleware:
+    """Rejeita com 503 quando há MAX_CONCORRENTES requisições em andamento"""
+
+    def __init__(self, app, limite: int = MAX_CONCORRENTES):
+        self.app = app
+        self.limite = limite
+        self.em_andamento = 0
+        self.rejeitadas = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(PREFIXOS_STREAMING):
+            return await self.app(scope, receive, send)
+
+        if self.em_andamento >= self.limite:
+            self.rejeitadas += 1
+            responder = _resposta_json(503, "Servidor sobrecarregado, tente novamente", [(b"retry-after", b"1")])
+            return await responder(send)
+
+        self.em_andamento += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.em_andamento -= 1
@@ -1,7 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status, Query
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
+from typing import Optional
 from database import SessionLocal
 import models, schemas
+import cache
+import projecoes
+import eventos
+import exclusao
+import concorrencia
 
 router = APIRouter(prefix="/animais", tags=["Animais"])
 
@@ -16,6 +23,14 @@ def get_db():
     finally:
         db.close()
 
+
+def _expansao(fields, include):
+    """Valida ?fields= e ?include= (400 se algum nome for inválido)"""
+    try:
+        return projecoes.ANIMAL.expandir(fields, include)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 # CREATE - Criar novo animal
 @router.post("/", status_code=status.HTTP_201_CREATED)
 def criar_animal(animal: schemas.AnimalCreate, db: Session = Depends(get_db)):
@@ -24,106 +39,137 @@ def criar_animal(animal: schemas.AnimalCreate, db: Session = Depends(get_db)):
     - Valida se o dono existe antes de criar o animal
     - Retorna o animal criado com ID gerado
     """
-    dono = db.query(models.Dono).filter(models.Dono.id == animal.dono_id).first()
+    dono = cache.buscar_dono(db, animal.dono_id)
     if not dono:
         raise HTTPException(status_code=404, detail="Dono não encontrado")
     
     novo_animal = models.Animal(**animal.dict())
     db.add(novo_animal)
     db.commit()
+    cache.invalidar_tabelas("animais")
     db.refresh(novo_animal)
-    return {
-        "id": novo_animal.id, 
-        "nome": novo_animal.nome, 
-        "especie": novo_animal.especie, 
-        "idade": novo_animal.idade,
-        "dono_id": novo_animal.dono_id
-    }
+    resposta = projecoes.ANIMAL.serializar_objeto(novo_animal)
+    eventos.publicar("animais", "criado", novo_animal.id)
+    return resposta
 
 # READ - Listar todos os animais
 @router.get("/")
-def listar_animais(db: Session = Depends(get_db)):
+def listar_animais(
+    fields: Optional[str] = Query(None, description="Campos separados por vírgula (ex.: id,nome)"),
+    include: Optional[str] = Query(None, description="Relações a incluir (ex.: dono,vacinas)"),
+    db: Session = Depends(get_db),
+):
     """
     Lista todos os animais cadastrados no sistema
     - Retorna lista com dados básicos para evitar erros de serialização
+    - ?fields= limita os campos e ?include=dono,vacinas embute as relações
     """
+    expansao = _expansao(fields, include)
+
+    def calcular():
+        return expansao.listar(db)
+
     try:
-        animais = db.query(models.Animal).all()
-        return [
-            {
-                "id": animal.id, 
-                "nome": animal.nome, 
-                "especie": animal.especie, 
-                "idade": animal.idade,
-                "dono_id": animal.dono_id
-            } 
-            for animal in animais
-        ]
+        return JSONResponse(cache.cached(f"animais:lista{expansao.chave}", ["animais", *expansao.tabelas], calcular))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao listar animais: {str(e)}")
 
 # READ - Obter animal por ID
 @router.get("/{animal_id}")
-def obter_animal(animal_id: int, db: Session = Depends(get_db)):
+def obter_animal(
+    animal_id: int,
+    response: Response,
+    fields: Optional[str] = Query(None, description="Campos separados por vírgula (ex.: id,nome)"),
+    include: Optional[str] = Query(None, description="Relações a incluir (ex.: dono,vacinas)"),
+    db: Session = Depends(get_db),
+):
     """
     Obtém um animal específico pelo ID
     - Retorna 404 se o animal não for encontrado
+    - ETag com a versão, para o If-Match do PUT
     """
-    animal = db.query(models.Animal).filter(models.Animal.id == animal_id).first()
+    if fields or include:
+        animal = _expansao(fields, include).obter(db, animal_id)
+        if not animal:
+            raise HTTPException(status_code=404, detail="Animal não encontrado")
+        if "version" in animal:
+            response.headers["ETag"] = concorrencia.etag(animal["version"])
+        return animal
+
+    animal = cache.buscar_animal(db, animal_id)
     if not animal:
         raise HTTPException(status_code=404, detail="Animal não encontrado")
     
-    return {
-        "id": animal.id, 
-        "nome": animal.nome, 
-        "especie": animal.especie, 
-        "idade": animal.idade,
-        "dono_id": animal.dono_id
-    }
+    response.headers["ETag"] = concorrencia.etag(animal.version)
+    return animal._asdict()
+
+def _atualizar(db: Session, animal_id: int, valores: dict, versao: Optional[int], response: Response):
+    """UPDATE ... RETURNING único (com If-Match opcional); publica e responde com o ETag novo"""
+    # Valida se o dono informado existe
+    if "dono_id" in valores and not cache.buscar_dono(db, valores["dono_id"]):
+        raise HTTPException(status_code=404, detail="Dono não encontrado")
+
+    try:
+        resposta = concorrencia.atualizar(db, projecoes.ANIMAL, animal_id, valores, versao)
+    except concorrencia.ConflitoDeVersao as e:
+        raise concorrencia.conflito(e)
+    if resposta is None:
+        raise HTTPException(status_code=404, detail="Animal não encontrado")
+
+    db.commit()
+    cache.invalidar_animal(animal_id)
+    cache.invalidar_tabelas("animais")
+    eventos.publicar("animais", "atualizado", animal_id)
+    response.headers["ETag"] = concorrencia.etag(resposta["version"])
+    return resposta
 
 # UPDATE - Atualizar animal existente
 @router.put("/{animal_id}")
-def atualizar_animal(animal_id: int, dados: schemas.AnimalCreate, db: Session = Depends(get_db)):
+def atualizar_animal(
+    animal_id: int,
+    dados: schemas.AnimalCreate,
+    response: Response,
+    versao: Optional[int] = Depends(concorrencia.versao_esperada),
+    db: Session = Depends(get_db),
+):
     """
     Atualiza os dados de um animal existente
-    - Valida se o animal existe antes de atualizar
     - Valida se o dono informado existe
+    - Com If-Match, só grava se o animal ainda estiver na versão lida
+      (409 se outra pessoa salvou antes; ver concorrencia.py)
+    - Retorna 404 se o animal não existir
     """
-    animal = db.query(models.Animal).filter(models.Animal.id == animal_id).first()
-    if not animal:
-        raise HTTPException(status_code=404, detail="Animal não encontrado")
-    
-    # Valida se o dono informado existe
-    dono = db.query(models.Dono).filter(models.Dono.id == dados.dono_id).first()
-    if not dono:
-        raise HTTPException(status_code=404, detail="Dono não encontrado")
+    return _atualizar(db, animal_id, dados.dict(), versao, response)
 
-    # Atualiza os campos do animal com os novos dados
-    for campo, valor in dados.dict().items():
-        setattr(animal, campo, valor)
-    
-    db.commit()
-    db.refresh(animal)
-    return {
-        "id": animal.id, 
-        "nome": animal.nome, 
-        "especie": animal.especie, 
-        "idade": animal.idade,
-        "dono_id": animal.dono_id
-    }
+# PATCH - Atualização parcial
+@router.patch("/{animal_id}")
+def atualizar_animal_parcial(
+    animal_id: int,
+    dados: schemas.AnimalUpdate,
+    response: Response,
+    versao: Optional[int] = Depends(concorrencia.versao_esperada),
+    db: Session = Depends(get_db),
+):
+    """
+    Altera só os campos enviados, num único UPDATE ... RETURNING
+    - Valida o dono apenas se dono_id for enviado
+    - Aceita If-Match como o PUT
+    """
+    return _atualizar(db, animal_id, dados.dict(exclude_unset=True), versao, response)
 
 # DELETE - Remover animal
 @router.delete("/{animal_id}", status_code=status.HTTP_204_NO_CONTENT)
 def deletar_animal(animal_id: int, db: Session = Depends(get_db)):
     """
-    Remove um animal do sistema
+    Remove um animal do sistema (exclusão lógica)
     - Valida se o animal existe antes de deletar
+    - Remove em cascata as vacinas, consultas e serviços do animal
     - Retorna 204 No Content em caso de sucesso
     """
-    animal = db.query(models.Animal).filter(models.Animal.id == animal_id).first()
-    if not animal:
+    removidos = exclusao.excluir_animal(db, animal_id)
+    if not removidos["animais"]:
         raise HTTPException(status_code=404, detail="Animal não encontrado")
     
-    db.delete(animal)
     db.commit()
+    exclusao.notificar(removidos)
     return None
\ No newline at end of file
@@ -1,9 +1,10 @@
-from fastapi import APIRouter, HTTPException, Depends, status
+from contextlib import contextmanager
+from fastapi import APIRouter, HTTPException, Depends, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
-from database import SessionLocal
+from database import SessionLocal, filial_atual, pool_filiais
 import models, schemas
-from security import hash_password, verify_password, create_token
+from security import hash_password, verify_password, create_token, claims_da_requisicao, eh_admin
 
 router = APIRouter(prefix="/auth", tags=["Auth"])
 security = HTTPBearer()
@@ -15,20 +16,29 @@ def get_db():
     finally:
         db.close()
 
-def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
-    token = credentials.credentials
+@contextmanager
+def _sessao_filial(filial, db: Session):
+    """Cadastro e login de usuários de filial usam o banco da filial"""
+    if not filial:
+        yield db
+        return
+    if not pool_filiais.existe(filial):
+        raise HTTPException(status_code=404, detail="Filial não encontrada")
+    sessao = Session(bind=pool_filiais.engine(filial))
     try:
-        from jose import jwt
-        from security import SECRET_KEY, ALGORITHM
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id: int = payload.get("user_id")
-        if user_id is None:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Token inválido",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
-    except:
+        yield sessao
+    finally:
+        sessao.close()
+
+def get_current_user(
+    request: Request,
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db),
+):
+    # Token já decodificado pelo ClaimsMiddleware (request.state.claims)
+    payload = claims_da_requisicao(request.scope)
+    user_id = payload.get("user_id") if payload else None
+    if user_id is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Token inválido",
@@ -44,28 +54,41 @@ def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(securit
         )
     return user
 
+def get_admin_user(current_user: models.User = Depends(get_current_user)):
+    """Usuário da matriz cujo e-mail está em PETCARE_ADMINS (403 caso contrário)"""
+    # current_user vem do banco da filial do token: e-mails de filial não contam
+    if not eh_admin(current_user.email, filial_atual()):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Acesso restrito a administradores")
+    return current_user
+
 @router.post("/register", response_model=schemas.UserOut)
 def register(user: schemas.UserCreate, db: Session = Depends(get_db)):
-    if db.query(models.User).filter(models.User.email == user.email).first():
-        raise HTTPException(status_code=400, detail="E-mail já está em uso")
-    
-    new_user = models.User(
-        nome=user.nome,
-        email=user.email,
-        hashed_password=hash_password(user.password)
-    )
-    db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
-    return new_user
+    with _sessao_filial(user.filial, db) as db:
+        if db.query(models.User).filter(models.User.email == user.email).first():
+            raise HTTPException(status_code=400, detail="E-mail já está em uso")
+
+        new_user = models.User(
+            nome=user.nome,
+            email=user.email,
+            hashed_password=hash_password(user.password)
+        )
+        db.add(new_user)
+        db.commit()
+        db.refresh(new_user)
+        return new_user
 
 @router.post("/login", response_model=schemas.Token)
 def login(data: schemas.UserLogin, db: Session = Depends(get_db)):
-    user = db.query(models.User).filter(models.User.email == data.email).first()
-    if not user or not verify_password(data.password, user.hashed_password):
-        raise HTTPException(status_code=401, detail="Credenciais inválidas")
+    with _sessao_filial(data.filial, db) as db:
+        user = db.query(models.User).filter(models.User.email == data.email).first()
+        if not user or not verify_password(data.password, user.hashed_password):
+            raise HTTPException(status_code=401, detail="Credenciais inválidas")
 
-    token = create_token({"user_id": user.id})
+    dados = {"user_id": user.id}
+    if eh_admin(user.email, data.filial):
+        # Lida sem ir ao banco pelo perfilador (diagnostico.PerfilMiddleware)
+        dados["admin"] = True
+    token = create_token(dados, filial=data.filial)
     return {"access_token": token, "token_type": "bearer"}
 
 @router.get("/me", response_model=schemas.UserOut)
@@ -1,12 +1,26 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import func
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
-from database import SessionLocal
+from database import LEITURA, SessionLocal, nova_sessao, ttl_leitura
 import models
 import schemas
-from typing import List, Dict, Any
+import cache
+import projecoes
+import eventos
+import exclusao
+import arquivamento
+import concorrencia
+from normalizacao import normalizar_status_servico as normalizar_status, normalizar_tipo_servico
+from normalizacao import TRANSICOES_SERVICO, origens_permitidas, reconhecer_status_servico
+from typing import List, Dict, Any, Optional
+from datetime import datetime
 
 router = APIRouter(prefix="/banho-tosa", tags=["Banho e Tosa"])
 
+HISTORICO_PADRAO = 100
+HISTORICO_MAXIMO = 1000
+
 
 # ----------------------------
 # DB session
@@ -19,88 +33,31 @@ def get_db():
         db.close()
 
 
-# ----------------------------
-# Normalização de Status (aceita maiúscula/minúscula)
-# ----------------------------
-def normalizar_status(value: str) -> str:
-    """Normaliza status para minúscula"""
-    if not value:
-        return "agendado"
-    
-    v = str(value).strip().lower()
-    
-    mapa = {
-        "agendado": "agendado",
-        "AGENDADO": "agendado",
-        "em_andamento": "em_andamento",
-        "EM_ANDAMENTO": "em_andamento",
-        "em andamento": "em_andamento",
-        "Em_Andamento": "em_andamento",
-        "concluido": "concluido",
-        "CONCLUIDO": "concluido",
-        "concluído": "concluido",
-        "cancelado": "cancelado",
-        "CANCELADO": "cancelado"
-    }
-    
-    if value in mapa:
-        return mapa[value]
-    
-    if v in mapa:
-        return mapa[v]
-    
-    return v if v in ["agendado", "em_andamento", "concluido", "cancelado"] else "agendado"
+def _status_do_filtro(status: Optional[str]):
+    """?status= canônico (400 se desconhecido, em vez de virar o status padrão)"""
+    if not status:
+        return None
+    normalizado = reconhecer_status_servico(status)
+    if normalizado is None:
+        raise HTTPException(status_code=400, detail=f"Status inválido: {status}")
+    return normalizado
 
 
-# ----------------------------
-# Normalização de Tipo de Serviço
-# ----------------------------
-def normalizar_tipo_servico(value: str) -> str:
-    """Normaliza tipo de serviço para minúscula"""
-    if not value:
-        return "banho"
-    
-    v = str(value).strip().lower()
-    
-    mapa = {
-        "banho": "banho",
-        "BANHO": "banho",
-        "tosa": "tosa",
-        "TOSA": "tosa",
-        "banho_e_tosa": "banho_e_tosa",
-        "BANHO_E_TOSA": "banho_e_tosa",
-        "banho e tosa": "banho_e_tosa",
-        "Banho_e_Tosa": "banho_e_tosa",
-        "Banho e Tosa": "banho_e_tosa"
-    }
-    
-    if value in mapa:
-        return mapa[value]
-    
-    if v in mapa:
-        return mapa[v]
-    
-    return v if v in ["banho", "tosa", "banho_e_tosa"] else "banho"
+def _expansao(fields, include):
+    """Valida ?fields= e ?include= (400 se algum nome for inválido)"""
+    try:
+        return projecoes.BANHO_TOSA.expandir(fields, include)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
-# ----------------------------
-# Serializar serviço (evita erros de relacionamento)
-# ----------------------------
-def serializar_servico(servico):
-    """Serializa serviço com segurança"""
-    return {
-        "id": servico.id,
-        "data_hora": servico.data_hora.isoformat() if servico.data_hora else None,
-        "tipo_servico": servico.tipo_servico,
-        "status": servico.status,
-        "valor": servico.valor,
-        "observacoes": servico.observacoes,
-        "duracao_estimada": servico.duracao_estimada,
-        "dono_id": servico.dono_id,
-        "animal_id": servico.animal_id,
-        "dono_nome": servico.dono.nome if servico.dono else None,
-        "animal_nome": servico.animal.nome if servico.animal else None
-    }
+def get_db_leitura():
+    """Sessão para relatórios: réplica/snapshot quando configurados (ver database.py)"""
+    db = nova_sessao(LEITURA)
+    try:
+        yield db
+    finally:
+        db.close()
 
 
 # ----------------------------
@@ -111,12 +68,12 @@ def criar_servico(data: schemas.BanhoTosaCreate, db: Session = Depends(get_db)):
     """Cria novo serviço de banho/tosa"""
     
     # Validar dono
-    dono = db.query(models.Dono).filter(models.Dono.id == data.dono_id).first()
+    dono = cache.buscar_dono(db, data.dono_id)
     if not dono:
         raise HTTPException(404, "Dono não encontrado")
 
     # Validar animal
-    animal = db.query(models.Animal).filter(models.Animal.id == data.animal_id).first()
+    animal = cache.buscar_animal(db, data.animal_id)
     if not animal:
         raise HTTPException(404, "Animal não encontrado")
 
@@ -137,62 +94,186 @@ def criar_servico(data: schemas.BanhoTosaCreate, db: Session = Depends(get_db)):
     )
     
     db.add(servico)
+    db.flush()
+    servico_id = servico.id
     db.commit()
-    db.refresh(servico)
-    
-    return serializar_servico(servico)
+    cache.invalidar_tabelas("banho_tosa")
+
+    resposta = projecoes.BANHO_TOSA.obter(db, servico_id)
+    eventos.publicar("banho_tosa", "criado", servico_id)
+    return resposta
 
 
 # ----------------------------
 # Listar todos
 # ----------------------------
 @router.get("/")
-def listar_servicos(db: Session = Depends(get_db)):
-    """Lista todos os serviços"""
-    servicos = db.query(models.BanhoTosa).all()
-    return [serializar_servico(s) for s in servicos]
+def listar_servicos(
+    status: Optional[str] = Query(None),
+    fields: Optional[str] = Query(None, description="Campos separados por vírgula (ex.: id,nome)"),
+    include: Optional[str] = Query(None, description="Relações a incluir (ex.: dono,animal)"),
+    db: Session = Depends(get_db),
+):
+    """Lista todos os serviços (opcionalmente filtrados por status)"""
+    status_normalizado = _status_do_filtro(status)
+    expansao = _expansao(fields, include)
+
+    def calcular():
+        if status_normalizado:
+            return expansao.listar(db, models.BanhoTosa.status == status_normalizado)
+        return expansao.listar(db)
+
+    return JSONResponse(
+        cache.cached(
+            f"banho_tosa:lista:{status_normalizado or '*'}{expansao.chave}",
+            ["banho_tosa", "donos", "animais", *expansao.tabelas],
+            calcular,
+        )
+    )
+
+
+# ----------------------------
+# Histórico (tabela quente + arquivo)
+# ----------------------------
+@router.get("/historico")
+def historico_servicos(
+    animal_id: Optional[int] = Query(None),
+    dono_id: Optional[int] = Query(None),
+    inicio: Optional[datetime] = Query(None),
+    fim: Optional[datetime] = Query(None),
+    status: Optional[str] = Query(None),
+    limite: int = Query(HISTORICO_PADRAO, ge=1, le=HISTORICO_MAXIMO),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_db),
+):
+    """
+    Histórico de serviços, do mais recente para o mais antigo
+    - Junta os serviços atuais e os arquivados (ver arquivamento.py);
+      cada registro traz "arquivada"
+    """
+    status_normalizado = _status_do_filtro(status)
+
+    def criterios(modelo):
+        filtros = []
+        if animal_id is not None:
+            filtros.append(modelo.animal_id == animal_id)
+        if dono_id is not None:
+            filtros.append(modelo.dono_id == dono_id)
+        if inicio is not None:
+            filtros.append(modelo.data_hora >= inicio)
+        if fim is not None:
+            filtros.append(modelo.data_hora < fim)
+        if status_normalizado:
+            filtros.append(modelo.status == status_normalizado)
+        return filtros
+
+    return JSONResponse(
+        arquivamento.historico(
+            db, projecoes.BANHO_TOSA, projecoes.BANHO_TOSA_ARQUIVO, criterios, limite, offset
+        )
+    )
 
 
 # ----------------------------
 # Buscar por ID
 # ----------------------------
 @router.get("/{servico_id}")
-def obter_servico(servico_id: int, db: Session = Depends(get_db)):
-    """Obtém serviço por ID"""
-    servico = db.query(models.BanhoTosa).filter(models.BanhoTosa.id == servico_id).first()
+def obter_servico(
+    servico_id: int,
+    response: Response,
+    fields: Optional[str] = Query(None, description="Campos separados por vírgula (ex.: id,nome)"),
+    include: Optional[str] = Query(None, description="Relações a incluir (ex.: dono,animal)"),
+    db: Session = Depends(get_db),
+):
+    """Obtém serviço por ID (também os arquivados, com "arquivada": true); ETag com a versão"""
+    servico = _expansao(fields, include).obter(db, servico_id)
     if not servico:
-        raise HTTPException(404, "Serviço não encontrado")
-    return serializar_servico(servico)
+        servico = projecoes.BANHO_TOSA_ARQUIVO.expandir(fields, include).obter(db, servico_id)
+        if not servico:
+            raise HTTPException(404, "Serviço não encontrado")
+        servico["arquivada"] = True
+    if "version" in servico:
+        response.headers["ETag"] = concorrencia.etag(servico["version"])
+    return servico
 
 
 # ----------------------------
 # Atualizar
 # ----------------------------
 @router.put("/{servico_id}")
-def atualizar_servico(servico_id: int, dados: schemas.BanhoTosaUpdate, db: Session = Depends(get_db)):
-    """Atualiza serviço existente"""
-    
-    servico = db.query(models.BanhoTosa).filter(models.BanhoTosa.id == servico_id).first()
-    if not servico:
-        raise HTTPException(404, "Serviço não encontrado")
-
+@router.patch("/{servico_id}")
+def atualizar_servico(
+    servico_id: int,
+    dados: schemas.BanhoTosaUpdate,
+    response: Response,
+    versao: Optional[int] = Depends(concorrencia.versao_esperada),
+    db: Session = Depends(get_db),
+):
+    """
+    Atualiza serviço existente (PUT ou PATCH: só os campos enviados)
+    - Com If-Match, só grava se o serviço ainda estiver na versão lida
+      (409 se outra pessoa salvou antes; ver concorrencia.py)
+    - status segue as mesmas transições de PATCH /{id}/status (ou fica
+      como está); 409 se a transição não for permitida
+    """
     update_data = dados.dict(exclude_unset=True)
 
-    # Normalizar se fornecidos
+    condicao = None
     if "status" in update_data:
-        update_data["status"] = normalizar_status(update_data["status"])
+        novo = reconhecer_status_servico(update_data["status"])
+        if novo is None:
+            raise HTTPException(400, f"Status inválido: {update_data['status']}")
+        update_data["status"] = novo
+        condicao = models.BanhoTosa.status.in_([novo, *origens_permitidas(TRANSICOES_SERVICO, novo)])
 
     if "tipo_servico" in update_data:
         update_data["tipo_servico"] = normalizar_tipo_servico(update_data["tipo_servico"])
 
-    # Atualizar campos
-    for campo, valor in update_data.items():
-        setattr(servico, campo, valor)
+    try:
+        return _atualizar(db, servico_id, update_data, versao, response, condicao)
+    except concorrencia.CondicaoRecusada as e:
+        raise HTTPException(409, f"Transição de status não permitida: {e.registro['status']} -> {novo}")
+
+
+@router.patch("/{servico_id}/status")
+def alterar_status_servico(
+    servico_id: int,
+    dados: schemas.StatusServicoUpdate,
+    response: Response,
+    versao: Optional[int] = Depends(concorrencia.versao_esperada),
+    db: Session = Depends(get_db),
+):
+    """
+    Transição de status (ex.: agendado -> em_andamento -> concluido)
+    - As transições permitidas ficam em normalizacao.TRANSICOES_SERVICO;
+      viram o filtro "status IN (origens)" do próprio UPDATE
+    - 409 se a transição não for permitida a partir do status atual
+    """
+    novo = reconhecer_status_servico(dados.status)
+    if novo is None:
+        raise HTTPException(400, f"Status inválido: {dados.status}")
+
+    condicao = models.BanhoTosa.status.in_(origens_permitidas(TRANSICOES_SERVICO, novo))
+    try:
+        return _atualizar(db, servico_id, {"status": novo}, versao, response, condicao)
+    except concorrencia.CondicaoRecusada as e:
+        raise HTTPException(409, f"Transição de status não permitida: {e.registro['status']} -> {novo}")
+
+
+def _atualizar(db: Session, servico_id: int, valores: dict, versao, response: Response, condicao=None):
+    """UPDATE ... RETURNING único (com If-Match opcional); publica e responde com o ETag novo"""
+    try:
+        resposta = concorrencia.atualizar(db, projecoes.BANHO_TOSA, servico_id, valores, versao, condicao)
+    except concorrencia.ConflitoDeVersao as e:
+        raise concorrencia.conflito(e)
+    if resposta is None:
+        raise HTTPException(404, "Serviço não encontrado")
 
     db.commit()
-    db.refresh(servico)
-    
-    return serializar_servico(servico)
+    cache.invalidar_tabelas("banho_tosa")
+    eventos.publicar("banho_tosa", "atualizado", servico_id)
+    response.headers["ETag"] = concorrencia.etag(resposta["version"])
+    return resposta
 
 
 # ----------------------------
@@ -200,36 +281,44 @@ def atualizar_servico(servico_id: int, dados: schemas.BanhoTosaUpdate, db: Sessi
 # ----------------------------
 @router.delete("/{servico_id}", status_code=204)
 def remover_servico(servico_id: int, db: Session = Depends(get_db)):
-    """Remove serviço"""
+    """Remove serviço (exclusão lógica)"""
     
-    servico = db.query(models.BanhoTosa).filter(models.BanhoTosa.id == servico_id).first()
-    if not servico:
+    removidos = exclusao.excluir(db, models.BanhoTosa, servico_id)
+    if not removidos["banho_tosa"]:
         raise HTTPException(404, "Serviço não encontrado")
 
-    db.delete(servico)
     db.commit()
+    exclusao.notificar(removidos)
     return None
 
 
 # ----------------------------
 # Dashboard (estatísticas)
 # ----------------------------
+def estatisticas(db: Session) -> Dict[str, Any]:
+    """Contagem por status, incluindo o arquivo (também usada por /dashboard/bootstrap)"""
+    # GROUP BY só nos índices de status, sem carregar os serviços
+    contagem = {}
+    for modelo in (models.BanhoTosa, models.BanhoTosaArquivado):
+        for status_servico, n in (
+            db.query(modelo.status, func.count(modelo.id))
+            .filter(modelo.deleted_at.is_(None))
+            .group_by(modelo.status)
+        ):
+            contagem[status_servico] = contagem.get(status_servico, 0) + n
+
+    return {
+        "total_servicos": sum(contagem.values()),
+        "agendados": contagem.get("agendado", 0),
+        "concluidos": contagem.get("concluido", 0),
+        "cancelados": contagem.get("cancelado", 0),
+        "em_andamento": contagem.get("em_andamento", 0)
+    }
+
+
 @router.get("/stats/dashboard")
-def stats_dashboard(db: Session = Depends(get_db)) -> Dict[str, Any]:
+def stats_dashboard(db: Session = Depends(get_db_leitura)) -> Dict[str, Any]:
     """Retorna estatísticas do dashboard"""
-    
-    servicos = db.query(models.BanhoTosa).all()
-    
-    total = len(servicos)
-    agendados = sum(1 for s in servicos if s.status == "agendado")
-    concluidos = sum(1 for s in servicos if s.status == "concluido")
-    cancelados = sum(1 for s in servicos if s.status == "cancelado")
-    em_andamento = sum(1 for s in servicos if s.status == "em_andamento")
-    
-    return {
-        "total_servicos": total,
-        "agendados": agendados,
-        "concluidos": concluidos,
-        "cancelados": cancelados,
-        "em_andamento": em_andamento
-    }
\ No newline at end of file
+    return cache.cached(
+        "banho_tosa:stats", ["banho_tosa", "banho_tosa_arquivo"], lambda: estatisticas(db), ttl=ttl_leitura(cache.LISTAS_CACHE_TTL)
+    )
\ No newline at end of file
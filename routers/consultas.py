@@ -1,12 +1,30 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status, Query
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import func
+from fastapi.responses import FileResponse, JSONResponse
 from sqlalchemy.orm import Session
-from database import SessionLocal
+from database import LEITURA, SessionLocal, nova_sessao, ttl_leitura
 import models
 import schemas
-from typing import List, Any, Dict
+import cache
+import projecoes
+import eventos
+import exclusao
+import anexos
+import arquivamento
+import concorrencia
+from normalizacao import (
+    TRANSICOES_CONSULTA, normalizar_status_consulta, origens_permitidas, reconhecer_status_consulta
+)
+from typing import List, Any, Dict, Optional
+import os
+from datetime import datetime
 
 router = APIRouter(prefix="/consultas", tags=["Consultas"])
 
+HISTORICO_PADRAO = 100
+HISTORICO_MAXIMO = 1000
+
 
 # --------------------------
 # DB Session
@@ -19,58 +37,31 @@ def get_db():
         db.close()
 
 
-# --------------------------
-# Normalização de ENUM (aceita maiúscula/minúscula)
-# --------------------------
-def normalizar_status_consulta(value: str) -> str:
-    """Normaliza status para minúscula"""
-    if not value:
-        return "agendada"
-    
-    v = str(value).strip().lower()
-    
-    # Mapeamento de variações aceitas
-    mapa = {
-        "agendada": "agendada",
-        "AGENDADA": "agendada",
-        "em_andamento": "em_andamento",
-        "EM_ANDAMENTO": "em_andamento",
-        "em andamento": "em_andamento",
-        "Em_Andamento": "em_andamento",
-        "concluida": "concluida",
-        "CONCLUIDA": "concluida",
-        "concluída": "concluida",
-        "cancelada": "cancelada",
-        "CANCELADA": "cancelada"
-    }
-    
-    if value in mapa:
-        return mapa[value]
-    
-    if v in mapa:
-        return mapa[v]
-    
-    # Se não encontrar, retorna o valor original normalizado
-    return v if v in ["agendada", "em_andamento", "concluida", "cancelada"] else "agendada"
+def _status_do_filtro(status: Optional[str]):
+    """?status= canônico (400 se desconhecido, em vez de virar o status padrão)"""
+    if not status:
+        return None
+    normalizado = reconhecer_status_consulta(status)
+    if normalizado is None:
+        raise HTTPException(status_code=400, detail=f"Status inválido: {status}")
+    return normalizado
 
 
-# --------------------------
-# Serializar consulta (evita erros de relacionamento)
-# --------------------------
-def serializar_consulta(consulta):
-    """Serializa consulta com segurança"""
-    return {
-        "id": consulta.id,
-        "data_hora": consulta.data_hora.isoformat() if consulta.data_hora else None,
-        "motivo": consulta.motivo,
-        "observacoes": consulta.observacoes,
-        "status": consulta.status,
-        "valor": consulta.valor,
-        "dono_id": consulta.dono_id,
-        "animal_id": consulta.animal_id,
-        "dono_nome": consulta.dono.nome if consulta.dono else None,
-        "animal_nome": consulta.animal.nome if consulta.animal else None
-    }
+def _expansao(fields, include):
+    """Valida ?fields= e ?include= (400 se algum nome for inválido)"""
+    try:
+        return projecoes.CONSULTA.expandir(fields, include)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def get_db_leitura():
+    """Sessão para relatórios: réplica/snapshot quando configurados (ver database.py)"""
+    db = nova_sessao(LEITURA)
+    try:
+        yield db
+    finally:
+        db.close()
 
 
 # --------------------------
@@ -81,12 +72,12 @@ def criar_consulta(data: schemas.ConsultaCreate, db: Session = Depends(get_db)):
     """Cria nova consulta"""
     
     # Validar dono
-    dono = db.query(models.Dono).filter(models.Dono.id == data.dono_id).first()
+    dono = cache.buscar_dono(db, data.dono_id)
     if not dono:
         raise HTTPException(404, "Dono não encontrado")
 
     # Validar animal
-    animal = db.query(models.Animal).filter(models.Animal.id == data.animal_id).first()
+    animal = cache.buscar_animal(db, data.animal_id)
     if not animal:
         raise HTTPException(404, "Animal não encontrado")
 
@@ -105,59 +96,183 @@ def criar_consulta(data: schemas.ConsultaCreate, db: Session = Depends(get_db)):
     )
     
     db.add(consulta)
+    db.flush()
+    consulta_id = consulta.id
     db.commit()
-    db.refresh(consulta)
-    
-    return serializar_consulta(consulta)
+    cache.invalidar_tabelas("consultas")
+
+    resposta = projecoes.CONSULTA.obter(db, consulta_id)
+    eventos.publicar("consultas", "criado", consulta_id)
+    return resposta
 
 
 # --------------------------
 # Listar todas
 # --------------------------
 @router.get("/")
-def listar_consultas(db: Session = Depends(get_db)):
-    """Lista todas as consultas"""
-    consultas = db.query(models.Consulta).all()
-    return [serializar_consulta(c) for c in consultas]
+def listar_consultas(
+    status: Optional[str] = Query(None),
+    fields: Optional[str] = Query(None, description="Campos separados por vírgula (ex.: id,nome)"),
+    include: Optional[str] = Query(None, description="Relações a incluir (ex.: dono,animal)"),
+    db: Session = Depends(get_db),
+):
+    """Lista todas as consultas (opcionalmente filtradas por status)"""
+    status_normalizado = _status_do_filtro(status)
+    expansao = _expansao(fields, include)
+
+    def calcular():
+        if status_normalizado:
+            return expansao.listar(db, models.Consulta.status == status_normalizado)
+        return expansao.listar(db)
+
+    return JSONResponse(
+        cache.cached(
+            f"consultas:lista:{status_normalizado or '*'}{expansao.chave}",
+            ["consultas", "donos", "animais", *expansao.tabelas],
+            calcular,
+        )
+    )
+
+
+# --------------------------
+# Histórico (tabela quente + arquivo)
+# --------------------------
+@router.get("/historico")
+def historico_consultas(
+    animal_id: Optional[int] = Query(None),
+    dono_id: Optional[int] = Query(None),
+    inicio: Optional[datetime] = Query(None),
+    fim: Optional[datetime] = Query(None),
+    status: Optional[str] = Query(None),
+    limite: int = Query(HISTORICO_PADRAO, ge=1, le=HISTORICO_MAXIMO),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_db),
+):
+    """
+    Histórico de consultas, da mais recente para a mais antiga
+    - Junta as consultas atuais e as arquivadas (ver arquivamento.py);
+      cada registro traz "arquivada"
+    """
+    status_normalizado = _status_do_filtro(status)
+
+    def criterios(modelo):
+        filtros = []
+        if animal_id is not None:
+            filtros.append(modelo.animal_id == animal_id)
+        if dono_id is not None:
+            filtros.append(modelo.dono_id == dono_id)
+        if inicio is not None:
+            filtros.append(modelo.data_hora >= inicio)
+        if fim is not None:
+            filtros.append(modelo.data_hora < fim)
+        if status_normalizado:
+            filtros.append(modelo.status == status_normalizado)
+        return filtros
+
+    return JSONResponse(
+        arquivamento.historico(
+            db, projecoes.CONSULTA, projecoes.CONSULTA_ARQUIVO, criterios, limite, offset
+        )
+    )
 
 
 # --------------------------
 # Buscar por ID
 # --------------------------
 @router.get("/{consulta_id}")
-def obter_consulta(consulta_id: int, db: Session = Depends(get_db)):
-    """Obtém consulta por ID"""
-    consulta = db.query(models.Consulta).filter(models.Consulta.id == consulta_id).first()
+def obter_consulta(
+    consulta_id: int,
+    response: Response,
+    fields: Optional[str] = Query(None, description="Campos separados por vírgula (ex.: id,nome)"),
+    include: Optional[str] = Query(None, description="Relações a incluir (ex.: dono,animal)"),
+    db: Session = Depends(get_db),
+):
+    """Obtém consulta por ID (também as arquivadas, com "arquivada": true); ETag com a versão"""
+    consulta = _expansao(fields, include).obter(db, consulta_id)
     if not consulta:
-        raise HTTPException(404, "Consulta não encontrada")
-    return serializar_consulta(consulta)
+        consulta = projecoes.CONSULTA_ARQUIVO.expandir(fields, include).obter(db, consulta_id)
+        if not consulta:
+            raise HTTPException(404, "Consulta não encontrada")
+        consulta["arquivada"] = True
+    if "version" in consulta:
+        response.headers["ETag"] = concorrencia.etag(consulta["version"])
+    return consulta
 
 
 # --------------------------
 # Atualizar
 # --------------------------
 @router.put("/{consulta_id}")
-def atualizar_consulta(consulta_id: int, dados: schemas.ConsultaUpdate, db: Session = Depends(get_db)):
-    """Atualiza consulta existente"""
-    
-    consulta = db.query(models.Consulta).filter(models.Consulta.id == consulta_id).first()
-    if not consulta:
-        raise HTTPException(404, "Consulta não encontrada")
-
+@router.patch("/{consulta_id}")
+def atualizar_consulta(
+    consulta_id: int,
+    dados: schemas.ConsultaUpdate,
+    response: Response,
+    versao: Optional[int] = Depends(concorrencia.versao_esperada),
+    db: Session = Depends(get_db),
+):
+    """
+    Atualiza consulta existente (PUT ou PATCH: só os campos enviados)
+    - Com If-Match, só grava se a consulta ainda estiver na versão lida
+      (409 se outra pessoa salvou antes; ver concorrencia.py)
+    - status segue as mesmas transições de PATCH /{id}/status (ou fica
+      como está); 409 se a transição não for permitida
+    """
     update_data = dados.dict(exclude_unset=True)
 
-    # Normalizar status se fornecido
+    condicao = None
     if "status" in update_data:
-        update_data["status"] = normalizar_status_consulta(update_data["status"])
+        novo = reconhecer_status_consulta(update_data["status"])
+        if novo is None:
+            raise HTTPException(400, f"Status inválido: {update_data['status']}")
+        update_data["status"] = novo
+        condicao = models.Consulta.status.in_([novo, *origens_permitidas(TRANSICOES_CONSULTA, novo)])
+
+    try:
+        return _atualizar(db, consulta_id, update_data, versao, response, condicao)
+    except concorrencia.CondicaoRecusada as e:
+        raise HTTPException(409, f"Transição de status não permitida: {e.registro['status']} -> {novo}")
+
+
+@router.patch("/{consulta_id}/status")
+def alterar_status_consulta(
+    consulta_id: int,
+    dados: schemas.StatusConsultaUpdate,
+    response: Response,
+    versao: Optional[int] = Depends(concorrencia.versao_esperada),
+    db: Session = Depends(get_db),
+):
+    """
+    Transição de status (ex.: agendada -> em_andamento -> concluida)
+    - As transições permitidas ficam em normalizacao.TRANSICOES_CONSULTA;
+      viram o filtro "status IN (origens)" do próprio UPDATE
+    - 409 se a transição não for permitida a partir do status atual
+    """
+    novo = reconhecer_status_consulta(dados.status)
+    if novo is None:
+        raise HTTPException(400, f"Status inválido: {dados.status}")
+
+    condicao = models.Consulta.status.in_(origens_permitidas(TRANSICOES_CONSULTA, novo))
+    try:
+        return _atualizar(db, consulta_id, {"status": novo}, versao, response, condicao)
+    except concorrencia.CondicaoRecusada as e:
+        raise HTTPException(409, f"Transição de status não permitida: {e.registro['status']} -> {novo}")
+
 
-    # Atualizar campos
-    for campo, valor in update_data.items():
-        setattr(consulta, campo, valor)
+def _atualizar(db: Session, consulta_id: int, valores: dict, versao, response: Response, condicao=None):
+    """UPDATE ... RETURNING único (com If-Match opcional); publica e responde com o ETag novo"""
+    try:
+        resposta = concorrencia.atualizar(db, projecoes.CONSULTA, consulta_id, valores, versao, condicao)
+    except concorrencia.ConflitoDeVersao as e:
+        raise concorrencia.conflito(e)
+    if resposta is None:
+        raise HTTPException(404, "Consulta não encontrada")
 
     db.commit()
-    db.refresh(consulta)
-    
-    return serializar_consulta(consulta)
+    cache.invalidar_tabelas("consultas")
+    eventos.publicar("consultas", "atualizado", consulta_id)
+    response.headers["ETag"] = concorrencia.etag(resposta["version"])
+    return resposta
 
 
 # --------------------------
@@ -165,36 +280,175 @@ def atualizar_consulta(consulta_id: int, dados: schemas.ConsultaUpdate, db: Sess
 # --------------------------
 @router.delete("/{consulta_id}", status_code=204)
 def deletar_consulta(consulta_id: int, db: Session = Depends(get_db)):
-    """Remove consulta"""
+    """Remove consulta (exclusão lógica)"""
     
-    consulta = db.query(models.Consulta).filter(models.Consulta.id == consulta_id).first()
-    if not consulta:
+    removidos = exclusao.excluir_consulta(db, consulta_id)
+    if not removidos["consultas"]:
         raise HTTPException(404, "Consulta não encontrada")
 
-    db.delete(consulta)
     db.commit()
+    exclusao.notificar(removidos)
+    return None
+
+
+# --------------------------
+# Anexos (exames, radiografias)
+# --------------------------
+def _consulta_ativa(db: Session, consulta_id: int, arquivadas: bool = False):
+    """404 se a consulta não existir; arquivadas=True aceita também as do arquivo (só leitura)"""
+    modelos = (models.Consulta, models.ConsultaArquivada) if arquivadas else (models.Consulta,)
+    for modelo in modelos:
+        existe = db.query(modelo.id).filter(modelo.id == consulta_id, modelo.deleted_at.is_(None)).first()
+        if existe:
+            return
+    raise HTTPException(404, "Consulta não encontrada")
+
+
+def _anexo(db: Session, consulta_id: int, anexo_id: int, arquivadas: bool = False) -> models.Anexo:
+    _consulta_ativa(db, consulta_id, arquivadas)
+    anexo = db.query(models.Anexo).filter(
+        models.Anexo.id == anexo_id,
+        models.Anexo.consulta_id == consulta_id,
+        models.Anexo.deleted_at.is_(None),
+    ).first()
+    if not anexo:
+        raise HTTPException(404, "Anexo não encontrado")
+    return anexo
+
+
+# Corpo lido à mão (anexos.receber_upload): o schema vai só para a documentação
+UPLOAD_OPENAPI = {
+    "requestBody": {
+        "required": True,
+        "content": {"multipart/form-data": {"schema": {
+            "type": "object",
+            "properties": {"arquivo": {"type": "string", "format": "binary"}},
+            "required": ["arquivo"],
+        }}},
+    }
+}
+
+
+@router.post("/{consulta_id}/anexos", status_code=201, openapi_extra=UPLOAD_OPENAPI)
+async def enviar_anexo(consulta_id: int, request: Request):
+    """
+    Anexa um arquivo (PDF, JPEG, PNG, WebP ou DICOM) à consulta
+    - multipart/form-data com o campo "arquivo", lido direto do stream:
+      gravado uma vez só, em blocos, e deduplicado pelo SHA-256 (ver anexos.py)
+    - 413 pelo Content-Length antes de ler o corpo, ou ao passar do limite
+    """
+    db = SessionLocal()
+    try:
+        await run_in_threadpool(_consulta_ativa, db, consulta_id)
+        try:
+            recebido = await anexos.receber_upload(request)
+        except anexos.AnexoGrandeDemais as e:
+            raise HTTPException(413, str(e))
+        except anexos.TipoNaoPermitido as e:
+            raise HTTPException(415, str(e))
+        except anexos.UploadInvalido as e:
+            raise HTTPException(400, str(e))
+        if recebido["tamanho"] == 0:
+            raise HTTPException(400, "Arquivo vazio")
+
+        anexo = models.Anexo(
+            consulta_id=consulta_id,
+            nome_arquivo=os.path.basename(recebido["nome_arquivo"] or "anexo")[:255],
+            content_type=recebido["content_type"],
+            tamanho=recebido["tamanho"],
+            sha256=recebido["sha256"],
+        )
+
+        def gravar_metadados():
+            db.add(anexo)
+            db.commit()
+            return anexos.serializar(anexo)
+
+        resposta = await run_in_threadpool(gravar_metadados)
+    finally:
+        db.close()
+
+    eventos.publicar("anexos", "criado", anexo.id)
+    return resposta
+
+
+@router.get("/{consulta_id}/anexos")
+def listar_anexos(consulta_id: int, db: Session = Depends(get_db)):
+    """Lista os anexos da consulta (só metadados)"""
+    _consulta_ativa(db, consulta_id, arquivadas=True)
+    lista = (
+        db.query(models.Anexo)
+        .filter(models.Anexo.consulta_id == consulta_id, models.Anexo.deleted_at.is_(None))
+        .order_by(models.Anexo.id)
+        .all()
+    )
+    return [anexos.serializar(anexo) for anexo in lista]
+
+
+@router.get("/{consulta_id}/anexos/{anexo_id}")
+def baixar_anexo(consulta_id: int, anexo_id: int, request: Request, db: Session = Depends(get_db)):
+    """
+    Conteúdo do anexo
+    - Aceita Range (206), para visualizadores que leem o arquivo por partes
+    - ETag é o SHA-256: o conteúdo de um anexo nunca muda
+    """
+    anexo = _anexo(db, consulta_id, anexo_id, arquivadas=True)
+    caminho = anexos.caminho(anexo.sha256)
+    try:
+        stat_result = os.stat(caminho)
+    except FileNotFoundError:
+        raise HTTPException(404, "Arquivo do anexo não encontrado")
+
+    headers = {"ETag": f'"{anexo.sha256}"', "Cache-Control": "private, max-age=31536000, immutable"}
+    if request.headers.get("if-none-match") == headers["ETag"]:
+        return Response(status_code=304, headers=headers)
+    return FileResponse(
+        caminho,
+        media_type=anexo.content_type,
+        filename=anexo.nome_arquivo,
+        content_disposition_type="inline",
+        stat_result=stat_result,
+        headers=headers,
+    )
+
+
+@router.delete("/{consulta_id}/anexos/{anexo_id}", status_code=204)
+def remover_anexo(consulta_id: int, anexo_id: int, db: Session = Depends(get_db)):
+    """Remove o anexo (exclusão lógica; o arquivo sai do disco na purga)"""
+    _anexo(db, consulta_id, anexo_id)
+    removidos = exclusao.excluir(db, models.Anexo, anexo_id)
+    db.commit()
+    exclusao.notificar(removidos)
     return None
 
 
 # --------------------------
 # Dashboard (estatísticas)
 # --------------------------
+def estatisticas(db: Session) -> Dict[str, Any]:
+    """Contagem por status, incluindo o arquivo (também usada por /dashboard/bootstrap)"""
+    # GROUP BY só nos índices de status, sem carregar as consultas
+    contagem = {}
+    for modelo in (models.Consulta, models.ConsultaArquivada):
+        for status_consulta, n in (
+            db.query(modelo.status, func.count(modelo.id))
+            .filter(modelo.deleted_at.is_(None))
+            .group_by(modelo.status)
+        ):
+            contagem[status_consulta] = contagem.get(status_consulta, 0) + n
+
+    return {
+        "total_consultas": sum(contagem.values()),
+        "agendadas": contagem.get("agendada", 0),
+        "concluidas": contagem.get("concluida", 0),
+        "canceladas": contagem.get("cancelada", 0),
+        "em_andamento": contagem.get("em_andamento", 0)
+    }
+
+
 @router.get("/stats/dashboard")
-def stats_dashboard(db: Session = Depends(get_db)) -> Dict[str, Any]:
+def stats_dashboard(db: Session = Depends(get_db_leitura)) -> Dict[str, Any]:
     """Retorna estatísticas do dashboard"""
-    
-    consultas = db.query(models.Consulta).all()
-    
-    total = len(consultas)
-    agendadas = sum(1 for c in consultas if c.status == "agendada")
-    concluidas = sum(1 for c in consultas if c.status == "concluida")
-    canceladas = sum(1 for c in consultas if c.status == "cancelada")
-    em_andamento = sum(1 for c in consultas if c.status == "em_andamento")
-    
-    return {
-        "total_consultas": total,
-        "agendadas": agendadas,
-        "concluidas": concluidas,
-        "canceladas": canceladas,
-        "em_andamento": em_andamento
-    }
\ No newline at end of file
+    return cache.cached(
+        "consultas:stats", ["consultas", "consultas_arquivo"], lambda: estatisticas(db), ttl=ttl_leitura(cache.LISTAS_CACHE_TTL)
+    )
\ No newline at end of file
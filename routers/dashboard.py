@@ -0,0 +1,148 @@
+import contextvars
+import os
+from datetime import date, datetime, time, timedelta
+from anyio import CapacityLimiter, create_task_group, from_thread, to_thread
+from anyio.lowlevel import RunVar
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import JSONResponse
+from sqlalchemy import func, select
+from database import engine, nova_sessao
+from starlette.concurrency import run_in_threadpool
+import models
+import cache
+import projecoes
+from routers import banho_tosa, consultas
+from routers.auth import get_current_user
+
+router = APIRouter(prefix="/dashboard", tags=["Dashboard"])
+
+# Tamanho padrão da primeira página de cada lista
+PAGINA_PADRAO = 500
+PAGINA_MAXIMA = 5000
+
+# Tabelas de que o bootstrap depende (versões embutidas na chave de cache)
+TABELAS = ["donos", "animais", "vacinas", "consultas", "banho_tosa", "consultas_arquivo", "banho_tosa_arquivo"]
+
+LISTAS = {
+    "donos": projecoes.DONO,
+    "animais": projecoes.ANIMAL,
+    "vacinas": projecoes.VACINA,
+    "consultas": projecoes.CONSULTA,
+    "banho_tosa": projecoes.BANHO_TOSA,
+}
+
+CANCELADOS = {"cancelada", "cancelado"}
+
+# Blocos do bootstrap rodando ao mesmo tempo no processo (somando todas as
+# requisições): cabem no pool de conexões do banco e deixam o overflow para
+# as outras rotas. PETCARE_DASHBOARD_PARALELISMO sobrescreve
+PARALELISMO = int(os.getenv("PETCARE_DASHBOARD_PARALELISMO", "0")) or engine.pool.size()
+
+# Um limitador por event loop (o CapacityLimiter pertence ao loop que o usa)
+_limitador = RunVar("dashboard_limitador")
+
+
+def _limitador_do_loop() -> CapacityLimiter:
+    try:
+        return _limitador.get()
+    except LookupError:
+        limitador = CapacityLimiter(PARALELISMO)
+        _limitador.set(limitador)
+        return limitador
+
+
+def _com_sessao(funcao, *args):
+    """Executa o bloco numa sessão própria (conexões separadas rodam em paralelo)"""
+    db = nova_sessao()
+    try:
+        return funcao(db, *args)
+    finally:
+        db.close()
+
+
+def _pagina(db, projecao, limite: int) -> dict:
+    """Primeira página da listagem, com o total para o cliente saber se está completa"""
+    total = db.execute(
+        select(func.count()).select_from(projecao.modelo).where(projecao.modelo.deleted_at.is_(None))
+    ).scalar()
+    serializar = projecao.serializar
+    itens = [serializar(row) for row in db.execute(projecao.select().limit(limite))]
+    return {"itens": itens, "total": total, "completo": len(itens) >= total}
+
+
+def _agenda(db, dia: date) -> list:
+    """Consultas e serviços do dia (exceto cancelados), em ordem de horário"""
+    inicio = datetime.combine(dia, time.min)
+    fim = inicio + timedelta(days=1)
+    agenda = []
+    for tipo, modelo, projecao in (
+        ("consulta", models.Consulta, projecoes.CONSULTA),
+        ("banho_tosa", models.BanhoTosa, projecoes.BANHO_TOSA),
+    ):
+        # Faixa no índice parcial ix_<tabela>_data_hora_ativos
+        for registro in projecao.listar(db, modelo.data_hora >= inicio, modelo.data_hora < fim):
+            if registro["status"] not in CANCELADOS:
+                agenda.append({"tipo": tipo, **registro})
+    agenda.sort(key=lambda item: item["data_hora"])
+    return agenda
+
+
+async def _montar(contexto: contextvars.Context, limite: int, dia: date) -> dict:
+    """
+    Dispara os blocos independentes ao mesmo tempo (task group da requisição) e espera todos
+    - Cada bloco roda numa thread do anyio, sob o limitador do processo
+    - contexto: o da requisição (filial atual, ver database.usar_filial),
+      copiado para cada bloco
+    """
+    blocos = {
+        "stats_consultas": (consultas.estatisticas,),
+        "stats_banho_tosa": (banho_tosa.estatisticas,),
+        "agenda_hoje": (_agenda, dia),
+    }
+    for nome, projecao in LISTAS.items():
+        blocos[nome] = (_pagina, projecao, limite)
+
+    resultados = {}
+    limitador = _limitador_do_loop()
+
+    async def executar(nome, funcao, *args):
+        resultados[nome] = await to_thread.run_sync(
+            contexto.copy().run, _com_sessao, funcao, *args, limiter=limitador
+        )
+
+    async with create_task_group() as grupo:
+        for nome, bloco in blocos.items():
+            grupo.start_soon(executar, nome, *bloco)
+    return {nome: resultados[nome] for nome in blocos}
+
+
+def _montar_em_paralelo(limite: int, dia: date) -> dict:
+    """Chamado por cache.cached numa thread do anyio: volta ao event loop para o task group"""
+    return from_thread.run(_montar, contextvars.copy_context(), limite, dia)
+
+
+# --------------------------
+# Bootstrap do frontend
+# --------------------------
+@router.get("/bootstrap")
+async def bootstrap(
+    limite: int = Query(PAGINA_PADRAO, ge=1, le=PAGINA_MAXIMA),
+    current_user: models.User = Depends(get_current_user),
+):
+    """
+    Tudo que a primeira tela precisa numa única requisição
+    - Usuário logado, estatísticas de consultas e banho/tosa, agenda do dia
+      e a primeira página de cada lista ({"itens", "total", "completo"})
+    - As queries rodam em paralelo, cada uma na sua conexão, no máximo
+      PARALELISMO ao mesmo tempo no processo
+    - Em cache pelas versões das tabelas (o usuário fica fora do cache)
+    """
+    hoje = date.today()
+    dados = await run_in_threadpool(
+        cache.cached,
+        f"dashboard:bootstrap:{limite}:{hoje.isoformat()}",
+        TABELAS,
+        lambda: _montar_em_paralelo(limite, hoje),
+    )
+    usuario = {"id": current_user.id, "nome": current_user.nome, "email": current_user.email}
+    return JSONResponse({"usuario": usuario, "data": hoje.isoformat(), **dados})
@@ -0,0 +1,69 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import FileResponse
+from typing import Optional
+import diagnostico
+from routers.auth import get_admin_user
+
+router = APIRouter(prefix="/debug", tags=["Diagnóstico"], dependencies=[Depends(get_admin_user)])
+
+AGRUPAMENTOS = "^(lineno|filename|traceback)$"
+
+
+# --------------------------
+# Perfis de requisições (X-Perfil: 1)
+# --------------------------
+@router.get("/perfis")
+def listar_perfis():
+    """Perfis gravados pelo perfilador, do mais recente para o mais antigo"""
+    return diagnostico.listar_perfis()
+
+
+@router.get("/perfis/{nome}")
+def baixar_perfil(nome: str):
+    """Perfil em collapsed stacks (flamegraph.pl, speedscope, inferno)"""
+    caminho = diagnostico.caminho_perfil(nome)
+    if caminho is None:
+        raise HTTPException(404, "Perfil não encontrado")
+    return FileResponse(caminho, media_type="text/plain; charset=utf-8", filename=nome)
+
+
+# --------------------------
+# Memória (tracemalloc)
+# --------------------------
+@router.get("/memoria")
+def estado_memoria():
+    """Memória rastreada, pico e snapshots guardados (neste processo)"""
+    return diagnostico.estado_memoria()
+
+
+@router.post("/memoria", status_code=201)
+def tirar_snapshot(
+    agrupar: str = Query("lineno", pattern=AGRUPAMENTOS),
+    limite: int = Query(20, ge=1, le=200),
+):
+    """
+    Tira e guarda um snapshot
+    - O primeiro liga o tracemalloc: as alocações anteriores a ele não aparecem
+    """
+    return diagnostico.tirar_snapshot(agrupar, limite)
+
+
+@router.get("/memoria/diferenca")
+def comparar_snapshots(
+    de: int = Query(..., description="Snapshot de referência"),
+    para: Optional[int] = Query(None, description="Snapshot comparado (padrão: estado atual)"),
+    agrupar: str = Query("lineno", pattern=AGRUPAMENTOS),
+    limite: int = Query(20, ge=1, le=200),
+):
+    """Onde as alocações cresceram entre os snapshots, da maior diferença para a menor"""
+    try:
+        return diagnostico.comparar(de, para, agrupar, limite)
+    except KeyError:
+        raise HTTPException(404, "Snapshot não encontrado")
+
+
+@router.delete("/memoria", status_code=204)
+def parar_memoria():
+    """Desliga o tracemalloc e descarta os snapshots"""
+    diagnostico.parar_memoria()
+    return None
@@ -1,7 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
+from typing import Optional
 from database import SessionLocal
 import models, schemas
+import cache
+import projecoes
+import eventos
+import exclusao
+import duplicados
+import concorrencia
 
 router = APIRouter(prefix="/donos", tags=["Donos"])
 
@@ -16,6 +24,14 @@ def get_db():
     finally:
         db.close()
 
+
+def _expansao(fields, include):
+    """Valida ?fields= e ?include= (400 se algum nome for inválido)"""
+    try:
+        return projecoes.DONO.expandir(fields, include)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 # CREATE - Criar novo dono
 @router.post("/", response_model=schemas.Dono, status_code=status.HTTP_201_CREATED)
 def criar_dono(dono: schemas.DonoCreate, db: Session = Depends(get_db)):
@@ -27,67 +43,158 @@ def criar_dono(dono: schemas.DonoCreate, db: Session = Depends(get_db)):
     novo_dono = models.Dono(**dono.dict())
     db.add(novo_dono)
     db.commit()
+    cache.invalidar_tabelas("donos")
     db.refresh(novo_dono)
+    eventos.publicar("donos", "criado", novo_dono.id)
     return novo_dono
 
 # READ - Listar todos os donos (simples, sem relacionamentos para evitar erro)
 @router.get("/")
-def listar_donos(db: Session = Depends(get_db)):
+def listar_donos(
+    fields: Optional[str] = Query(None, description="Campos separados por vírgula (ex.: id,nome)"),
+    include: Optional[str] = Query(None, description="Relações a incluir (ex.: animais)"),
+    db: Session = Depends(get_db),
+):
     """
     Lista todos os donos cadastrados no sistema
     - Retorna lista simples sem relacionamentos para evitar erros de serialização
+    - ?fields= limita os campos e ?include=animais embute os animais
     """
+    expansao = _expansao(fields, include)
+
+    def calcular():
+        return expansao.listar(db)
+
     try:
-        donos = db.query(models.Dono).all()
-        return [{"id": dono.id, "nome": dono.nome, "telefone": dono.telefone} for dono in donos]
+        return JSONResponse(cache.cached(f"donos:lista{expansao.chave}", ["donos", *expansao.tabelas], calcular))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao listar donos: {str(e)}")
 
+# DUPLICADOS - Pares de donos provavelmente duplicados
+@router.get("/duplicados")
+def listar_duplicados(
+    limiar: float = Query(duplicados.LIMIAR_SIMILARIDADE, ge=0, le=1),
+    limite: int = Query(500, ge=1, le=5000),
+    db: Session = Depends(get_db),
+):
+    """
+    Sugere pares de donos duplicados (mesmo telefone ou nome parecido)
+    - Compara só donos do mesmo bloco (telefone ou chave fonética do nome)
+    - limiar: similaridade mínima dos nomes (trigramas) para pares só por nome
+    """
+    return duplicados.candidatos(db, limiar=limiar, limite=limite)
+
+# MESCLAR - Unificar donos duplicados
+@router.post("/mesclar")
+def mesclar_donos(dados: schemas.MesclagemDonos, db: Session = Depends(get_db)):
+    """
+    Mescla donos duplicados numa única transação
+    - Animais, consultas e serviços passam para o dono mantido
+    - Os donos removidos recebem exclusão lógica
+    """
+    grupos = [(g.manter_id, g.remover_ids) for g in dados.grupos]
+    try:
+        resultado = duplicados.mesclar(db, grupos)
+    except duplicados.MesclagemInvalida as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
+
+    db.commit()
+    duplicados.notificar(resultado)
+    return resultado
+
 # READ - Obter dono por ID (simples)
 @router.get("/{dono_id}")
-def obter_dono(dono_id: int, db: Session = Depends(get_db)):
+def obter_dono(
+    dono_id: int,
+    response: Response,
+    fields: Optional[str] = Query(None, description="Campos separados por vírgula (ex.: id,nome)"),
+    include: Optional[str] = Query(None, description="Relações a incluir (ex.: animais)"),
+    db: Session = Depends(get_db),
+):
     """
     Obtém um dono específico pelo ID
     - Retorna 404 se o dono não for encontrado
+    - ETag com a versão, para o If-Match do PUT
     """
-    dono = db.query(models.Dono).filter(models.Dono.id == dono_id).first()
+    if fields or include:
+        dono = _expansao(fields, include).obter(db, dono_id)
+        if not dono:
+            raise HTTPException(status_code=404, detail="Dono não encontrado")
+        if "version" in dono:
+            response.headers["ETag"] = concorrencia.etag(dono["version"])
+        return dono
+
+    dono = cache.buscar_dono(db, dono_id)
     if not dono:
         raise HTTPException(status_code=404, detail="Dono não encontrado")
     
-    return {"id": dono.id, "nome": dono.nome, "telefone": dono.telefone}
+    response.headers["ETag"] = concorrencia.etag(dono.version)
+    return dono._asdict()
+
+def _atualizar(db: Session, dono_id: int, valores: dict, versao: Optional[int], response: Response):
+    """UPDATE ... RETURNING único (com If-Match opcional); publica e responde com o ETag novo"""
+    # UPDATE fora do ORM: as chaves de comparação vão junto
+    valores = {**valores, **models.chaves_dono(valores)}
+    try:
+        resposta = concorrencia.atualizar(db, projecoes.DONO, dono_id, valores, versao)
+    except concorrencia.ConflitoDeVersao as e:
+        raise concorrencia.conflito(e)
+    if resposta is None:
+        raise HTTPException(status_code=404, detail="Dono não encontrado")
+
+    db.commit()
+    cache.invalidar_dono(dono_id)
+    cache.invalidar_tabelas("donos")
+    eventos.publicar("donos", "atualizado", dono_id)
+    response.headers["ETag"] = concorrencia.etag(resposta["version"])
+    return resposta
 
 # UPDATE - Atualizar dono existente
 @router.put("/{dono_id}")
-def atualizar_dono(dono_id: int, dados: schemas.DonoCreate, db: Session = Depends(get_db)):
+def atualizar_dono(
+    dono_id: int,
+    dados: schemas.DonoCreate,
+    response: Response,
+    versao: Optional[int] = Depends(concorrencia.versao_esperada),
+    db: Session = Depends(get_db),
+):
     """
     Atualiza os dados de um dono existente
-    - Valida se o dono existe antes de atualizar
-    - Atualiza apenas os campos fornecidos
+    - Com If-Match, só grava se o dono ainda estiver na versão lida
+      (409 se outra pessoa salvou antes; ver concorrencia.py)
+    - Retorna 404 se o dono não existir
     """
-    dono = db.query(models.Dono).filter(models.Dono.id == dono_id).first()
-    if not dono:
-        raise HTTPException(status_code=404, detail="Dono não encontrado")
+    return _atualizar(db, dono_id, dados.dict(), versao, response)
 
-    # Atualiza os campos do dono com os novos dados
-    for campo, valor in dados.dict().items():
-        setattr(dono, campo, valor)
-    
-    db.commit()
-    db.refresh(dono)
-    return {"id": dono.id, "nome": dono.nome, "telefone": dono.telefone}
+# PATCH - Atualização parcial
+@router.patch("/{dono_id}")
+def atualizar_dono_parcial(
+    dono_id: int,
+    dados: schemas.DonoUpdate,
+    response: Response,
+    versao: Optional[int] = Depends(concorrencia.versao_esperada),
+    db: Session = Depends(get_db),
+):
+    """
+    Altera só os campos enviados, num único UPDATE ... RETURNING
+    - Aceita If-Match como o PUT
+    """
+    return _atualizar(db, dono_id, dados.dict(exclude_unset=True), versao, response)
 
 # DELETE - Remover dono
 @router.delete("/{dono_id}", status_code=status.HTTP_204_NO_CONTENT)
 def deletar_dono(dono_id: int, db: Session = Depends(get_db)):
     """
-    Remove um dono do sistema
+    Remove um dono do sistema (exclusão lógica)
     - Valida se o dono existe antes de deletar
+    - Remove em cascata os animais, vacinas, consultas e serviços do dono
     - Retorna 204 No Content em caso de sucesso
     """
-    dono = db.query(models.Dono).filter(models.Dono.id == dono_id).first()
-    if not dono:
+    removidos = exclusao.excluir_dono(db, dono_id)
+    if not removidos["donos"]:
         raise HTTPException(status_code=404, detail="Dono não encontrado")
     
-    db.delete(dono)
     db.commit()
+    exclusao.notificar(removidos)
     return None
\ No newline at end of file
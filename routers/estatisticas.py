@@ -0,0 +1,19 @@
+from fastapi import APIRouter, Depends
+import cache
+from database import pool_filiais, roteador
+from routers.auth import get_admin_user
+
+# Estatísticas internas do processo: só administradores da matriz (como /debug)
+router = APIRouter(tags=["Diagnóstico"], dependencies=[Depends(get_admin_user)])
+
+
+@router.get("/cache/stats")
+def cache_stats():
+    """Taxa de acerto dos caches de entidades (donos/animais)"""
+    return cache.estatisticas()
+
+
+@router.get("/database/stats")
+def database_stats():
+    """Destino das leituras de relatórios (primário, réplica ou snapshot) e engines das filiais"""
+    return {**roteador.estatisticas(), "filiais": pool_filiais.estatisticas()}
@@ -0,0 +1,132 @@
+import asyncio
+import json
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+
+import cache
+import eventos
+from routers.auth import get_admin_user
+from security import claims_da_requisicao
+
+router = APIRouter(prefix="/eventos", tags=["Eventos"])
+
+# Intervalo entre comentários de keep-alive (e verificações entre workers)
+KEEPALIVE_SEGUNDOS = 15
+VERIFICACAO_SEGUNDOS = 2
+# Espera sugerida ao navegador antes de reconectar
+RETRY_MS = 3000
+
+
+def _mensagem(evento_sse: str, dados: dict, id: str = None) -> str:
+    linhas = [f"id: {id}"] if id else []
+    linhas.append(f"event: {evento_sse}")
+    linhas.append(f"data: {json.dumps(dados, separators=(',', ':'))}")
+    return "\n".join(linhas) + "\n\n"
+
+
+def _mudanca(evento: eventos.Evento) -> str:
+    dados = {"tabela": evento.tabela, "acao": evento.acao, "id": evento.id}
+    return _mensagem("mudanca", dados, eventos.id_evento(evento))
+
+
+def _versoes() -> dict:
+    """Versões de tabela no backend de cache + eventos locais já publicados"""
+    return {tabela: cache.versao(tabela) for tabela in eventos.TABELAS}, eventos.publicados_por_tabela()
+
+
+async def _fluxo(ultimo_id: Optional[str]):
+    """
+    Gera o feed SSE de uma conexão
+    - Reenvia o que ficou no histórico desde ultimo_id, ou pede resync
+    - Com backend de cache compartilhado, avisa "invalidado" para tabelas
+      alteradas por outros workers (versão mudou sem evento local)
+    """
+    assinatura, pendentes = eventos.assinar(ultimo_id)
+    compartilhado = not isinstance(cache.get_backend(), cache.MemoryBackend)
+    intervalo = VERIFICACAO_SEGUNDOS if compartilhado else KEEPALIVE_SEGUNDOS
+    try:
+        yield f"retry: {RETRY_MS}\n\n"
+        if pendentes is None:
+            yield _mensagem("resync", {"motivo": "historico"})
+        else:
+            for evento in pendentes:
+                yield _mudanca(evento)
+
+        if compartilhado:
+            versoes, locais = await run_in_threadpool(_versoes)
+        ociosos = 0.0
+
+        while True:
+            try:
+                evento = await asyncio.wait_for(assinatura.fila.get(), timeout=intervalo)
+            except asyncio.TimeoutError:
+                evento = None
+
+            if assinatura.encerrada:
+                return
+
+            if assinatura.perdeu_eventos:
+                assinatura.perdeu_eventos = False
+                while not assinatura.fila.empty():
+                    assinatura.fila.get_nowait()
+                yield _mensagem("resync", {"motivo": "fila"})
+                continue
+
+            if evento is not None:
+                ociosos = 0.0
+                yield _mudanca(evento)
+                continue
+
+            if compartilhado:
+                novas_versoes, novos_locais = await run_in_threadpool(_versoes)
+                alteradas = [
+                    tabela for tabela in eventos.TABELAS
+                    if novas_versoes[tabela] - versoes[tabela] > novos_locais[tabela] - locais[tabela]
+                ]
+                versoes, locais = novas_versoes, novos_locais
+                if alteradas:
+                    ociosos = 0.0
+                    yield _mensagem("invalidado", {"tabelas": alteradas})
+                    continue
+
+            ociosos += intervalo
+            if ociosos >= KEEPALIVE_SEGUNDOS:
+                ociosos = 0.0
+                yield ": keep-alive\n\n"
+    finally:
+        eventos.cancelar(assinatura)
+
+
+@router.get("/")
+async def feed_eventos(request: Request, last_event_id: Optional[str] = Header(None)):
+    """
+    Feed de alterações em Server-Sent Events (text/event-stream)
+    - Exige token (header Authorization ou ?token=, já que o EventSource
+      não envia headers); só chegam os eventos da filial do token
+    - event: mudanca    {"tabela", "acao", "id"} por registro alterado (o
+      registro em si é buscado pela API, com o mesmo token)
+    - event: invalidado {"tabelas"} quando outro worker alterou as tabelas
+    - event: resync     o cliente perdeu eventos e deve recarregar as listas
+    - Reconexões com Last-Event-ID recebem os eventos perdidos
+    """
+    # Token decodificado pelo ClaimsMiddleware; a filial já foi aplicada pelo FilialMiddleware
+    if (claims_da_requisicao(request.scope) or {}).get("user_id") is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token inválido",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return StreamingResponse(
+        _fluxo(last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/stats", dependencies=[Depends(get_admin_user)])
+def stats_eventos():
+    """Conexões abertas e eventos publicados neste processo (administradores)"""
+    return eventos.estatisticas()
@@ -0,0 +1,98 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import func, select
+from database import LEITURA, filial_atual, nova_sessao, pool_filiais, ttl_leitura
+import models
+import cache
+import filiais
+from routers import banho_tosa, consultas
+from routers.auth import get_current_user
+
+router = APIRouter(prefix="/filiais", tags=["Filiais"])
+
+# Filiais consultadas ao mesmo tempo no relatório da rede
+PARALELISMO = int(os.getenv("PETCARE_FILIAIS_PARALELISMO", "8"))
+# Espera máxima (segundos) pela resposta de cada filial
+TEMPO_MAXIMO = 30
+
+TABELAS = ["donos", "animais", "vacinas", "consultas", "banho_tosa", "consultas_arquivo", "banho_tosa_arquivo"]
+CONTADAS = [models.Dono, models.Animal, models.Vacina]
+
+_executor = ThreadPoolExecutor(max_workers=PARALELISMO, thread_name_prefix="filiais")
+
+
+def _somente_matriz():
+    if filial_atual() is not None:
+        raise HTTPException(403, "Disponível apenas para usuários da matriz")
+
+
+def _resumo(db) -> dict:
+    """Totais de uma filial (mesmo formato em todas, para poder somar)"""
+    resumo = {
+        modelo.__tablename__: db.execute(
+            select(func.count()).select_from(modelo).where(modelo.deleted_at.is_(None))
+        ).scalar()
+        for modelo in CONTADAS
+    }
+    resumo["consultas"] = consultas.estatisticas(db)
+    resumo["banho_tosa"] = banho_tosa.estatisticas(db)
+    return resumo
+
+
+def _resumo_da_filial(nome: str) -> dict:
+    """Roda numa thread do pool, no banco e no escopo de cache da filial"""
+    with filiais.escopo(nome):
+        db = nova_sessao(LEITURA)
+        try:
+            return cache.cached(
+                "filiais:resumo", TABELAS, lambda: _resumo(db), ttl=ttl_leitura(cache.LISTAS_CACHE_TTL)
+            )
+        finally:
+            db.close()
+
+
+def _somar(total: dict, parcial: dict):
+    for chave, valor in parcial.items():
+        if isinstance(valor, dict):
+            _somar(total.setdefault(chave, {}), valor)
+        else:
+            total[chave] = total.get(chave, 0) + valor
+
+
+# --------------------------
+# Filiais
+# --------------------------
+@router.get("/")
+def listar_filiais(current_user: models.User = Depends(get_current_user)):
+    """Matriz e filiais conhecidas, com o estado do pool de engines"""
+    _somente_matriz()
+    return {"filiais": filiais.listar(), "pool": pool_filiais.estatisticas()}
+
+
+# --------------------------
+# Relatório da rede
+# --------------------------
+@router.get("/relatorio")
+def relatorio(current_user: models.User = Depends(get_current_user)):
+    """
+    Totais da rede inteira
+    - Uma consulta por filial, todas em paralelo, cada uma no seu banco
+    - Cada parte fica em cache pelas versões das tabelas da própria filial
+    - Filiais que falharem (ou passarem de TEMPO_MAXIMO) vão para "falhas"
+      e ficam fora do total
+    """
+    _somente_matriz()
+    futuros = {nome: _executor.submit(_resumo_da_filial, nome) for nome in filiais.listar()}
+
+    por_filial, falhas = {}, {}
+    for nome, futuro in futuros.items():
+        try:
+            por_filial[nome] = futuro.result(timeout=TEMPO_MAXIMO)
+        except Exception as e:
+            falhas[nome] = str(e) or type(e).__name__
+
+    total = {}
+    for resumo in por_filial.values():
+        _somar(total, resumo)
+    return {"total": total, "por_filial": por_filial, "falhas": falhas}
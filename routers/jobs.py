@@ -0,0 +1,139 @@
+import csv
+import io
+import os
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Request, Response, UploadFile
+from fastapi.responses import FileResponse, JSONResponse
+from sqlalchemy.orm import Session
+from database import engine, filial_atual
+import concorrencia
+import models
+import schemas
+import jobs
+from routers.auth import get_admin_user
+from typing import Optional
+
+router = APIRouter(prefix="/jobs", tags=["Jobs"])
+
+# Tamanho máximo do CSV de importação (os registros vão para os parâmetros do job)
+MAX_CSV_IMPORTACAO = 5 * 1024 * 1024
+
+
+# --------------------------
+# DB Session
+# --------------------------
+def get_db():
+    # A fila fica no banco da matriz (ver jobs._engine), também para as filiais
+    db = Session(bind=engine, autoflush=False)
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def _buscar(db: Session, job_id: int):
+    job = db.get(models.Job, job_id)
+    # Jobs de outra filial não existem para esta
+    if job is None or job.filial != filial_atual():
+        raise HTTPException(404, "Job não encontrado")
+    return job
+
+
+# --------------------------
+# Enfileirar
+# --------------------------
+@router.post("/", status_code=202)
+def criar_job(dados: schemas.JobCreate, db: Session = Depends(get_db)):
+    """Enfileira um job e retorna na hora (acompanhe em GET /jobs/{id})"""
+    try:
+        job = jobs.enfileirar(db, dados.tipo, dados.parametros)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    return jobs.serializar(job)
+
+
+@router.post("/importar-donos", status_code=202)
+def importar_donos_csv(arquivo: UploadFile = File(...), db: Session = Depends(get_db)):
+    """
+    Enfileira a importação de um CSV enviado (colunas nome, telefone)
+    - O CSV é lido aqui; o job recebe só os registros
+    """
+    try:
+        conteudo = arquivo.file.read(MAX_CSV_IMPORTACAO + 1)
+        if len(conteudo) > MAX_CSV_IMPORTACAO:
+            raise HTTPException(413, f"CSV maior que {MAX_CSV_IMPORTACAO // (1024 * 1024)} MB")
+        linhas = list(csv.DictReader(io.StringIO(conteudo.decode("utf-8-sig"))))
+    except (UnicodeDecodeError, csv.Error):
+        raise HTTPException(400, "CSV inválido (use UTF-8 com as colunas nome, telefone)")
+    if not linhas or "nome" not in linhas[0]:
+        raise HTTPException(400, "CSV sem a coluna nome")
+
+    donos = [{"nome": linha.get("nome"), "telefone": linha.get("telefone")} for linha in linhas]
+    return jobs.serializar(jobs.enfileirar(db, "importar_donos", {"donos": donos}))
+
+
+# --------------------------
+# Listar
+# --------------------------
+@router.get("/")
+def listar_jobs(
+    status: Optional[str] = Query(None),
+    limite: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_db),
+):
+    """Lista os jobs mais recentes (opcionalmente filtrados por status)"""
+    query = db.query(models.Job).filter(models.Job.filial.is_not_distinct_from(filial_atual()))
+    if status:
+        query = query.filter(models.Job.status == status)
+    return [jobs.serializar(job) for job in query.order_by(models.Job.id.desc()).limit(limite)]
+
+
+@router.get("/tipos")
+def listar_tipos():
+    """Tipos de job disponíveis"""
+    return sorted(jobs.tarefas_registradas())
+
+
+@router.get("/stats", dependencies=[Depends(get_admin_user)])
+def stats_jobs():
+    """Pool de execução deste processo (administradores)"""
+    return jobs.estatisticas()
+
+
+# --------------------------
+# Status
+# --------------------------
+@router.get("/{job_id}")
+def obter_job(job_id: int, request: Request, db: Session = Depends(get_db)):
+    """
+    Status, progresso, resultado ou erro do job
+    - ETag com a versão: o polling com If-None-Match recebe 304 enquanto
+      o job não muda
+    """
+    job = _buscar(db, job_id)
+    headers = {"ETag": concorrencia.etag(job.version)}
+    if request.headers.get("if-none-match") == headers["ETag"]:
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(jobs.serializar(job), headers=headers)
+
+
+# --------------------------
+# Cancelar
+# --------------------------
+@router.post("/{job_id}/cancelar")
+def cancelar_job(job_id: int, db: Session = Depends(get_db)):
+    """Cancela um job pendente ou pede a parada de um job em execução"""
+    _buscar(db, job_id)
+    return jobs.serializar(jobs.cancelar(db, job_id))
+
+
+# --------------------------
+# Arquivo gerado
+# --------------------------
+@router.get("/{job_id}/arquivo")
+def baixar_arquivo(job_id: int, db: Session = Depends(get_db)):
+    """Baixa o arquivo gerado por um job concluído (ex.: exportar_csv)"""
+    resultado = jobs.serializar(_buscar(db, job_id))["resultado"] or {}
+    caminho = resultado.get("arquivo")
+    if not caminho or not os.path.isfile(caminho):
+        raise HTTPException(404, "Job sem arquivo disponível")
+    return FileResponse(caminho, filename=os.path.basename(caminho))
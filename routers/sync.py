@@ -0,0 +1,85 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import JSONResponse
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from database import SessionLocal
+import models
+import projecoes
+from typing import Optional
+
+router = APIRouter(prefix="/sync", tags=["Sincronização"])
+
+# Tabela do log -> (modelo, projeção no formato das listagens)
+TABELAS = {
+    "donos": (models.Dono, projecoes.DONO),
+    "animais": (models.Animal, projecoes.ANIMAL),
+    "vacinas": (models.Vacina, projecoes.VACINA),
+    "consultas": (models.Consulta, projecoes.CONSULTA),
+    "banho_tosa": (models.BanhoTosa, projecoes.BANHO_TOSA),
+}
+
+LOTE_PADRAO = 500
+LOTE_MAXIMO = 5000
+
+
+# --------------------------
+# DB Session
+# --------------------------
+def get_db():
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def _token(valor: Optional[str]) -> int:
+    if not valor:
+        return 0
+    if not valor.isdigit():
+        raise HTTPException(400, "Token de sincronização inválido")
+    return int(valor)
+
+
+# --------------------------
+# Alterações desde o token
+# --------------------------
+@router.get("/")
+def sincronizar(
+    since: Optional[str] = Query(None, description="Token devolvido pela sincronização anterior"),
+    limite: int = Query(LOTE_PADRAO, ge=1, le=LOTE_MAXIMO),
+    db: Session = Depends(get_db),
+):
+    """
+    Retorna os registros alterados e os ids removidos desde o token
+    - Sem token: todos os registros (sincronização completa)
+    - Em lotes de até `limite` alterações; enquanto "mais" for true, chame
+      de novo com o token retornado
+    - Cada registro aparece uma única vez, no estado atual
+    """
+    desde = _token(since)
+    log = db.execute(
+        select(models.Alteracao.seq, models.Alteracao.tabela, models.Alteracao.registro_id, models.Alteracao.acao)
+        .where(models.Alteracao.seq > desde)
+        .order_by(models.Alteracao.seq)
+        .limit(limite + 1)
+    ).all()
+
+    mais = len(log) > limite
+    log = log[:limite]
+
+    alterados = {tabela: [] for tabela in TABELAS}
+    removidos = {tabela: [] for tabela in TABELAS}
+    for _, tabela, registro_id, acao in log:
+        if tabela in TABELAS:
+            (removidos if acao == "removido" else alterados)[tabela].append(registro_id)
+
+    resposta = {"token": str(log[-1].seq if log else desde), "mais": mais}
+    for tabela, (modelo, projecao) in TABELAS.items():
+        ids = alterados[tabela]
+        # Uma query IN por tabela e lote; registros removidos depois da leitura
+        # do log não aparecem aqui (a lápide vem no próximo lote)
+        registros = projecao.listar(db, modelo.id.in_(ids)) if ids else []
+        resposta[tabela] = {"alterados": registros, "removidos": removidos[tabela]}
+
+    return JSONResponse(resposta)
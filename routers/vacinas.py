@@ -1,7 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, Response, status, Query
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
+from typing import Optional
 from database import SessionLocal
 import models, schemas
+import cache
+import projecoes
+import eventos
+import exclusao
+import concorrencia
 from datetime import date
 
 router = APIRouter(prefix="/vacinas", tags=["Vacinas"])
@@ -17,6 +24,14 @@ def get_db():
     finally:
         db.close()
 
+
+def _expansao(fields, include):
+    """Valida ?fields= e ?include= (400 se algum nome for inválido)"""
+    try:
+        return projecoes.VACINA.expandir(fields, include)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 # CREATE - Criar nova vacina
 @router.post("/", status_code=status.HTTP_201_CREATED)
 def criar_vacina(vacina: schemas.VacinaCreate, animal_id: int = Query(...), db: Session = Depends(get_db)):
@@ -25,119 +40,142 @@ def criar_vacina(vacina: schemas.VacinaCreate, animal_id: int = Query(...), db:
     - Valida se o animal existe antes de criar a vacina
     - Retorna a vacina criada com ID gerado
     """
-    animal = db.query(models.Animal).filter(models.Animal.id == animal_id).first()
+    animal = cache.buscar_animal(db, animal_id)
     if not animal:
         raise HTTPException(status_code=404, detail="Animal não encontrado")
     
     nova_vacina = models.Vacina(**vacina.dict(), animal_id=animal_id)
     db.add(nova_vacina)
     db.commit()
+    cache.invalidar_tabelas("vacinas")
     db.refresh(nova_vacina)
-    return {
-        "id": nova_vacina.id,
-        "nome": nova_vacina.nome,
-        "data_aplicacao": nova_vacina.data_aplicacao.isoformat() if nova_vacina.data_aplicacao else None,
-        "animal_id": nova_vacina.animal_id
-    }
+    resposta = projecoes.VACINA.serializar_objeto(nova_vacina)
+    eventos.publicar("vacinas", "criado", nova_vacina.id)
+    return resposta
 
 # READ - Listar todas as vacinas
 @router.get("/")
-def listar_vacinas(db: Session = Depends(get_db)):
+def listar_vacinas(
+    fields: Optional[str] = Query(None, description="Campos separados por vírgula (ex.: id,nome)"),
+    include: Optional[str] = Query(None, description="Relações a incluir (ex.: animal)"),
+    db: Session = Depends(get_db),
+):
     """
     Lista todas as vacinas cadastradas no sistema
     - Retorna lista com dados básicos para evitar erros de serialização
+    - ?fields= limita os campos e ?include=animal embute o animal
     """
+    expansao = _expansao(fields, include)
+
+    def calcular():
+        return expansao.listar(db)
+
     try:
-        vacinas = db.query(models.Vacina).all()
-        return [
-            {
-                "id": vacina.id,
-                "nome": vacina.nome,
-                "data_aplicacao": vacina.data_aplicacao.isoformat() if vacina.data_aplicacao else None,
-                "animal_id": vacina.animal_id
-            }
-            for vacina in vacinas
-        ]
+        return JSONResponse(cache.cached(f"vacinas:lista{expansao.chave}", ["vacinas", *expansao.tabelas], calcular))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao listar vacinas: {str(e)}")
 
 # READ - Obter vacina por ID
 @router.get("/{vacina_id}")
-def obter_vacina(vacina_id: int, db: Session = Depends(get_db)):
+def obter_vacina(
+    vacina_id: int,
+    response: Response,
+    fields: Optional[str] = Query(None, description="Campos separados por vírgula (ex.: id,nome)"),
+    include: Optional[str] = Query(None, description="Relações a incluir (ex.: animal)"),
+    db: Session = Depends(get_db),
+):
     """
     Obtém uma vacina específica pelo ID
     - Retorna 404 se a vacina não for encontrada
+    - ETag com a versão, para o If-Match do PUT
     """
-    vacina = db.query(models.Vacina).filter(models.Vacina.id == vacina_id).first()
+    vacina = _expansao(fields, include).obter(db, vacina_id)
     if not vacina:
         raise HTTPException(status_code=404, detail="Vacina não encontrada")
     
-    return {
-        "id": vacina.id,
-        "nome": vacina.nome,
-        "data_aplicacao": vacina.data_aplicacao.isoformat() if vacina.data_aplicacao else None,
-        "animal_id": vacina.animal_id
-    }
+    if "version" in vacina:
+        response.headers["ETag"] = concorrencia.etag(vacina["version"])
+    return vacina
+
+def _atualizar(db: Session, vacina_id: int, valores: dict, versao: Optional[int], response: Response):
+    """UPDATE ... RETURNING único (com If-Match opcional); publica e responde com o ETag novo"""
+    try:
+        resposta = concorrencia.atualizar(db, projecoes.VACINA, vacina_id, valores, versao)
+    except concorrencia.ConflitoDeVersao as e:
+        raise concorrencia.conflito(e)
+    if resposta is None:
+        raise HTTPException(status_code=404, detail="Vacina não encontrada")
+
+    db.commit()
+    cache.invalidar_tabelas("vacinas")
+    eventos.publicar("vacinas", "atualizado", vacina_id)
+    response.headers["ETag"] = concorrencia.etag(resposta["version"])
+    return resposta
 
 # UPDATE - Atualizar vacina existente
 @router.put("/{vacina_id}")
-def atualizar_vacina(vacina_id: int, dados: schemas.VacinaCreate, db: Session = Depends(get_db)):
+def atualizar_vacina(
+    vacina_id: int,
+    dados: schemas.VacinaCreate,
+    response: Response,
+    versao: Optional[int] = Depends(concorrencia.versao_esperada),
+    db: Session = Depends(get_db),
+):
     """
     Atualiza os dados de uma vacina existente
-    - Valida se a vacina existe antes de atualizar
+    - Com If-Match, só grava se a vacina ainda estiver na versão lida
+      (409 se outra pessoa salvou antes; ver concorrencia.py)
+    - Retorna 404 se a vacina não existir
     """
-    vacina = db.query(models.Vacina).filter(models.Vacina.id == vacina_id).first()
-    if not vacina:
-        raise HTTPException(status_code=404, detail="Vacina não encontrada")
+    return _atualizar(db, vacina_id, dados.dict(), versao, response)
 
-    # Atualiza os campos da vacina com os novos dados
-    for campo, valor in dados.dict().items():
-        setattr(vacina, campo, valor)
-    
-    db.commit()
-    db.refresh(vacina)
-    return {
-        "id": vacina.id,
-        "nome": vacina.nome,
-        "data_aplicacao": vacina.data_aplicacao.isoformat() if vacina.data_aplicacao else None,
-        "animal_id": vacina.animal_id
-    }
+# PATCH - Atualização parcial
+@router.patch("/{vacina_id}")
+def atualizar_vacina_parcial(
+    vacina_id: int,
+    dados: schemas.VacinaUpdate,
+    response: Response,
+    versao: Optional[int] = Depends(concorrencia.versao_esperada),
+    db: Session = Depends(get_db),
+):
+    """
+    Altera só os campos enviados, num único UPDATE ... RETURNING
+    - Aceita If-Match como o PUT
+    """
+    return _atualizar(db, vacina_id, dados.dict(exclude_unset=True), versao, response)
 
 # DELETE - Remover vacina
 @router.delete("/{vacina_id}", status_code=status.HTTP_204_NO_CONTENT)
 def deletar_vacina(vacina_id: int, db: Session = Depends(get_db)):
     """
-    Remove uma vacina do sistema
+    Remove uma vacina do sistema (exclusão lógica)
     - Valida se a vacina existe antes de deletar
     - Retorna 204 No Content em caso de sucesso
     """
-    vacina = db.query(models.Vacina).filter(models.Vacina.id == vacina_id).first()
-    if not vacina:
+    removidos = exclusao.excluir(db, models.Vacina, vacina_id)
+    if not removidos["vacinas"]:
         raise HTTPException(status_code=404, detail="Vacina não encontrada")
     
-    db.delete(vacina)
     db.commit()
+    exclusao.notificar(removidos)
     return None
 
 # GET - Listar vacinas por animal
 @router.get("/animal/{animal_id}")
-def listar_vacinas_por_animal(animal_id: int, db: Session = Depends(get_db)):
+def listar_vacinas_por_animal(
+    animal_id: int,
+    fields: Optional[str] = Query(None, description="Campos separados por vírgula (ex.: id,nome)"),
+    include: Optional[str] = Query(None, description="Relações a incluir (ex.: animal)"),
+    db: Session = Depends(get_db),
+):
     """
     Lista todas as vacinas de um animal específico
     - Valida se o animal existe
     - Retorna lista de vacinas do animal
     """
-    animal = db.query(models.Animal).filter(models.Animal.id == animal_id).first()
+    expansao = _expansao(fields, include)
+    animal = cache.buscar_animal(db, animal_id)
     if not animal:
         raise HTTPException(status_code=404, detail="Animal não encontrado")
     
-    vacinas = db.query(models.Vacina).filter(models.Vacina.animal_id == animal_id).all()
-    return [
-        {
-            "id": vacina.id,
-            "nome": vacina.nome,
-            "data_aplicacao": vacina.data_aplicacao.isoformat() if vacina.data_aplicacao else None,
-            "animal_id": vacina.animal_id
-        }
-        for vacina in vacinas
-    ]
\ No newline at end of file
+    return JSONResponse(expansao.listar(db, models.Vacina.animal_id == animal_id))
\ No newline at end of file
@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from datetime import date, datetime
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 from pydantic import BaseModel, EmailStr
 from enum import Enum
 
@@ -18,6 +18,14 @@ class VacinaCreate(VacinaBase):
     """
     pass
 
+class VacinaUpdate(BaseModel):
+    """
+    Schema para atualização parcial (PATCH) de vacina
+    Só os campos enviados são alterados
+    """
+    nome: Optional[str] = None
+    data_aplicacao: Optional[date] = None
+
 class Vacina(VacinaBase):
     """
     Schema completo para vacina usado em respostas
@@ -45,6 +53,16 @@ class AnimalCreate(AnimalBase):
     """
     dono_id: int
 
+class AnimalUpdate(BaseModel):
+    """
+    Schema para atualização parcial (PATCH) de animal
+    Só os campos enviados são alterados
+    """
+    nome: Optional[str] = None
+    especie: Optional[str] = None
+    idade: Optional[int] = None
+    dono_id: Optional[int] = None
+
 class Animal(AnimalBase):
     """
     Schema completo para animal usado em respostas
@@ -71,6 +89,14 @@ class DonoCreate(DonoBase):
     """
     pass
 
+class DonoUpdate(BaseModel):
+    """
+    Schema para atualização parcial (PATCH) de dono
+    Só os campos enviados são alterados
+    """
+    nome: Optional[str] = None
+    telefone: Optional[str] = None
+
 class Dono(DonoBase):
     """
     Schema completo para dono usado em respostas
@@ -83,6 +109,15 @@ class Dono(DonoBase):
         from_attributes = True
         
 
+class DonoMesclagem(BaseModel):
+    """Grupo de donos duplicados: mantém um e mescla os demais nele"""
+    manter_id: int
+    remover_ids: List[int]
+
+class MesclagemDonos(BaseModel):
+    """Schema para mesclar vários grupos de donos numa única transação"""
+    grupos: List[DonoMesclagem]
+
 class UserBase(BaseModel):
     nome: str
     email: EmailStr
@@ -113,10 +148,12 @@ class UserCreate(BaseModel):
     nome: str
     email: EmailStr
     password: str
+    filial: Optional[str] = None  # None = matriz
 
 class UserLogin(BaseModel):
     email: EmailStr
     password: str
+    filial: Optional[str] = None  # None = matriz
 
 class UserOut(BaseModel):
     id: int
@@ -158,6 +195,10 @@ class ConsultaUpdate(BaseModel):
     status: Optional[str] = None  # MUDADO PARA STRING SIMPLES
     valor: Optional[int] = None
 
+class StatusConsultaUpdate(BaseModel):
+    """Schema para atualização apenas do status da consulta"""
+    status: str
+
 class Consulta(ConsultaBase):
     """Schema completo para consulta"""
     id: int
@@ -218,4 +259,9 @@ class BanhoTosa(BanhoTosaBase):
 
 class StatusServicoUpdate(BaseModel):
     """Schema para atualização apenas do status do serviço"""
-    status: str  # MUDADO PARA STRING SIMPLES
\ No newline at end of file
+    status: str  # MUDADO PARA STRING SIMPLES
+# ===== SCHEMAS PARA JOBS =====
+class JobCreate(BaseModel):
+    """Schema para enfileirar um job de segundo plano"""
+    tipo: str
+    parametros: Dict[str, Any] = {}
@@ -1,21 +1,91 @@
+import os
 from datetime import timedelta, datetime
-from jose import jwt
-from passlib.context import CryptContext
+from functools import lru_cache
+from urllib.parse import parse_qs
 
 SECRET_KEY = "chave-super-secreta"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
 
-pwd = CryptContext(schemes=["argon2"], deprecated="auto")
+# E-mails dos administradores (rotas /debug e perfilador; ver diagnostico.py).
+# Valem só para contas da matriz: o cadastro de filial aceita qualquer e-mail
+ADMINS = {email.strip().lower() for email in os.getenv("PETCARE_ADMINS", "").split(",") if email.strip()}
+
+# jose e passlib/argon2 são importados sob demanda: o custo de importação
+# (backends de criptografia) só é pago na primeira operação que os usa,
+# e não no cold start da aplicação
+
+
+@lru_cache(maxsize=None)
+def get_pwd_context():
+    from passlib.context import CryptContext
+    return CryptContext(schemes=["argon2"], deprecated="auto")
 
 def hash_password(password: str):
-    return pwd.hash(password)
+    return get_pwd_context().hash(password)
 
 def verify_password(password: str, hashed: str):
-    return pwd.verify(password, hashed)
+    return get_pwd_context().verify(password, hashed)
 
-def create_token(data: dict):
+def eh_admin(email: str, filial: str = None) -> bool:
+    """Conta da matriz (filial None) com e-mail em PETCARE_ADMINS"""
+    return filial is None and bool(email) and email.lower() in ADMINS
+
+def create_token(data: dict, filial: str = None):
+    """JWT com os dados e, para usuários de filial, a claim "filial" (ver filiais.py)"""
+    from jose import jwt
     to_encode = data.copy()
+    if filial:
+        to_encode["filial"] = filial
     expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+
+def decode_token(token: str) -> dict:
+    """Decodifica e valida o JWT (levanta jose.JWTError se inválido/expirado)"""
+    from jose import jwt
+    return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+
+# Rotas que aceitam o token em ?token= (o EventSource do navegador não envia headers)
+ROTAS_TOKEN_NA_QUERY = ("/eventos",)
+
+def _token_do_scope(scope):
+    for nome, valor in scope.get("headers", ()):
+        if nome == b"authorization":
+            esquema, _, token = valor.decode("latin-1").partition(" ")
+            return token if esquema.lower() == "bearer" and token else None
+    query = scope.get("query_string", b"")
+    if b"token=" in query and scope.get("path", "").startswith(ROTAS_TOKEN_NA_QUERY):
+        return parse_qs(query.decode("latin-1")).get("token", [None])[0]
+    return None
+
+def claims_da_requisicao(scope):
+    """
+    Claims do Bearer token de uma requisição ASGI, decodificadas uma única vez
+    - Guardadas em scope["state"]["claims"] (request.state.claims nas rotas)
+      para os middlewares seguintes e para get_current_user
+    - None sem token ou com token inválido/expirado
+    """
+    estado = scope.setdefault("state", {})
+    if "claims" not in estado:
+        token = _token_do_scope(scope)
+        claims = None
+        if token:
+            try:
+                claims = decode_token(token)
+            except Exception:
+                # Token inválido/expirado: a autenticação da rota responde 401
+                claims = None
+        estado["claims"] = claims
+    return estado["claims"]
+
+class ClaimsMiddleware:
+    """Middleware ASGI (o mais externo da API) que decodifica o token da requisição"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] in ("http", "websocket"):
+            claims_da_requisicao(scope)
+        await self.app(scope, receive, send)
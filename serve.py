@@ -0,0 +1,82 @@
+"""
+Entry point de produção da API
+
+Uso:
+    python serve.py --workers 4 --port 8000
+
+- Cria/verifica o schema uma única vez, no processo principal, antes de
+  iniciar os workers (que então pulam essa etapa no lifespan)
+- Gera os estáticos versionados e pré-comprimidos antes dos workers
+- Sobe N workers do uvicorn sem reload; com mais de um worker e o cache em
+  memória (padrão), troca para o backend SQLite compartilhado: cada worker
+  teria o seu cache e as escritas de um não invalidariam o dos outros
+- No SIGTERM/SIGINT, para de aceitar conexões e espera as requisições em
+  andamento terminarem (até --graceful-timeout segundos) antes de encerrar
+
+Variáveis de ambiente equivalentes: PETCARE_HOST, PETCARE_PORT,
+PETCARE_WORKERS, PETCARE_GRACEFUL_TIMEOUT.
+"""
+
+import argparse
+import os
+
+import uvicorn
+
+# Backend usado quando há vários workers e nenhum backend compartilhado foi configurado
+CACHE_URL_COMPARTILHADO = "sqlite:///./cache_petcare.db"
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Servidor de produção da API Clínica Veterinária")
+    parser.add_argument("--host", default=os.getenv("PETCARE_HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PETCARE_PORT", "8000")))
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=int(os.getenv("PETCARE_WORKERS", str(os.cpu_count() or 1))),
+        help="Número de processos worker (padrão: número de CPUs)",
+    )
+    parser.add_argument(
+        "--graceful-timeout",
+        type=int,
+        default=int(os.getenv("PETCARE_GRACEFUL_TIMEOUT", "30")),
+        help="Segundos para drenar requisições em andamento no shutdown",
+    )
+    return parser.parse_args(argv)
+
+
+def cache_compartilhado(workers: int):
+    """Com vários workers, garante um PETCARE_CACHE_URL compartilhado (herdado pelos workers)"""
+    url = os.getenv("PETCARE_CACHE_URL", "memory://")
+    if workers > 1 and url.startswith("memory://"):
+        print(f"🗄️ {workers} workers: cache em memória trocado por {CACHE_URL_COMPARTILHADO}")
+        os.environ["PETCARE_CACHE_URL"] = CACHE_URL_COMPARTILHADO
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    cache_compartilhado(args.workers)
+
+    # DDL uma única vez, antes dos workers
+    from database import init_db, engine
+    init_db()
+    engine.dispose()
+    os.environ["PETCARE_SCHEMA_PRONTO"] = "1"
+
+    # Estáticos versionados/comprimidos também uma única vez (ver estaticos.py)
+    from estaticos import construir_todos
+    construir_todos()
+
+    uvicorn.run(
+        "main:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        reload=False,
+        timeout_graceful_shutdown=args.graceful_timeout,
+        proxy_headers=True,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+"""
+Tarefas pesadas executadas como jobs de segundo plano (ver jobs.py)
+
+Cada tarefa recebe o contexto do job e os parâmetros do POST /jobs, informa
+o progresso com ctx.progresso() e retorna um resultado serializável em JSON.
+As leituras usam as mesmas projeções da API (linhas excluídas não entram)
+e vão para a réplica/snapshot de leitura quando houver (database.roteador).
+
+Importação, purga e arquivamento alteram tabelas: os caches são invalidados ao final. Com
+PETCARE_JOBS_MODO=processos, use um backend de cache compartilhado (ver
+cache.py) para que a invalidação chegue aos workers da API.
+"""
+
+import csv
+import os
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import extract, func, insert, select
+from sqlalchemy.orm import Session
+
+import cache
+import models
+import normalizacao
+import projecoes
+from jobs import tarefa
+
+# Diretório dos arquivos gerados pelas exportações
+EXPORTS_DIR = os.getenv("PETCARE_EXPORTS_DIR", "./exports")
+LOTE = 1000
+
+EXPORTAVEIS = {
+    "donos": projecoes.DONO,
+    "animais": projecoes.ANIMAL,
+    "vacinas": projecoes.VACINA,
+    "consultas": projecoes.CONSULTA,
+    "banho_tosa": projecoes.BANHO_TOSA,
+}
+
+
+def _sessao(ctx):
+    """Sessão só de leitura: réplica/snapshot quando configurados (ver database.py)"""
+    from database import LEITURA, roteador
+
+    if ctx.engine is roteador.primario:
+        return Session(roteador.engine_para(LEITURA))
+    return Session(ctx.engine)
+
+
+@tarefa("exportar_csv")
+def exportar_csv(ctx, tabela: str):
+    """Exporta uma tabela (formato das listagens) para CSV em EXPORTS_DIR"""
+    projecao = EXPORTAVEIS.get(tabela)
+    if projecao is None:
+        raise ValueError(f"Tabela não exportável: {tabela}")
+
+    os.makedirs(EXPORTS_DIR, exist_ok=True)
+    caminho = os.path.join(EXPORTS_DIR, f"{tabela}_{ctx.job_id}.csv")
+    with _sessao(ctx) as db, open(caminho, "w", newline="", encoding="utf-8") as arquivo:
+        total = db.execute(
+            select(func.count()).select_from(projecao.modelo).where(projecao.modelo.deleted_at.is_(None))
+        ).scalar()
+        escritor = csv.DictWriter(arquivo, fieldnames=projecao.nomes)
+        escritor.writeheader()
+        linhas = 0
+        for registro in projecao.iterar(db):
+            escritor.writerow(registro)
+            linhas += 1
+            if linhas % LOTE == 0:
+                ctx.progresso(100 * linhas / max(total, 1), f"{linhas}/{total} linhas")
+    ctx.progresso(100, f"{linhas} linhas exportadas")
+    return {"arquivo": caminho, "linhas": linhas}
+
+
+@tarefa("importar_donos", max_tentativas=1)
+def importar_donos(ctx, donos: list = None):
+    """
+    Importa donos de uma lista de dicts (nome, telefone)
+    - Os registros vêm no corpo do POST /jobs ou de um CSV enviado em
+      POST /jobs/importar-donos; caminhos no servidor não são aceitos
+    - INSERT em lotes de LOTE linhas, com commit por lote
+    - Uma única tentativa: repetir duplicaria os lotes já gravados
+    """
+    donos = [
+        {
+            "nome": d.get("nome"),
+            "telefone": d.get("telefone"),
+            # INSERT em lote não passa pelos eventos do ORM (ver models.Dono)
+            "telefone_normalizado": normalizacao.normalizar_telefone(d.get("telefone")),
+            "nome_fonetico": normalizacao.chave_fonetica_nome(d.get("nome")),
+        }
+        for d in donos or []
+    ]
+
+    agora = datetime.utcnow()
+    for inicio in range(0, len(donos), LOTE):
+        lote = [{**d, "updated_at": agora} for d in donos[inicio:inicio + LOTE]]
+        with ctx.engine.begin() as conn:
+            conn.execute(insert(models.Dono), lote)
+        ctx.progresso(100 * (inicio + len(lote)) / len(donos), f"{inicio + len(lote)}/{len(donos)} donos")
+
+    if donos:
+        cache.invalidar_tabelas("donos")
+    return {"importados": len(donos)}
+
+
+@tarefa("lembretes_vacinas")
+def lembretes_vacinas(ctx, validade_dias: int = 365, antecedencia_dias: int = 30):
+    """
+    Vacinas que vencem (ou já venceram) nos próximos antecedencia_dias
+    - Considera a aplicação mais recente de cada vacina por animal
+    """
+    limite = date.today() + timedelta(days=antecedencia_dias) - timedelta(days=validade_dias)
+    ultima = (
+        select(
+            models.Vacina.animal_id,
+            models.Vacina.nome,
+            func.max(models.Vacina.data_aplicacao).label("ultima_aplicacao"),
+        )
+        .where(models.Vacina.deleted_at.is_(None))
+        .group_by(models.Vacina.animal_id, models.Vacina.nome)
+        .subquery()
+    )
+    stmt = (
+        select(
+            ultima.c.animal_id, models.Animal.nome, ultima.c.nome, ultima.c.ultima_aplicacao,
+            models.Dono.id, models.Dono.nome, models.Dono.telefone,
+        )
+        .join(models.Animal, models.Animal.id == ultima.c.animal_id)
+        .join(models.Dono, models.Dono.id == models.Animal.dono_id)
+        .where(
+            ultima.c.ultima_aplicacao <= limite,
+            models.Animal.deleted_at.is_(None),
+            models.Dono.deleted_at.is_(None),
+        )
+        .order_by(ultima.c.ultima_aplicacao)
+    )
+    ctx.progresso(10, "Calculando vencimentos")
+    with _sessao(ctx) as db:
+        lembretes = [
+            {
+                "animal_id": animal_id,
+                "animal_nome": animal_nome,
+                "vacina": vacina,
+                "ultima_aplicacao": projecoes.date_iso(aplicada),
+                "vencimento": projecoes.date_iso(aplicada + timedelta(days=validade_dias)),
+                "dono_id": dono_id,
+                "dono_nome": dono_nome,
+                "telefone": telefone,
+            }
+            for animal_id, animal_nome, vacina, aplicada, dono_id, dono_nome, telefone in db.execute(stmt)
+        ]
+    return {"total": len(lembretes), "lembretes": lembretes}
+
+
+@tarefa("relatorio_faturamento")
+def relatorio_faturamento(ctx, ano: int = None):
+    """Faturamento mensal (em centavos) de consultas e banho/tosa concluídos (inclui o arquivo)"""
+    ano = ano or date.today().year
+    relatorio = {mes: {"consultas": 0, "banho_tosa": 0} for mes in range(1, 13)}
+    fontes = [
+        ("consultas", models.Consulta, "concluida"),
+        ("consultas", models.ConsultaArquivada, "concluida"),
+        ("banho_tosa", models.BanhoTosa, "concluido"),
+        ("banho_tosa", models.BanhoTosaArquivado, "concluido"),
+    ]
+    with _sessao(ctx) as db:
+        for i, (nome, modelo, concluido) in enumerate(fontes):
+            mes = extract("month", modelo.data_hora)
+            linhas = db.execute(
+                select(mes, func.coalesce(func.sum(modelo.valor), 0))
+                .where(
+                    modelo.deleted_at.is_(None),
+                    modelo.status == concluido,
+                    extract("year", modelo.data_hora) == ano,
+                )
+                .group_by(mes)
+            )
+            for numero, total in linhas:
+                relatorio[int(numero)][nome] += total
+            ctx.progresso(100 * (i + 1) / len(fontes), f"{modelo.__tablename__} agregado")
+    return {
+        "ano": ano,
+        "meses": [{"mes": mes, **valores} for mes, valores in relatorio.items()],
+        "total": sum(v["consultas"] + v["banho_tosa"] for v in relatorio.values()),
+    }
+
+
+def _progresso_por_tabela(ctx, tabelas: list, verbo: str):
+    """Callback de lote (tabela, linhas) -> ctx.progresso, que também serve de heartbeat"""
+    def progresso(tabela, linhas):
+        pct = 100 * tabelas.index(tabela) / len(tabelas)
+        ctx.progresso(pct, f"{tabela}: {linhas} linhas {verbo}")
+    return progresso
+
+
+@tarefa("purgar_excluidos")
+def purgar_excluidos(ctx, retencao_dias: int = None):
+    """
+    Purga sob demanda dos registros excluídos (ver exclusao.purgar)
+    - ctx.progresso a cada lote: purgas longas não parecem órfãs
+    """
+    import exclusao
+
+    ctx.progresso(0, "Purgando registros excluídos")
+    if retencao_dias is None:
+        retencao_dias = exclusao.RETENCAO_DIAS
+    tabelas = [modelo.__tablename__ for modelo in exclusao.ORDEM_PURGA]
+    return exclusao.purgar(
+        ctx.engine, retencao_dias=retencao_dias, progresso=_progresso_por_tabela(ctx, tabelas, "purgadas")
+    )
+
+
+@tarefa("arquivar_historico")
+def arquivar_historico(ctx, dias: int = None):
+    """
+    Arquivamento sob demanda do histórico fechado (ver arquivamento.arquivar)
+    - ctx.progresso a cada lote: arquivamentos longos não parecem órfãos
+    """
+    import arquivamento
+
+    ctx.progresso(0, "Arquivando histórico")
+    if dias is None:
+        dias = arquivamento.ARQUIVO_DIAS
+    tabelas = [quente.__tablename__ for quente, _, _ in arquivamento.ARQUIVAVEIS]
+    return arquivamento.arquivar(ctx.engine, dias=dias, progresso=_progresso_por_tabela(ctx, tabelas, "arquivadas"))
@@ -0,0 +1,98 @@
+"""
+Configuração dos testes (pytest)
+
+- Rodam num diretório temporário: banco da matriz, bancos das filiais,
+  cache, anexos e build dos estáticos são criados do zero e o
+  clinica_vet.db do projeto nunca é tocado
+- Filiais "centro" e "zona-sul" cadastradas; rate limiting, executor de
+  jobs e tarefas periódicas desligados (os testes de jobs executam a fila
+  diretamente)
+"""
+
+import os
+import shutil
+import tempfile
+import uuid
+
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DIRETORIO = tempfile.mkdtemp(prefix="petcare-testes-")
+
+# Antes de importar a aplicação: configuração por ambiente
+os.environ.update({
+    "PETCARE_FILIAIS": "centro,zona-sul",
+    "PETCARE_CACHE_URL": "memory://",
+    "PETCARE_RATE_LIMIT": "0",
+    "PETCARE_JOBS_WORKERS": "0",
+    "PETCARE_PURGA_INTERVALO": "0",
+    "PETCARE_ARQUIVO_INTERVALO": "0",
+    "PETCARE_ADMINS": "admin@petcare.com.br",
+})
+
+SENHA = "senha-de-teste"
+ADMIN = "admin@petcare.com.br"
+
+
+def pytest_sessionstart(session):
+    # Caminhos relativos (bancos, estáticos) apontam para o diretório
+    # temporário; só depois da coleta dos argumentos (testpaths)
+    for pasta in ("frontend", "auth"):
+        shutil.copytree(os.path.join(RAIZ, pasta), os.path.join(DIRETORIO, pasta))
+    os.chdir(DIRETORIO)
+
+
+def pytest_sessionfinish(session, exitstatus):
+    os.chdir(RAIZ)
+    shutil.rmtree(DIRETORIO, ignore_errors=True)
+
+
+@pytest.fixture(scope="session")
+def cliente():
+    from fastapi.testclient import TestClient
+
+    import main
+
+    with TestClient(main.app) as c:
+        yield c
+
+
+def _autenticar(cliente, filial=None, email=None):
+    email = email or f"{uuid.uuid4().hex[:12]}@petcare.com.br"
+    dados = {"nome": "Teste", "email": email, "password": SENHA, "filial": filial}
+    resposta = cliente.post("/auth/register", json=dados)
+    assert resposta.status_code == 200, resposta.text
+    resposta = cliente.post("/auth/login", json={"email": email, "password": SENHA, "filial": filial})
+    assert resposta.status_code == 200, resposta.text
+    return {"Authorization": f"Bearer {resposta.json()['access_token']}"}
+
+
+@pytest.fixture
+def autenticar(cliente):
+    """autenticar(filial=None, email=None) -> headers com o token de um usuário novo"""
+    def autenticar(filial=None, email=None):
+        return _autenticar(cliente, filial, email)
+
+    return autenticar
+
+
+@pytest.fixture(scope="session")
+def admin(cliente):
+    """Headers do administrador da matriz (e-mail em PETCARE_ADMINS)"""
+    return _autenticar(cliente, email=ADMIN)
+
+
+@pytest.fixture
+def auth(autenticar):
+    """Headers de um usuário da matriz"""
+    return autenticar()
+
+
+@pytest.fixture
+def criar_dono(cliente):
+    def criar_dono(headers, nome="Maria Souza", telefone="11987654321"):
+        resposta = cliente.post("/donos/", json={"nome": nome, "telefone": telefone}, headers=headers)
+        assert resposta.status_code in (200, 201), resposta.text
+        return resposta.json()
+
+    return criar_dono
@@ -0,0 +1,135 @@
+"""Anexos: upload em stream, deduplicação pelo SHA-256, limites e Range (anexos.py)"""
+
+import hashlib
+import os
+
+import pytest
+
+import anexos
+
+PDF = b"%PDF-1.4\n" + bytes(range(256)) * 64
+
+
+@pytest.fixture
+def consulta(cliente, auth, criar_dono):
+    def consulta(headers=auth):
+        dono = criar_dono(headers)
+        animal = cliente.post(
+            "/animais/", json={"nome": "Rex", "especie": "cachorro", "idade": 3, "dono_id": dono["id"]},
+            headers=headers,
+        ).json()
+        return cliente.post("/consultas/", json={
+            "data_hora": "2030-01-10T10:00:00",
+            "motivo": "Raio-X",
+            "dono_id": dono["id"],
+            "animal_id": animal["id"],
+        }, headers=headers).json()["id"]
+
+    return consulta
+
+
+def _enviar(cliente, headers, consulta_id, conteudo=PDF, tipo="application/pdf", nome="exame.pdf", **kwargs):
+    return cliente.post(
+        f"/consultas/{consulta_id}/anexos", files={"arquivo": (nome, conteudo, tipo)}, headers=headers, **kwargs
+    )
+
+
+def _temporarios():
+    pasta = os.path.join(anexos.ANEXOS_DIR, "tmp")
+    return os.listdir(pasta) if os.path.isdir(pasta) else []
+
+
+def test_upload_grava_metadados_e_conteudo(cliente, auth, consulta):
+    consulta_id = consulta()
+    resposta = _enviar(cliente, auth, consulta_id)
+    assert resposta.status_code == 201
+    anexo = resposta.json()
+    assert anexo["sha256"] == hashlib.sha256(PDF).hexdigest()
+    assert (anexo["tamanho"], anexo["content_type"], anexo["nome_arquivo"]) == (len(PDF), "application/pdf", "exame.pdf")
+
+    with open(anexos.caminho(anexo["sha256"]), "rb") as f:
+        assert f.read() == PDF
+    assert _temporarios() == []
+
+
+def test_upload_maior_que_um_bloco(cliente, auth, consulta):
+    conteudo = os.urandom(anexos.TAMANHO_BLOCO * 2 + 123)
+    anexo = _enviar(cliente, auth, consulta(), conteudo, tipo="image/png", nome="raio-x.png").json()
+    assert anexo["sha256"] == hashlib.sha256(conteudo).hexdigest()
+    assert os.path.getsize(anexos.caminho(anexo["sha256"])) == len(conteudo)
+
+
+def test_mesmo_conteudo_ocupa_um_arquivo(cliente, auth, consulta):
+    conteudo = b"%PDF-1.4 radiografia"
+    a = _enviar(cliente, auth, consulta(), conteudo).json()
+    b = _enviar(cliente, auth, consulta(), conteudo, nome="copia.pdf").json()
+
+    assert a["id"] != b["id"]
+    assert a["sha256"] == b["sha256"]
+    pasta = os.path.dirname(anexos.caminho(a["sha256"]))
+    assert [nome for nome in os.listdir(pasta) if nome == a["sha256"]] == [a["sha256"]]
+
+
+def test_tipo_nao_permitido_responde_415(cliente, auth, consulta):
+    resposta = _enviar(cliente, auth, consulta(), b"texto", tipo="text/plain", nome="nota.txt")
+    assert resposta.status_code == 415
+    assert _temporarios() == []
+
+
+def test_maior_que_o_limite_responde_413(cliente, auth, consulta, monkeypatch):
+    monkeypatch.setattr(anexos, "TAMANHO_MAXIMO", 1024)
+    resposta = _enviar(cliente, auth, consulta(), b"x" * 2048)
+    assert resposta.status_code == 413
+    assert _temporarios() == []
+
+
+def test_content_length_grande_demais_responde_413_sem_gravar(cliente, auth, consulta, monkeypatch):
+    monkeypatch.setattr(anexos, "TAMANHO_MAXIMO", 1024)
+    criados = []
+    monkeypatch.setattr(anexos, "Gravacao", lambda *a: criados.append(a))
+
+    resposta = _enviar(cliente, auth, consulta(), b"x" * (anexos.FOLGA_MULTIPART + 4096))
+    assert resposta.status_code == 413
+    assert criados == []
+
+
+def test_sem_o_campo_ou_vazio_responde_400(cliente, auth, consulta):
+    consulta_id = consulta()
+    outro_campo = cliente.post(
+        f"/consultas/{consulta_id}/anexos", files={"foto": ("a.pdf", PDF, "application/pdf")}, headers=auth
+    )
+    assert outro_campo.status_code == 400
+    assert _enviar(cliente, auth, consulta_id, b"").status_code == 400
+    nao_multipart = cliente.post(f"/consultas/{consulta_id}/anexos", content=PDF, headers=auth)
+    assert nao_multipart.status_code == 400
+
+
+def test_consulta_inexistente_responde_404(cliente, auth):
+    assert _enviar(cliente, auth, 10 ** 9).status_code == 404
+
+
+def test_download_com_range(cliente, auth, consulta):
+    consulta_id = consulta()
+    anexo = _enviar(cliente, auth, consulta_id).json()
+    url = f"/consultas/{consulta_id}/anexos/{anexo['id']}"
+
+    inteiro = cliente.get(url, headers=auth)
+    assert inteiro.status_code == 200
+    assert inteiro.content == PDF
+    assert inteiro.headers["etag"] == f'"{anexo["sha256"]}"'
+
+    parte = cliente.get(url, headers={**auth, "Range": "bytes=9-18"})
+    assert parte.status_code == 206
+    assert parte.content == PDF[9:19]
+    assert parte.headers["content-range"] == f"bytes 9-18/{len(PDF)}"
+
+    assert cliente.get(url, headers={**auth, "If-None-Match": inteiro.headers["etag"]}).status_code == 304
+
+
+def test_anexo_de_filial_fica_no_diretorio_dela(cliente, autenticar, consulta):
+    centro = autenticar(filial="centro")
+    anexo = _enviar(cliente, centro, consulta(centro), b"%PDF-1.4 filial centro").json()
+
+    caminho = os.path.join(anexos.ANEXOS_DIR, "filiais", "centro", anexo["sha256"][:2], anexo["sha256"])
+    assert os.path.exists(caminho)
+    assert not os.path.exists(anexos.caminho(anexo["sha256"]))
@@ -0,0 +1,77 @@
+"""Arquivamento: histórico com as duas tabelas e /sync sem lápides de arquivamento"""
+
+import pytest
+from sqlalchemy import text
+
+import arquivamento
+import database
+
+
+@pytest.fixture
+def consultas(cliente, auth, criar_dono):
+    """Duas consultas do mesmo animal; a primeira já é antiga e concluída"""
+    dono = criar_dono(auth)
+    animal = cliente.post(
+        "/animais/", json={"nome": "Bidu", "especie": "cachorro", "idade": 9, "dono_id": dono["id"]}, headers=auth
+    ).json()
+    criadas = [
+        cliente.post("/consultas/", json={
+            "data_hora": data_hora, "motivo": motivo, "dono_id": dono["id"], "animal_id": animal["id"],
+        }, headers=auth).json()
+        for data_hora, motivo in (("2030-01-10T10:00:00", "Vacina"), ("2030-02-10T10:00:00", "Retorno"))
+    ]
+    with database.engine.begin() as conn:
+        conn.execute(
+            text("UPDATE consultas SET data_hora = '2015-03-01 09:00:00.000000', status = 3 WHERE id = :id"),
+            {"id": criadas[0]["id"]},
+        )
+    return animal, criadas
+
+
+def _token(cliente, auth):
+    corpo = cliente.get("/sync/", headers=auth).json()
+    while corpo["mais"]:
+        corpo = cliente.get("/sync/", params={"since": corpo["token"]}, headers=auth).json()
+    return corpo["token"]
+
+
+def test_historico_junta_quentes_e_arquivadas(cliente, auth, consultas):
+    animal, (antiga, recente) = consultas
+    assert arquivamento.arquivar(database.engine)["consultas"] == 1
+
+    resposta = cliente.get("/consultas/historico", params={"animal_id": animal["id"]}, headers=auth)
+    assert resposta.status_code == 200
+    assert [(c["id"], c["arquivada"]) for c in resposta.json()] == [
+        (recente["id"], False),
+        (antiga["id"], True),
+    ]
+    # A consulta arquivada continua acessível pelo id
+    assert cliente.get(f"/consultas/{antiga['id']}", headers=auth).json()["arquivada"] is True
+
+
+def test_arquivar_nao_gera_lapide_no_sync(cliente, auth, consultas):
+    _, (antiga, _) = consultas
+    token = _token(cliente, auth)
+
+    arquivamento.arquivar(database.engine)
+    corpo = cliente.get("/sync/", params={"since": token}, headers=auth).json()
+    assert antiga["id"] not in corpo["consultas"]["removidos"]
+
+
+def test_exclusao_de_consulta_arquivada_gera_lapide(cliente, auth, consultas):
+    animal, (antiga, _) = consultas
+    arquivamento.arquivar(database.engine)
+    token = _token(cliente, auth)
+
+    assert cliente.delete(f"/animais/{animal['id']}", headers=auth).status_code == 204
+    corpo = cliente.get("/sync/", params={"since": token}, headers=auth).json()
+    assert antiga["id"] in corpo["consultas"]["removidos"]
+
+
+def test_exclusao_comum_continua_gerando_lapide(cliente, auth, consultas):
+    _, (_, recente) = consultas
+    token = _token(cliente, auth)
+
+    assert cliente.delete(f"/consultas/{recente['id']}", headers=auth).status_code == 204
+    corpo = cliente.get("/sync/", params={"since": token}, headers=auth).json()
+    assert corpo["consultas"]["removidos"] == [recente["id"]]
@@ -0,0 +1,137 @@
+"""Cache de entidades (dono/animal) e invalidação por entidade (cache.py)"""
+
+import pytest
+from sqlalchemy import text
+
+import cache
+import database
+
+
+@pytest.fixture
+def db(cliente):
+    db = database.SessionLocal()
+    cache.donos_cache.clear()
+    yield db
+    db.close()
+
+
+@pytest.fixture
+def consultas_ao_backend(monkeypatch):
+    """Conta as leituras de versão feitas no backend"""
+    backend = cache.get_backend()
+    lidas = []
+    original = backend.get_versao
+
+    def get_versao(nome):
+        lidas.append(nome)
+        return original(nome)
+
+    monkeypatch.setattr(backend, "get_versao", get_versao)
+    return lidas
+
+
+def test_segunda_busca_e_acerto(db, auth, criar_dono):
+    dono = criar_dono(auth, nome="Cache Um")
+
+    assert cache.buscar_dono(db, dono["id"]).nome == "Cache Um"
+    assert cache.buscar_dono(db, dono["id"]).nome == "Cache Um"
+    stats = cache.donos_cache.stats()
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+
+
+def test_inexistente_nao_fica_em_cache(db):
+    assert cache.buscar_dono(db, 10 ** 9) is None
+    assert cache.buscar_dono(db, 10 ** 9) is None
+    assert cache.donos_cache.stats()["tamanho"] == 0
+
+
+def test_entrada_recente_nao_consulta_o_backend(db, auth, criar_dono, consultas_ao_backend):
+    dono = criar_dono(auth)
+    cache.buscar_dono(db, dono["id"])
+    lidas = len(consultas_ao_backend)
+
+    for _ in range(5):
+        cache.buscar_dono(db, dono["id"])
+    assert len(consultas_ao_backend) == lidas
+
+
+def test_entrada_vencida_confere_a_versao_sem_ir_ao_banco(db, auth, criar_dono, consultas_ao_backend, monkeypatch):
+    dono = criar_dono(auth)
+    cache.buscar_dono(db, dono["id"])
+    monkeypatch.setattr(cache, "ENTIDADES_TTL", 0)
+
+    cache.buscar_dono(db, dono["id"])
+    assert f"donos:entidade={dono['id']}" in consultas_ao_backend
+    # Versão igual: continua sendo acerto
+    assert cache.donos_cache.stats()["hits"] == 1
+
+
+def test_alteracao_em_outro_worker_aparece_depois_do_ttl(db, auth, criar_dono, monkeypatch):
+    dono = criar_dono(auth, nome="Antes")
+    cache.buscar_dono(db, dono["id"])
+
+    # Outro worker: grava no banco e incrementa a versão no backend, sem
+    # descartar a entrada deste processo
+    db.execute(text("UPDATE donos SET nome = 'Depois' WHERE id = :id"), {"id": dono["id"]})
+    db.commit()
+    cache.get_backend().incr_versao(f"donos:entidade={dono['id']}")
+
+    assert cache.buscar_dono(db, dono["id"]).nome == "Antes"
+    monkeypatch.setattr(cache, "ENTIDADES_TTL", 0)
+    assert cache.buscar_dono(db, dono["id"]).nome == "Depois"
+
+
+def test_update_e_delete_invalidam_na_hora(cliente, db, auth, criar_dono):
+    dono = criar_dono(auth, nome="Original")
+    url = f"/donos/{dono['id']}"
+    assert cliente.get(url, headers=auth).json()["nome"] == "Original"
+
+    cliente.patch(url, json={"nome": "Alterado"}, headers=auth)
+    assert cliente.get(url, headers=auth).json()["nome"] == "Alterado"
+
+    cliente.delete(url, headers=auth)
+    assert cliente.get(url, headers=auth).status_code == 404
+    assert cache.buscar_dono(db, dono["id"]) is None
+
+
+def test_invalidar_um_dono_preserva_os_outros(db, auth, criar_dono):
+    a = criar_dono(auth)
+    b = criar_dono(auth)
+    cache.buscar_dono(db, a["id"])
+    cache.buscar_dono(db, b["id"])
+
+    cache.invalidar_dono(a["id"])
+    cache.buscar_dono(db, b["id"])
+    cache.buscar_dono(db, a["id"])
+    stats = cache.donos_cache.stats()
+    assert (stats["hits"], stats["misses"]) == (1, 3)
+
+
+def test_validacao_de_chave_estrangeira_usa_o_cache(cliente, db, auth, criar_dono):
+    dono = criar_dono(auth)
+    for nome in ("Rex", "Thor", "Luna"):
+        resposta = cliente.post(
+            "/animais/", json={"nome": nome, "especie": "cachorro", "idade": 2, "dono_id": dono["id"]}, headers=auth
+        )
+        assert resposta.status_code == 201
+    stats = cache.donos_cache.stats()
+    assert (stats["hits"], stats["misses"]) == (2, 1)
+
+
+def test_estatisticas_com_hit_rate(db, auth, criar_dono):
+    dono = criar_dono(auth)
+    for _ in range(4):
+        cache.buscar_dono(db, dono["id"])
+
+    stats = cache.estatisticas()
+    assert stats["donos"]["hit_rate"] == 0.75
+    assert {"animais", "backend", "coalescencia"} <= stats.keys()
+
+
+def test_rota_de_estatisticas(cliente, db, auth, admin, criar_dono):
+    dono = criar_dono(auth)
+    for _ in range(2):
+        assert cliente.get(f"/donos/{dono['id']}", headers=auth).status_code == 200
+
+    donos = cliente.get("/cache/stats", headers=admin).json()["donos"]
+    assert (donos["hits"], donos["misses"], donos["hit_rate"]) == (1, 1, 0.5)
@@ -0,0 +1,123 @@
+"""Coalescência de requisições simultâneas (cache.SingleFlight e cache.cached)"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import cache
+
+ESPERADAS = 4
+
+
+def _esperar(condicao, limite=5.0):
+    fim = time.monotonic() + limite
+    while not condicao():
+        assert time.monotonic() < fim, "condição não atingida"
+        time.sleep(0.005)
+
+
+class Calculo:
+    """calcular() que só termina quando liberado, contando as execuções"""
+
+    def __init__(self, resultado="pronto", erro=None):
+        self.resultado = resultado
+        self.erro = erro
+        self.execucoes = 0
+        self.liberar = threading.Event()
+
+    def __call__(self):
+        self.execucoes += 1
+        assert self.liberar.wait(5)
+        if self.erro is not None:
+            raise self.erro
+        return self.resultado
+
+
+@pytest.fixture
+def pool():
+    with ThreadPoolExecutor(max_workers=ESPERADAS + 1) as executor:
+        yield executor
+
+
+def test_chamadas_simultaneas_executam_uma_vez(pool):
+    voo = cache.SingleFlight()
+    calculo = Calculo(resultado=object())
+
+    futuros = [pool.submit(voo.executar, "k", calculo) for _ in range(ESPERADAS)]
+    _esperar(lambda: voo.coalescidas == ESPERADAS - 1)
+    assert voo.stats()["em_andamento"] == 1
+    calculo.liberar.set()
+
+    resultados = [f.result(timeout=5) for f in futuros]
+    assert calculo.execucoes == 1
+    # Todos recebem o mesmo objeto, não cópias
+    assert all(r is calculo.resultado for r in resultados)
+    assert voo.stats() == {
+        "execucoes": 1,
+        "coalescidas": ESPERADAS - 1,
+        "esperas_esgotadas": 0,
+        "em_andamento": 0,
+        "taxa_coalescencia": 0.75,
+    }
+
+
+def test_excecao_chega_a_todos_os_que_esperavam(pool):
+    voo = cache.SingleFlight()
+    calculo = Calculo(erro=RuntimeError("banco indisponível"))
+
+    futuros = [pool.submit(voo.executar, "k", calculo) for _ in range(3)]
+    _esperar(lambda: voo.coalescidas == 2)
+    calculo.liberar.set()
+
+    for futuro in futuros:
+        with pytest.raises(RuntimeError, match="banco indisponível"):
+            futuro.result(timeout=5)
+    assert calculo.execucoes == 1
+
+
+def test_chaves_diferentes_nao_se_esperam(pool):
+    voo = cache.SingleFlight()
+    lento = Calculo()
+    lider = pool.submit(voo.executar, "lenta", lento)
+    _esperar(lambda: lento.execucoes == 1)
+
+    assert voo.executar("rapida", lambda: 42) == 42
+    lento.liberar.set()
+    assert lider.result(timeout=5) == "pronto"
+    assert voo.coalescidas == 0
+
+
+def test_espera_esgotada_calcula_por_conta_propria(pool):
+    voo = cache.SingleFlight(espera_maxima=0.05)
+    travado = Calculo()
+    lider = pool.submit(voo.executar, "k", travado)
+    _esperar(lambda: travado.execucoes == 1)
+
+    assert voo.executar("k", lambda: "sozinho") == "sozinho"
+    assert voo.esperas_esgotadas == 1
+    travado.liberar.set()
+    lider.result(timeout=5)
+
+
+def test_terminado_o_voo_a_proxima_chamada_calcula_de_novo():
+    voo = cache.SingleFlight()
+    assert [voo.executar("k", lambda i=i: i) for i in range(3)] == [0, 1, 2]
+    assert (voo.execucoes, voo.coalescidas) == (3, 0)
+
+
+def test_cached_coalesce_o_miss(pool, monkeypatch):
+    monkeypatch.setattr(cache, "coalescencia", cache.SingleFlight())
+    calculo = Calculo(resultado=[{"id": 1}])
+    namespace = f"teste:coalescencia:{time.monotonic_ns()}"
+
+    futuros = [pool.submit(cache.cached, namespace, ["donos"], calculo) for _ in range(ESPERADAS)]
+    _esperar(lambda: cache.coalescencia.coalescidas == ESPERADAS - 1)
+    calculo.liberar.set()
+
+    assert [f.result(timeout=5) for f in futuros] == [[{"id": 1}]] * ESPERADAS
+    # Gravado no backend: a próxima chamada nem entra no voo
+    assert cache.cached(namespace, ["donos"], calculo) == [{"id": 1}]
+    assert calculo.execucoes == 1
+    assert cache.coalescencia.execucoes == 1
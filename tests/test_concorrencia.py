@@ -0,0 +1,176 @@
+"""Concorrência otimista: ETag, If-Match e compare-and-swap (concorrencia.py)"""
+
+import pytest
+
+import concorrencia
+
+
+@pytest.mark.parametrize("valor, esperado", [
+    (None, None),
+    ("*", None),
+    ('"3"', 3),
+    ('W/"7"', 7),
+    ("12", 12),
+])
+def test_versao_do_if_match(valor, esperado):
+    assert concorrencia.versao_do_if_match(valor) == esperado
+
+
+@pytest.mark.parametrize("valor", ['"abc"', '"-1"', '""', "W/"])
+def test_versao_do_if_match_invalida(valor):
+    with pytest.raises(ValueError):
+        concorrencia.versao_do_if_match(valor)
+
+
+def _ler(cliente, auth, dono_id):
+    resposta = cliente.get(f"/donos/{dono_id}", headers=auth)
+    assert resposta.status_code == 200
+    return resposta
+
+
+def test_get_devolve_a_versao_no_etag(cliente, auth, criar_dono):
+    dono = criar_dono(auth)
+    resposta = _ler(cliente, auth, dono["id"])
+    assert resposta.headers["etag"] == concorrencia.etag(resposta.json()["version"])
+
+
+def test_put_com_a_versao_lida_grava_e_incrementa(cliente, auth, criar_dono):
+    dono = criar_dono(auth)
+    etag = _ler(cliente, auth, dono["id"]).headers["etag"]
+
+    resposta = cliente.put(
+        f"/donos/{dono['id']}",
+        json={"nome": "Maria Editada", "telefone": "11987654321"},
+        headers={**auth, "If-Match": etag},
+    )
+    assert resposta.status_code == 200
+    versao = resposta.json()["version"]
+    assert versao == concorrencia.versao_do_if_match(etag) + 1
+    assert resposta.headers["etag"] == concorrencia.etag(versao)
+    assert _ler(cliente, auth, dono["id"]).json()["nome"] == "Maria Editada"
+
+
+def test_segunda_gravacao_com_versao_antiga_responde_409(cliente, auth, criar_dono):
+    dono = criar_dono(auth)
+    # Recepção e veterinário leem a mesma versão
+    etag = _ler(cliente, auth, dono["id"]).headers["etag"]
+
+    primeira = cliente.put(
+        f"/donos/{dono['id']}",
+        json={"nome": "Recepção", "telefone": "11987654321"},
+        headers={**auth, "If-Match": etag},
+    )
+    assert primeira.status_code == 200
+
+    segunda = cliente.put(
+        f"/donos/{dono['id']}",
+        json={"nome": "Veterinário", "telefone": "11987654321"},
+        headers={**auth, "If-Match": etag},
+    )
+    assert segunda.status_code == 409
+    assert segunda.headers["etag"] == primeira.headers["etag"]
+    # A primeira gravação não foi sobrescrita
+    assert _ler(cliente, auth, dono["id"]).json()["nome"] == "Recepção"
+
+
+def test_if_match_invalido_responde_400(cliente, auth, criar_dono):
+    dono = criar_dono(auth)
+    resposta = cliente.patch(f"/donos/{dono['id']}", json={"nome": "X"}, headers={**auth, "If-Match": '"abc"'})
+    assert resposta.status_code == 400
+
+
+def test_sem_if_match_grava_e_ainda_incrementa_a_versao(cliente, auth, criar_dono):
+    dono = criar_dono(auth)
+    antes = _ler(cliente, auth, dono["id"]).json()["version"]
+
+    resposta = cliente.patch(f"/donos/{dono['id']}", json={"nome": "Sem If-Match"}, headers=auth)
+    assert resposta.status_code == 200
+    assert resposta.json()["version"] == antes + 1
+
+
+def test_patch_altera_so_os_campos_enviados(cliente, auth, criar_dono):
+    dono = criar_dono(auth, nome="Ana Lima", telefone="11911112222")
+    etag = _ler(cliente, auth, dono["id"]).headers["etag"]
+
+    resposta = cliente.patch(f"/donos/{dono['id']}", json={"nome": "Ana Paula Lima"}, headers={**auth, "If-Match": etag})
+    assert resposta.status_code == 200
+    assert resposta.json()["nome"] == "Ana Paula Lima"
+    assert resposta.json()["telefone"] == "11911112222"
+
+
+def test_registro_excluido_responde_404_e_nao_409(cliente, auth, criar_dono):
+    dono = criar_dono(auth)
+    etag = _ler(cliente, auth, dono["id"]).headers["etag"]
+    assert cliente.delete(f"/donos/{dono['id']}", headers=auth).status_code == 204
+
+    resposta = cliente.put(
+        f"/donos/{dono['id']}",
+        json={"nome": "Fantasma", "telefone": "11987654321"},
+        headers={**auth, "If-Match": etag},
+    )
+    assert resposta.status_code == 404
+
+
+def _consulta(cliente, auth, criar_dono):
+    dono = criar_dono(auth)
+    animal = cliente.post(
+        "/animais/", json={"nome": "Rex", "especie": "cachorro", "idade": 3, "dono_id": dono["id"]}, headers=auth
+    ).json()
+    return cliente.post("/consultas/", json={
+        "data_hora": "2030-01-10T10:00:00",
+        "motivo": "Check-up",
+        "dono_id": dono["id"],
+        "animal_id": animal["id"],
+    }, headers=auth).json()
+
+
+def test_transicao_de_status_invalida_responde_409(cliente, auth, criar_dono):
+    consulta = _consulta(cliente, auth, criar_dono)
+
+    url = f"/consultas/{consulta['id']}/status"
+    assert cliente.patch(url, json={"status": "concluida"}, headers=auth).status_code == 200
+    # concluida não volta para agendada; a linha fica como estava
+    recusada = cliente.patch(url, json={"status": "agendada"}, headers=auth)
+    assert recusada.status_code == 409
+    assert cliente.get(f"/consultas/{consulta['id']}", headers=auth).json()["status"] == "concluida"
+
+
+@pytest.mark.parametrize("metodo", ["patch", "put"])
+def test_atualizacao_generica_nao_dribla_a_transicao(cliente, auth, criar_dono, metodo):
+    consulta = _consulta(cliente, auth, criar_dono)
+    url = f"/consultas/{consulta['id']}"
+    assert cliente.patch(f"{url}/status", json={"status": "concluida"}, headers=auth).status_code == 200
+
+    recusada = getattr(cliente, metodo)(url, json={"status": "agendada"}, headers=auth)
+    assert recusada.status_code == 409
+    assert cliente.get(url, headers=auth).json()["status"] == "concluida"
+
+
+def test_atualizacao_generica_mantendo_o_status(cliente, auth, criar_dono):
+    consulta = _consulta(cliente, auth, criar_dono)
+    url = f"/consultas/{consulta['id']}"
+
+    resposta = cliente.patch(url, json={"status": "Agendada", "motivo": "Retorno"}, headers=auth)
+    assert resposta.status_code == 200
+    assert resposta.json()["motivo"] == "Retorno"
+    # Transição permitida pela rota genérica também
+    assert cliente.patch(url, json={"status": "em andamento"}, headers=auth).json()["status"] == "em_andamento"
+    assert cliente.patch(url, json={"status": "bogus"}, headers=auth).status_code == 400
+
+
+def test_servico_concluido_nao_volta_pela_rota_generica(cliente, auth, criar_dono):
+    dono = criar_dono(auth)
+    animal = cliente.post(
+        "/animais/", json={"nome": "Mel", "especie": "gato", "idade": 2, "dono_id": dono["id"]}, headers=auth
+    ).json()
+    servico = cliente.post("/banho-tosa/", json={
+        "data_hora": "2030-01-10T14:00:00",
+        "tipo_servico": "banho",
+        "dono_id": dono["id"],
+        "animal_id": animal["id"],
+    }, headers=auth).json()
+    url = f"/banho-tosa/{servico['id']}"
+
+    assert cliente.patch(f"{url}/status", json={"status": "concluido"}, headers=auth).status_code == 200
+    assert cliente.patch(url, json={"status": "agendado"}, headers=auth).status_code == 409
+    assert cliente.get(url, headers=auth).json()["status"] == "concluido"
@@ -0,0 +1,93 @@
+"""GET /dashboard/bootstrap: conteúdo, cache pelas versões e paralelismo limitado"""
+
+import threading
+import time
+
+from anyio import CapacityLimiter
+
+from routers import dashboard
+
+BLOCOS = {"stats_consultas", "stats_banho_tosa", "agenda_hoje", *dashboard.LISTAS}
+
+
+def _bootstrap(cliente, headers, **params):
+    resposta = cliente.get("/dashboard/bootstrap", params=params, headers=headers)
+    assert resposta.status_code == 200, resposta.text
+    return resposta.json()
+
+
+def test_traz_usuario_e_todos_os_blocos(cliente, auth, criar_dono):
+    dono = criar_dono(auth, nome="Dono do Painel")
+    corpo = _bootstrap(cliente, auth, limite=5000)
+
+    assert BLOCOS <= corpo.keys()
+    assert corpo["usuario"]["nome"] == "Teste"
+    donos = corpo["donos"]
+    assert donos["completo"] and donos["total"] == len(donos["itens"])
+    assert dono["id"] in {d["id"] for d in donos["itens"]}
+
+
+def test_pagina_incompleta_informa_o_total(cliente, auth, criar_dono):
+    criar_dono(auth)
+    criar_dono(auth)
+    donos = _bootstrap(cliente, auth, limite=1)["donos"]
+    assert len(donos["itens"]) == 1
+    assert donos["total"] >= 2 and donos["completo"] is False
+
+
+def test_cache_vale_ate_a_proxima_escrita(cliente, auth, criar_dono, monkeypatch):
+    montagens = []
+    original = dashboard._montar_em_paralelo
+    monkeypatch.setattr(
+        dashboard, "_montar_em_paralelo", lambda *args: montagens.append(args) or original(*args)
+    )
+
+    _bootstrap(cliente, auth, limite=7)
+    _bootstrap(cliente, auth, limite=7)
+    assert len(montagens) == 1
+
+    novo = criar_dono(auth, nome="Depois do Cache")
+    corpo = _bootstrap(cliente, auth, limite=5000)
+    assert len(montagens) == 2
+    assert novo["id"] in {d["id"] for d in corpo["donos"]["itens"]}
+
+
+def test_usuario_fica_fora_do_cache(cliente, autenticar):
+    primeiro, segundo = autenticar(), autenticar()
+    a = _bootstrap(cliente, primeiro)["usuario"]
+    b = _bootstrap(cliente, segundo)["usuario"]
+    assert a["id"] != b["id"]
+
+
+def test_filial_monta_com_o_proprio_banco(cliente, auth, autenticar, criar_dono):
+    centro = autenticar(filial="centro")
+    dono = criar_dono(centro, nome="Painel do Centro")
+
+    assert dono["id"] in {d["id"] for d in _bootstrap(cliente, centro, limite=5000)["donos"]["itens"]}
+    matriz = _bootstrap(cliente, auth, limite=5000)["donos"]["itens"]
+    assert "Painel do Centro" not in {d["nome"] for d in matriz}
+
+
+def test_blocos_respeitam_o_limitador(cliente, auth, criar_dono, monkeypatch):
+    # Escrita nova: a próxima chamada monta de novo, sem vir do cache
+    criar_dono(auth)
+    em_andamento, maximo = [0], [0]
+    trava = threading.Lock()
+    original = dashboard._com_sessao
+
+    def com_sessao(funcao, *args):
+        with trava:
+            em_andamento[0] += 1
+            maximo[0] = max(maximo[0], em_andamento[0])
+        try:
+            time.sleep(0.02)
+            return original(funcao, *args)
+        finally:
+            with trava:
+                em_andamento[0] -= 1
+
+    monkeypatch.setattr(dashboard, "_com_sessao", com_sessao)
+    monkeypatch.setattr(dashboard, "_limitador_do_loop", lambda: CapacityLimiter(2))
+
+    assert BLOCOS <= _bootstrap(cliente, auth).keys()
+    assert maximo[0] == 2
@@ -0,0 +1,85 @@
+"""Perfilador por requisição (X-Perfil) e rotas /debug: só para administradores da matriz"""
+
+import threading
+import time
+
+import pytest
+
+import diagnostico
+import security
+from conftest import ADMIN
+
+
+def _perfilado(resposta):
+    assert resposta.status_code == 200, resposta.text
+    return resposta.headers.get("x-perfil")
+
+
+def test_admin_recebe_o_perfil_e_pode_baixar(cliente, admin):
+    nome = _perfilado(cliente.get("/donos/", headers={**admin, "X-Perfil": "1"}))
+    assert nome and nome.endswith("_GET_donos.folded")
+
+    assert nome in {p["nome"] for p in cliente.get("/debug/perfis", headers=admin).json()}
+    conteudo = cliente.get(f"/debug/perfis/{nome}", headers=admin).text
+    cabecalho, *pilhas = conteudo.splitlines()
+    assert cabecalho.startswith("# GET /donos/ ")
+    # Collapsed stacks: "thread;frame;frame contagem"
+    assert all(linha.rsplit(" ", 1)[1].isdigit() for linha in pilhas)
+
+
+def test_pedido_pela_query_string(cliente, admin):
+    assert _perfilado(cliente.get("/donos/", params={"_perfil": "1"}, headers=admin))
+    assert _perfilado(cliente.get("/donos/", params={"_perfil": "0"}, headers=admin)) is None
+    assert _perfilado(cliente.get("/donos/", headers={**admin, "X-Perfil": "0"})) is None
+
+
+def test_usuario_comum_segue_sem_perfil(cliente, auth):
+    assert _perfilado(cliente.get("/donos/", headers={**auth, "X-Perfil": "1"})) is None
+    assert cliente.get("/debug/perfis", headers=auth).status_code == 403
+
+
+def test_admin_de_filial_segue_sem_perfil(cliente, autenticar):
+    # Mesmo e-mail de administrador, mas cadastrado numa filial
+    filial = autenticar(filial="zona-sul", email=ADMIN)
+    assert _perfilado(cliente.get("/donos/", headers={**filial, "X-Perfil": "1"})) is None
+
+
+def test_claim_admin_forjada_nao_liga_o_perfil(cliente, auth):
+    user_id = security.decode_token(auth["Authorization"].split()[1])["user_id"]
+    forjado = {"Authorization": f"Bearer {security.create_token({'user_id': user_id, 'admin': True})}"}
+    # A claim passa pelo _pedido_de_perfil, mas o e-mail no banco não é de administrador
+    assert _perfilado(cliente.get("/donos/", headers={**forjado, "X-Perfil": "1"})) is None
+
+
+def test_um_perfil_por_vez_no_processo(cliente, admin):
+    assert diagnostico._perfil_em_andamento.acquire(blocking=False)
+    try:
+        assert _perfilado(cliente.get("/donos/", headers={**admin, "X-Perfil": "1"})) is None
+    finally:
+        diagnostico._perfil_em_andamento.release()
+
+
+@pytest.mark.parametrize("nome", ["nao-existe.folded", "..%2Fclinica_vet.db", "perfil.txt"])
+def test_download_de_nome_invalido_responde_404(cliente, admin, nome):
+    assert cliente.get(f"/debug/perfis/{nome}", headers=admin).status_code == 404
+
+
+def test_amostrador_conta_pilhas_da_thread_ocupada():
+    parar = threading.Event()
+
+    def ocupada():
+        while not parar.is_set():
+            sum(range(1000))
+
+    trabalho = threading.Thread(target=ocupada, name="ocupada")
+    trabalho.start()
+    amostrador = diagnostico.Amostrador(intervalo=0.001)
+    amostrador.start()
+    time.sleep(0.05)
+    amostrador.parar()
+    parar.set()
+    trabalho.join()
+
+    assert amostrador.amostras > 0
+    pilhas = [linha for linha in amostrador.collapsed().splitlines() if linha.startswith("ocupada;")]
+    assert pilhas and any("ocupada (test_diagnostico.py" in linha for linha in pilhas)
@@ -0,0 +1,109 @@
+"""Detecção de donos duplicados por bloqueio e mesclagem (duplicados.py)"""
+
+import random
+
+import pytest
+
+import duplicados
+
+
+def _telefone():
+    # Telefones únicos: o padrão do criar_dono forma um bloco com os donos dos outros testes
+    return f"219{random.randrange(10 ** 7, 10 ** 8)}"
+
+
+@pytest.fixture
+def zona_sul(autenticar):
+    """Banco de filial, longe dos blocos "Maria Souza" que os outros testes criam na matriz"""
+    return autenticar(filial="zona-sul")
+
+
+def _pares(cliente, headers, ids):
+    """Pares sugeridos entre os ids dados: {frozenset(par): motivos}"""
+    corpo = cliente.get("/donos/duplicados", params={"limite": 5000}, headers=headers).json()
+    pares = {}
+    for par in corpo["pares"]:
+        chave = frozenset(d["id"] for d in par["donos"])
+        if chave <= set(ids):
+            pares[chave] = par["motivos"]
+    return corpo, pares
+
+
+def test_mesmo_telefone_em_formatos_diferentes(cliente, zona_sul, criar_dono):
+    telefone = _telefone()
+    a = criar_dono(zona_sul, nome="Cláudio Barreto", telefone=telefone)
+    b = criar_dono(zona_sul, nome="Otávio Nunes", telefone=f"+55 ({telefone[:2]}) {telefone[2:7]}-{telefone[7:]}")
+
+    _, pares = _pares(cliente, zona_sul, [a["id"], b["id"]])
+    assert pares == {frozenset((a["id"], b["id"])): ["telefone"]}
+
+
+def test_nome_com_a_mesma_pronuncia(cliente, zona_sul, criar_dono):
+    a = criar_dono(zona_sul, nome="Raphaella Guimarães", telefone=_telefone())
+    b = criar_dono(zona_sul, nome="Rafaela Guimaraes", telefone=_telefone())
+    # Mesma chave fonética, mas nomes diferentes demais
+    c = criar_dono(zona_sul, nome="Rafaela Beatriz Conceição Guimarães", telefone=_telefone())
+
+    _, pares = _pares(cliente, zona_sul, [a["id"], b["id"], c["id"]])
+    assert pares == {frozenset((a["id"], b["id"])): ["nome"]}
+
+
+def test_bloco_grande_demais_e_ignorado(cliente, zona_sul, criar_dono, monkeypatch):
+    monkeypatch.setattr(duplicados, "TAMANHO_MAXIMO_BLOCO", 2)
+    telefone = _telefone()
+    ids = [criar_dono(zona_sul, nome=nome, telefone=telefone)["id"] for nome in ("Ana Prado", "Bia Lopes", "Caio Reis")]
+
+    corpo, pares = _pares(cliente, zona_sul, ids)
+    assert pares == {}
+    assert corpo["blocos_ignorados"] >= 1
+
+
+def test_mesclar_reponta_e_exclui(cliente, auth, criar_dono):
+    manter = criar_dono(auth, nome="Joana Dias")
+    remover = criar_dono(auth, nome="Joana Dias")
+    animal = cliente.post(
+        "/animais/", json={"nome": "Pipoca", "especie": "gato", "idade": 4, "dono_id": remover["id"]}, headers=auth
+    ).json()
+
+    resposta = cliente.post(
+        "/donos/mesclar", json={"grupos": [{"manter_id": manter["id"], "remover_ids": [remover["id"]]}]}, headers=auth
+    )
+    assert resposta.status_code == 200
+    assert resposta.json()["removidos"] == {"donos": [remover["id"]]}
+    assert resposta.json()["repontados"]["animais"] == [animal["id"]]
+
+    assert cliente.get(f"/animais/{animal['id']}", headers=auth).json()["dono_id"] == manter["id"]
+    assert cliente.get(f"/donos/{remover['id']}", headers=auth).status_code == 404
+
+
+@pytest.mark.parametrize("grupos, mensagem", [
+    ([(1, [])], "sem donos para remover"),
+    ([(1, [1, 2])], "não pode ser mantido e removido"),
+    # Ciclo: cada um seria mantido num grupo e removido no outro
+    ([(1, [2]), (2, [1])], "mais de um grupo"),
+    # Cadeia: 2 é removido no primeiro grupo e mantido no segundo (e vice-versa)
+    ([(1, [2]), (2, [3])], "mais de um grupo"),
+    ([(2, [3]), (1, [2])], "mais de um grupo"),
+    ([(1, [3]), (2, [3])], "mais de um grupo"),
+])
+def test_grupos_conflitantes_recusados_antes_do_banco(grupos, mensagem):
+    # A validação estrutural não toca no banco
+    with pytest.raises(duplicados.MesclagemInvalida, match=mensagem):
+        duplicados._validar(None, grupos)
+
+
+def test_mesclar_com_ciclo_ou_dono_inexistente_responde_400(cliente, auth, criar_dono):
+    a, b = criar_dono(auth), criar_dono(auth)
+    ciclo = {"grupos": [
+        {"manter_id": a["id"], "remover_ids": [b["id"]]},
+        {"manter_id": b["id"], "remover_ids": [a["id"]]},
+    ]}
+    assert cliente.post("/donos/mesclar", json=ciclo, headers=auth).status_code == 400
+
+    inexistente = {"grupos": [{"manter_id": a["id"], "remover_ids": [10 ** 9]}]}
+    resposta = cliente.post("/donos/mesclar", json=inexistente, headers=auth)
+    assert resposta.status_code == 400
+    assert str(10 ** 9) in resposta.json()["detail"]
+    # Nada foi mesclado
+    assert cliente.get(f"/donos/{a['id']}", headers=auth).status_code == 200
+    assert cliente.get(f"/donos/{b['id']}", headers=auth).status_code == 200
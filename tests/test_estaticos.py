@@ -0,0 +1,154 @@
+"""Build versionado dos estáticos e negociação .br/.gz (estaticos.py)"""
+
+import gzip
+import os
+import re
+import types
+
+import pytest
+from starlette.applications import Starlette
+from starlette.routing import Mount
+from starlette.testclient import TestClient
+
+import estaticos
+
+JS = "function ola() { return 'olá'; }\n" * 200
+HTML = '<link href="./css/tela.css" rel="stylesheet"><script src="app.js"></script><a href="https://x.y/app.js">'
+
+
+@pytest.fixture
+def origem(tmp_path):
+    pasta = tmp_path / "origem"
+    (pasta / "css").mkdir(parents=True)
+    (pasta / "app.js").write_text(JS)
+    (pasta / "css" / "tela.css").write_text("body { margin: 0 }")
+    (pasta / "index.html").write_text(HTML)
+    return pasta
+
+
+@pytest.fixture
+def brotli_falso(monkeypatch):
+    """Sem o pacote brotli instalado: um "compressor" que sempre compensa"""
+    monkeypatch.setattr(estaticos, "_brotli", lambda: types.SimpleNamespace(compress=lambda dados, quality: b"br!"))
+
+
+def _arquivos(pasta):
+    return sorted(
+        os.path.relpath(os.path.join(raiz, nome), pasta).replace(os.sep, "/")
+        for raiz, _, nomes in os.walk(pasta) for nome in nomes
+    )
+
+
+def _com_hash(pasta, prefixo, ext):
+    (nome,) = [a for a in _arquivos(pasta) if a.startswith(prefixo) and a.endswith(ext) and a.count(".") == 2]
+    return nome
+
+
+# ---- build ----
+
+def test_assets_ganham_hash_e_o_html_aponta_para_eles(origem, tmp_path):
+    pasta = estaticos.construir(str(origem), str(tmp_path / "build"))
+    js = _com_hash(pasta, "app.", ".js")
+    css = _com_hash(pasta, "css/tela.", ".css")
+    assert js == f"app.{estaticos._hash(JS.encode())}.js"
+
+    html = open(os.path.join(pasta, "index.html")).read()
+    assert f'href="./{css}"' in html and f'src="{js}"' in html
+    # URLs externas não são tocadas
+    assert 'href="https://x.y/app.js"' in html
+    # O nome original continua servido
+    assert os.path.isfile(os.path.join(pasta, "app.js"))
+
+
+def test_gz_so_quando_compensa(origem, tmp_path):
+    pasta = estaticos.construir(str(origem), str(tmp_path / "build"))
+    js = _com_hash(pasta, "app.", ".js")
+    assert gzip.decompress(open(os.path.join(pasta, js + ".gz"), "rb").read()).decode() == JS
+    # CSS minúsculo: o gzip ficaria maior que o original
+    assert not any(a.startswith("css/") and a.endswith(".gz") for a in _arquivos(pasta))
+    # Sem o pacote brotli, nenhum .br
+    assert not any(a.endswith(".br") for a in _arquivos(pasta))
+
+
+def test_mesma_origem_mesma_pasta_e_versoes_antigas_limitadas(origem, tmp_path):
+    destino = str(tmp_path / "build")
+    primeira = estaticos.construir(str(origem), destino)
+    assert estaticos.construir(str(origem), destino) == primeira
+
+    # A ordem das versões é a do mtime: datas explícitas, independentes da resolução do disco
+    pastas = [primeira]
+    os.utime(primeira, (1e9, 1e9))
+    for i in range(1, estaticos.VERSOES_MANTIDAS + 1):
+        (origem / "app.js").write_text(JS + f"// {i}\n")
+        pastas.append(estaticos.construir(str(origem), destino))
+        os.utime(pastas[-1], (1e9 + i, 1e9 + i))
+
+    assert len(set(pastas)) == len(pastas)
+    restantes = {os.path.join(destino, nome) for nome in os.listdir(destino)}
+    assert restantes == set(pastas[-estaticos.VERSOES_MANTIDAS:])
+
+
+@pytest.mark.parametrize("cabecalho, codificacao, aceita", [
+    ("gzip, deflate, br", "br", True),
+    ("gzip", "br", False),
+    ("br;q=0", "br", False),
+    ("br;q=0.5, gzip", "br", True),
+    ("*", "gzip", True),
+    ("GZIP", "gzip", True),
+    ("gzip;q=abc", "gzip", False),
+    ("", "gzip", False),
+])
+def test_aceita(cabecalho, codificacao, aceita):
+    assert estaticos._aceita(cabecalho, codificacao) is aceita
+
+
+# ---- servindo ----
+
+@pytest.fixture
+def servidor(origem, tmp_path, monkeypatch, brotli_falso):
+    monkeypatch.setattr(estaticos, "BUILD_DIR", str(tmp_path / "build"))
+    app = Starlette(routes=[Mount("/s", estaticos.StaticFilesPrecomprimidos(directory=str(origem), nome="s"))])
+    with TestClient(app) as cliente:
+        cliente.get("/s/index.html")  # dispara o build
+        yield cliente, estaticos.construir(str(origem), str(tmp_path / "build" / "s"))
+
+
+@pytest.mark.parametrize("accept_encoding, esperado", [
+    ("br, gzip", "br"),
+    ("gzip", "gzip"),
+    ("br;q=0, gzip", "gzip"),
+    ("identity", None),
+])
+def test_negociacao_da_variante(servidor, accept_encoding, esperado):
+    cliente, pasta = servidor
+    js = _com_hash(pasta, "app.", ".js")
+
+    resposta = cliente.get(f"/s/{js}", headers={"Accept-Encoding": accept_encoding})
+    assert resposta.status_code == 200
+    assert resposta.headers.get("content-encoding") == esperado
+    assert resposta.headers["vary"] == "Accept-Encoding"
+    assert resposta.headers["content-type"].startswith(("application/javascript", "text/javascript"))
+    if esperado == "br":
+        assert resposta.content == b"br!"
+    else:
+        # gzip é decodificado pelo cliente
+        assert resposta.text == JS
+
+
+def test_cache_imutavel_so_para_nomes_com_hash(servidor):
+    cliente, pasta = servidor
+    js = _com_hash(pasta, "app.", ".js")
+
+    assert cliente.get(f"/s/{js}").headers["cache-control"] == estaticos.CACHE_IMUTAVEL
+    html = cliente.get("/s/index.html", headers={"Accept-Encoding": "identity"})
+    assert html.headers["cache-control"] == estaticos.CACHE_REVALIDAR
+    assert js in html.text
+
+    revalidado = cliente.get("/s/index.html", headers={"If-None-Match": html.headers["etag"], "Accept-Encoding": "identity"})
+    assert revalidado.status_code == 304
+
+
+def test_frontend_da_aplicacao_vem_versionado(cliente):
+    html = cliente.get("/frontend/index.html", headers={"Accept-Encoding": "identity"})
+    assert html.status_code == 200
+    assert re.search(r'src="\./app\.[0-9a-f]{10}\.js"', html.text)
@@ -0,0 +1,80 @@
+"""Exclusão lógica em cascata e purga das linhas excluídas (exclusao.py)"""
+
+from sqlalchemy import text
+
+import database
+import exclusao
+
+
+def _ficha(cliente, auth, criar_dono):
+    """Dono com um animal, uma vacina e uma consulta"""
+    dono = criar_dono(auth)
+    animal = cliente.post(
+        "/animais/", json={"nome": "Rex", "especie": "cachorro", "idade": 3, "dono_id": dono["id"]}, headers=auth
+    ).json()
+    vacina = cliente.post(
+        f"/vacinas/?animal_id={animal['id']}", json={"nome": "V10", "data_aplicacao": "2024-03-01"}, headers=auth
+    ).json()
+    consulta = cliente.post("/consultas/", json={
+        "data_hora": "2030-01-10T10:00:00",
+        "motivo": "Check-up",
+        "dono_id": dono["id"],
+        "animal_id": animal["id"],
+    }, headers=auth).json()
+    return {"donos": dono["id"], "animais": animal["id"], "vacinas": vacina["id"], "consultas": consulta["id"]}
+
+
+def _linha(tabela, id):
+    with database.engine.connect() as conn:
+        return conn.execute(text(f"SELECT deleted_at, version FROM {tabela} WHERE id = :id"), {"id": id}).first()
+
+
+def test_excluir_dono_marca_os_dependentes(cliente, auth, criar_dono):
+    ids = _ficha(cliente, auth, criar_dono)
+    assert cliente.delete(f"/donos/{ids['donos']}", headers=auth).status_code == 204
+
+    for tabela, id in ids.items():
+        linha = _linha(tabela, id)
+        # A linha continua no banco, só marcada
+        assert linha is not None and linha.deleted_at is not None, tabela
+        assert linha.version == 2, tabela
+
+    assert cliente.get(f"/animais/{ids['animais']}", headers=auth).status_code == 404
+    assert cliente.get(f"/vacinas/{ids['vacinas']}", headers=auth).status_code == 404
+    assert cliente.get(f"/consultas/{ids['consultas']}", headers=auth).status_code == 404
+    assert ids["donos"] not in {d["id"] for d in cliente.get("/donos/", headers=auth).json()}
+
+
+def test_excluir_de_novo_responde_404(cliente, auth, criar_dono):
+    dono = criar_dono(auth)
+    assert cliente.delete(f"/donos/{dono['id']}", headers=auth).status_code == 204
+    assert cliente.delete(f"/donos/{dono['id']}", headers=auth).status_code == 404
+
+
+def test_excluir_animal_preserva_o_dono(cliente, auth, criar_dono):
+    ids = _ficha(cliente, auth, criar_dono)
+    assert cliente.delete(f"/animais/{ids['animais']}", headers=auth).status_code == 204
+
+    assert _linha("donos", ids["donos"]).deleted_at is None
+    for tabela in ("animais", "vacinas", "consultas"):
+        assert _linha(tabela, ids[tabela]).deleted_at is not None, tabela
+
+
+def test_purga_respeita_a_retencao(cliente, auth, criar_dono):
+    ids = _ficha(cliente, auth, criar_dono)
+    assert cliente.delete(f"/donos/{ids['donos']}", headers=auth).status_code == 204
+
+    # Excluídas agora: ainda dentro da retenção
+    exclusao.purgar(database.engine, retencao_dias=1)
+    assert all(_linha(tabela, id) is not None for tabela, id in ids.items())
+
+    # Sem retenção: apagadas de verdade, filhas antes das mães, em lotes de 1
+    purgadas = exclusao.purgar(database.engine, retencao_dias=0, lote=1)
+    assert all(_linha(tabela, id) is None for tabela, id in ids.items())
+    assert all(purgadas[tabela] >= 1 for tabela in ids)
+
+
+def test_purga_nao_toca_linhas_ativas(cliente, auth, criar_dono):
+    ids = _ficha(cliente, auth, criar_dono)
+    exclusao.purgar(database.engine, retencao_dias=0)
+    assert all(_linha(tabela, id) is not None for tabela, id in ids.items())
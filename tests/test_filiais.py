@@ -0,0 +1,110 @@
+"""Filiais: isolamento dos dados por banco, claim do token e contas de administrador"""
+
+import pytest
+
+import rate_limit
+import security
+from conftest import ADMIN
+
+
+def _nomes(cliente, headers):
+    resposta = cliente.get("/donos/", headers=headers)
+    assert resposta.status_code == 200
+    return {d["nome"] for d in resposta.json()}
+
+
+def _bearer(claims: dict, filial=None):
+    return {"Authorization": f"Bearer {security.create_token(claims, filial=filial)}"}
+
+
+def test_login_de_filial_leva_a_claim(autenticar):
+    headers = autenticar(filial="centro")
+    claims = security.decode_token(headers["Authorization"].split()[1])
+    assert claims["filial"] == "centro"
+
+
+def test_login_da_matriz_nao_leva_claim(auth):
+    claims = security.decode_token(auth["Authorization"].split()[1])
+    assert "filial" not in claims
+
+
+def test_dono_da_filial_nao_aparece_nas_outras(cliente, autenticar, auth, criar_dono):
+    centro = autenticar(filial="centro")
+    zona_sul = autenticar(filial="zona-sul")
+    criar_dono(centro, nome="Só no Centro")
+
+    assert "Só no Centro" in _nomes(cliente, centro)
+    assert "Só no Centro" not in _nomes(cliente, auth)
+    assert "Só no Centro" not in _nomes(cliente, zona_sul)
+
+
+def test_id_de_outra_filial_responde_404(cliente, autenticar, criar_dono):
+    centro = autenticar(filial="centro")
+    zona_sul = autenticar(filial="zona-sul")
+    dono = criar_dono(centro, nome="Cliente do Centro")
+    # Mesmo id na zona-sul é outro registro (ou nenhum), nunca o do centro
+    resposta = cliente.get(f"/donos/{dono['id']}", headers=zona_sul)
+    assert resposta.status_code == 404 or resposta.json()["nome"] != "Cliente do Centro"
+
+
+@pytest.mark.parametrize("path", ["/donos/", "/consultas/", "/sync/", "/eventos/"])
+def test_rota_de_dados_sem_token_responde_401(cliente, path):
+    resposta = cliente.get(path)
+    assert resposta.status_code == 401
+    assert resposta.headers["www-authenticate"] == "Bearer"
+
+
+def test_token_invalido_nao_cai_na_matriz(cliente):
+    resposta = cliente.get("/donos/", headers={"Authorization": "Bearer invalido"})
+    assert resposta.status_code == 401
+
+
+def test_rotas_publicas_sem_token(cliente):
+    assert cliente.get("/").status_code == 200
+    assert cliente.get("/frontend/index.html").status_code == 200
+
+
+def test_filial_desconhecida_responde_403(cliente):
+    resposta = cliente.get("/donos/", headers=_bearer({"user_id": 1}, filial="nao-existe"))
+    assert resposta.status_code == 403
+
+
+def test_chave_do_rate_limit_inclui_a_filial():
+    def escopo(filial):
+        token = security.create_token({"user_id": 7}, filial=filial)
+        return {
+            "type": "http", "path": "/donos/", "query_string": b"",
+            "headers": [(b"authorization", f"Bearer {token}".encode())],
+            "client": ("10.0.0.1", 1234),
+        }
+
+    assert rate_limit.identificar_cliente(escopo(None)) == "user:matriz:7"
+    assert rate_limit.identificar_cliente(escopo("centro")) == "user:centro:7"
+    assert rate_limit.identificar_cliente(escopo("zona-sul")) == "user:zona-sul:7"
+
+
+def test_email_de_admin_so_vale_na_matriz(cliente, autenticar, admin):
+    # Qualquer um pode se cadastrar numa filial com o e-mail de um administrador
+    filial = autenticar(filial="centro", email=ADMIN)
+    assert "admin" not in security.decode_token(filial["Authorization"].split()[1])
+    assert cliente.get("/debug/memoria", headers=filial).status_code == 403
+
+    assert cliente.get("/debug/memoria", headers=admin).status_code == 200
+
+
+def test_claim_admin_forjada_nao_da_acesso(cliente, autenticar):
+    headers = autenticar(filial="centro")
+    user_id = security.decode_token(headers["Authorization"].split()[1])["user_id"]
+    forjado = _bearer({"user_id": user_id, "admin": True}, filial="centro")
+    assert cliente.get("/debug/memoria", headers=forjado).status_code == 403
+
+
+ESTATISTICAS = ["/cache/stats", "/database/stats", "/eventos/stats", "/jobs/stats"]
+
+
+@pytest.mark.parametrize("path", ESTATISTICAS)
+def test_estatisticas_so_para_administradores(cliente, auth, autenticar, admin, path):
+    assert cliente.get(path).status_code == 401
+    assert cliente.get(path, headers=auth).status_code == 403
+    assert cliente.get(path, headers=autenticar(filial="centro")).status_code == 403
+    assert cliente.get(path, headers=admin).status_code == 200
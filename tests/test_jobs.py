@@ -0,0 +1,254 @@
+"""Fila de jobs: reivindicação, novas tentativas, cancelamento e órfãos (jobs.py)"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+import database
+import exclusao
+import jobs
+import models
+
+_falhas = []
+
+
+@jobs.tarefa("teste_falha", max_tentativas=2)
+def _tarefa_que_falha(ctx):
+    _falhas.append(ctx.job_id)
+    raise RuntimeError("falha de teste")
+
+
+@jobs.tarefa("teste_progresso")
+def _tarefa_com_progresso(ctx):
+    ctx.progresso(50, "metade")
+    return {"ok": True}
+
+
+@pytest.fixture
+def db(cliente):
+    # A fila fica no banco da matriz; o cliente garante o schema
+    db = Session(bind=database.engine)
+    # Jobs deixados por outros testes não disputam a reivindicação
+    db.execute(update(models.Job).where(models.Job.status == "pendente").values(status="cancelado"))
+    db.commit()
+    yield db
+    db.close()
+
+
+def _job(db, job_id):
+    db.expire_all()
+    return db.get(models.Job, job_id)
+
+
+def test_job_e_reivindicado_uma_unica_vez(db):
+    job = jobs.enfileirar(db, "teste_falha")
+
+    assert jobs._reivindicar(database.engine, "worker-a") == job.id
+    assert jobs._reivindicar(database.engine, "worker-b") is None
+
+    job = _job(db, job.id)
+    assert job.status == "executando"
+    assert job.worker == "worker-a"
+    assert job.tentativas == 1
+
+
+def test_falha_volta_para_a_fila_com_espera_e_depois_falha(db):
+    job = jobs.enfileirar(db, "teste_falha")
+    assert job.max_tentativas == 2
+
+    jobs._reivindicar(database.engine, "worker")
+    jobs.executar_job(job.id)
+    job = _job(db, job.id)
+    assert job.status == "pendente"
+    assert "falha de teste" in job.erro
+    assert job.executar_apos > datetime.utcnow()
+    # A espera ainda não passou
+    assert jobs._reivindicar(database.engine, "worker") is None
+
+    job.executar_apos = datetime.utcnow() - timedelta(seconds=1)
+    db.commit()
+    assert jobs._reivindicar(database.engine, "worker") == job.id
+    jobs.executar_job(job.id)
+    job = _job(db, job.id)
+    assert job.status == "falhou"
+    assert job.tentativas == 2
+    assert _falhas.count(job.id) == 2
+
+
+def test_tipo_desconhecido_responde_400(cliente, auth):
+    resposta = cliente.post("/jobs/", json={"tipo": "nao_existe"}, headers=auth)
+    assert resposta.status_code == 400
+
+
+def test_tentativas_vem_da_tarefa_e_nao_do_cliente(cliente, auth):
+    resposta = cliente.post(
+        "/jobs/", json={"tipo": "importar_donos", "parametros": {"donos": []}, "max_tentativas": 50}, headers=auth
+    )
+    assert resposta.status_code == 202
+    assert resposta.json()["max_tentativas"] == 1
+
+
+def test_importacao_nao_aceita_caminho_no_servidor(cliente, auth, db):
+    resposta = cliente.post(
+        "/jobs/", json={"tipo": "importar_donos", "parametros": {"caminho": "/etc/passwd"}}, headers=auth
+    )
+    job_id = resposta.json()["id"]
+    assert jobs._reivindicar(database.engine, "worker") == job_id
+    jobs.executar_job(job_id)
+    job = _job(db, job_id)
+    assert job.status == "falhou"
+    assert "caminho" in job.erro
+
+
+def test_importacao_de_csv_enviado(cliente, auth, db):
+    csv = "nome,telefone\nCarlos Importado,11955554444\nBeatriz Importada,11944443333\n"
+    resposta = cliente.post(
+        "/jobs/importar-donos", files={"arquivo": ("donos.csv", csv, "text/csv")}, headers=auth
+    )
+    assert resposta.status_code == 202
+    job_id = resposta.json()["id"]
+
+    assert jobs._reivindicar(database.engine, "worker") == job_id
+    jobs.executar_job(job_id)
+    resultado = cliente.get(f"/jobs/{job_id}", headers=auth).json()
+    assert resultado["status"] == "concluido"
+    assert resultado["resultado"] == {"importados": 2}
+    nomes = {d["nome"] for d in cliente.get("/donos/", headers=auth).json()}
+    assert {"Carlos Importado", "Beatriz Importada"} <= nomes
+
+
+def test_csv_invalido_responde_400(cliente, auth):
+    resposta = cliente.post(
+        "/jobs/importar-donos", files={"arquivo": ("donos.csv", "telefone\n119\n", "text/csv")}, headers=auth
+    )
+    assert resposta.status_code == 400
+
+
+def test_job_de_outra_filial_nao_aparece(cliente, auth, autenticar):
+    job_id = cliente.post(
+        "/jobs/", json={"tipo": "importar_donos", "parametros": {"donos": []}}, headers=auth
+    ).json()["id"]
+    centro = autenticar(filial="centro")
+    assert cliente.get(f"/jobs/{job_id}", headers=centro).status_code == 404
+
+
+def test_etag_do_job_muda_a_cada_gravacao(cliente, auth):
+    url = "/jobs/{}".format(cliente.post(
+        "/jobs/", json={"tipo": "importar_donos", "parametros": {"donos": []}}, headers=auth
+    ).json()["id"])
+    resposta = cliente.get(url, headers=auth)
+    etag = resposta.headers["etag"]
+    assert etag == f'"{resposta.json()["version"]}"'
+    assert cliente.get(url, headers={**auth, "If-None-Match": etag}).status_code == 304
+
+    cliente.post(f"{url}/cancelar", headers=auth)
+    depois = cliente.get(url, headers={**auth, "If-None-Match": etag})
+    assert depois.status_code == 200
+    assert depois.json()["version"] > resposta.json()["version"]
+
+
+def _em_execucao(db, tipo="teste_falha"):
+    job = jobs.enfileirar(db, tipo)
+    assert jobs._reivindicar(database.engine, "worker") == job.id
+    # A reivindicação é fora da sessão: recarrega o job
+    return _job(db, job.id)
+
+
+def test_cancelar_job_pendente(db):
+    job = jobs.enfileirar(db, "teste_progresso")
+    job = jobs.cancelar(db, job.id)
+    assert job.status == "cancelado"
+    assert job.concluido_em is not None
+    # Cancelado não é reivindicado
+    assert jobs._reivindicar(database.engine, "worker") is None
+
+
+def test_cancelar_job_em_execucao_para_no_proximo_progresso(db):
+    job = _em_execucao(db, "teste_progresso")
+    job = jobs.cancelar(db, job.id)
+    # Continua executando até a tarefa chamar ctx.progresso()
+    assert job.status == "executando" and job.cancelar
+
+    ctx = jobs.ContextoJob(job.id, database.engine)
+    with pytest.raises(jobs.JobCancelado):
+        ctx.progresso(10)
+
+    jobs.executar_job(job.id)
+    assert _job(db, job.id).status == "cancelado"
+
+
+def test_cancelar_job_finalizado_nao_muda_nada(db):
+    job = _em_execucao(db, "teste_progresso")
+    jobs.executar_job(job.id)
+    db.expire_all()
+    assert jobs.cancelar(db, job.id).status == "concluido"
+    assert jobs.cancelar(db, 10 ** 9) is None
+
+
+def test_progresso_espacado_exceto_100(db):
+    job = _em_execucao(db, "teste_progresso")
+    ctx = jobs.ContextoJob(job.id, database.engine)
+
+    ctx.progresso(10, "início")
+    ctx.progresso(20, "logo depois")
+    job = _job(db, job.id)
+    assert (job.progresso, job.mensagem) == (10, "início")
+
+    ctx.progresso(100, "fim")
+    assert _job(db, job.id).progresso == 100
+
+
+def _envelhecer(db, job_id, **valores):
+    antigo = datetime.utcnow() - timedelta(seconds=jobs.ORFAO_SEGUNDOS + 60)
+    db.execute(update(models.Job).where(models.Job.id == job_id).values(atualizado_em=antigo, **valores))
+    db.commit()
+
+
+def test_orfao_volta_para_a_fila(db):
+    job = _em_execucao(db)
+    _envelhecer(db, job.id)
+
+    assert jobs._recuperar_orfaos(database.engine) == 1
+    job = _job(db, job.id)
+    assert job.status == "pendente" and job.worker is None
+    assert jobs._reivindicar(database.engine, "outro-worker") == job.id
+
+
+def test_orfao_sem_tentativas_falha(db):
+    job = _em_execucao(db)
+    _envelhecer(db, job.id, tentativas=2)
+
+    jobs._recuperar_orfaos(database.engine)
+    job = _job(db, job.id)
+    assert job.status == "falhou"
+    assert "interrompido" in job.erro
+
+
+def test_orfao_com_cancelamento_pedido_fica_cancelado(db):
+    job = _em_execucao(db)
+    _envelhecer(db, job.id, cancelar=True)
+
+    jobs._recuperar_orfaos(database.engine)
+    assert _job(db, job.id).status == "cancelado"
+    assert jobs._reivindicar(database.engine, "worker") is None
+
+
+def test_job_com_heartbeat_recente_nao_e_orfao(db):
+    job = _em_execucao(db)
+    assert jobs._recuperar_orfaos(database.engine) == 0
+    assert _job(db, job.id).status == "executando"
+
+
+def test_purga_informa_cada_lote(cliente, auth, criar_dono):
+    for _ in range(3):
+        dono = criar_dono(auth)
+        cliente.delete(f"/donos/{dono['id']}", headers=auth)
+
+    lotes = []
+    exclusao.purgar(database.engine, retencao_dias=0, lote=1, progresso=lambda *a: lotes.append(a))
+    donos = [linhas for tabela, linhas in lotes if tabela == "donos"]
+    # Um heartbeat por lote de 1 linha (mais o lote vazio que encerra)
+    assert len(donos) >= 4
+    assert donos == sorted(donos)
@@ -0,0 +1,90 @@
+"""Migrações versionadas (pacote migrations): ordem, idempotência e dados legados"""
+
+import importlib
+
+import pytest
+from sqlalchemy import create_engine
+
+import migrations
+import normalizacao
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'migracoes.db'}")
+    yield engine
+    engine.dispose()
+
+
+def _colunas(engine, tabela):
+    with engine.connect() as conn:
+        return {row[1]: row[2].upper() for row in conn.exec_driver_sql(f"PRAGMA table_info({tabela})")}
+
+
+def test_revisoes_ordenadas_e_unicas():
+    revisoes = migrations.listar_revisoes()
+    assert revisoes == sorted(revisoes)
+    numeros = [r[:4] for r in revisoes]
+    assert len(numeros) == len(set(numeros))
+    assert revisoes[0] == "0001_schema_inicial"
+
+
+def test_banco_vazio_recebe_todas_as_revisoes_em_ordem(engine):
+    aplicadas = migrations.aplicar_pendentes(engine, verbose=False)
+
+    assert aplicadas == migrations.listar_revisoes()
+    assert migrations.revisoes_pendentes(engine) == []
+    with engine.connect() as conn:
+        registradas = [row[0] for row in conn.exec_driver_sql("SELECT revisao FROM schema_migrations ORDER BY revisao")]
+    assert registradas == aplicadas
+
+
+def test_segunda_execucao_nao_faz_nada(engine):
+    migrations.aplicar_pendentes(engine, verbose=False)
+    assert migrations.aplicar_pendentes(engine, verbose=False) == []
+    with engine.connect() as conn:
+        total = conn.exec_driver_sql("SELECT COUNT(*) FROM schema_migrations").scalar()
+    assert total == len(migrations.listar_revisoes())
+
+
+def test_schema_final(engine):
+    migrations.aplicar_pendentes(engine, verbose=False)
+
+    for tabela in ("donos", "animais", "vacinas", "consultas", "banho_tosa"):
+        colunas = _colunas(engine, tabela)
+        assert "version" in colunas
+        assert "deleted_at" in colunas
+    assert _colunas(engine, "consultas")["status"] in ("INTEGER", "SMALLINT")
+    assert _colunas(engine, "banho_tosa")["tipo_servico"] in ("INTEGER", "SMALLINT")
+
+
+def test_dados_legados_normalizados_em_lotes(engine):
+    # Banco antigo: só o schema inicial, com status em texto livre
+    inicial = importlib.import_module("migrations.versions.0001_schema_inicial")
+    ctx = migrations.Contexto(engine, progresso=lambda *a: None)
+    inicial.upgrade(ctx)
+    legados = ["Agendada", "CONCLUÍDA", "em andamento", "cancelada", None]
+    with engine.begin() as conn:
+        conn.exec_driver_sql("INSERT INTO donos (id, nome, telefone) VALUES (1, 'Maria', '11987654321')")
+        for i, status in enumerate(legados, start=1):
+            conn.exec_driver_sql(
+                "INSERT INTO consultas (id, data_hora, motivo, status, dono_id) "
+                "VALUES (?, '2024-01-10 10:00:00', 'Check-up', ?, 1)",
+                (i, status),
+            )
+
+    lotes = []
+    migrations.aplicar_pendentes(engine, lote=2, progresso=lambda *a: lotes.append(a), verbose=True)
+
+    with engine.connect() as conn:
+        status = [row[0] for row in conn.exec_driver_sql("SELECT status FROM consultas ORDER BY id")]
+        version = {row[0] for row in conn.exec_driver_sql("SELECT version FROM consultas")}
+    codigos = normalizacao.STATUS_CONSULTA
+    assert status == [
+        codigos["agendada"], codigos["concluida"], codigos["em_andamento"],
+        codigos["cancelada"], codigos["agendada"],
+    ]
+    # As linhas existentes começam na versão 1
+    assert version == {1}
+    # 5 ids com lote 2: cada UPDATE em lotes reporta 3 vezes
+    assert any(processados == 2 and total == 5 for tabela, processados, total, _ in lotes if tabela == "consultas")
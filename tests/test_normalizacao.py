@@ -0,0 +1,87 @@
+"""Normalização de status/tipo (normalizacao.py) e códigos inteiros no banco (CodigoEnum)"""
+
+import pytest
+from sqlalchemy import text
+
+import database
+import models
+import normalizacao as n
+
+
+@pytest.mark.parametrize("entrada, esperado", [
+    ("CONCLUÍDA", "concluida"),
+    ("Concluida", "concluida"),
+    ("  concluída ", "concluida"),
+    ("Em andamento", "em_andamento"),
+    ("em-andamento", "em_andamento"),
+    ("EM  ANDAMENTO", "em_andamento"),
+    ("Cancelada", "cancelada"),
+    (None, "agendada"),
+    ("", "agendada"),
+    ("qualquer coisa", "agendada"),
+])
+def test_status_de_consulta(entrada, esperado):
+    assert n.normalizar_status_consulta(entrada) == esperado
+
+
+@pytest.mark.parametrize("entrada, esperado", [
+    ("Banho e Tosa", "banho_e_tosa"),
+    ("banho-tosa", "banho_e_tosa"),
+    ("TOSA", "tosa"),
+    ("hidratação", "banho"),  # desconhecido: padrão
+])
+def test_tipo_de_servico_com_alias(entrada, esperado):
+    assert n.normalizar_tipo_servico(entrada) == esperado
+
+
+def test_reconhecer_nao_inventa_padrao():
+    assert n.reconhecer_status_consulta("Concluída") == "concluida"
+    assert n.reconhecer_status_servico("Concluído") == "concluido"
+    assert n.reconhecer_status_consulta("finalizada") is None
+    assert n.reconhecer_status_consulta("") is None
+
+
+def test_codigos_sao_estaveis():
+    # Valores gravados no banco: mudar um número corrompe os dados existentes
+    assert n.STATUS_CONSULTA == {"agendada": 1, "em_andamento": 2, "concluida": 3, "cancelada": 4}
+    for codigos in n.CODIGOS.values():
+        assert len(set(codigos.values())) == len(codigos)
+
+
+def test_origens_permitidas():
+    assert set(n.origens_permitidas(n.TRANSICOES_CONSULTA, "concluida")) == {"agendada", "em_andamento"}
+    assert n.origens_permitidas(n.TRANSICOES_CONSULTA, "agendada") == ["cancelada"]
+
+
+def test_codigo_enum_recusa_valor_fora_da_tabela():
+    coluna = models.CodigoEnum("status_consulta")
+    assert coluna.process_bind_param("cancelada", None) == 4
+    assert coluna.process_result_value(2, None) == "em_andamento"
+    with pytest.raises(ValueError):
+        coluna.process_bind_param("Cancelada", None)
+
+
+def test_banco_guarda_o_codigo_e_a_api_o_nome(cliente, auth, criar_dono):
+    dono = criar_dono(auth)
+    animal = cliente.post(
+        "/animais/", json={"nome": "Mel", "especie": "gato", "idade": 1, "dono_id": dono["id"]}, headers=auth
+    ).json()
+    consulta = cliente.post("/consultas/", json={
+        "data_hora": "2030-04-01T08:30:00", "motivo": "Castração", "status": "EM ANDAMENTO",
+        "dono_id": dono["id"], "animal_id": animal["id"],
+    }, headers=auth).json()
+    assert consulta["status"] == "em_andamento"
+
+    with database.engine.connect() as conn:
+        bruto = conn.execute(text("SELECT status FROM consultas WHERE id = :id"), {"id": consulta["id"]}).scalar()
+    assert bruto == 2
+
+    filtradas = cliente.get("/consultas/", params={"status": "Em-Andamento"}, headers=auth).json()
+    assert consulta["id"] in {c["id"] for c in filtradas}
+
+
+@pytest.mark.parametrize("path", ["/consultas/", "/consultas/historico", "/banho-tosa/", "/banho-tosa/historico"])
+def test_filtro_de_status_desconhecido_responde_400(cliente, auth, path):
+    resposta = cliente.get(path, params={"status": "finalizada"}, headers=auth)
+    assert resposta.status_code == 400
+    assert "finalizada" in resposta.json()["detail"]
@@ -0,0 +1,105 @@
+"""?fields= e ?include= (projecoes.Expansao): campos pedidos, relações em lote e erros 400"""
+
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+
+import database
+import models
+import projecoes
+
+
+@pytest.fixture
+def ficha(cliente, auth, criar_dono):
+    """Dono com dois animais e uma consulta do primeiro"""
+    dono = criar_dono(auth, nome="Helena Campos")
+    animais = [
+        cliente.post(
+            "/animais/", json={"nome": nome, "especie": "cachorro", "idade": 5, "dono_id": dono["id"]}, headers=auth
+        ).json()
+        for nome in ("Fred", "Nina")
+    ]
+    consulta = cliente.post("/consultas/", json={
+        "data_hora": "2030-05-05T15:00:00", "motivo": "Dermatite",
+        "dono_id": dono["id"], "animal_id": animais[0]["id"],
+    }, headers=auth).json()
+    return dono, animais, consulta
+
+
+@contextmanager
+def _selects():
+    """Conta os SELECTs executados no engine da matriz"""
+    executados = []
+
+    def contar(conn, cursor, sql, parametros, contexto, varios):
+        if sql.lstrip().upper().startswith("SELECT"):
+            executados.append(sql)
+
+    event.listen(database.engine, "before_cursor_execute", contar)
+    try:
+        yield executados
+    finally:
+        event.remove(database.engine, "before_cursor_execute", contar)
+
+
+def test_fields_devolve_so_os_campos_pedidos(cliente, auth, ficha):
+    _, _, consulta = ficha
+    corpo = cliente.get(f"/consultas/{consulta['id']}", params={"fields": "id, status,id"}, headers=auth).json()
+    assert corpo == {"id": consulta["id"], "status": "agendada"}
+
+
+def test_include_embute_as_relacoes(cliente, auth, ficha):
+    dono, animais, consulta = ficha
+
+    corpo = cliente.get(f"/consultas/{consulta['id']}", params={"include": "dono,animal"}, headers=auth).json()
+    assert corpo["dono"]["nome"] == "Helena Campos"
+    assert corpo["animal"]["id"] == animais[0]["id"]
+
+    com_animais = cliente.get(f"/donos/{dono['id']}", params={"include": "animais"}, headers=auth).json()
+    assert sorted(a["nome"] for a in com_animais["animais"]) == ["Fred", "Nina"]
+
+
+def test_chave_da_relacao_so_sai_se_pedida(cliente, auth, ficha):
+    _, animais, consulta = ficha
+    corpo = cliente.get(
+        f"/consultas/{consulta['id']}", params={"fields": "motivo", "include": "animal"}, headers=auth
+    ).json()
+    # animal_id foi lido para carregar o animal, mas não foi pedido
+    assert corpo.keys() == {"motivo", "animal"}
+    assert corpo["animal"]["id"] == animais[0]["id"]
+
+
+def test_listagem_com_fields_nao_mistura_o_cache(cliente, auth, ficha):
+    enxuta = cliente.get("/donos/", params={"fields": "id"}, headers=auth).json()
+    completa = cliente.get("/donos/", headers=auth).json()
+    assert all(d.keys() == {"id"} for d in enxuta)
+    assert all({"id", "nome", "telefone"} <= d.keys() for d in completa)
+
+
+@pytest.mark.parametrize("path, params, trecho", [
+    ("/consultas/", {"fields": "id,senha"}, "Campo inválido em fields: senha"),
+    ("/consultas/", {"include": "vacinas"}, "Relação inválida em include: vacinas"),
+    ("/vacinas/", {"include": "dono"}, "disponíveis: animal"),
+    ("/donos/", {"include": "dono"}, "disponíveis: animais"),
+])
+def test_nome_invalido_responde_400(cliente, auth, path, params, trecho):
+    resposta = cliente.get(path, params=params, headers=auth)
+    assert resposta.status_code == 400
+    assert trecho in resposta.json()["detail"]
+
+
+def test_uma_query_por_relacao_sem_n_mais_1(cliente, ficha):
+    dono, _, _ = ficha
+    expansao = projecoes.ANIMAL.expandir("id,nome", "dono,vacinas")
+    db = database.SessionLocal()
+    try:
+        with _selects() as executados:
+            animais = expansao.listar(db, models.Animal.dono_id == dono["id"])
+    finally:
+        db.close()
+
+    assert len(animais) == 2
+    assert all(a["dono"]["id"] == dono["id"] and a["vacinas"] == [] for a in animais)
+    # Página + uma query IN por relação, qualquer que seja o número de animais
+    assert len(executados) == 3
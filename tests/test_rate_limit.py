@@ -0,0 +1,131 @@
+"""Token bucket (429) e limite de requisições simultâneas (503), direto nos middlewares ASGI"""
+
+import anyio
+
+import rate_limit
+from rate_limit import ConcurrencyLimitMiddleware, Limite, RateLimitMiddleware, TokenBuckets
+
+LIMITE = Limite("teste", taxa=1, capacidade=3)
+
+
+async def _ok(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+def _escopo(path="/donos/", metodo="GET", ip="10.0.0.9"):
+    return {"type": "http", "method": metodo, "path": path, "query_string": b"", "headers": [], "client": (ip, 5000)}
+
+
+async def _chamar(app, scope):
+    """Executa o app ASGI; retorna (status, cabeçalhos)"""
+    mensagens = []
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(mensagem):
+        mensagens.append(mensagem)
+
+    await app(scope, receive, send)
+    inicio = mensagens[0]
+    return inicio["status"], dict(inicio["headers"])
+
+
+# ---- TokenBuckets ----
+
+def test_rajada_ate_a_capacidade_e_depois_espera():
+    buckets = TokenBuckets()
+    assert [buckets.consumir("a", LIMITE, 100.0) for _ in range(3)] == [0, 0, 0]
+    assert buckets.consumir("a", LIMITE, 100.0) == 1.0
+    # Meio segundo depois falta meio token
+    assert buckets.consumir("a", LIMITE, 100.5) == 0.5
+    assert buckets.consumir("a", LIMITE, 101.5) == 0
+
+
+def test_reposicao_nao_passa_da_capacidade():
+    buckets = TokenBuckets()
+    buckets.consumir("a", LIMITE, 0.0)
+    buckets.consumir("a", LIMITE, 3600.0)
+    consumos = [buckets.consumir("a", LIMITE, 3600.0) for _ in range(3)]
+    assert consumos[:2] == [0, 0] and consumos[2] > 0
+
+
+def test_clientes_independentes_e_lru_limitado():
+    buckets = TokenBuckets(maxsize=2)
+    for _ in range(3):
+        buckets.consumir("a", LIMITE, 0.0)
+    assert buckets.consumir("b", LIMITE, 0.0) == 0
+    buckets.consumir("c", LIMITE, 0.0)
+    assert len(buckets) == 2
+    # "a" foi o menos usado recentemente: descartado, volta com o bucket cheio
+    assert buckets.consumir("a", LIMITE, 0.0) == 0
+
+
+# ---- RateLimitMiddleware ----
+
+def test_middleware_responde_429_com_retry_after(monkeypatch):
+    monkeypatch.setattr(rate_limit, "REGRAS", [("GET", "/", LIMITE)])
+    app = RateLimitMiddleware(_ok, habilitado=True)
+
+    async def cenario():
+        return [await _chamar(app, _escopo()) for _ in range(4)]
+
+    respostas = anyio.run(cenario)
+    assert [status for status, _ in respostas] == [200, 200, 200, 429]
+    assert respostas[-1][1][b"retry-after"] == b"1"
+    assert app.rejeitadas == 1
+
+
+def test_middleware_separa_por_ip_e_isenta_estaticos(monkeypatch):
+    monkeypatch.setattr(rate_limit, "REGRAS", [(None, "/", Limite("um", taxa=0.001, capacidade=1))])
+    app = RateLimitMiddleware(_ok, habilitado=True)
+
+    async def cenario():
+        return [
+            (await _chamar(app, _escopo(ip="10.0.0.1")))[0],
+            (await _chamar(app, _escopo(ip="10.0.0.1")))[0],
+            (await _chamar(app, _escopo(ip="10.0.0.2")))[0],
+            (await _chamar(app, _escopo("/frontend/app.js", ip="10.0.0.1")))[0],
+            (await _chamar(app, _escopo("/auth/login", "POST", ip="10.0.0.1")))[0],
+        ]
+
+    assert anyio.run(cenario) == [200, 429, 200, 200, 429]
+
+
+# ---- ConcurrencyLimitMiddleware ----
+
+def test_acima_do_limite_responde_503_na_hora():
+    liberar = anyio.Event()
+
+    async def lento(scope, receive, send):
+        await liberar.wait()
+        await _ok(scope, receive, send)
+
+    app = ConcurrencyLimitMiddleware(lento, limite=2)
+    resultados = []
+
+    async def cenario():
+        async def requisicao(path="/donos/"):
+            resultados.append(await _chamar(app, _escopo(path)))
+
+        async with anyio.create_task_group() as grupo:
+            grupo.start_soon(requisicao)
+            grupo.start_soon(requisicao)
+            await anyio.wait_all_tasks_blocked()
+            assert app.em_andamento == 2
+
+            # A terceira não espera: 503 enquanto as duas estão em andamento
+            await requisicao()
+            assert resultados[-1][0] == 503
+            assert resultados[-1][1][b"retry-after"] == b"1"
+
+            # SSE não ocupa vaga nem é recusado
+            grupo.start_soon(requisicao, "/eventos/")
+            await anyio.wait_all_tasks_blocked()
+            assert app.em_andamento == 2
+            liberar.set()
+
+    anyio.run(cenario)
+    assert sorted(status for status, _ in resultados) == [200, 200, 200, 503]
+    assert (app.em_andamento, app.rejeitadas) == (0, 1)
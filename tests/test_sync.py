@@ -0,0 +1,65 @@
+"""Sincronização incremental (GET /sync): token, lotes e lápides"""
+
+
+def _ate_o_fim(cliente, auth, since=None, limite=500):
+    """Percorre os lotes até mais=false; retorna o último token e as respostas"""
+    respostas = []
+    while True:
+        params = {"limite": limite}
+        if since is not None:
+            params["since"] = since
+        resposta = cliente.get("/sync/", params=params, headers=auth)
+        assert resposta.status_code == 200
+        corpo = resposta.json()
+        respostas.append(corpo)
+        since = corpo["token"]
+        if not corpo["mais"]:
+            return since, respostas
+
+
+def test_token_devolve_so_as_alteracoes_seguintes(cliente, auth, criar_dono):
+    token, _ = _ate_o_fim(cliente, auth)
+    dono = criar_dono(auth, nome="Dono Sincronizado")
+
+    corpo = cliente.get("/sync/", params={"since": token}, headers=auth).json()
+    assert [d["id"] for d in corpo["donos"]["alterados"]] == [dono["id"]]
+    assert corpo["donos"]["alterados"][0]["nome"] == "Dono Sincronizado"
+    assert corpo["mais"] is False
+
+    # Nada mudou desde o novo token
+    vazio = cliente.get("/sync/", params={"since": corpo["token"]}, headers=auth).json()
+    assert vazio["token"] == corpo["token"]
+    assert vazio["donos"] == {"alterados": [], "removidos": []}
+
+
+def test_registro_aparece_uma_vez_no_estado_atual(cliente, auth, criar_dono):
+    token, _ = _ate_o_fim(cliente, auth)
+    dono = criar_dono(auth, nome="Primeiro Nome")
+    cliente.patch(f"/donos/{dono['id']}", json={"nome": "Nome Final"}, headers=auth)
+
+    corpo = cliente.get("/sync/", params={"since": token}, headers=auth).json()
+    assert [(d["id"], d["nome"]) for d in corpo["donos"]["alterados"]] == [(dono["id"], "Nome Final")]
+
+
+def test_exclusao_vira_lapide(cliente, auth, criar_dono):
+    dono = criar_dono(auth)
+    token, _ = _ate_o_fim(cliente, auth)
+    assert cliente.delete(f"/donos/{dono['id']}", headers=auth).status_code == 204
+
+    corpo = cliente.get("/sync/", params={"since": token}, headers=auth).json()
+    assert corpo["donos"]["removidos"] == [dono["id"]]
+    assert corpo["donos"]["alterados"] == []
+
+
+def test_lotes_com_limite(cliente, auth, criar_dono):
+    token, _ = _ate_o_fim(cliente, auth)
+    criados = {criar_dono(auth, nome=f"Lote {i}")["id"] for i in range(3)}
+
+    _, respostas = _ate_o_fim(cliente, auth, since=token, limite=1)
+    assert [r["mais"] for r in respostas] == [True, True, False]
+    recebidos = {d["id"] for r in respostas for d in r["donos"]["alterados"]}
+    assert recebidos == criados
+
+
+def test_token_invalido_responde_400(cliente, auth):
+    assert cliente.get("/sync/", params={"since": "abc"}, headers=auth).status_code == 400